@@ -15,6 +15,9 @@ from .tools.common_tools import (
 from .tools.monitoring_tools import check_critical_lab_values, generate_deterioration_alert
 from .tools.image_tools import analyze_medical_image
 from .tools.websearch_tools import web_search
+from .infra.context_window import install_context_window
+from .infra.metrics import instrument_agent_tree, start_metrics_server
+from .infra.token_accounting import install_token_accounting
 
 # ---- Department imports (alphabetical) ----
 from .departments.allergy_immunology import allergy_immunology_agent
@@ -120,3 +123,10 @@ root_agent = Agent(
         vascular_surgery_agent,
     ],
 )
+
+# ---- Observability and context budgeting: per-tool metrics, LLM token accounting
+# and per-agent context-window trimming for every agent ----
+instrument_agent_tree(root_agent)
+install_token_accounting(root_agent)
+install_context_window(root_agent)
+start_metrics_server()
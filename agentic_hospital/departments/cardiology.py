@@ -18,7 +18,7 @@ from ..tools.common_tools import (
     generate_treatment_plan,
 )
 from ..tools.monitoring_tools import check_critical_lab_values, generate_deterioration_alert
-from ..tools.cardiology_tools import analyze_ecg, assess_cardiac_risk
+from ..tools.cardiology_tools import analyze_ecg, assess_cardiac_risk, assess_cardiac_risk_registry
 from ..tools.image_tools import analyze_medical_image
 from ..tools.websearch_tools import web_search
 
@@ -43,6 +43,7 @@ cardiology_agent = Agent(
         generate_deterioration_alert,
         analyze_ecg,
         assess_cardiac_risk,
+        assess_cardiac_risk_registry,
         analyze_medical_image,
         web_search,
     ],
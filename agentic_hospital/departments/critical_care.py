@@ -17,7 +17,12 @@ from ..tools.common_tools import (
     request_mdt_consultation,
     generate_treatment_plan,
 )
-from ..tools.monitoring_tools import check_critical_lab_values, generate_deterioration_alert
+from ..tools.monitoring_tools import (
+    check_critical_lab_values,
+    generate_deterioration_alert,
+    get_vitals_trend,
+    score_ward_vitals,
+)
 from ..tools.critical_care_tools import (
     calculate_severity_score,
     organ_dysfunction_assessment,
@@ -43,6 +48,8 @@ critical_care_agent = Agent(
         generate_treatment_plan,
         check_critical_lab_values,
         generate_deterioration_alert,
+        score_ward_vitals,
+        get_vitals_trend,
         calculate_severity_score,
         organ_dysfunction_assessment,
         web_search,
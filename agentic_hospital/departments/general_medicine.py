@@ -17,8 +17,14 @@ from ..tools.common_tools import (
     request_mdt_consultation,
     generate_treatment_plan,
 )
-from ..tools.monitoring_tools import check_critical_lab_values, generate_deterioration_alert
+from ..tools.monitoring_tools import (
+    check_critical_lab_values,
+    generate_deterioration_alert,
+    get_vitals_trend,
+    score_ward_vitals,
+)
 from ..tools.general_medicine_tools import bmi_calculator, vaccination_schedule
+from ..tools.screening import get_screening_worklist, record_screening_history
 from ..tools.websearch_tools import web_search
 
 general_medicine_agent = Agent(
@@ -40,8 +46,12 @@ general_medicine_agent = Agent(
         generate_treatment_plan,
         check_critical_lab_values,
         generate_deterioration_alert,
+        score_ward_vitals,
+        get_vitals_trend,
         bmi_calculator,
         vaccination_schedule,
+        get_screening_worklist,
+        record_screening_history,
         web_search,
     ],
 )
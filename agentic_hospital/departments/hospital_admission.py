@@ -16,6 +16,8 @@ from ..tools.bed_management_tools import (
     assign_bed,
     discharge_patient_from_bed,
     transfer_patient_bed,
+    mark_bed_ready,
+    set_bed_out_of_service,
     add_to_waitlist,
     get_waitlist_status,
 )
@@ -40,6 +42,8 @@ hospital_admission_agent = Agent(
         assign_bed,
         discharge_patient_from_bed,
         transfer_patient_bed,
+        mark_bed_ready,
+        set_bed_out_of_service,
         add_to_waitlist,
         get_waitlist_status,
     ],
@@ -18,7 +18,7 @@ from ..tools.common_tools import (
     generate_treatment_plan,
 )
 from ..tools.monitoring_tools import check_critical_lab_values, generate_deterioration_alert
-from ..tools.nephrology_tools import calculate_gfr, assess_kidney_stage
+from ..tools.nephrology_tools import calculate_gfr, assess_kidney_stage, calculate_gfr_cohort
 from ..tools.websearch_tools import web_search
 
 nephrology_agent = Agent(
@@ -42,6 +42,7 @@ nephrology_agent = Agent(
         generate_deterioration_alert,
         calculate_gfr,
         assess_kidney_stage,
+        calculate_gfr_cohort,
         web_search,
     ],
 )
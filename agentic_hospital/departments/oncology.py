@@ -19,6 +19,7 @@ from ..tools.common_tools import (
 )
 from ..tools.monitoring_tools import check_critical_lab_values, generate_deterioration_alert
 from ..tools.oncology_tools import cancer_screening_recommendation, staging_assessment
+from ..tools.screening import get_screening_worklist, record_screening_history
 from ..tools.websearch_tools import web_search
 
 oncology_agent = Agent(
@@ -42,6 +43,8 @@ oncology_agent = Agent(
         generate_deterioration_alert,
         cancer_screening_recommendation,
         staging_assessment,
+        get_screening_worklist,
+        record_screening_history,
         web_search,
     ],
 )
@@ -18,7 +18,7 @@ from ..tools.common_tools import (
     generate_treatment_plan,
 )
 from ..tools.monitoring_tools import check_critical_lab_values, generate_deterioration_alert
-from ..tools.pathology_tools import interpret_biopsy_result, critical_lab_value_alert
+from ..tools.pathology_tools import interpret_biopsy_result, critical_lab_value_alert, screen_analyser_results
 from ..tools.image_tools import analyze_medical_image
 from ..tools.websearch_tools import web_search
 
@@ -43,6 +43,7 @@ pathology_agent = Agent(
         generate_deterioration_alert,
         interpret_biopsy_result,
         critical_lab_value_alert,
+        screen_analyser_results,
         analyze_medical_image,
         web_search,
     ],
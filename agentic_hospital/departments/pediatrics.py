@@ -22,6 +22,7 @@ from ..tools.pediatrics_tools import (
     pediatric_growth_assessment,
     vaccination_tracker,
 )
+from ..tools.screening import get_screening_worklist, record_screening_history
 from ..tools.websearch_tools import web_search
 
 pediatrics_agent = Agent(
@@ -45,6 +46,8 @@ pediatrics_agent = Agent(
         generate_deterioration_alert,
         pediatric_growth_assessment,
         vaccination_tracker,
+        get_screening_worklist,
+        record_screening_history,
         web_search,
     ],
 )
@@ -5,6 +5,7 @@ from google.adk.models.lite_llm import LiteLlm
 
 from ..prompts.pharmacy import PHARMACY_INSTRUCTION
 from ..tools.common_tools import get_patient_info, check_drug_interactions
+from ..tools.nephrology_tools import calculate_gfr_cohort
 from ..tools.pharmacy_tools import (
     verify_medication_order,
     dispense_medication,
@@ -31,5 +32,6 @@ pharmacy_agent = Agent(
         dispense_medication,
         medication_reconciliation,
         generate_tta_prescription,
+        calculate_gfr_cohort,
     ],
 )
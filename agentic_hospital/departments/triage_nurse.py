@@ -10,6 +10,7 @@ from ..tools.triage_tools import (
     record_nurse_triage,
     assign_waiting_priority,
     get_triage_queue,
+    call_next_patient,
 )
 
 triage_nurse_agent = Agent(
@@ -30,5 +31,6 @@ triage_nurse_agent = Agent(
         record_nurse_triage,
         assign_waiting_priority,
         get_triage_queue,
+        call_next_patient,
     ],
 )
@@ -0,0 +1 @@
+"""Runtime infrastructure shared by the agent tree and the tool layer."""
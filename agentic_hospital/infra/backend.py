@@ -0,0 +1,911 @@
+"""Pluggable shared-state backend for the tool-layer stores.
+
+By default the module-level dicts and lists in the tool modules are the only
+copy of the hospital state, which limits deployment to one ``adk web``
+worker. Setting ``AGENTIC_HOSPITAL_STATE_BACKEND`` to a shared backend lets N
+worker processes see one hospital::
+
+    AGENTIC_HOSPITAL_STATE_BACKEND=sqlite:///var/lib/agentic_hospital/state.db
+
+How it works
+------------
+Tool modules register their stores with ``register_store`` and mark their
+tool functions with ``@state_transaction``. The module dicts stay the working
+copy, so tool code is unchanged. Synchronisation follows the locks the tool
+code already takes, so calls on different patients never wait for each
+other, in one process or across several:
+
+1. ``infra.state.locked(...)`` and ``named_lock`` also take a cross-process
+   lock for the same stripe (a byte-range lock on ``<db>-locks``) and then
+   apply whatever other workers have committed since this process last
+   looked, which includes every change made under that lock before.
+2. The tool changes the in-process entries under those locks.
+3. Releasing the outermost hold of a stripe writes the changed entries back
+   in one short write transaction with bumped versions, then releases the
+   cross-process lock.
+
+Catching up compares the backend generation with the last one applied and,
+if another worker has written since, reads only the documents and log items
+committed after it (indexed by generation); documents this process already
+has at that version are skipped. ``@state_transaction`` catches up on entry
+too, so lock-free reads are current, and on exit writes out new log items
+(write transactions only) and checks that nothing changed outside a lock.
+
+Store kinds:
+
+* ``keyed``    — a dict whose top-level entries are separate documents (one
+  per ward, one per patient). Every change to an entry — adding, editing or
+  removing it — must happen under ``locked(...)`` for its key (``scope``
+  ``'patient'`` or ``'ward'``), which the tool modules already do for thread
+  safety.
+* ``append``   — an append-only list (audit logs). Appends must hold
+  ``append_lock(obj)`` (``infra.event_log.log_event`` does); the new tail is
+  written out at the end of the transaction, after the items other workers
+  appended meanwhile, which this process then adds after its own.
+* ``document`` — the whole object is one document (e.g. the ED waiting
+  queue), guarded by the ``infra.state.named_lock`` given as ``lock=``.
+
+A change the write-back would skip is an error, not a silent divergence
+between workers: at the end of every transaction an entry that was added,
+removed or resized while nobody in the process held its lock raises
+``UnsharedMutationError``, and only those entries are reloaded from the
+backend. Set ``AGENTIC_HOSPITAL_STATE_STRICT=1`` to also compare every
+unlocked entry with its last synced JSON, which catches in-place edits of
+fields at the cost of serialising the whole state per call
+(``infra.stress --strict``).
+
+Write transactions are short and only cover what a lock release or a flush
+wrote; read-only paths never take SQLite's write lock, so a write nested in a
+read cannot fail with ``SQLITE_BUSY``. ``AtomicCounter`` instances with a
+name draw from a shared counter. ``infra.stress --scaling N`` measures
+throughput with 1..N worker processes.
+
+A different backend (e.g. a Redis-compatible server) only needs to implement
+the ``StateBackend`` interface and be returned by ``configure_backend``.
+"""
+
+import errno
+import functools
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from contextlib import ExitStack
+from itertools import repeat
+from typing import Any, Callable, Iterable, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+_ENV_VAR = "AGENTIC_HOSPITAL_STATE_BACKEND"
+_STRICT_ENV_VAR = "AGENTIC_HOSPITAL_STATE_STRICT"
+
+# struct flock for F_OFD_SETLKW: l_type, l_whence, l_start, l_len, l_pid
+_FLOCK = struct.Struct("hhqqi4x")
+
+DocRow = tuple[str, str, int, str]   # namespace, key, version, JSON value ('' = deleted)
+ItemRow = tuple[str, int, str]       # namespace, seq, JSON value
+
+
+# =============================================================================
+# BACKEND INTERFACE
+# =============================================================================
+class StateBackend:
+    """Storage primitives used by the sync layer. The base class is the in-process default.
+
+    Every method is one atomic operation; implementations must be safe to
+    call from several threads at once.
+    """
+
+    shared = False
+    name = "memory"
+
+    def generation(self) -> int:
+        """Counter bumped by every write."""
+        raise NotImplementedError
+
+    def changes(self, since: int, until: int) -> tuple[list[DocRow], list[ItemRow]]:
+        """Documents and log items written in generations ``since`` (exclusive) to ``until``.
+
+        Rows are committed together with their generation, so once ``until``
+        has been read everything up to it is visible. A document rewritten
+        after ``until`` is left out and comes with a later call.
+        """
+        raise NotImplementedError
+
+    def read_docs(self, namespaces: Iterable[str], keys: Iterable[str]) -> list[DocRow]:
+        """Current documents for ``keys`` in any of ``namespaces``."""
+        raise NotImplementedError
+
+    def write(self, docs: list[DocRow],
+              appends: dict[str, tuple[int, list[str]]]) -> tuple[int, dict[str, list[tuple[int, str]]]]:
+        """Writes documents and appends log items in one transaction.
+
+        ``appends`` maps a namespace to ``(last seq the caller has, new
+        values)``; the values go after any items appended since. Returns the
+        new generation and, per namespace, those intervening ``(seq, value)``
+        items.
+        """
+        raise NotImplementedError
+
+    def seed(self, namespace: str, docs: list[tuple[str, str]],
+             items: list[str]) -> tuple[int, Optional[list[DocRow]], Optional[list[ItemRow]]]:
+        """Stores a namespace's initial contents unless another worker already has.
+
+        Returns the generation and ``None, None`` if this call seeded it,
+        otherwise the stored documents and items.
+        """
+        raise NotImplementedError
+
+    def incr(self, name: str) -> int:
+        raise NotImplementedError
+
+    def lock(self, slot: int) -> None:
+        """Blocks until this process holds the cross-process lock ``slot``."""
+        raise NotImplementedError
+
+    def unlock(self, slot: int) -> None:
+        raise NotImplementedError
+
+
+_SQLITE_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS docs (namespace TEXT NOT NULL, key TEXT NOT NULL, "
+    "version INTEGER NOT NULL, value TEXT NOT NULL, gen INTEGER NOT NULL DEFAULT 0, "
+    "PRIMARY KEY (namespace, key))",
+    "CREATE TABLE IF NOT EXISTS log_items (namespace TEXT NOT NULL, seq INTEGER NOT NULL, "
+    "value TEXT NOT NULL, gen INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (namespace, seq))",
+    "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+)
+# Lock slot every write queues on, past the slots the sync layer hands out
+_WRITER_SLOT = 4 << 16
+
+_SQLITE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS docs_gen ON docs (gen)",
+    "CREATE INDEX IF NOT EXISTS log_items_gen ON log_items (gen)",
+)
+
+
+class SQLiteBackend(StateBackend):
+    """Shared state in one SQLite file (WAL mode) reachable by every worker.
+
+    Each thread gets its own connection, so reads never queue behind another
+    thread's transaction. Cross-process locks are byte ranges of the
+    ``<path>-locks`` file, taken through a per-thread open file description
+    where the platform has OFD locks: classic POSIX locks belong to the whole
+    process, so the kernel reports false deadlocks between threads that hold
+    different slots (on other platforms those are retried). Writers also
+    queue on a slot before ``BEGIN IMMEDIATE``: the kernel hands the lock
+    straight to the next waiter, where SQLite's busy handler would sleep for
+    milliseconds per retry.
+    """
+
+    shared = True
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        if fcntl is None:
+            raise RuntimeError("The SQLite state backend needs POSIX file locks (fcntl)")
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for stmt in _SQLITE_SCHEMA:
+            conn.execute(stmt)
+        for table in ("docs", "log_items"):
+            if "gen" not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN gen INTEGER NOT NULL DEFAULT 0")
+        for stmt in _SQLITE_INDEXES:
+            conn.execute(stmt)
+        conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('generation', 0)")
+        self._lock_path = os.path.abspath(path) + "-locks"
+        self._ofd = hasattr(fcntl, "F_OFD_SETLKW")
+        self._lock_fd = None if self._ofd else os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=60.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=60000")
+            self._local.conn = conn
+        return conn
+
+    def generation(self) -> int:
+        return self._conn().execute("SELECT value FROM meta WHERE name='generation'").fetchone()[0]
+
+    def changes(self, since: int, until: int) -> tuple[list[DocRow], list[ItemRow]]:
+        docs, items = [], []
+        for kind, namespace, key, number, value in self._conn().execute(
+                "SELECT 0, namespace, key, version, value FROM docs WHERE gen > ? AND gen <= ? "
+                "UNION ALL SELECT 1, namespace, '', seq, value FROM log_items WHERE gen > ? AND gen <= ? "
+                "ORDER BY 1, 2, 4", (since, until, since, until)):
+            if kind:
+                items.append((namespace, number, value))
+            else:
+                docs.append((namespace, key, number, value))
+        return docs, items
+
+    def read_docs(self, namespaces: Iterable[str], keys: Iterable[str]) -> list[DocRow]:
+        namespaces, keys = list(namespaces), [str(k) for k in keys]
+        if not namespaces or not keys:
+            return []
+        return self._conn().execute(
+            f"SELECT namespace, key, version, value FROM docs "
+            f"WHERE namespace IN ({','.join('?' * len(namespaces))}) "
+            f"AND key IN ({','.join('?' * len(keys))})",
+            namespaces + keys,
+        ).fetchall()
+
+    def write(self, docs: list[DocRow],
+              appends: dict[str, tuple[int, list[str]]]) -> tuple[int, dict[str, list[tuple[int, str]]]]:
+        conn = self._conn()
+        self.lock(_WRITER_SLOT)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            generation = self._bump(conn)
+            conn.executemany(
+                "INSERT OR REPLACE INTO docs (namespace, key, version, value, gen) VALUES (?,?,?,?,?)",
+                [(ns, key, version, value, generation) for ns, key, version, value in docs],
+            )
+            merged = {}
+            for namespace, (after_seq, values) in appends.items():
+                remote = conn.execute(
+                    "SELECT seq, value FROM log_items WHERE namespace=? AND seq > ? ORDER BY seq",
+                    (namespace, after_seq),
+                ).fetchall()
+                first = (remote[-1][0] if remote else after_seq) + 1
+                conn.executemany(
+                    "INSERT INTO log_items (namespace, seq, value, gen) VALUES (?,?,?,?)",
+                    [(namespace, first + i, v, generation) for i, v in enumerate(values)],
+                )
+                merged[namespace] = remote
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            self.unlock(_WRITER_SLOT)
+        return generation, merged
+
+    def seed(self, namespace: str, docs: list[tuple[str, str]],
+             items: list[str]) -> tuple[int, Optional[list[DocRow]], Optional[list[ItemRow]]]:
+        conn = self._conn()
+        self.lock(_WRITER_SLOT)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            seeded = conn.execute(
+                "SELECT 1 FROM meta WHERE name=?", (f"seeded:{namespace}",)).fetchone() is not None
+            if seeded:
+                generation = conn.execute("SELECT value FROM meta WHERE name='generation'").fetchone()[0]
+                stored_docs = conn.execute(
+                    "SELECT namespace, key, version, value FROM docs WHERE namespace=? AND value != ''",
+                    (namespace,)).fetchall()
+                stored_items = conn.execute(
+                    "SELECT namespace, seq, value FROM log_items WHERE namespace=? ORDER BY seq",
+                    (namespace,)).fetchall()
+            else:
+                generation = self._bump(conn)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO docs (namespace, key, version, value, gen) VALUES (?,?,1,?,?)",
+                    [(namespace, key, value, generation) for key, value in docs],
+                )
+                conn.executemany(
+                    "INSERT INTO log_items (namespace, seq, value, gen) VALUES (?,?,?,?)",
+                    [(namespace, i + 1, v, generation) for i, v in enumerate(items)],
+                )
+                conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                             (f"seeded:{namespace}", int(time.time())))
+                stored_docs = stored_items = None
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            self.unlock(_WRITER_SLOT)
+        return generation, stored_docs, stored_items
+
+    def incr(self, name: str) -> int:
+        self.lock(_WRITER_SLOT)
+        try:
+            return self._conn().execute(
+                "INSERT INTO counters (name, value) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1 RETURNING value", (name,),
+            ).fetchall()[0][0]
+        finally:
+            self.unlock(_WRITER_SLOT)
+
+    def _lock_file(self):
+        handle = getattr(self._local, "locks", None)
+        if handle is None:
+            handle = self._local.locks = open(self._lock_path, "a+b")  # closed with the thread
+        return handle
+
+    def lock(self, slot: int) -> None:
+        if self._ofd:
+            fcntl.fcntl(self._lock_file(), fcntl.F_OFD_SETLKW,
+                        _FLOCK.pack(fcntl.F_WRLCK, os.SEEK_SET, slot, 1, 0))
+            return
+        while True:
+            try:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, slot)
+                return
+            except OSError as exc:
+                if exc.errno != errno.EDEADLK:
+                    raise
+                time.sleep(0.001)
+
+    def unlock(self, slot: int) -> None:
+        if self._ofd:
+            fcntl.fcntl(self._lock_file(), fcntl.F_OFD_SETLK,
+                        _FLOCK.pack(fcntl.F_UNLCK, os.SEEK_SET, slot, 1, 0))
+        else:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, slot)
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection) -> int:
+        return conn.execute(
+            "UPDATE meta SET value = value + 1 WHERE name='generation' RETURNING value"
+        ).fetchone()[0]
+
+
+def _backend_from_url(url: str) -> StateBackend:
+    url = (url or "").strip()
+    if not url or url == "memory":
+        return StateBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported {_ENV_VAR} value: {url!r} (use 'memory' or 'sqlite:///path')")
+
+
+# =============================================================================
+# STORE REGISTRY
+# =============================================================================
+class UnsharedMutationError(RuntimeError):
+    """A registered store changed in a way the write-back would not share."""
+
+
+class _Store:
+    __slots__ = ("namespace", "obj", "kind", "scope", "lock", "on_load", "guard",
+                 "versions", "cached", "lens", "synced_len", "flushed", "offset")
+
+    def __init__(self, namespace: str, obj, kind: str, scope: Optional[str],
+                 lock: Optional[str] = None, on_load: Optional[Callable] = None):
+        self.namespace = namespace
+        self.obj = obj
+        self.kind = kind
+        self.scope = scope
+        self.lock = lock
+        self.on_load = on_load
+        self.guard = threading.RLock() if kind == "append" else None
+        self.versions: dict[str, int] = {}   # keyed / document: key → version last synced
+        self.cached: dict[str, str] = {}     # key → JSON last synced (absent once deleted)
+        self.lens: dict[str, int] = {}       # key → list length last synced
+        self.synced_len = 0                  # append: last backend seq held locally
+        self.flushed = 0                     # append: local items (from the first ever) in the backend
+        self.offset = 0                      # append: items dropped from the front locally
+
+
+_STORES: dict[str, _Store] = {}
+_STORES_BY_OBJ: dict[int, _Store] = {}
+_SCOPED: dict[str, list[_Store]] = {"patient": [], "ward": []}
+_LOCKED_DOCS: dict[str, list[_Store]] = {}
+_APPENDS: list[_Store] = []
+
+_BACKEND: dict[str, Any] = {"impl": None, "strict": None}
+_DOC_KEY = "_"
+
+_SYNC_LOCK = threading.RLock()        # sync metadata of the in-process copies
+_SYNCED = {"generation": -1}          # every change up to this generation is applied here
+_TXN = threading.local()              # depth, write
+
+# Cross-process lock slots: one per patient / ward stripe, one per named lock
+_REGIONS = {"patient": 0, "ward": 1 << 16, "named": 2 << 16}
+_NAMED_SLOTS = 1 << 16
+_HELD: dict[int, list] = {}           # slot → [hold count, scope, keys] while this process holds it
+_HELD_LOCK = threading.Lock()
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def get_backend() -> StateBackend:
+    """Returns the active backend, configuring it from the environment on first use."""
+    impl = _BACKEND["impl"]
+    if impl is None:
+        impl = configure_backend(os.environ.get(_ENV_VAR, "memory"))
+    return impl
+
+
+def configure_backend(url_or_backend="memory", strict: Optional[bool] = None) -> StateBackend:
+    """Selects the backend. Must run before the tool modules are imported.
+
+    Args:
+        url_or_backend: ``'memory'``, ``'sqlite:///path/to/state.db'`` or a
+            ``StateBackend`` instance.
+        strict: Compare every unlocked entry with its last synced copy at
+            the end of each transaction (see ``UnsharedMutationError``).
+            Defaults to ``AGENTIC_HOSPITAL_STATE_STRICT``.
+
+    Returns:
+        StateBackend: The active backend.
+    """
+    impl = url_or_backend if isinstance(url_or_backend, StateBackend) else _backend_from_url(url_or_backend)
+    _BACKEND["impl"] = impl
+    if strict is None:
+        strict = os.environ.get(_STRICT_ENV_VAR, "").strip().lower() in ("1", "true", "yes")
+    _BACKEND["strict"] = strict
+    return impl
+
+
+def is_shared() -> bool:
+    """True when state is shared with other worker processes."""
+    return get_backend().shared
+
+
+def _named_slot(name: str) -> int:
+    return _REGIONS["named"] + zlib.crc32(name.encode("utf-8")) % _NAMED_SLOTS
+
+
+def register_store(namespace: str, obj, kind: str = "keyed", scope: Optional[str] = None,
+                   on_load: Optional[Callable] = None, lock: Optional[str] = None) -> None:
+    """Puts a module-level store under backend management.
+
+    The first worker to register a namespace seeds the backend with its
+    in-process contents (the demo hospital); later workers load the shared
+    copy instead.
+
+    Args:
+        namespace: Unique store name, e.g. ``'beds.wards'``.
+        obj: The module-level dict or list.
+        kind: ``'keyed'``, ``'append'`` or ``'document'``.
+        scope: For keyed stores, ``'patient'`` or ``'ward'`` — which
+            ``locked(...)`` keys guard the entries.
+        on_load: For keyed stores, ``on_load(key, old, new)`` is called
+            whenever an entry is replaced or removed (``new`` is ``None``) by
+            a load from the backend, so derived indexes can follow.
+        lock: For document stores (required), the ``infra.state.named_lock``
+            that guards every change.
+
+    Raises:
+        ValueError: A document store without ``lock``, or whose lock would
+            share a cross-process slot with another store's lock.
+    """
+    if kind == "document":
+        if not lock:
+            raise ValueError(f"{namespace}: document stores need lock=")
+        clash = [name for name in _LOCKED_DOCS
+                 if name != lock and _named_slot(name) == _named_slot(lock)]
+        if clash:
+            raise ValueError(f"{namespace}: lock {lock!r} hashes to the same slot as {clash[0]!r}")
+    store = _Store(namespace, obj, kind, scope, lock, on_load)
+    _STORES[namespace] = store
+    _STORES_BY_OBJ[id(obj)] = store
+    if kind == "keyed" and scope in _SCOPED:
+        _SCOPED[scope].append(store)
+    elif kind == "document":
+        _LOCKED_DOCS.setdefault(lock, []).append(store)
+    elif kind == "append":
+        _APPENDS.append(store)
+    backend = get_backend()
+    if not backend.shared:
+        return
+    with ExitStack() as stack:
+        if store.guard is not None:
+            stack.enter_context(store.guard)
+        stack.enter_context(_SYNC_LOCK)
+        if kind == "append":
+            docs, items = [], [_dumps(v) for v in obj]
+        elif kind == "document":
+            docs, items = [(_DOC_KEY, _dumps(obj))], []
+        else:
+            docs, items = [(str(k), _dumps(v)) for k, v in obj.items()], []
+        generation, stored_docs, stored_items = backend.seed(namespace, docs, items)
+        if stored_docs is None:
+            if kind == "append":
+                store.synced_len = store.flushed = len(obj)
+            else:
+                for key, raw in docs:
+                    store.versions[key] = 1
+                    _remember(store, key, raw, obj if kind == "document" else obj[key])
+        elif kind == "append":
+            obj.clear()
+            obj.extend(json.loads(v) for _, _, v in stored_items)
+            store.synced_len = stored_items[-1][1] if stored_items else 0
+            store.flushed = len(obj)
+        else:
+            if kind == "keyed":
+                if on_load is not None:
+                    for key, old in list(obj.items()):
+                        on_load(key, old, None)
+                obj.clear()
+            for _, key, version, raw in stored_docs:
+                _apply(store, key, version, raw, force=True)
+        previous = _SYNCED["generation"]
+        _SYNCED["generation"] = generation if previous < 0 else min(previous, generation)
+
+
+def append_lock(obj: list) -> Optional[threading.RLock]:
+    """The lock every append to a registered ``append`` store must hold (``None`` if unregistered)."""
+    store = _STORES_BY_OBJ.get(id(obj))
+    return store.guard if store is not None else None
+
+
+# =============================================================================
+# SYNC — per-key refresh and write-back, catch-up per transaction
+# =============================================================================
+def _remember(store: _Store, key: str, raw: str, value) -> None:
+    """Records ``raw`` as the synced copy of an entry (``''`` = deleted)."""
+    if raw:
+        store.cached[key] = raw
+        if isinstance(value, list):
+            store.lens[key] = len(value)
+        else:
+            store.lens.pop(key, None)
+    else:
+        store.cached.pop(key, None)
+        store.lens.pop(key, None)
+
+
+def _apply(store: _Store, key: str, version: int, raw: str, force: bool = False) -> None:
+    """Installs one backend document in the in-process copy unless it is already as new."""
+    if not force and version <= store.versions.get(key, 0):
+        return
+    store.versions[key] = version
+    value = json.loads(raw) if raw else None
+    if store.kind == "document":
+        if isinstance(store.obj, dict):
+            store.obj.clear()
+            store.obj.update(value)
+        else:
+            store.obj[:] = value
+    else:
+        old = store.obj.get(key)
+        if raw:
+            store.obj[key] = value
+        else:
+            store.obj.pop(key, None)
+        if store.on_load is not None and (old is not None or value is not None):
+            store.on_load(key, old, value)
+    _remember(store, key, raw, value)
+
+
+def _entry_stores(scope: str, keys: Iterable[str]) -> list[tuple[_Store, str]]:
+    """(store, key) pairs guarded by the given lock keys."""
+    if scope == "named":
+        return [(store, _DOC_KEY) for name in keys for store in _LOCKED_DOCS.get(name, ())]
+    return [(store, key) for store in _SCOPED[scope] for key in keys]
+
+
+def _row(store: _Store, key: str) -> Optional[tuple]:
+    """The write for one entry if it differs from its synced copy."""
+    if store.kind == "document":
+        present, value = True, store.obj
+    else:
+        present, value = key in store.obj, store.obj.get(key)
+    if not present:
+        if key not in store.cached:
+            return None
+        raw = ""
+    else:
+        raw = _dumps(value)
+        if raw == store.cached.get(key):
+            return None
+    return store, key, store.versions.get(key, 0) + 1, raw, value
+
+
+def _write(backend: StateBackend, rows: list[tuple], appends: Iterable[_Store]) -> None:
+    """Writes entries and append tails, then records them as synced. Holds ``_SYNC_LOCK``
+    and the guard of every store in ``appends``."""
+    tails = {}
+    for store in appends:
+        tail = store.obj[store.flushed - store.offset:]
+        if tail:
+            tails[store.namespace] = (store, tail)
+    if not rows and not tails:
+        return
+    generation, remote = backend.write(
+        [(store.namespace, str(key), version, raw) for store, key, version, raw, _ in rows],
+        {ns: (store.synced_len, [_dumps(v) for v in tail]) for ns, (store, tail) in tails.items()},
+    )
+    for store, key, version, raw, value in rows:
+        store.versions[key] = version
+        _remember(store, key, raw, value)
+    for ns, (store, tail) in tails.items():
+        # Items other workers appended first go after ours locally, so
+        # positions already handed out never shift
+        merged = remote.get(ns, [])
+        store.obj.extend(json.loads(v) for _, v in merged)
+        store.synced_len = (merged[-1][0] if merged else store.synced_len) + len(tail)
+        store.flushed = store.offset + len(store.obj)
+    if generation == _SYNCED["generation"] + 1:
+        _SYNCED["generation"] = generation
+
+
+def _catch_up(backend: StateBackend) -> None:
+    """Applies what other workers wrote since this process last looked."""
+    pending = any(s.offset + len(s.obj) > s.flushed for s in _APPENDS)
+    generation = backend.generation()
+    if not pending and generation == _SYNCED["generation"]:
+        return
+    with ExitStack() as stack:
+        for store in _APPENDS:
+            stack.enter_context(store.guard)
+        stack.enter_context(_SYNC_LOCK)
+        # Flush local tails first so remote items can go after them
+        _write(backend, [], _APPENDS)
+        since = _SYNCED["generation"]
+        docs, items = backend.changes(since, generation) if generation > since else ([], [])
+        for namespace, key, version, raw in docs:
+            store = _STORES.get(namespace)
+            if store is not None and store.kind != "append":
+                _apply(store, key, version, raw)
+        for namespace, seq, raw in items:
+            store = _STORES.get(namespace)
+            if store is not None and seq > store.synced_len:
+                store.obj.append(json.loads(raw))
+                store.synced_len = seq
+                store.flushed = store.offset + len(store.obj)
+        _SYNCED["generation"] = max(_SYNCED["generation"], generation)
+
+
+def hold(entries: Iterable[tuple[str, int, str]]) -> Optional[list[int]]:
+    """Takes the cross-process locks for ``(scope, stripe, key)`` entries.
+
+    Called by ``infra.state`` while it holds the matching in-process locks,
+    so a slot is only ever taken by one thread of the process at a time.
+    Named locks that guard no document store take no slot. After a new slot
+    is taken the process catches up, so everything its previous holders
+    wrote — and whatever tool code derives from it, such as the patient → bed
+    index built from ward entries — is current.
+
+    Returns:
+        Optional[list[int]]: Token for ``release`` (``None`` when not shared).
+    """
+    backend = get_backend()
+    if not backend.shared:
+        return None
+    wanted: dict[int, tuple[str, set]] = {}
+    for scope, stripe, key in entries:
+        if not key or (scope == "named" and key not in _LOCKED_DOCS):
+            continue
+        slot = _named_slot(key) if scope == "named" else _REGIONS[scope] + stripe
+        wanted.setdefault(slot, (scope, set()))[1].add(key)
+    taken: list[int] = []
+    locked_new = False
+    try:
+        for slot in sorted(wanted):
+            scope, keys = wanted[slot]
+            record = _HELD.get(slot)
+            if record is None:
+                backend.lock(slot)
+                record = [0, scope, set()]
+                with _HELD_LOCK:
+                    _HELD[slot] = record
+                locked_new = True
+            record[0] += 1
+            taken.append(slot)
+            if not keys <= record[2]:
+                with _HELD_LOCK:
+                    record[2].update(keys)
+        if locked_new:
+            _catch_up(backend)
+    except BaseException:
+        release(taken)
+        raise
+    return taken
+
+
+def release(token: Optional[list[int]]) -> None:
+    """Ends a ``hold``; the last hold of a slot writes its entries back and unlocks it."""
+    if not token:
+        return
+    backend = get_backend()
+    done = []
+    for slot in token:
+        record = _HELD[slot]
+        record[0] -= 1
+        if record[0] == 0:
+            done.append(slot)
+    if not done:
+        return
+    try:
+        with _SYNC_LOCK:
+            try:
+                rows = [row for slot in done
+                        for store, key in _entry_stores(_HELD[slot][1], _HELD[slot][2])
+                        if (row := _row(store, key)) is not None]
+                _write(backend, rows, ())
+            finally:
+                with _HELD_LOCK:
+                    for slot in done:
+                        del _HELD[slot]
+    finally:
+        for slot in done:
+            backend.unlock(slot)
+
+
+def _held_keys() -> dict[str, set]:
+    held = {"patient": set(), "ward": set(), "named": set()}
+    with _HELD_LOCK:
+        for _, scope, keys in _HELD.values():
+            held[scope] |= keys
+    return held
+
+
+def trim_front(obj: list, count: int) -> int:
+    """Drops the oldest ``count`` items of a list store from this process only.
+
+    Used to bound in-memory windows of ``append`` stores; items already
+    written to the backend stay there. Unsynced items are never dropped.
+
+    Returns:
+        int: Number of items actually dropped.
+    """
+    store = _STORES_BY_OBJ.get(id(obj))
+    if store is None or store.kind != "append":
+        count = max(0, min(count, len(obj)))
+        del obj[:count]
+        return count
+    with store.guard:
+        if get_backend().shared:
+            count = min(count, store.flushed - store.offset)
+        count = max(0, min(count, len(obj)))
+        if count:
+            del obj[:count]
+            store.offset += count
+    return count
+
+
+def dropped_front(obj: list) -> int:
+    """Number of items ``trim_front`` has dropped from a list store in this process.
+
+    ``dropped_front(obj) + i`` is the absolute position of ``obj[i]``, which lets
+    incremental consumers of an append store resume where they left off.
+    """
+    store = _STORES_BY_OBJ.get(id(obj))
+    return store.offset if store is not None and store.kind == "append" else 0
+
+
+def _unshared(store: _Store, held: dict[str, set], strict: bool) -> list:
+    """Entries that differ from their synced copy without a lock held on them.
+
+    Added, removed and resized entries are always found; ``strict`` also
+    compares every other entry with its last synced JSON.
+    """
+    if store.kind == "document":
+        if store.lock in held["named"]:
+            return []
+        value = store.obj
+        if isinstance(value, list) and len(value) != store.lens.get(_DOC_KEY, len(value)):
+            return [_DOC_KEY]
+        if strict and _DOC_KEY in store.cached and _dumps(value) != store.cached[_DOC_KEY]:
+            return [_DOC_KEY]
+        return []
+    owned = held[store.scope]
+    cached, lens = store.cached, store.lens
+    if not strict:
+        # Usual case, checked at C speed: the synced keys and list lengths
+        try:
+            if (store.obj.keys() == cached.keys()
+                    and list(map(len, map(store.obj.get, list(lens), repeat(())))) == list(lens.values())):
+                return []
+        except TypeError:
+            pass
+    items = [(k, v) for k, v in list(store.obj.items()) if k not in owned]
+    bad = [k for k, v in items if k not in cached or (k in lens and len(v) != lens[k])]
+    if strict:
+        for k, v in items:
+            if k in cached and k not in bad:
+                try:
+                    changed = _dumps(v) != cached[k]
+                except RuntimeError:  # being changed right now, so a lock is held on it
+                    changed = True
+                if changed:
+                    bad.append(k)
+    present = store.obj.keys()
+    bad.extend(k for k in list(cached) if k not in present and k not in owned)
+    return bad
+
+
+def _check(backend: StateBackend) -> None:
+    """Raises ``UnsharedMutationError`` for changes no lock release will write back,
+    after reloading just those entries from the backend."""
+    strict = _BACKEND["strict"]
+    with _SYNC_LOCK:
+        # A lock taken during the scan was taken before the change it covers,
+        # and releases wait for _SYNC_LOCK, so the second look excuses exactly
+        # the entries that are still being worked on.
+        before = _held_keys()
+        found = [(store, _unshared(store, before, strict))
+                 for store in _STORES.values() if store.kind != "append"]
+        after = _held_keys()
+        bad = []
+        for store, keys in found:
+            if store.kind == "document":
+                keys = [k for k in keys if store.lock not in after["named"]]
+            else:
+                keys = [k for k in keys if k not in after[store.scope]]
+            if keys:
+                bad.append((store, keys))
+        if not bad:
+            return
+        for store, keys in bad:
+            stored = {key: (version, raw)
+                      for _, key, version, raw in backend.read_docs([store.namespace], keys)}
+            for key in keys:
+                version, raw = stored.get(str(key), (store.versions.get(key, 0), ""))
+                _apply(store, key, version, raw, force=True)
+    store, keys = bad[0]
+    where = (f"locked({store.scope}s=...)" if store.kind == "keyed"
+             else f"named_lock({store.lock!r})")
+    raise UnsharedMutationError(
+        f"{store.namespace}: {', '.join(map(str, keys[:5]))} changed outside {where}; "
+        "the change would not reach other workers, so it was reverted")
+
+
+def _flush_appends(backend: StateBackend) -> None:
+    pending = [s for s in _APPENDS if s.offset + len(s.obj) > s.flushed]
+    if not pending:
+        return
+    with ExitStack() as stack:
+        for store in pending:
+            stack.enter_context(store.guard)
+        stack.enter_context(_SYNC_LOCK)
+        _write(backend, [], pending)
+
+
+def state_transaction(func: Optional[Callable] = None, *, readonly: bool = False):
+    """Runs a tool call as one shared-state transaction.
+
+    A no-op with the default in-memory backend. Nested decorated calls join
+    the outer transaction. Calls run concurrently; entries are written back
+    as their locks are released, so an exception leaves the changes made up
+    to that point, exactly as with in-memory state.
+
+    Args:
+        func: The tool function.
+        readonly: The tool does not append to log stores, so there is
+            nothing to flush on exit.
+    """
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            backend = get_backend()
+            if not backend.shared:
+                return fn(*args, **kwargs)
+            if getattr(_TXN, "depth", 0):
+                _TXN.depth += 1
+                _TXN.write = _TXN.write or not readonly
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    _TXN.depth -= 1
+            _TXN.depth, _TXN.write = 1, not readonly
+            try:
+                _catch_up(backend)
+                result = fn(*args, **kwargs)
+            finally:
+                _TXN.depth = 0
+            if _TXN.write:
+                _flush_appends(backend)
+            _check(backend)
+            return result
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+def shared_incr(name: str) -> int:
+    """Increments a named counter in the shared backend and returns the new value."""
+    return get_backend().incr(name)
@@ -0,0 +1,51 @@
+"""Swappable time source for the tool layer.
+
+Tools that stamp records or compute waits and due times read the current
+time through ``now()`` rather than ``datetime.datetime.now()``. Normally the
+two are identical. The discrete-event simulators in
+``agentic_hospital.simulation`` install a ``VirtualClock`` with ``use_clock``
+so that the real tool code runs on simulated time, and a year of hospital
+activity takes seconds.
+
+The override is process-wide, not per thread: run simulations in a process
+(or at a time) where no live sessions are being served.
+"""
+
+import datetime
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+_SOURCE: dict[str, Callable[[], datetime.datetime]] = {"now": datetime.datetime.now}
+
+
+def now() -> datetime.datetime:
+    """The current (possibly simulated) local time."""
+    return _SOURCE["now"]()
+
+
+class VirtualClock:
+    """A clock that only moves when told to."""
+
+    __slots__ = ("current",)
+
+    def __init__(self, start: datetime.datetime):
+        self.current = start
+
+    def __call__(self) -> datetime.datetime:
+        return self.current
+
+    def advance_to(self, when: datetime.datetime) -> None:
+        if when < self.current:
+            raise ValueError(f"Clock cannot go backwards: {when} < {self.current}")
+        self.current = when
+
+
+@contextmanager
+def use_clock(source: Callable[[], datetime.datetime]) -> Iterator[None]:
+    """Routes ``now()`` to ``source`` for the duration of the block."""
+    previous = _SOURCE["now"]
+    _SOURCE["now"] = source
+    try:
+        yield
+    finally:
+        _SOURCE["now"] = previous
@@ -0,0 +1,511 @@
+"""Per-agent context-window budgeting for long multi-agent conversations.
+
+Every model call resends the whole conversation, including large tool outputs
+(patient dashboards, SOAP notes, lab panels) produced many turns earlier and
+carried across agent transfers. ``context_window_callback`` runs as an ADK
+``before_model_callback`` and keeps the request inside a per-agent token
+budget:
+
+1. Clinical facts that must never be lost — allergies, current medications and
+   the working diagnosis — are collected from every tool result in the
+   conversation, keyed by patient, and pinned verbatim into the system
+   instruction.
+2. Tool results from earlier turns are replaced, oldest first, by a short
+   summary (status, scalar fields, list sizes) until the request fits.
+3. If summaries alone are not enough, the oldest turns are dropped entirely.
+
+The current turn (everything after the latest user message) is never touched,
+so the agent always sees full results of the tools it just called. After an
+agent transfer ADK relays the other agent's messages as user-role text
+starting "For context:"; those are not user messages, so they never start a
+turn, and the tool outputs they quote are summarised and pinned like function
+responses. Only the outgoing request is rewritten; session events keep the
+original payloads.
+
+Check the trimming on a synthetic conversation with an agent transfer::
+
+    python -m agentic_hospital.infra.context_window --check
+
+Budgets default to ``AGENTIC_HOSPITAL_CONTEXT_BUDGET`` tokens (24000) and can be
+set per agent with ``set_agent_budget``. ``0`` disables trimming.
+"""
+
+import argparse
+import ast
+import json
+import os
+import re
+import threading
+from typing import Any, Optional
+
+from .metrics import register_exporter
+from .token_accounting import CHARS_PER_TOKEN, chain_callback
+
+
+_DEFAULT_BUDGET_TOKENS = 24000
+
+# Tool results below this size are cheap enough to keep verbatim
+_MIN_ELIDE_TOKENS = 150
+
+# Longest scalar value copied into a summary
+_SUMMARY_VALUE_CHARS = 80
+
+# Tool-result keys whose values are pinned verbatim, with the label they get
+_PINNED_KEYS = {
+    "allergies": "Allergies",
+    "current_medications": "Current medications",
+    "active_medications": "Current medications",
+    "diagnosis": "Current diagnosis",
+    "primary_diagnosis": "Current diagnosis",
+    "working_diagnosis": "Current diagnosis",
+}
+
+# ADK's relay of another agent's events (flows/llm_flows: _present_other_agent_message)
+_RELAY_PREFIX = "For context:"
+_RELAYED_RESULT = re.compile(r"^\[(?P<agent>[^\]]*)\] `(?P<tool>[^`]*)` tool returned result:\s*(?P<payload>.*)\Z",
+                             re.DOTALL)
+_RELAYED_CALL = re.compile(r"^\[(?P<agent>[^\]]*)\] called tool `(?P<tool>[^`]*)` with parameters:\s*(?P<payload>.*)\Z",
+                           re.DOTALL)
+_QUOTE_MARKERS = re.compile(r"<<<(?:BEGIN|END)_QUOTED_AGENT_CONTENT>>>")
+
+_AGENT_BUDGETS: dict[str, int] = {}
+
+_STATS_LOCK = threading.Lock()
+_STATS: dict[str, dict] = {}
+
+
+def _default_budget() -> int:
+    try:
+        return int(os.environ.get("AGENTIC_HOSPITAL_CONTEXT_BUDGET", _DEFAULT_BUDGET_TOKENS))
+    except ValueError:
+        return _DEFAULT_BUDGET_TOKENS
+
+
+def set_agent_budget(agent_name: str, tokens: int) -> None:
+    """Sets the prompt token budget for one agent (``0`` disables trimming).
+
+    Args:
+        agent_name: ADK agent name, e.g. ``'hospital_admission_agent'``.
+        tokens: Maximum estimated prompt tokens for the conversation contents.
+    """
+    _AGENT_BUDGETS[agent_name] = int(tokens)
+
+
+def agent_budget(agent_name: str) -> int:
+    """Returns the effective token budget for ``agent_name``."""
+    return _AGENT_BUDGETS.get(agent_name, _default_budget())
+
+
+# =============================================================================
+# SIZING AND SUMMARIES
+# =============================================================================
+def _json_chars(value: Any) -> int:
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str))
+    except (TypeError, ValueError):
+        return len(str(value))
+
+
+def _part_tokens(part) -> int:
+    chars = 0
+    if getattr(part, "text", None):
+        chars += len(part.text)
+    call = getattr(part, "function_call", None)
+    if call is not None:
+        chars += len(call.name or "") + _json_chars(call.args or {})
+    response = getattr(part, "function_response", None)
+    if response is not None:
+        chars += len(response.name or "") + _json_chars(response.response or {})
+    return chars // CHARS_PER_TOKEN + 1
+
+
+def _content_tokens(content) -> int:
+    return sum(_part_tokens(p) for p in (getattr(content, "parts", None) or []))
+
+
+def _is_relayed(content) -> bool:
+    """Whether a user-role content is ADK's relay of another agent's events."""
+    return any((getattr(p, "text", None) or "").startswith(_RELAY_PREFIX) for p in (content.parts or []))
+
+
+def _is_user_message(content) -> bool:
+    """A message the user typed: user role, some text, and not a relay."""
+    if getattr(content, "role", None) != "user":
+        return False
+    parts = getattr(content, "parts", None) or []
+    return any(getattr(p, "text", None) for p in parts) and not _is_relayed(content)
+
+
+def _relayed_payload(match) -> Any:
+    """The quoted tool args or result of a relayed part; the raw text if it does not parse."""
+    text = _QUOTE_MARKERS.sub("", match.group("payload")).strip()
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return text
+
+
+def summarise_tool_result(response: Any) -> dict:
+    """Condenses a tool result into a small dict the model can still reason over.
+
+    Keeps ``status``, short scalar fields and the sizes of lists and nested
+    objects, and marks the result as elided so the agent knows to call the tool
+    again if it needs the detail.
+
+    Args:
+        response: The original tool result.
+
+    Returns:
+        dict: The summary.
+    """
+    if not isinstance(response, dict):
+        text = str(response)
+        return {"elided": True, "preview": text[:_SUMMARY_VALUE_CHARS]}
+    summary: dict[str, Any] = {"elided": True}
+    for key, value in response.items():
+        if isinstance(value, (bool, int, float)) or value is None:
+            summary[key] = value
+        elif isinstance(value, str):
+            summary[key] = value if len(value) <= _SUMMARY_VALUE_CHARS else (
+                value[:_SUMMARY_VALUE_CHARS] + "…")
+        elif isinstance(value, (list, tuple)):
+            summary[key] = f"[{len(value)} items]"
+        elif isinstance(value, dict):
+            summary[key] = f"{{{len(value)} fields}}"
+    summary["note"] = "Earlier tool output summarised to save context; call the tool again for full detail."
+    return summary
+
+
+# =============================================================================
+# PINNED CLINICAL FACTS
+# =============================================================================
+def _collect_pinned(value: Any, patient_id: str, pinned: dict, depth: int = 0) -> None:
+    if depth > 3 or not isinstance(value, dict):
+        return
+    patient_id = str(value.get("patient_id") or patient_id)
+    for key, label in _PINNED_KEYS.items():
+        fact = value.get(key)
+        if fact:
+            pinned.setdefault(patient_id, {})[label] = fact
+    for nested in value.values():
+        if isinstance(nested, dict):
+            _collect_pinned(nested, patient_id, pinned, depth + 1)
+
+
+def pinned_facts(contents) -> dict:
+    """Extracts allergies, current medications and diagnosis per patient.
+
+    Later tool results override earlier ones, so the most recent value wins.
+
+    Args:
+        contents: ``LlmRequest.contents`` (list of ``types.Content``).
+
+    Returns:
+        dict: ``{patient_id: {label: value}}``.
+    """
+    call_patient: dict[str, str] = {}
+    relayed_patient: dict[str, str] = {}  # tool -> patient of its last relayed call
+    pinned: dict[str, dict] = {}
+    for content in contents or []:
+        relayed = getattr(content, "role", None) == "user" and _is_relayed(content)
+        for part in getattr(content, "parts", None) or []:
+            text = getattr(part, "text", None)
+            if relayed and text:
+                match = _RELAYED_CALL.match(text)
+                if match:
+                    args = _relayed_payload(match)
+                    if isinstance(args, dict) and args.get("patient_id"):
+                        relayed_patient[match.group("tool")] = str(args["patient_id"])
+                    continue
+                match = _RELAYED_RESULT.match(text)
+                if match:
+                    _collect_pinned(_relayed_payload(match), relayed_patient.get(match.group("tool"), "unknown"),
+                                    pinned)
+                continue
+            call = getattr(part, "function_call", None)
+            if call is not None and call.id and isinstance(call.args, dict):
+                if call.args.get("patient_id"):
+                    call_patient[call.id] = str(call.args["patient_id"])
+            response = getattr(part, "function_response", None)
+            if response is not None:
+                _collect_pinned(response.response, call_patient.get(response.id or "", "unknown"),
+                                pinned)
+    return pinned
+
+
+def _render_pinned(pinned: dict) -> str:
+    lines = ["PINNED CLINICAL FACTS (verbatim from tool results; always current):"]
+    for patient_id, facts in pinned.items():
+        lines.append(f"- Patient {patient_id}:")
+        for label, value in facts.items():
+            rendered = "; ".join(map(str, value)) if isinstance(value, (list, tuple)) else str(value)
+            lines.append(f"    {label}: {rendered or 'none recorded'}")
+    return "\n".join(lines)
+
+
+# =============================================================================
+# TRIMMING
+# =============================================================================
+def _current_turn_start(contents) -> int:
+    """Index of the latest user message, relays excluded; everything from there on is kept."""
+    for i in range(len(contents) - 1, -1, -1):
+        if _is_user_message(contents[i]):
+            return i
+    return len(contents)
+
+
+def _elide_relayed(part, types) -> Optional[Any]:
+    """A summarised copy of a relayed tool-result text part, or None if it is not one."""
+    match = _RELAYED_RESULT.match(getattr(part, "text", None) or "")
+    if match is None:
+        return None
+    summary = json.dumps(summarise_tool_result(_relayed_payload(match)), ensure_ascii=False, default=str)
+    return types.Part(text=f"[{match.group('agent')}] `{match.group('tool')}` tool result (summarised): {summary}")
+
+
+def _elide_content(content, types) -> tuple[Any, int, int]:
+    """Returns a copy of ``content`` with large tool results summarised, tokens saved and count."""
+    new_parts, saved, elided = [], 0, 0
+    relayed = getattr(content, "role", None) == "user" and _is_relayed(content)
+    for part in content.parts or []:
+        response = getattr(part, "function_response", None)
+        if relayed and response is None:
+            replacement = _elide_relayed(part, types) if _part_tokens(part) >= _MIN_ELIDE_TOKENS else None
+            if replacement is None:
+                new_parts.append(part)
+                continue
+        elif response is None or (isinstance(response.response, dict)
+                                  and response.response.get("elided")):
+            new_parts.append(part)
+            continue
+        elif _part_tokens(part) < _MIN_ELIDE_TOKENS:
+            new_parts.append(part)
+            continue
+        else:
+            replacement = types.Part(function_response=types.FunctionResponse(
+                id=response.id, name=response.name,
+                response=summarise_tool_result(response.response),
+            ))
+        before = _part_tokens(part)
+        saved += before - _part_tokens(replacement)
+        new_parts.append(replacement)
+        elided += 1
+    if not elided:
+        return content, 0, 0
+    return types.Content(role=content.role, parts=new_parts), saved, elided
+
+
+def fit_contents(contents: list, budget: int) -> tuple[list, dict]:
+    """Shrinks conversation contents to ``budget`` estimated tokens.
+
+    Args:
+        contents: ``LlmRequest.contents``; not modified.
+        budget: Token budget; ``0`` or less returns the contents unchanged.
+
+    Returns:
+        tuple: (new contents list, stats dict with tokens before/after and
+        counts of elided results and dropped turns).
+    """
+    from google.genai import types  # noqa: PLC0415
+
+    sizes = [_content_tokens(c) for c in contents]
+    total = sum(sizes)
+    stats = {"tokens_before": total, "tokens_after": total, "results_elided": 0,
+             "contents_dropped": 0}
+    if budget <= 0 or total <= budget:
+        return contents, stats
+
+    keep_from = _current_turn_start(contents)
+    result = list(contents)
+
+    # Pass 1: summarise stale tool results, oldest first
+    for i in range(keep_from):
+        if total <= budget:
+            break
+        new_content, saved, elided = _elide_content(result[i], types)
+        if elided:
+            result[i] = new_content
+            sizes[i] -= saved
+            total -= saved
+            stats["results_elided"] += elided
+
+    # Pass 2: drop whole turns, oldest first, at user-message boundaries so
+    # function calls are never separated from their responses
+    drop_to = 0
+    while total > budget and drop_to < keep_from:
+        nxt = drop_to + 1
+        while nxt < keep_from and not _is_user_message(result[nxt]):
+            nxt += 1
+        total -= sum(sizes[drop_to:nxt])
+        drop_to = nxt
+    if drop_to:
+        stats["contents_dropped"] = drop_to
+        marker = types.Content(role="user", parts=[types.Part(
+            text=f"[{drop_to} earlier conversation messages omitted to fit the context budget; "
+                 "any pinned clinical facts are in the system instruction.]")])
+        result = [marker] + result[drop_to:]
+        total += _content_tokens(marker)
+
+    stats["tokens_after"] = total
+    return result, stats
+
+
+def _record(agent: str, stats: dict, trimmed: bool) -> None:
+    with _STATS_LOCK:
+        s = _STATS.setdefault(agent, {
+            "requests": 0, "requests_trimmed": 0, "tokens_before": 0, "tokens_after": 0,
+            "results_elided": 0, "contents_dropped": 0, "max_tokens_after": 0,
+        })
+        s["requests"] += 1
+        s["requests_trimmed"] += int(trimmed)
+        s["tokens_before"] += stats["tokens_before"]
+        s["tokens_after"] += stats["tokens_after"]
+        s["results_elided"] += stats["results_elided"]
+        s["contents_dropped"] += stats["contents_dropped"]
+        s["max_tokens_after"] = max(s["max_tokens_after"], stats["tokens_after"])
+
+
+def context_window_callback(callback_context, llm_request):
+    """ADK ``before_model_callback`` keeping the request within the agent's budget."""
+    agent = callback_context.agent_name
+    contents = llm_request.contents or []
+    new_contents, stats = fit_contents(contents, agent_budget(agent))
+    trimmed = new_contents is not contents
+    if trimmed:
+        pinned = pinned_facts(contents)
+        llm_request.contents = new_contents
+        if pinned:
+            llm_request.append_instructions([_render_pinned(pinned)])
+    _record(agent, stats, trimmed)
+    return None
+
+
+# =============================================================================
+# INSTALLATION AND EXPORT
+# =============================================================================
+_INSTALLED = {"exporter": False}
+
+
+def install_context_window(root_agent) -> int:
+    """Adds ``context_window_callback`` as the first before-model callback on every agent.
+
+    Install after ``install_token_accounting`` so token attribution sees the
+    trimmed request.
+
+    Returns:
+        int: Number of agents that received the callback.
+    """
+    if not _INSTALLED["exporter"]:
+        register_exporter("context_window", snapshot=context_window_snapshot)
+        _INSTALLED["exporter"] = True
+
+    count = 0
+    seen: set[int] = set()
+    stack = [root_agent]
+    while stack:
+        agent = stack.pop()
+        if id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        if hasattr(agent, "before_model_callback"):
+            agent.before_model_callback = chain_callback(
+                agent.before_model_callback, context_window_callback,
+            )
+            count += 1
+        stack.extend(getattr(agent, "sub_agents", None) or [])
+    return count
+
+
+def context_window_snapshot() -> dict:
+    """Per-agent budget and trimming statistics.
+
+    Returns:
+        dict: For each agent, its budget, requests seen and trimmed, average
+        estimated tokens before and after trimming, and elision counts.
+    """
+    with _STATS_LOCK:
+        agents = {}
+        for agent, s in _STATS.items():
+            n = s["requests"] or 1
+            agents[agent] = {
+                "budget_tokens": agent_budget(agent),
+                "requests": s["requests"],
+                "requests_trimmed": s["requests_trimmed"],
+                "avg_tokens_before": round(s["tokens_before"] / n, 1),
+                "avg_tokens_after": round(s["tokens_after"] / n, 1),
+                "max_tokens_after": s["max_tokens_after"],
+                "results_elided": s["results_elided"],
+                "contents_dropped": s["contents_dropped"],
+            }
+    return {"status": "success", "default_budget_tokens": _default_budget(), "agents": agents}
+
+
+def reset_context_window_stats(agent_name: Optional[str] = None) -> None:
+    """Clears trimming statistics for one agent or all agents."""
+    with _STATS_LOCK:
+        if agent_name is None:
+            _STATS.clear()
+        else:
+            _STATS.pop(agent_name, None)
+
+
+# =============================================================================
+# CHECK
+# =============================================================================
+def _transfer_conversation(types) -> list:
+    """A conversation as ADK sends it to pharmacy after two turns handled by admissions."""
+    dashboard = {"status": "success", "patient_id": "P003", "allergies": ["Penicillin (anaphylaxis)"],
+                 "current_medications": ["Metformin 500mg BD"], "notes": "x" * 4000}
+
+    def relay(text: str) -> Any:
+        return types.Content(role="user", parts=[types.Part(text=f"{_RELAY_PREFIX} below is a transcript of "
+                                                                "what another agent did."), types.Part(text=text)])
+
+    quoted = "<<<BEGIN_QUOTED_AGENT_CONTENT>>>\n{}\n<<<END_QUOTED_AGENT_CONTENT>>>"
+    return [
+        types.Content(role="user", parts=[types.Part(text="Admit P003.")]),
+        relay("[admission_agent] called tool `get_patient_dashboard` with parameters:\n"
+              + quoted.format({"patient_id": "P003"})),
+        relay("[admission_agent] `get_patient_dashboard` tool returned result:\n" + quoted.format(dashboard)),
+        relay("[admission_agent] said:\n" + quoted.format("P003 admitted to Ward 4.")),
+        types.Content(role="user", parts=[types.Part(text="Now review P003's medications.")]),
+        relay("[admission_agent] called tool `transfer_to_agent` with parameters:\n"
+              + quoted.format({"agent_name": "pharmacy_agent"})),
+        types.Content(role="model", parts=[types.Part(text="Reviewing the medication list now.")]),
+    ]
+
+
+def check() -> dict:
+    """Trims a synthetic post-transfer conversation and checks what survives.
+
+    Returns:
+        dict: The checks, each True when it holds, plus the trimming stats.
+    """
+    from google.genai import types  # noqa: PLC0415
+
+    contents = _transfer_conversation(types)
+    pinned = pinned_facts(contents)
+    fitted, stats = fit_contents(contents, budget=400)
+    texts = [p.text for c in fitted for p in (c.parts or []) if getattr(p, "text", None)]
+    checks = {
+        "turn_starts_at_user_question": _current_turn_start(contents) == 4,
+        "user_question_kept": any(t.startswith("Now review P003") for t in texts),
+        "relayed_result_summarised": stats["results_elided"] == 1
+                                     and any("tool result (summarised)" in t for t in texts),
+        "relayed_result_pinned": pinned.get("P003", {}).get("Allergies") == ["Penicillin (anaphylaxis)"],
+    }
+    return {"passed": all(checks.values()), "checks": checks, "stats": stats}
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Check context-window trimming.")
+    parser.add_argument("--check", action="store_true", help="Trim a synthetic conversation with an agent transfer")
+    parser.parse_args(argv)
+    report = check()
+    print(json.dumps(report, indent=2))
+    if not report["passed"]:
+        raise SystemExit("context window check failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,742 @@
+"""Segmented, append-only audit log for the tool-layer event streams.
+
+Admissions, alerts, dispensing, reconciliations, discharge summaries, GP
+letters, triage records and SOAP notes are all append-only event streams.
+Without this module they only live in module-level lists and dicts, which
+grow for the life of the process and vanish on restart.
+
+Set ``AGENTIC_HOSPITAL_AUDIT_DIR`` (or call ``configure_event_log``) to
+persist them::
+
+    AGENTIC_HOSPITAL_AUDIT_DIR=/var/lib/agentic_hospital/audit adk web
+
+On-disk layout
+--------------
+One directory per stream, holding segment files named by a sortable ID
+(``infra.ids.new_id``), so several workers can share a directory::
+
+    audit/pharmacy.dispense_log/01JAB3X4M2K7000Q5Z8RDT1VWE.seg
+    audit/pharmacy.dispense_log/01JAB3X4M2K7000Q5Z8RDT1VWE.idx
+
+Each record is a frame::
+
+    | u32 payload length | u32 CRC-32 of payload | i64 ms timestamp | payload |
+
+The payload is compact JSON ``{"k": key, "r": record}``. A torn or corrupt
+tail (crash mid-write) fails the length or CRC check and ends the segment.
+
+* Group commit — appends go to the OS page cache. A background flusher
+  fsyncs every ``fsync_interval`` seconds, so one fsync covers every record
+  appended since the last one. ``EventLog.sync`` blocks until all records
+  appended so far are durable; ``fsync_interval=0`` fsyncs on every append.
+* Rotation — a segment is sealed once it passes ``segment_bytes`` or has been
+  open for ``segment_seconds``. Sealing fsyncs it and writes an ``.idx``
+  sidecar.
+* Sparse time index — each segment keeps its first/last timestamp, the set
+  of keys (patient IDs) it contains and a ``(timestamp, offset)`` entry every
+  ``index_interval`` bytes. A time-range query skips segments outside the
+  range and seeks straight to the nearest index entry inside one.
+
+In memory each stream keeps only a bounded recent window: the last
+``window`` records of a flat log, or the last ``key_window`` records for
+each of the ``max_keys`` most recently active patients of a keyed log.
+``history`` serves reads from that window when it is complete and falls
+back to the segment files otherwise. Without an audit directory nothing is
+trimmed, since the in-memory store is then the only copy. With a shared state
+backend a keyed log keeps its per-patient cap but never evicts patients: the
+store is written back to the backend, where an eviction would delete the
+patient's entry for every worker. A trim is written back too, so any worker
+treats a patient whose list is at the cap as possibly trimmed and reads
+their history from disk.
+"""
+
+import argparse
+import atexit
+import bisect
+import heapq
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, Optional
+
+from .backend import append_lock, is_shared, trim_front
+from .ids import new_id
+from .state import locked
+
+_ENV_VAR = "AGENTIC_HOSPITAL_AUDIT_DIR"
+
+_HEADER = struct.Struct(">IIq")
+_MAX_PAYLOAD = 64 * 1024 * 1024
+_SEGMENT_SUFFIX = ".seg"
+_INDEX_SUFFIX = ".idx"
+
+_DEFAULT_SEGMENT_BYTES = 16 * 1024 * 1024
+_DEFAULT_SEGMENT_SECONDS = 3600.0
+_DEFAULT_FSYNC_INTERVAL = 0.05
+_DEFAULT_INDEX_INTERVAL = 32 * 1024
+
+_DEFAULT_WINDOW = 1000       # records kept in memory per flat stream
+_DEFAULT_KEY_WINDOW = 50     # records kept in memory per patient in keyed streams
+_DEFAULT_MAX_KEYS = 1000     # patients kept in memory per keyed stream
+
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+# =============================================================================
+# SEGMENT FILES
+# =============================================================================
+class _SegmentMeta:
+    """Summary of one segment file used to plan range and key queries."""
+
+    __slots__ = ("path", "first_ts", "last_ts", "count", "size", "index_ts", "index_off", "keys")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.first_ts: Optional[int] = None
+        self.last_ts: Optional[int] = None
+        self.count = 0
+        self.size = 0
+        self.index_ts: list[int] = []
+        self.index_off: list[int] = []
+        self.keys: set[str] = set()
+
+    def add(self, ts: int, offset: int, frame_len: int, key: Optional[str], index_interval: int) -> None:
+        if self.first_ts is None:
+            self.first_ts = ts
+        if not self.index_off or offset - self.index_off[-1] >= index_interval:
+            self.index_ts.append(ts)
+            self.index_off.append(offset)
+        self.last_ts = ts
+        self.count += 1
+        self.size = offset + frame_len
+        if key is not None:
+            self.keys.add(key)
+
+    def overlaps(self, since: Optional[int], until: Optional[int]) -> bool:
+        if self.first_ts is None:
+            return False
+        if since is not None and self.last_ts < since:
+            return False
+        return until is None or self.first_ts <= until
+
+    def start_offset(self, since: Optional[int]) -> int:
+        """Offset of the last index entry at or before ``since``."""
+        if since is None or not self.index_ts:
+            return 0
+        i = bisect.bisect_left(self.index_ts, since) - 1
+        return self.index_off[max(i, 0)]
+
+    def to_json(self) -> dict:
+        return {
+            "first_ts": self.first_ts, "last_ts": self.last_ts, "count": self.count,
+            "size": self.size, "index": list(zip(self.index_ts, self.index_off)),
+            "keys": sorted(self.keys),
+        }
+
+    @classmethod
+    def from_json(cls, path: str, data: dict) -> "_SegmentMeta":
+        meta = cls(path)
+        meta.first_ts, meta.last_ts = data["first_ts"], data["last_ts"]
+        meta.count, meta.size = data["count"], data["size"]
+        meta.index_ts = [ts for ts, _ in data["index"]]
+        meta.index_off = [off for _, off in data["index"]]
+        meta.keys = set(data["keys"])
+        return meta
+
+
+def _encode_frame(ts: int, key: Optional[str], record) -> bytes:
+    payload = json.dumps({"k": key, "r": record}, separators=(",", ":"),
+                         ensure_ascii=False, default=str).encode("utf-8")
+    return _HEADER.pack(len(payload), zlib.crc32(payload), ts) + payload
+
+
+def _iter_frames(path: str, start: int = 0, end: Optional[int] = None) -> Iterator[tuple[int, int, bytes]]:
+    """Yields ``(offset, ts, payload)`` for valid frames, stopping at a torn tail."""
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        offset = start
+        while end is None or offset < end:
+            header = fh.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            length, crc, ts = _HEADER.unpack(header)
+            if length > _MAX_PAYLOAD:
+                return
+            payload = fh.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            yield offset, ts, payload
+            offset += _HEADER.size + length
+
+
+def _scan_segment(path: str, index_interval: int) -> _SegmentMeta:
+    meta = _SegmentMeta(path)
+    for offset, ts, payload in _iter_frames(path):
+        key = json.loads(payload)["k"]
+        meta.add(ts, offset, _HEADER.size + len(payload), key, index_interval)
+    return meta
+
+
+def _fsync_dir(directory: str) -> None:
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# =============================================================================
+# EVENT LOG
+# =============================================================================
+class EventLog:
+    """One append-only stream stored as rotating segment files.
+
+    Args:
+        directory: Directory holding this stream's segments.
+        segment_bytes: Seal the open segment once it reaches this size.
+        segment_seconds: Seal the open segment once it has been open this long.
+        fsync_interval: Seconds between group-commit fsyncs; ``0`` fsyncs
+            every append.
+        index_interval: Bytes between sparse time-index entries.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = _DEFAULT_SEGMENT_BYTES,
+                 segment_seconds: float = _DEFAULT_SEGMENT_SECONDS,
+                 fsync_interval: float = _DEFAULT_FSYNC_INTERVAL,
+                 index_interval: int = _DEFAULT_INDEX_INTERVAL):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.fsync_interval = fsync_interval
+        self.index_interval = index_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._synced_cond = threading.Condition()
+        self._wake = threading.Event()
+        self._file = None
+        self._meta: Optional[_SegmentMeta] = None
+        self._opened_at = 0.0
+        self._last_ts = 0
+        self._written = 0
+        self._synced = 0
+        self._closed = False
+        self._flusher: Optional[threading.Thread] = None
+        self._foreign: dict[str, tuple[int, _SegmentMeta]] = {}
+        self.stats = {"appends": 0, "fsyncs": 0, "rotations": 0}
+
+    # ── writing ────────────────────────────────────────────────────────────
+    def _open_segment(self) -> None:
+        path = os.path.join(self.directory, new_id() + _SEGMENT_SUFFIX)
+        self._file = open(path, "ab")
+        self._meta = _SegmentMeta(path)
+        self._opened_at = time.monotonic()
+        _fsync_dir(self.directory)
+
+    def _seal_segment(self) -> None:
+        """Fsyncs the open segment, writes its index sidecar and closes it."""
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        meta = self._meta
+        idx_path = meta.path[: -len(_SEGMENT_SUFFIX)] + _INDEX_SUFFIX
+        tmp_path = idx_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(meta.to_json(), fh, separators=(",", ":"))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, idx_path)
+        self._foreign[meta.path] = (meta.size, meta)
+        self._file = None
+        self._meta = None
+        with self._synced_cond:
+            self._synced = self._written
+            self._synced_cond.notify_all()
+        self.stats["fsyncs"] += 1
+        self.stats["rotations"] += 1
+
+    def append(self, record, key: Optional[str] = None) -> int:
+        """Appends one record.
+
+        Args:
+            record: JSON-serialisable record.
+            key: Optional patient ID, indexed per segment for ``read(key=...)``.
+
+        Returns:
+            int: Timestamp (ms since epoch) stored with the record.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"Event log {self.directory} is closed")
+            if self._file is not None and (
+                self._meta.size >= self.segment_bytes
+                or time.monotonic() - self._opened_at >= self.segment_seconds
+            ):
+                self._seal_segment()
+            if self._file is None:
+                self._open_segment()
+            # Non-decreasing within a process so the sparse index stays sorted
+            ts = max(_now_ms(), self._last_ts)
+            self._last_ts = ts
+            frame = _encode_frame(ts, key, record)
+            offset = self._meta.size
+            self._file.write(frame)
+            self._meta.add(ts, offset, len(frame), key, self.index_interval)
+            self._written += 1
+            self.stats["appends"] += 1
+            if self.fsync_interval <= 0:
+                self._sync_once()
+            elif self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_loop, name=f"event-log-{os.path.basename(self.directory)}",
+                    daemon=True,
+                )
+                self._flusher.start()
+        return ts
+
+    def _sync_once(self) -> None:
+        with self._lock:
+            target = self._written
+            if target <= self._synced or self._file is None:
+                return
+            self._file.flush()
+            # fsync a duplicate descriptor outside the lock so appends continue
+            fd = os.dup(self._file.fileno())
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        with self._synced_cond:
+            self._synced = max(self._synced, target)
+            self._synced_cond.notify_all()
+        self.stats["fsyncs"] += 1
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.fsync_interval)
+            self._wake.clear()
+            self._sync_once()
+
+    def sync(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every record appended so far is on stable storage.
+
+        Returns:
+            bool: False if ``timeout`` expired first.
+        """
+        target = self._written
+        if self._flusher is None or self.fsync_interval <= 0:
+            self._sync_once()
+            return True
+        self._wake.set()
+        with self._synced_cond:
+            return self._synced_cond.wait_for(lambda: self._synced >= target, timeout)
+
+    def close(self) -> None:
+        """Seals the open segment and stops the flusher."""
+        with self._lock:
+            if self._closed:
+                return
+            self._seal_segment()
+            self._closed = True
+        self._wake.set()
+
+    # ── reading ────────────────────────────────────────────────────────────
+    def segments(self) -> list[_SegmentMeta]:
+        """Metadata for every segment in the directory, oldest first."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            own = self._meta
+            own_snapshot = None
+            if own is not None:
+                own_snapshot = _SegmentMeta(own.path)
+                for name in _SegmentMeta.__slots__[1:]:
+                    value = getattr(own, name)
+                    setattr(own_snapshot, name, value.copy() if isinstance(value, (list, set)) else value)
+        metas = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(_SEGMENT_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            if own_snapshot is not None and path == own_snapshot.path:
+                metas.append(own_snapshot)
+                continue
+            metas.append(self._segment_meta(path))
+        return metas
+
+    def _segment_meta(self, path: str) -> _SegmentMeta:
+        """Sealed segments load their sidecar; others (other workers' open ones) are scanned."""
+        size = os.path.getsize(path)
+        cached = self._foreign.get(path)
+        if cached is not None and cached[0] == size:
+            return cached[1]
+        idx_path = path[: -len(_SEGMENT_SUFFIX)] + _INDEX_SUFFIX
+        meta = None
+        if os.path.exists(idx_path):
+            with open(idx_path, encoding="utf-8") as fh:
+                meta = _SegmentMeta.from_json(path, json.load(fh))
+        if meta is None or meta.size != size:
+            meta = _scan_segment(path, self.index_interval)
+        self._foreign[path] = (size, meta)
+        return meta
+
+    def _read_segment(self, meta: _SegmentMeta, since: Optional[int], until: Optional[int],
+                      key: Optional[str]) -> Iterator[tuple[int, Optional[str], dict]]:
+        for _, ts, payload in _iter_frames(meta.path, meta.start_offset(since), meta.size):
+            if since is not None and ts < since:
+                continue
+            if until is not None and ts > until:
+                return
+            entry = json.loads(payload)
+            if key is not None and entry["k"] != key:
+                continue
+            yield ts, entry["k"], entry["r"]
+
+    def read(self, since: Optional[int] = None, until: Optional[int] = None,
+             key: Optional[str] = None, limit: Optional[int] = None) -> list[dict]:
+        """Records in time order, optionally bounded by time and filtered by key.
+
+        Args:
+            since: Inclusive lower bound, ms since epoch.
+            until: Inclusive upper bound, ms since epoch.
+            key: Only records appended with this key.
+            limit: Maximum number of records.
+
+        Returns:
+            list[dict]: ``{"ts", "key", "record"}`` entries.
+        """
+        plan = [m for m in self.segments()
+                if m.overlaps(since, until) and (key is None or key in m.keys)]
+        merged = heapq.merge(*(self._read_segment(m, since, until, key) for m in plan),
+                             key=lambda e: e[0])
+        out = []
+        for ts, k, record in merged:
+            out.append({"ts": ts, "key": k, "record": record})
+            if limit is not None and len(out) >= limit:
+                break
+        return out
+
+    def tail(self, count: int) -> list[dict]:
+        """The last ``count`` records, oldest first, reading only the newest segments."""
+        if count <= 0:
+            return []
+        metas = self.segments()
+        chosen, total = [], 0
+        for meta in reversed(metas):
+            chosen.append(meta)
+            total += meta.count
+            if total >= count:
+                break
+        since = min((m.first_ts for m in chosen if m.first_ts is not None), default=None)
+        merged = heapq.merge(*(self._read_segment(m, since, None, None) for m in reversed(chosen)),
+                             key=lambda e: e[0])
+        entries = [{"ts": ts, "key": k, "record": r} for ts, k, r in merged]
+        return entries[-count:]
+
+
+# =============================================================================
+# STREAM REGISTRY — binds module-level stores to their event logs
+# =============================================================================
+class _Stream:
+    __slots__ = ("name", "store", "keyed", "window", "key_window", "max_keys",
+                 "lock", "log", "key_order", "truncated", "partial")
+
+    def __init__(self, name: str, store, window: int, key_window: int, max_keys: int):
+        self.name = name
+        self.store = store
+        self.keyed = isinstance(store, dict)
+        self.window = window
+        self.key_window = key_window
+        self.max_keys = max_keys
+        # Flat logs share the append store's lock, which the backend flush also takes
+        self.lock = (None if self.keyed else append_lock(store)) or threading.RLock()
+        self.log: Optional[EventLog] = None
+        self.key_order: OrderedDict = OrderedDict()   # keyed: patient → None, least recent first
+        self.truncated: set[str] = set()              # keyed: patients with records only on disk
+        self.partial = False                          # flat: some records are only on disk
+
+
+_STREAMS: dict[str, _Stream] = {}
+_CONFIG: dict = {"directory": os.environ.get(_ENV_VAR) or None, "options": {}}
+_CONFIG_LOCK = threading.Lock()
+
+
+def configure_event_log(directory: Optional[str], **options) -> None:
+    """Enables (or, with ``None``, disables) on-disk persistence of all streams.
+
+    Args:
+        directory: Root directory; each stream gets a subdirectory.
+        **options: ``EventLog`` keyword arguments (``segment_bytes``,
+            ``segment_seconds``, ``fsync_interval``, ``index_interval``).
+    """
+    with _CONFIG_LOCK:
+        for stream in _STREAMS.values():
+            if stream.log is not None:
+                stream.log.close()
+                stream.log = None
+        _CONFIG["directory"] = directory
+        _CONFIG["options"] = dict(options)
+    for stream in _STREAMS.values():
+        _open_stream(stream)
+
+
+@contextmanager
+def persistence_suspended() -> Iterator[None]:
+    """Stops writing streams to disk for the block (e.g. while a simulation runs)."""
+    directory, options = _CONFIG["directory"], dict(_CONFIG["options"])
+    if directory:
+        configure_event_log(None)
+    try:
+        yield
+    finally:
+        if directory:
+            configure_event_log(directory, **options)
+
+
+def _open_stream(stream: _Stream) -> Optional[EventLog]:
+    if stream.log is None and _CONFIG["directory"]:
+        with _CONFIG_LOCK:
+            if stream.log is None:
+                stream.log = EventLog(os.path.join(_CONFIG["directory"], stream.name),
+                                      **_CONFIG["options"])
+    return stream.log
+
+
+def register_log(name: str, store, window: int = _DEFAULT_WINDOW,
+                 key_window: int = _DEFAULT_KEY_WINDOW, max_keys: int = _DEFAULT_MAX_KEYS) -> None:
+    """Binds a module-level log to its event stream.
+
+    If persistence is enabled and the store is empty (a fresh process with
+    the in-memory backend), the recent window is reloaded from disk.
+
+    Args:
+        name: Stream name, matching the store's ``register_store`` namespace.
+        store: The module-level list (flat log) or dict of patient → list (keyed log).
+        window: Flat logs: records kept in memory.
+        key_window: Keyed logs: records kept in memory per patient.
+        max_keys: Keyed logs: patients kept in memory.
+    """
+    stream = _Stream(name, store, window, key_window, max_keys)
+    _STREAMS[name] = stream
+    log = _open_stream(stream)
+    if log is None or store or is_shared():
+        return
+    entries = log.tail(window if not stream.keyed else max_keys * key_window)
+    for entry in entries:
+        if stream.keyed:
+            if entry["key"] is not None:
+                _remember(stream, entry["key"], entry["record"])
+        else:
+            store.append(entry["record"])
+    if stream.keyed:
+        # Reloaded lists are partial; serve full history from disk
+        stream.truncated.update(store)
+    else:
+        # A full window may have older records behind it
+        stream.partial = len(entries) >= window
+        _trim_flat(stream)
+
+
+def _remember(stream: _Stream, key: str, record) -> None:
+    store = stream.store
+    records = store.setdefault(key, [])
+    records.append(record)
+    if len(records) > stream.key_window:
+        del records[: len(records) - stream.key_window]
+        stream.truncated.add(key)
+    if is_shared():
+        return  # evicting would delete the patient's entry for every worker
+    stream.key_order[key] = None
+    stream.key_order.move_to_end(key)
+    while len(stream.key_order) > stream.max_keys:
+        evicted, _ = stream.key_order.popitem(last=False)
+        store.pop(evicted, None)
+        stream.truncated.add(evicted)
+
+
+def _trim_flat(stream: _Stream) -> None:
+    # Trim in chunks (25% slack) so the list shift is amortised O(1) per append
+    excess = len(stream.store) - stream.window
+    if excess > stream.window // 4 and trim_front(stream.store, excess):
+        stream.partial = True
+
+
+def log_event(name: str, record: dict, key: Optional[str] = None) -> None:
+    """Appends a record to a stream's in-memory window and, if enabled, its segments.
+
+    Args:
+        name: Stream registered with ``register_log``.
+        record: The event record.
+        key: Patient ID. Required for keyed logs; optional (indexed on disk) for flat ones.
+    """
+    stream = _STREAMS[name]
+    log = stream.log if stream.log is not None else _open_stream(stream)
+    if stream.keyed and key is None:
+        raise ValueError(f"Stream {name!r} is keyed by patient; pass key=")
+    # Keyed logs are patient-scoped stores: the patient lock shares the change
+    with locked(patients=(key,)) if stream.keyed else nullcontext(), stream.lock:
+        if stream.keyed:
+            if log is None:
+                stream.store.setdefault(key, []).append(record)
+            else:
+                _remember(stream, key, record)
+        else:
+            stream.store.append(record)
+            if log is not None:
+                _trim_flat(stream)
+    if log is not None:
+        log.append(record, key=key)
+
+
+def history(name: str, key: Optional[str] = None, since: Optional[int] = None,
+            until: Optional[int] = None, limit: Optional[int] = None) -> list[dict]:
+    """Records of a stream, from memory when the window holds them all, else from disk.
+
+    Flat logs are served from memory until their window is first trimmed;
+    a ``key`` filter on a flat log always reads the disk, since the window
+    does not keep keys.
+
+    Args:
+        name: Stream name.
+        key: Patient ID (keyed logs, or flat logs written with a key).
+        since: Inclusive lower bound, ms since epoch (disk only).
+        until: Inclusive upper bound, ms since epoch (disk only).
+        limit: Maximum number of records.
+
+    Returns:
+        list[dict]: The records, oldest first.
+    """
+    stream = _STREAMS[name]
+    log = stream.log
+    if stream.keyed:
+        # With a shared backend another worker may have trimmed a list down to the cap
+        in_window = key is not None and key not in stream.truncated and (
+            not is_shared() or len(stream.store.get(key, ())) < stream.key_window)
+    else:
+        in_window = key is None and not stream.partial
+    if log is None or (in_window and since is None and until is None):
+        if stream.keyed:
+            if key is not None:
+                records = list(stream.store.get(key, []))
+            else:
+                records = [r for recs in stream.store.values() for r in recs]
+        else:
+            records = list(stream.store)
+        return records[:limit] if limit is not None else records
+    return [e["record"] for e in log.read(since=since, until=until, key=key, limit=limit)]
+
+
+def event_log_stats() -> dict:
+    """Per-stream in-memory window size and disk counters."""
+    out = {}
+    for name, stream in _STREAMS.items():
+        held = sum(len(v) for v in stream.store.values()) if stream.keyed else len(stream.store)
+        entry = {"in_memory": held, "persisted": stream.log is not None}
+        if stream.log is not None:
+            entry.update(stream.log.stats)
+            entry["segments"] = len(stream.log.segments())
+        out[name] = entry
+    return out
+
+
+def sync_all(timeout: Optional[float] = None) -> None:
+    """Waits for every open stream's pending records to be fsynced."""
+    for stream in _STREAMS.values():
+        if stream.log is not None:
+            stream.log.sync(timeout)
+
+
+@atexit.register
+def _close_all() -> None:
+    for stream in _STREAMS.values():
+        if stream.log is not None:
+            stream.log.close()
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+def benchmark(records: int = 200_000, patients: int = 2000, segment_bytes: int = 4 * 1024 * 1024,
+              fsync_interval: float = _DEFAULT_FSYNC_INTERVAL) -> dict:
+    """Appends synthetic dispensing events and times range and patient queries.
+
+    Returns:
+        dict: Append throughput, fsync count, segment count and query latencies
+        (indexed range query vs. full scan).
+    """
+    with tempfile.TemporaryDirectory(prefix="event_log_bench_") as tmp:
+        log = EventLog(tmp, segment_bytes=segment_bytes, fsync_interval=fsync_interval)
+        start = time.perf_counter()
+        for i in range(records):
+            pid = f"P{i % patients:05d}"
+            log.append({"dispense_id": f"DSP-{i}", "patient_id": pid, "medication": "Amoxicillin",
+                        "dose": "500mg", "timestamp": time.strftime("%Y-%m-%d %H:%M")}, key=pid)
+        log.sync()
+        append_s = time.perf_counter() - start
+
+        metas = log.segments()
+        mid = metas[len(metas) // 2]
+        since, until = mid.first_ts, mid.first_ts + 50
+
+        start = time.perf_counter()
+        ranged = log.read(since=since, until=until)
+        range_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        scanned = [e for e in log.read() if since <= e["ts"] <= until]
+        scan_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        by_key = log.read(key="P00042")
+        key_ms = (time.perf_counter() - start) * 1000
+        stats = dict(log.stats)
+        log.close()
+
+    assert len(ranged) == len(scanned)
+    return {
+        "records": records,
+        "appends_per_s": round(records / append_s),
+        "fsyncs": stats["fsyncs"],
+        "segments": len(metas),
+        "range_query": {"records": len(ranged), "indexed_ms": round(range_ms, 2),
+                        "full_scan_ms": round(scan_ms, 2)},
+        "patient_query": {"records": len(by_key), "ms": round(key_ms, 2)},
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect or benchmark the audit event log.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    q = sub.add_parser("query", help="Print records of one stream")
+    q.add_argument("directory", help="Stream directory, e.g. audit/pharmacy.dispense_log")
+    q.add_argument("--since", type=int, help="ms since epoch")
+    q.add_argument("--until", type=int, help="ms since epoch")
+    q.add_argument("--key", help="Patient ID")
+    q.add_argument("--limit", type=int, default=100)
+    b = sub.add_parser("bench", help="Append and query synthetic records")
+    b.add_argument("--records", type=int, default=200_000)
+    b.add_argument("--patients", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    if args.command == "query":
+        log = EventLog(args.directory)
+        for entry in log.read(since=args.since, until=args.until, key=args.key, limit=args.limit):
+            print(json.dumps(entry, ensure_ascii=False, default=str))
+    else:
+        print(json.dumps(benchmark(args.records, args.patients), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Sortable, collision-free identifiers for records minted by the tool layer.
+
+IDs are 128-bit values in the ULID layout, encoded as 26 Crockford base32
+characters so that lexical order equals time order::
+
+    | 48 bits: ms since Unix epoch | 16 bits: worker ID | 64 bits: counter |
+
+* The timestamp comes from a wall-clock anchor advanced by ``time.monotonic_ns``,
+  so IDs from one process never go backwards when the system clock is stepped.
+* The worker ID separates processes. Set ``AGENTIC_HOSPITAL_WORKER_ID``
+  (0–65535) explicitly when running several workers; otherwise it is derived
+  from the host name and process ID.
+* The counter is an ``itertools.count`` started at a random offset. Advancing
+  it is a single C-level call, atomic under the GIL, so minting takes no lock
+  and two threads can never receive the same value. The counter is re-seeded
+  in a forked child so parent and child never share a sequence.
+
+Uniqueness therefore only depends on (worker ID, counter), never on the
+clock resolution.
+"""
+
+import datetime
+import itertools
+import os
+import random
+import socket
+import time
+import zlib
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_DECODE = {c: i for i, c in enumerate(_CROCKFORD)}
+
+_COUNTER_BITS = 64
+_WORKER_BITS = 16
+_COUNTER_MASK = (1 << _COUNTER_BITS) - 1
+_WORKER_MASK = (1 << _WORKER_BITS) - 1
+
+_STATE: dict = {}
+
+
+def _derive_worker_id() -> int:
+    configured = os.environ.get("AGENTIC_HOSPITAL_WORKER_ID", "").strip()
+    if configured:
+        try:
+            return int(configured) & _WORKER_MASK
+        except ValueError:
+            pass
+    return zlib.crc32(f"{socket.gethostname()}:{os.getpid()}".encode("utf-8")) & _WORKER_MASK
+
+
+def _seed() -> None:
+    """(Re)initialises the worker ID, clock anchor and counter for this process."""
+    _STATE["worker"] = _derive_worker_id()
+    _STATE["wall_ms"] = time.time_ns() // 1_000_000
+    _STATE["mono_ns"] = time.monotonic_ns()
+    # Random start leaves headroom (2**62 values) before the counter wraps
+    _STATE["counter"] = itertools.count(random.SystemRandom().getrandbits(_COUNTER_BITS - 2))
+
+
+_seed()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_seed)
+
+
+def _now_ms() -> int:
+    return _STATE["wall_ms"] + (time.monotonic_ns() - _STATE["mono_ns"]) // 1_000_000
+
+
+def _encode(value: int) -> str:
+    chars = []
+    for _ in range(26):
+        chars.append(_CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def new_id() -> str:
+    """Mints a new 26-character sortable unique ID.
+
+    Returns:
+        str: Crockford base32 ID, e.g. ``'01JAB3X4M2K7000Q5Z8RDT1VWE'``.
+    """
+    counter = next(_STATE["counter"]) & _COUNTER_MASK
+    value = (_now_ms() << (_WORKER_BITS + _COUNTER_BITS)) | (_STATE["worker"] << _COUNTER_BITS) | counter
+    return _encode(value)
+
+
+def worker_id() -> int:
+    """The worker ID embedded in IDs minted by this process."""
+    return _STATE["worker"]
+
+
+def decode_id(value: str) -> dict:
+    """Splits an ID (optionally with a ``PREFIX-...-`` in front) into its fields.
+
+    Args:
+        value: An ID returned by ``new_id`` or a prefixed record ID ending in one.
+
+    Returns:
+        dict: ``timestamp`` (ISO string), ``worker_id`` and ``counter``.
+    """
+    raw = value.rsplit("-", 1)[-1].upper()
+    if len(raw) != 26 or any(c not in _DECODE for c in raw):
+        raise ValueError(f"Not a sortable ID: {value!r}")
+    n = 0
+    for c in raw:
+        n = (n << 5) | _DECODE[c]
+    ms = n >> (_WORKER_BITS + _COUNTER_BITS)
+    return {
+        "timestamp": datetime.datetime.fromtimestamp(ms / 1000).isoformat(timespec="milliseconds"),
+        "worker_id": (n >> _COUNTER_BITS) & _WORKER_MASK,
+        "counter": n & _COUNTER_MASK,
+    }
@@ -0,0 +1,418 @@
+"""Per-tool latency and call-count instrumentation.
+
+Every plain-function tool attached to an ADK agent is wrapped by
+``instrument_agent_tree`` so that each (agent, tool) pair records call counts,
+error counts, a latency histogram and a result-payload-size histogram.
+Metrics are exported as Prometheus text (``render_prometheus``) and as a JSON
+snapshot (``metrics_snapshot``), optionally served over HTTP on
+``AGENTIC_HOSPITAL_METRICS_PORT`` via ``start_metrics_server``.
+
+Recording costs one ``perf_counter_ns`` pair, two bisects into fixed bucket
+tuples and one uncontended lock per call, so it is left on permanently.
+Set ``AGENTIC_HOSPITAL_TOOL_METRICS=0`` to disable wrapping altogether.
+"""
+
+import bisect
+import datetime
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+
+
+# =============================================================================
+# HISTOGRAM BUCKETS (upper bounds, Prometheus "le" semantics)
+# =============================================================================
+_LATENCY_BUCKETS_S = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+_LATENCY_BUCKETS_NS = tuple(int(b * 1e9) for b in _LATENCY_BUCKETS_S)
+
+_PAYLOAD_BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+_METRIC_PREFIX = "agentic_hospital_tool"
+
+
+# =============================================================================
+# SERIES STORE — one series per (agent, tool)
+# =============================================================================
+class _ToolSeries:
+    """Counters and histograms for one tool as bound to one agent."""
+
+    __slots__ = (
+        "calls", "errors", "latency_counts", "latency_sum_ns", "latency_max_ns",
+        "payload_counts", "payload_sum", "payload_max", "lock",
+    )
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self._zero()
+
+    def _zero(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.latency_counts = [0] * (len(_LATENCY_BUCKETS_NS) + 1)
+        self.latency_sum_ns = 0
+        self.latency_max_ns = 0
+        self.payload_counts = [0] * (len(_PAYLOAD_BUCKETS_BYTES) + 1)
+        self.payload_sum = 0
+        self.payload_max = 0
+
+    def reset(self) -> None:
+        with self.lock:
+            self._zero()
+
+    def observe(self, elapsed_ns: int, payload_bytes: int, failed: bool) -> None:
+        lat_idx = bisect.bisect_left(_LATENCY_BUCKETS_NS, elapsed_ns)
+        size_idx = bisect.bisect_left(_PAYLOAD_BUCKETS_BYTES, payload_bytes)
+        with self.lock:
+            self.calls += 1
+            if failed:
+                self.errors += 1
+            self.latency_counts[lat_idx] += 1
+            self.latency_sum_ns += elapsed_ns
+            if elapsed_ns > self.latency_max_ns:
+                self.latency_max_ns = elapsed_ns
+            self.payload_counts[size_idx] += 1
+            self.payload_sum += payload_bytes
+            if payload_bytes > self.payload_max:
+                self.payload_max = payload_bytes
+
+    def copy(self) -> dict:
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "latency_counts": list(self.latency_counts),
+                "latency_sum_ns": self.latency_sum_ns,
+                "latency_max_ns": self.latency_max_ns,
+                "payload_counts": list(self.payload_counts),
+                "payload_sum": self.payload_sum,
+                "payload_max": self.payload_max,
+            }
+
+
+_SERIES: dict[tuple[str, str], _ToolSeries] = {}
+_SERIES_LOCK = threading.Lock()
+
+
+def _series_for(agent_name: str, tool_name: str) -> _ToolSeries:
+    key = (agent_name, tool_name)
+    series = _SERIES.get(key)
+    if series is None:
+        with _SERIES_LOCK:
+            series = _SERIES.setdefault(key, _ToolSeries())
+    return series
+
+
+def reset_metrics() -> None:
+    """Zeroes all recorded tool metrics.
+
+    Series are reset in place rather than dropped: each ``instrument_tool``
+    wrapper holds its series, so a fresh one would never be recorded into.
+    """
+    with _SERIES_LOCK:
+        series = list(_SERIES.values())
+    for s in series:
+        s.reset()
+
+
+# =============================================================================
+# INSTRUMENTATION
+# =============================================================================
+_PAYLOAD_ENCODER = json.JSONEncoder(ensure_ascii=False, check_circular=False, default=str)
+
+
+def _payload_size(result: Any) -> int:
+    """Approximate size in bytes of the tool result as sent back to the model."""
+    try:
+        return len(_PAYLOAD_ENCODER.encode(result).encode("utf-8"))
+    except (TypeError, ValueError):
+        return len(str(result).encode("utf-8"))
+
+
+def instrument_tool(func: Callable, agent_name: str) -> Callable:
+    """Wraps a tool function so every call is recorded under (agent_name, tool).
+
+    The wrapper keeps the original signature and docstring (``functools.wraps``),
+    so ADK builds the same function declaration as for the bare tool.
+    """
+    if getattr(func, "__instrumented_agent__", None) == agent_name:
+        return func
+
+    tool_name = func.__name__
+    series = _series_for(agent_name, tool_name)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                series.observe(time.perf_counter_ns() - start, 0, True)
+                raise
+            elapsed = time.perf_counter_ns() - start
+            failed = isinstance(result, dict) and result.get("status") == "error"
+            series.observe(elapsed, _payload_size(result), failed)
+            return result
+
+        async_wrapper.__instrumented_agent__ = agent_name
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter_ns()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            series.observe(time.perf_counter_ns() - start, 0, True)
+            raise
+        elapsed = time.perf_counter_ns() - start
+        failed = isinstance(result, dict) and result.get("status") == "error"
+        series.observe(elapsed, _payload_size(result), failed)
+        return result
+
+    wrapper.__instrumented_agent__ = agent_name
+    return wrapper
+
+
+def instrument_agent_tree(agent) -> int:
+    """Instruments every function tool on ``agent`` and all of its sub-agents.
+
+    Tools shared between agents get one wrapper per agent, so the same tool is
+    reported separately for the coordinator and for each department. Tool
+    objects that are not plain functions (e.g. ``BaseTool`` instances) are left
+    untouched.
+
+    Returns:
+        int: Number of tool bindings instrumented.
+    """
+    if os.environ.get("AGENTIC_HOSPITAL_TOOL_METRICS", "1") == "0":
+        return 0
+
+    count = 0
+    seen: set[int] = set()
+    stack = [agent]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+
+        tools = getattr(current, "tools", None)
+        if tools:
+            for i, tool in enumerate(tools):
+                if inspect.isfunction(tool):
+                    tools[i] = instrument_tool(tool, current.name)
+                    count += 1
+        stack.extend(getattr(current, "sub_agents", None) or [])
+    return count
+
+
+# =============================================================================
+# EXPORT — JSON snapshot
+# =============================================================================
+def _quantile(counts: list[int], bounds: tuple, total: int, q: float,
+              max_value: float) -> float:
+    """Estimates a quantile from cumulative histogram buckets (upper bound)."""
+    if not total:
+        return 0.0
+    target = q * total
+    running = 0
+    for i, c in enumerate(counts):
+        running += c
+        if running >= target:
+            return float(bounds[i]) if i < len(bounds) else float(max_value)
+    return float(max_value)
+
+
+def metrics_snapshot() -> dict:
+    """Returns a JSON-serialisable snapshot of every (agent, tool) series.
+
+    Returns:
+        dict: Per-series call/error counts, latency summary (ms) with estimated
+              percentiles, result-size summary (bytes), plus hospital-wide totals.
+    """
+    with _SERIES_LOCK:
+        items = list(_SERIES.items())
+
+    tools = []
+    total_calls = total_errors = 0
+    for (agent_name, tool_name), series in sorted(items):
+        data = series.copy()
+        calls = data["calls"]
+        total_calls += calls
+        total_errors += data["errors"]
+        max_ms = data["latency_max_ns"] / 1e6
+        latency_bounds_ms = tuple(b * 1000 for b in _LATENCY_BUCKETS_S)
+        tools.append({
+            "agent": agent_name,
+            "tool": tool_name,
+            "calls": calls,
+            "errors": data["errors"],
+            "error_rate": round(data["errors"] / calls, 4) if calls else 0.0,
+            "latency_ms": {
+                "mean": round(data["latency_sum_ns"] / calls / 1e6, 3) if calls else 0.0,
+                "p50": _quantile(data["latency_counts"], latency_bounds_ms, calls, 0.50, max_ms),
+                "p95": _quantile(data["latency_counts"], latency_bounds_ms, calls, 0.95, max_ms),
+                "p99": _quantile(data["latency_counts"], latency_bounds_ms, calls, 0.99, max_ms),
+                "max": round(max_ms, 3),
+            },
+            "result_bytes": {
+                "mean": round(data["payload_sum"] / calls, 1) if calls else 0.0,
+                "max": data["payload_max"],
+                "total": data["payload_sum"],
+            },
+        })
+
+    return {
+        "status": "success",
+        "generated_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "total_calls": total_calls,
+        "total_errors": total_errors,
+        "series_count": len(tools),
+        "tools": tools,
+    }
+
+
+# =============================================================================
+# EXPORT — Prometheus text exposition format (0.0.4)
+# =============================================================================
+def escape_label(value: str) -> str:
+    """Escapes a Prometheus label value (backslash, double quote, newline)."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_le(bound: float) -> str:
+    return repr(float(bound)) if not float(bound).is_integer() else f"{float(bound):.1f}"
+
+
+def render_prometheus() -> str:
+    """Renders all tool series in Prometheus text exposition format."""
+    with _SERIES_LOCK:
+        items = sorted(_SERIES.items())
+    snapshots = [((a, t), s.copy()) for (a, t), s in items]
+
+    lines = [
+        f"# HELP {_METRIC_PREFIX}_calls_total Tool invocations per agent.",
+        f"# TYPE {_METRIC_PREFIX}_calls_total counter",
+    ]
+    for (agent_name, tool_name), d in snapshots:
+        labels = f'agent="{escape_label(agent_name)}",tool="{escape_label(tool_name)}"'
+        lines.append(f"{_METRIC_PREFIX}_calls_total{{{labels}}} {d['calls']}")
+
+    lines += [
+        f"# HELP {_METRIC_PREFIX}_errors_total Tool invocations that raised or returned status=error.",
+        f"# TYPE {_METRIC_PREFIX}_errors_total counter",
+    ]
+    for (agent_name, tool_name), d in snapshots:
+        labels = f'agent="{escape_label(agent_name)}",tool="{escape_label(tool_name)}"'
+        lines.append(f"{_METRIC_PREFIX}_errors_total{{{labels}}} {d['errors']}")
+
+    histograms = (
+        ("latency_seconds", "Tool wall-clock latency.", _LATENCY_BUCKETS_S,
+         "latency_counts", lambda d: d["latency_sum_ns"] / 1e9),
+        ("result_bytes", "Serialised tool result size.", _PAYLOAD_BUCKETS_BYTES,
+         "payload_counts", lambda d: d["payload_sum"]),
+    )
+    for name, help_text, bounds, counts_key, sum_of in histograms:
+        metric = f"{_METRIC_PREFIX}_{name}"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+        for (agent_name, tool_name), d in snapshots:
+            labels = f'agent="{escape_label(agent_name)}",tool="{escape_label(tool_name)}"'
+            running = 0
+            for bound, c in zip(bounds, d[counts_key]):
+                running += c
+                lines.append(f'{metric}_bucket{{{labels},le="{_format_le(bound)}"}} {running}')
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {d["calls"]}')
+            lines.append(f"{metric}_sum{{{labels}}} {sum_of(d)}")
+            lines.append(f"{metric}_count{{{labels}}} {d['calls']}")
+
+    return "\n".join(lines) + "\n"
+
+
+# =============================================================================
+# EXPORT — HTTP endpoint (/metrics, /metrics.json)
+# =============================================================================
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802 — http.server naming
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body = render_prometheus_all().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(metrics_snapshot_all()).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404, "Use /metrics or /metrics.json")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        return
+
+
+_EXTRA_SNAPSHOTS: dict[str, Callable[[], dict]] = {}
+_EXTRA_PROMETHEUS: dict[str, Callable[[], str]] = {}
+
+
+def register_exporter(name: str, snapshot: Optional[Callable[[], dict]] = None,
+                      prometheus: Optional[Callable[[], str]] = None) -> None:
+    """Adds another metrics source to the /metrics and /metrics.json endpoints."""
+    if snapshot is not None:
+        _EXTRA_SNAPSHOTS[name] = snapshot
+    if prometheus is not None:
+        _EXTRA_PROMETHEUS[name] = prometheus
+
+
+def metrics_snapshot_all() -> dict:
+    """Tool metrics snapshot merged with every registered exporter's snapshot."""
+    snapshot = {"tools": metrics_snapshot()}
+    for name, fn in _EXTRA_SNAPSHOTS.items():
+        snapshot[name] = fn()
+    return snapshot
+
+
+def render_prometheus_all() -> str:
+    """Tool metrics in Prometheus text format followed by every registered exporter."""
+    return render_prometheus() + "".join(fn() for fn in _EXTRA_PROMETHEUS.values())
+
+
+_SERVER: dict[str, Optional[ThreadingHTTPServer]] = {"server": None}
+
+
+def start_metrics_server(port: Optional[int] = None, host: str = "127.0.0.1") -> Optional[int]:
+    """Starts the metrics HTTP endpoint in a daemon thread (idempotent).
+
+    Args:
+        port: Port to bind. Defaults to ``AGENTIC_HOSPITAL_METRICS_PORT``; when
+              neither is set the server is not started.
+        host: Interface to bind (default loopback only).
+
+    Returns:
+        Optional[int]: The bound port, or None if the server was not started.
+    """
+    if _SERVER["server"] is not None:
+        return _SERVER["server"].server_address[1]
+    if port is None:
+        env_port = os.environ.get("AGENTIC_HOSPITAL_METRICS_PORT")
+        if not env_port:
+            return None
+        port = int(env_port)
+
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="tool-metrics-http", daemon=True)
+    thread.start()
+    _SERVER["server"] = server
+    return server.server_address[1]
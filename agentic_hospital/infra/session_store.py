@@ -0,0 +1,697 @@
+"""Maintenance for the ADK SQLite session store (``.adk/session.db``).
+
+``adk web`` persists every session and event of the agent tree in a local
+SQLite file. Left alone it grows without bound: every tool output (patient
+dashboards, SOAP notes, lab panels) is stored verbatim in ``events.event_data``
+and the default rollback journal serialises readers behind writers.
+
+This module keeps the store healthy without changing its schema contract with
+``google.adk.sessions.SqliteSessionService``:
+
+* ``enable_wal``        — switch to write-ahead logging (readers no longer block
+  on the writer) with ``synchronous=NORMAL``.
+* ``ensure_indexes``    — index events by (session, timestamp) so a resume is
+  an index range scan instead of a primary-key scan plus a sort, and sessions
+  by update time for listing and retention.
+* ``compact_sessions``  — for long sessions, move the original payloads of all
+  but the most recent events into a compressed snapshot row
+  (``session_snapshots``) and replace their bulky function responses with a
+  short stub. Events stay valid ADK events, so resume keeps working.
+* ``prune_sessions``    — archive sessions idle past the retention window into
+  ``session_archive`` (compressed) and remove them from the hot tables.
+* ``session_store_report`` — database size, free pages, per-session event
+  volume and measured resume latency for the largest sessions.
+
+Run from the command line::
+
+    python -m agentic_hospital.infra.session_store report
+    python -m agentic_hospital.infra.session_store maintain --retention-days 30
+    python -m agentic_hospital.infra.session_store bench --events 1000
+"""
+
+import argparse
+import gc
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+import zlib
+from typing import Optional
+
+
+DEFAULT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".adk", "session.db",
+)
+
+# Events per session kept with full payloads; older ones are compacted
+_DEFAULT_KEEP_RECENT = 200
+
+# Function responses smaller than this are left untouched during compaction
+_DEFAULT_MIN_PAYLOAD_BYTES = 1024
+
+# Characters of the original response kept in the compacted stub
+_STUB_PREVIEW_CHARS = 160
+
+_DEFAULT_RETENTION_DAYS = 30
+
+_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_events_session_ts "
+    "ON events (app_name, user_id, session_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_update_time "
+    "ON sessions (app_name, update_time)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_last_update "
+    "ON sessions (update_time)",
+)
+
+_SIDE_TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS session_snapshots (
+        snapshot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        app_name TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        session_id TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        through_timestamp REAL NOT NULL,
+        event_count INTEGER NOT NULL,
+        raw_bytes INTEGER NOT NULL,
+        payload BLOB NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_snapshots_session "
+    "ON session_snapshots (app_name, user_id, session_id)",
+    """
+    CREATE TABLE IF NOT EXISTS session_archive (
+        app_name TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        session_id TEXT NOT NULL,
+        archived_at REAL NOT NULL,
+        last_update_time REAL NOT NULL,
+        event_count INTEGER NOT NULL,
+        payload BLOB NOT NULL,
+        PRIMARY KEY (app_name, user_id, session_id)
+    )
+    """,
+)
+
+# Same statement SqliteSessionService.get_session issues on resume
+_RESUME_SQL = (
+    "SELECT event_data FROM events WHERE app_name=? AND user_id=? AND session_id=? "
+    "ORDER BY timestamp DESC, rowid DESC"
+)
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30.0, isolation_level=None)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA busy_timeout = 30000")
+    return conn
+
+
+def _pack(obj) -> bytes:
+    return zlib.compress(json.dumps(obj, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def unpack_snapshot(payload: bytes):
+    """Decode a ``session_snapshots`` / ``session_archive`` payload blob.
+
+    Args:
+        payload: The compressed blob stored by compaction or pruning.
+
+    Returns:
+        The original JSON structure (list of events or archived session dict).
+    """
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+
+# =============================================================================
+# JOURNAL MODE AND INDEXES
+# =============================================================================
+def enable_wal(db_path: str = DEFAULT_DB_PATH) -> dict:
+    """Switch the session database to write-ahead logging.
+
+    WAL is persistent in the database file, so this only needs to run once.
+
+    Args:
+        db_path: Path to the ADK SQLite session database.
+
+    Returns:
+        dict: Previous and current journal modes.
+    """
+    if not os.path.exists(db_path):
+        return {"status": "error", "message": f"Session database not found: {db_path}"}
+    conn = _connect(db_path)
+    try:
+        previous = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        current = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA wal_autocheckpoint=1000")
+    finally:
+        conn.close()
+    return {"status": "success", "previous_journal_mode": previous, "journal_mode": current}
+
+
+def ensure_indexes(db_path: str = DEFAULT_DB_PATH) -> dict:
+    """Create the resume and retention indexes plus the maintenance side tables.
+
+    Args:
+        db_path: Path to the ADK SQLite session database.
+
+    Returns:
+        dict: Indexes present on the events and sessions tables afterwards.
+    """
+    if not os.path.exists(db_path):
+        return {"status": "error", "message": f"Session database not found: {db_path}"}
+    conn = _connect(db_path)
+    try:
+        for stmt in _INDEX_SQL + _SIDE_TABLES_SQL:
+            conn.execute(stmt)
+        conn.execute("ANALYZE")
+        indexes = [
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='index' "
+                "AND tbl_name IN ('events','sessions') AND name NOT LIKE 'sqlite_autoindex%'"
+            )
+        ]
+    finally:
+        conn.close()
+    return {"status": "success", "indexes": sorted(indexes)}
+
+
+# =============================================================================
+# COMPACTION — old event payloads into compressed snapshots
+# =============================================================================
+def _compact_event(event: dict, min_payload_bytes: int) -> bool:
+    """Replace large function responses in an event with a stub. Returns True if changed."""
+    parts = (event.get("content") or {}).get("parts") or []
+    changed = False
+    for part in parts:
+        fr = part.get("function_response")
+        if not fr or not isinstance(fr.get("response"), dict):
+            continue
+        response = fr["response"]
+        if response.get("compacted"):
+            continue
+        raw = json.dumps(response, separators=(",", ":"), default=str)
+        if len(raw) < min_payload_bytes:
+            continue
+        stub = {"compacted": True, "original_bytes": len(raw), "preview": raw[:_STUB_PREVIEW_CHARS]}
+        if "status" in response:
+            stub["status"] = response["status"]
+        fr["response"] = stub
+        changed = True
+    return changed
+
+
+def compact_sessions(
+    db_path: str = DEFAULT_DB_PATH,
+    keep_recent: int = _DEFAULT_KEEP_RECENT,
+    min_payload_bytes: int = _DEFAULT_MIN_PAYLOAD_BYTES,
+) -> dict:
+    """Compact old event payloads of long sessions into snapshots.
+
+    For every session with more than ``keep_recent`` events, the original
+    ``event_data`` of the older events is stored once, compressed, in
+    ``session_snapshots``; in the live ``events`` table their function
+    responses above ``min_payload_bytes`` are replaced by a short stub
+    (status, original size, preview). The most recent events are untouched,
+    so the model still sees full tool outputs for the current conversation.
+
+    Args:
+        db_path: Path to the ADK SQLite session database.
+        keep_recent: Number of most recent events per session kept verbatim.
+        min_payload_bytes: Function responses smaller than this are kept.
+
+    Returns:
+        dict: Sessions and events compacted and bytes reclaimed from event rows.
+    """
+    if not os.path.exists(db_path):
+        return {"status": "error", "message": f"Session database not found: {db_path}"}
+    ensure_indexes(db_path)
+    conn = _connect(db_path)
+    sessions_compacted = events_compacted = bytes_before = bytes_after = 0
+    try:
+        candidates = conn.execute(
+            "SELECT app_name, user_id, session_id, COUNT(*) FROM events "
+            "GROUP BY app_name, user_id, session_id HAVING COUNT(*) > ?",
+            (keep_recent,),
+        ).fetchall()
+        for app_name, user_id, session_id, _count in candidates:
+            rows = conn.execute(
+                "SELECT rowid, id, timestamp, event_data FROM events "
+                "WHERE app_name=? AND user_id=? AND session_id=? "
+                "ORDER BY timestamp DESC, rowid DESC LIMIT -1 OFFSET ?",
+                (app_name, user_id, session_id, keep_recent),
+            ).fetchall()
+            originals, updates = [], []
+            for rowid, event_id, ts, data in rows:
+                try:
+                    event = json.loads(data)
+                except ValueError:
+                    continue
+                if not _compact_event(event, min_payload_bytes):
+                    continue
+                new_data = json.dumps(event, separators=(",", ":"), ensure_ascii=False)
+                originals.append({"id": event_id, "timestamp": ts, "event_data": data})
+                updates.append((new_data, rowid))
+                bytes_before += len(data)
+                bytes_after += len(new_data)
+            if not updates:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO session_snapshots (app_name, user_id, session_id, created_at, "
+                    "through_timestamp, event_count, raw_bytes, payload) VALUES (?,?,?,?,?,?,?,?)",
+                    (app_name, user_id, session_id, time.time(),
+                     max(o["timestamp"] for o in originals), len(originals),
+                     sum(len(o["event_data"]) for o in originals), _pack(originals)),
+                )
+                conn.executemany("UPDATE events SET event_data=? WHERE rowid=?", updates)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            sessions_compacted += 1
+            events_compacted += len(updates)
+    finally:
+        conn.close()
+    return {
+        "status": "success",
+        "sessions_compacted": sessions_compacted,
+        "events_compacted": events_compacted,
+        "event_bytes_before": bytes_before,
+        "event_bytes_after": bytes_after,
+        "event_bytes_saved": bytes_before - bytes_after,
+    }
+
+
+# =============================================================================
+# RETENTION — archive and prune idle sessions
+# =============================================================================
+def prune_sessions(
+    db_path: str = DEFAULT_DB_PATH,
+    retention_days: float = _DEFAULT_RETENTION_DAYS,
+    archive: bool = True,
+    now: Optional[float] = None,
+) -> dict:
+    """Archive and delete sessions not updated within the retention window.
+
+    Archived sessions (state plus every event) are stored compressed in
+    ``session_archive`` so they can be restored for audit; pass
+    ``archive=False`` to drop them outright.
+
+    Args:
+        db_path: Path to the ADK SQLite session database.
+        retention_days: Sessions idle for longer than this are pruned.
+        archive: Keep a compressed copy in ``session_archive`` before deleting.
+        now: Reference epoch time (defaults to the current time).
+
+    Returns:
+        dict: Number of sessions and events pruned.
+    """
+    if not os.path.exists(db_path):
+        return {"status": "error", "message": f"Session database not found: {db_path}"}
+    ensure_indexes(db_path)
+    cutoff = (now if now is not None else time.time()) - retention_days * 86400
+    conn = _connect(db_path)
+    sessions_pruned = events_pruned = 0
+    try:
+        expired = conn.execute(
+            "SELECT app_name, user_id, id, state, create_time, update_time "
+            "FROM sessions WHERE update_time < ?",
+            (cutoff,),
+        ).fetchall()
+        for app_name, user_id, session_id, state, create_time, update_time in expired:
+            key = (app_name, user_id, session_id)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                events = conn.execute(
+                    "SELECT id, invocation_id, timestamp, event_data FROM events "
+                    "WHERE app_name=? AND user_id=? AND session_id=? ORDER BY timestamp, rowid",
+                    key,
+                ).fetchall()
+                if archive:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO session_archive (app_name, user_id, session_id, "
+                        "archived_at, last_update_time, event_count, payload) VALUES (?,?,?,?,?,?,?)",
+                        key + (time.time(), update_time, len(events), _pack({
+                            "state": state,
+                            "create_time": create_time,
+                            "update_time": update_time,
+                            "events": [
+                                {"id": e[0], "invocation_id": e[1], "timestamp": e[2], "event_data": e[3]}
+                                for e in events
+                            ],
+                        })),
+                    )
+                conn.execute(
+                    "DELETE FROM events WHERE app_name=? AND user_id=? AND session_id=?", key,
+                )
+                conn.execute(
+                    "DELETE FROM session_snapshots WHERE app_name=? AND user_id=? AND session_id=?", key,
+                )
+                conn.execute("DELETE FROM sessions WHERE app_name=? AND user_id=? AND id=?", key)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            sessions_pruned += 1
+            events_pruned += len(events)
+    finally:
+        conn.close()
+    return {
+        "status": "success",
+        "retention_days": retention_days,
+        "sessions_pruned": sessions_pruned,
+        "events_pruned": events_pruned,
+        "archived": archive,
+    }
+
+
+def vacuum(db_path: str = DEFAULT_DB_PATH) -> dict:
+    """Return free pages to the filesystem and checkpoint the WAL.
+
+    Args:
+        db_path: Path to the ADK SQLite session database.
+
+    Returns:
+        dict: File size before and after.
+    """
+    if not os.path.exists(db_path):
+        return {"status": "error", "message": f"Session database not found: {db_path}"}
+    before = _db_bytes(db_path)
+    conn = _connect(db_path)
+    try:
+        conn.execute("VACUUM")
+        if conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    return {"status": "success", "bytes_before": before, "bytes_after": _db_bytes(db_path)}
+
+
+# =============================================================================
+# REPORTING
+# =============================================================================
+def _db_bytes(db_path: str) -> int:
+    total = 0
+    for suffix in ("", "-wal", "-shm"):
+        path = db_path + suffix
+        if os.path.exists(path):
+            total += os.path.getsize(path)
+    return total
+
+
+def _time_resume(conn: sqlite3.Connection, key: tuple, repeats: int) -> float:
+    """Median milliseconds to fetch and decode a session's events the way ADK does."""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for (data,) in conn.execute(_RESUME_SQL, key):
+            json.loads(data)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def session_store_report(db_path: str = DEFAULT_DB_PATH, top: int = 5, repeats: int = 5) -> dict:
+    """Report size, journal mode and resume latency of the session database.
+
+    Args:
+        db_path: Path to the ADK SQLite session database.
+        top: Number of largest sessions (by event count) to time.
+        repeats: Timed resumes per session; the median is reported.
+
+    Returns:
+        dict: File and page statistics, row counts and per-session resume latency.
+    """
+    if not os.path.exists(db_path):
+        return {"status": "error", "message": f"Session database not found: {db_path}"}
+    conn = _connect(db_path)
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        tables = {
+            row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        }
+        counts = {
+            name: conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+            for name in ("sessions", "events", "session_snapshots", "session_archive")
+            if name in tables
+        }
+        event_bytes = conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(event_data)), 0) FROM events"
+        ).fetchone()[0] if "events" in tables else 0
+        largest = conn.execute(
+            "SELECT app_name, user_id, session_id, COUNT(*), SUM(LENGTH(event_data)) FROM events "
+            "GROUP BY app_name, user_id, session_id ORDER BY COUNT(*) DESC LIMIT ?",
+            (top,),
+        ).fetchall() if "events" in tables else []
+        sessions = []
+        for app_name, user_id, session_id, n_events, n_bytes in largest:
+            sessions.append({
+                "app_name": app_name,
+                "user_id": user_id,
+                "session_id": session_id,
+                "events": n_events,
+                "event_bytes": n_bytes,
+                "resume_ms": round(_time_resume(conn, (app_name, user_id, session_id), repeats), 3),
+            })
+        plan = " ".join(
+            row[-1] for row in conn.execute(
+                "EXPLAIN QUERY PLAN " + _RESUME_SQL, ("", "", ""),
+            )
+        ) if "events" in tables else ""
+    finally:
+        conn.close()
+    return {
+        "status": "success",
+        "db_path": db_path,
+        "file_bytes": _db_bytes(db_path),
+        "page_size": page_size,
+        "page_count": page_count,
+        "free_pages": freelist,
+        "journal_mode": journal_mode,
+        "row_counts": counts,
+        "event_payload_bytes": event_bytes,
+        "resume_query_plan": plan,
+        "largest_sessions": sessions,
+    }
+
+
+def run_maintenance(
+    db_path: str = DEFAULT_DB_PATH,
+    retention_days: float = _DEFAULT_RETENTION_DAYS,
+    keep_recent: int = _DEFAULT_KEEP_RECENT,
+    min_payload_bytes: int = _DEFAULT_MIN_PAYLOAD_BYTES,
+    archive: bool = True,
+    do_vacuum: bool = True,
+) -> dict:
+    """Run every maintenance step in order and report before/after.
+
+    Safe to run while ``adk web`` is up: each step takes SQLite's normal write
+    lock and ADK retries on ``SQLITE_BUSY``.
+
+    Args:
+        db_path: Path to the ADK SQLite session database.
+        retention_days: Sessions idle for longer than this are archived and pruned.
+        keep_recent: Events per session kept with full payloads.
+        min_payload_bytes: Smallest function response worth compacting.
+        archive: Keep compressed copies of pruned sessions.
+        do_vacuum: Reclaim free pages at the end.
+
+    Returns:
+        dict: Results of each step plus reports taken before and after.
+    """
+    if not os.path.exists(db_path):
+        return {"status": "error", "message": f"Session database not found: {db_path}"}
+    before = session_store_report(db_path)
+    steps = {
+        "wal": enable_wal(db_path),
+        "indexes": ensure_indexes(db_path),
+        "prune": prune_sessions(db_path, retention_days=retention_days, archive=archive),
+        "compact": compact_sessions(
+            db_path, keep_recent=keep_recent, min_payload_bytes=min_payload_bytes,
+        ),
+    }
+    if do_vacuum:
+        steps["vacuum"] = vacuum(db_path)
+    return {
+        "status": "success",
+        "steps": steps,
+        "before": before,
+        "after": session_store_report(db_path),
+    }
+
+
+# =============================================================================
+# BENCHMARK — resume time of 1k-event sessions before and after maintenance
+# =============================================================================
+def _synthetic_event(i: int, ts: float, invocation_id: str) -> tuple[str, str]:
+    """A realistic ADK event row: alternating tool calls and bulky tool results."""
+    from google.adk.events import Event  # noqa: PLC0415
+    from google.genai import types  # noqa: PLC0415
+
+    if i % 2 == 0:
+        part = types.Part(function_call=types.FunctionCall(
+            id=f"call-{i}", name="get_patient_dashboard", args={"patient_id": "PT001"},
+        ))
+        author = "hospital_admission_agent"
+    else:
+        response = {
+            "status": "success",
+            "patient_id": "PT001",
+            "vitals": [{"hr": 70 + k % 30, "bp": "120/80", "spo2": 97, "time": f"08:{k:02d}"}
+                       for k in range(40)],
+            "notes": "Patient stable on ward review. " * 40,
+        }
+        part = types.Part(function_response=types.FunctionResponse(
+            id=f"call-{i - 1}", name="get_patient_dashboard", response=response,
+        ))
+        author = "user"
+    event = Event(
+        invocation_id=invocation_id, author=author, timestamp=ts,
+        content=types.Content(role="user" if author == "user" else "model", parts=[part]),
+    )
+    return event.id, event.model_dump_json(exclude_none=True)
+
+
+async def _adk_resume_ms(db_paths: dict[str, str], app_name: str, user_id: str, session_id: str,
+                         repeats: int) -> dict[str, dict]:
+    """Times ``get_session`` on each database, alternating between them every round.
+
+    Interleaving puts machine noise (other processes, CPU frequency) on both
+    sides of the comparison instead of on whichever ran second; a full
+    collection before each sample keeps GC pauses from the previous
+    resume out of the next one.
+    """
+    from google.adk.sessions.sqlite_session_service import SqliteSessionService  # noqa: PLC0415
+
+    services = {label: SqliteSessionService(path) for label, path in db_paths.items()}
+    samples: dict[str, list] = {label: [] for label in db_paths}
+    n_events: dict[str, int] = {}
+    for _ in range(repeats):
+        for label, service in services.items():
+            gc.collect()
+            start = time.perf_counter()
+            session = await service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+            samples[label].append((time.perf_counter() - start) * 1000)
+            n_events[label] = len(session.events)
+    return {
+        label: {"median": statistics.median(s), "min": min(s), "events": n_events[label]}
+        for label, s in samples.items()
+    }
+
+
+def benchmark_resume(events: int = 1000, sessions: int = 20, repeats: int = 15,
+                     keep_recent: int = _DEFAULT_KEEP_RECENT) -> dict:
+    """Measure ADK session resume time on a synthetic store before and after maintenance.
+
+    Builds a throwaway database through ``SqliteSessionService`` holding
+    ``sessions`` sessions of ``events`` events each, copies it, runs
+    ``run_maintenance`` (no pruning) on the copy and times
+    ``SqliteSessionService.get_session`` on both, alternating. The real
+    ``.adk/session.db`` is never touched.
+
+    Resume cost is dominated by ADK validating every event with pydantic, so
+    it falls with the payload bytes compaction removes, not with the index.
+
+    Args:
+        events: Events per session.
+        sessions: Number of sessions in the store (the others add index pressure).
+        repeats: Timed resumes per measurement; the median is reported.
+        keep_recent: Events per session kept with full payloads.
+
+    Returns:
+        dict: Resume latency, file size and event payload bytes before and after.
+    """
+    import asyncio  # noqa: PLC0415
+
+    from google.adk.sessions.sqlite_session_service import SqliteSessionService  # noqa: PLC0415
+
+    app_name, user_id = "agentic_hospital", "bench"
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "session.db")
+
+        async def _create():
+            service = SqliteSessionService(db_path)
+            for s in range(sessions):
+                await service.create_session(app_name=app_name, user_id=user_id, session_id=f"S{s}")
+        asyncio.run(_create())
+
+        conn = _connect(db_path)
+        base = time.time() - 3600
+        conn.execute("BEGIN")
+        for s in range(sessions):
+            rows = []
+            for i in range(events):
+                event_id, data = _synthetic_event(i, base + i * 0.5 + s * 0.001, f"inv-{i // 2}")
+                rows.append((event_id, app_name, user_id, f"S{s}", f"inv-{i // 2}",
+                             base + i * 0.5 + s * 0.001, data))
+            conn.executemany(
+                "INSERT INTO events (id, app_name, user_id, session_id, invocation_id, "
+                "timestamp, event_data) VALUES (?,?,?,?,?,?,?)",
+                rows,
+            )
+        conn.execute("COMMIT")
+        conn.close()
+
+        maintained_path = os.path.join(tmp, "maintained.db")
+        shutil.copyfile(db_path, maintained_path)
+        run_maintenance(maintained_path, retention_days=36500, keep_recent=keep_recent)
+
+        target = f"S{sessions // 2}"
+        timed = asyncio.run(_adk_resume_ms({"before": db_path, "after": maintained_path},
+                                           app_name, user_id, target, repeats))
+        before = session_store_report(db_path, top=1, repeats=repeats)
+        after = session_store_report(maintained_path, top=1, repeats=repeats)
+
+    return {
+        "status": "success",
+        "sessions": sessions,
+        "events_per_session": events,
+        "events_resumed": {label: t["events"] for label, t in timed.items()},
+        "adk_resume_ms": {label: round(t["median"], 2) for label, t in timed.items()},
+        "adk_resume_min_ms": {label: round(t["min"], 2) for label, t in timed.items()},
+        "raw_resume_ms": {
+            "before": before["largest_sessions"][0]["resume_ms"],
+            "after": after["largest_sessions"][0]["resume_ms"],
+        },
+        "file_bytes": {"before": before["file_bytes"], "after": after["file_bytes"]},
+        "event_payload_bytes": {
+            "before": before["event_payload_bytes"], "after": after["event_payload_bytes"],
+        },
+        "resume_query_plan": {"before": before["resume_query_plan"], "after": after["resume_query_plan"]},
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Maintain the ADK SQLite session store.")
+    parser.add_argument("command", choices=("report", "maintain", "bench"))
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--retention-days", type=float, default=_DEFAULT_RETENTION_DAYS)
+    parser.add_argument("--keep-recent", type=int, default=_DEFAULT_KEEP_RECENT)
+    parser.add_argument("--no-archive", action="store_true")
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--sessions", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == "report":
+        result = session_store_report(args.db)
+    elif args.command == "maintain":
+        result = run_maintenance(
+            args.db, retention_days=args.retention_days,
+            keep_recent=args.keep_recent, archive=not args.no_archive,
+        )
+    else:
+        result = benchmark_resume(events=args.events, sessions=args.sessions,
+                                  keep_recent=args.keep_recent)
+    print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
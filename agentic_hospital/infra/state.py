@@ -0,0 +1,158 @@
+"""Synchronisation primitives for the in-memory hospital state.
+
+The tool modules keep their data in module-level dicts and lists that are
+shared by every concurrent ``adk web`` session. This module provides the
+primitives they use to stay consistent:
+
+* ``AtomicCounter`` — thread-safe replacement for the ``{"n": 0}`` sequence
+  dicts behind order, prescription, triage and discharge IDs. Named counters
+  are drawn from the shared backend when one is configured (see
+  ``infra.backend``), so IDs stay unique across worker processes.
+* ``ShardedLock``   — a fixed pool of re-entrant locks striped by key, so
+  operations on different patients (or wards) proceed in parallel while
+  operations on the same patient are serialised.
+* ``locked``        — acquires patient and ward stripes together in a fixed
+  global order (patients, then wards, each sorted by stripe) so that no two
+  callers can deadlock.
+* ``named_lock``    — one re-entrant lock per shared structure that has no
+  natural key, such as the ED waiting queue.
+
+With a shared backend, ``locked`` and ``named_lock`` also take the matching
+cross-process lock, so workers only wait for each other on the same key.
+Taking it brings the process up to date with other workers; releasing the
+outermost hold writes the guarded entries back. A change to any other entry
+fails the transaction (see ``infra.backend``).
+
+Locking rule for tool code: take every lock an operation needs through a
+single ``locked(...)`` call where possible. When a key is only known after a
+lookup (e.g. the ward a patient is in), nest a ward-only ``locked(...)``
+inside the patient one — never the other way round.
+"""
+
+import threading
+import zlib
+from contextlib import ExitStack, contextmanager
+from typing import Iterable, Iterator, Optional
+
+from .backend import hold, is_shared, release, shared_incr
+
+
+class AtomicCounter:
+    """A monotonically increasing integer shared between threads (and workers, if named)."""
+
+    __slots__ = ("_lock", "_value", "name")
+
+    def __init__(self, name: Optional[str] = None, start: int = 0):
+        self._lock = threading.Lock()
+        self._value = start
+        self.name = name
+
+    def next(self) -> int:
+        """Increments the counter and returns the new value."""
+        if self.name and is_shared():
+            value = shared_incr(self.name)
+            self._value = value
+            return value
+        with self._lock:
+            self._value += 1
+            return self._value
+
+    @property
+    def value(self) -> int:
+        """The last value handed out."""
+        return self._value
+
+    def reset(self, value: int = 0) -> None:
+        with self._lock:
+            self._value = value
+
+
+class ShardedLock:
+    """A pool of re-entrant locks selected by hashing a key.
+
+    Keys hash with CRC-32 so the key → stripe mapping is stable across
+    processes (unlike ``hash`` on strings), which keeps lock ordering
+    reproducible in stress runs.
+    """
+
+    __slots__ = ("name", "_locks")
+
+    def __init__(self, name: str, shards: int = 64):
+        self.name = name
+        self._locks = tuple(threading.RLock() for _ in range(shards))
+
+    def stripe(self, key: str) -> int:
+        return zlib.crc32(str(key).encode("utf-8")) % len(self._locks)
+
+    def stripes(self, keys: Iterable[str]) -> list[int]:
+        """Distinct stripe indexes for ``keys`` in acquisition order."""
+        return sorted({self.stripe(k) for k in keys if k})
+
+    @contextmanager
+    def hold(self, *keys: str) -> Iterator[None]:
+        """Holds the stripes for every key, acquired in ascending stripe order."""
+        with ExitStack() as stack:
+            for idx in self.stripes(keys):
+                stack.enter_context(self._locks[idx])
+            yield
+
+
+_PATIENT_LOCKS = ShardedLock("patient", shards=128)
+_WARD_LOCKS = ShardedLock("ward", shards=64)
+
+_NAMED_LOCKS: dict[str, "NamedLock"] = {}
+_NAMED_LOCKS_GUARD = threading.Lock()
+
+
+@contextmanager
+def locked(patients: Iterable[str] = (), wards: Iterable[str] = ()) -> Iterator[None]:
+    """Holds the patient and ward locks for an operation.
+
+    Args:
+        patients: Patient IDs the operation reads-modifies-writes.
+        wards: Ward keys whose beds or waitlist the operation changes.
+    """
+    patients, wards = tuple(patients), tuple(wards)
+    with ExitStack() as stack:
+        stack.enter_context(_PATIENT_LOCKS.hold(*patients))
+        stack.enter_context(_WARD_LOCKS.hold(*wards))
+        if is_shared():
+            token = hold([("patient", _PATIENT_LOCKS.stripe(p), p) for p in patients if p]
+                         + [("ward", _WARD_LOCKS.stripe(w), w) for w in wards if w])
+            stack.callback(release, token)
+        yield
+
+
+class NamedLock:
+    """A re-entrant lock for one keyless structure; with a shared backend it also syncs the structure."""
+
+    __slots__ = ("name", "_lock", "_tokens")
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.RLock()
+        self._tokens: list = []   # one per nested hold, only touched by the owner
+
+    def __enter__(self) -> "NamedLock":
+        self._lock.acquire()
+        try:
+            self._tokens.append(hold([("named", 0, self.name)]) if is_shared() else None)
+        except BaseException:
+            self._lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc) -> None:
+        try:
+            release(self._tokens.pop())
+        finally:
+            self._lock.release()
+
+
+def named_lock(name: str) -> NamedLock:
+    """Returns the process-wide re-entrant lock registered under ``name``."""
+    lock = _NAMED_LOCKS.get(name)
+    if lock is None:
+        with _NAMED_LOCKS_GUARD:
+            lock = _NAMED_LOCKS.setdefault(name, NamedLock(name))
+    return lock
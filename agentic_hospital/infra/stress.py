@@ -0,0 +1,551 @@
+"""Concurrency stress harness for the in-memory hospital state.
+
+Hammers the real tool functions from many threads at once — bed admissions,
+discharges and transfers on a shared pool of patients, investigation orders,
+medication dispensing, nurse triage records and the ED waiting queue — and
+then checks invariants that only hold if no update was lost:
+
+* no patient occupies more than one bed, and bed occupancy matches the number
+  of successful admissions minus discharges;
+* the admission log has exactly one entry per successful bed operation;
+* no patient appears twice on a ward waitlist;
+* every minted order, dispense and triage ID is unique and every record is
+  present in its store;
+* the ED waiting queue holds every queued patient, in ESI order.
+
+The GIL switch interval is shortened for the run so that thread interleavings
+inside the tools actually happen. All stores touched are snapshotted first and
+restored afterwards.
+
+With ``--processes N`` the same workload runs in N worker processes sharing
+one SQLite state backend (see ``infra.backend``), and the invariants are
+checked across all of them. ``--strict`` also compares every store entry
+with its synced copy after each transaction, so a change made outside
+``locked(...)`` fails the run (much slower; ignore its throughput).
+
+    python -m agentic_hospital.infra.stress --threads 16 --iterations 400
+    python -m agentic_hospital.infra.stress --processes 4 --threads 4 --iterations 200
+    python -m agentic_hospital.infra.stress --processes 2 --iterations 50 --strict
+
+``--scaling N`` measures how throughput grows with worker processes: the
+same low-contention workload (orders, results, dispensing and triage on
+patients private to each process) runs with 1, 2, ... N processes and the
+report gives ops/s, CPU time per operation, speedup over one process and
+parallel efficiency, next to ``os.cpu_count()`` — with fewer CPUs than
+processes no speedup is possible, so read the efficiency against the CPUs
+actually available.
+
+    python -m agentic_hospital.infra.stress --scaling 4 --threads 2 --iterations 300
+"""
+
+import argparse
+import copy
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from ..tools import bed_management_tools as beds
+from ..tools import common_tools as common
+from ..tools import pharmacy_tools as pharmacy
+from ..tools import triage_tools as triage
+from .backend import state_transaction
+from .state import locked
+
+
+_STRESS_WARDS = ("General_Medicine", "Cardiology", "ICU")
+
+_SNAPSHOT_STORES = (
+    (beds, "_BED_DB"), (beds, "_WAITLIST"), (beds, "_ADMISSION_LOG"),
+    (common, "_INVESTIGATION_ORDERS"), (pharmacy, "_DISPENSE_LOG"),
+    (triage, "_TRIAGE_LOG"), (triage, "_WAITING_QUEUE"),
+)
+
+
+def _snapshot() -> list:
+    return [(module, name, copy.deepcopy(getattr(module, name))) for module, name in _SNAPSHOT_STORES]
+
+
+def _restore(saved: list) -> None:
+    # Restore in place: other modules hold references to these objects
+    for module, name, value in saved:
+        store = getattr(module, name)
+        if isinstance(store, dict):
+            store.clear()
+            store.update(value)
+        else:
+            store[:] = value
+    common._rebuild_order_index()
+    beds._rebuild_patient_beds()
+    beds._rebuild_wait_estimator()
+
+
+@state_transaction
+def _housekeeping(ward: str) -> None:
+    """Turns cleaned beds around so admissions keep finding capacity."""
+    with locked(wards=[ward]):
+        ward_beds = beds._BED_DB[ward]["beds"]
+        for bed_id, bed in ward_beds.items():
+            if bed["status"] == "cleaning":
+                ward_beds[bed_id] = beds._make_bed("available")
+
+
+def _bed_worker(seed: int, iterations: int, patients: list, tally: Counter, lock: threading.Lock) -> None:
+    rng = random.Random(seed)
+    local = Counter()
+    for _ in range(iterations):
+        pid = rng.choice(patients)
+        op = rng.random()
+        if op < 0.1:
+            _housekeeping(rng.choice(_STRESS_WARDS))
+        elif op < 0.5:
+            result = beds.assign_bed(pid, rng.choice(_STRESS_WARDS), "Stress admission", "routine")
+            local[result["status"]] += 1
+            if result.get("removed_from_waitlist"):
+                local["waitlist_admitted"] += 1
+            if result["status"] == "waitlisted":
+                local["waitlist_" + result["waitlist_details"]["status"]] += 1
+        elif op < 0.8:
+            local[beds.discharge_patient_from_bed(pid, "Stress discharge")["status"]] += 1
+        else:
+            local[beds.transfer_patient_bed(pid, rng.choice(_STRESS_WARDS), "Stress transfer")["status"]] += 1
+    with lock:
+        tally.update(local)
+
+
+def _order_worker(seed: int, iterations: int, ids: list) -> None:
+    rng = random.Random(seed)
+    for i in range(iterations):
+        pid = f"STRESS-P{rng.randrange(50):03d}"
+        kind = rng.random()
+        if kind < 0.4:
+            order_id = common.order_investigation(
+                pid, "blood_panel", "Stress order", rng.choice(("emergency", "urgent", "routine")))["order_id"]
+            ids.append(("order", pid, order_id))
+            if rng.random() < 0.5:
+                common.mock_result_investigation(order_id, pid)
+                if rng.random() < 0.5:
+                    common.acknowledge_critical_result(pid, order_id, "STRESS-DR")
+        elif kind < 0.75:
+            ids.append(("dispense", pid, pharmacy.dispense_medication(
+                pid, "Paracetamol", "1g", quantity=8)["dispense_id"]))
+        elif kind < 0.9:
+            ids.append(("triage", pid, triage.record_nurse_triage(
+                pid, "Stress complaint", {"hr": 80}, 2, 3)["record_id"]))
+        else:
+            esi = rng.randint(2, 5)
+            triage.assign_waiting_priority(f"STRESS-Q{seed}-{i}", esi)
+            ids.append(("queue", f"STRESS-Q{seed}-{i}", esi))
+
+
+def _check(patients: list, tally: Counter, ids: list, occupied_before: int,
+           queue_before: int) -> list[str]:
+    failures = []
+
+    # Beds
+    locations = Counter()
+    occupied = 0
+    stale_index = 0
+    for ward_name, ward in beds._BED_DB.items():
+        for bed_id, bed in ward["beds"].items():
+            if bed["status"] == "occupied":
+                occupied += 1
+            if bed["patient_id"] in patients:
+                locations[bed["patient_id"]] += 1
+                if beds._PATIENT_BEDS.get(bed["patient_id"]) != (ward_name, bed_id):
+                    stale_index += 1
+    stale_index += sum(1 for pid in patients if pid in beds._PATIENT_BEDS and not locations[pid])
+    if stale_index:
+        failures.append(f"{stale_index} patient → bed index entries disagree with the wards")
+    double = [pid for pid, n in locations.items() if n > 1]
+    if double:
+        failures.append(f"{len(double)} patients occupy more than one bed")
+    expected = occupied_before + tally["admitted"] - tally["discharged"]
+    if occupied != expected:
+        failures.append(f"occupied beds {occupied} != expected {expected}")
+
+    log = Counter(e["event_type"] for e in beds._ADMISSION_LOG if e["patient_id"] in patients)
+    for event, status in (("ADMISSION", "admitted"), ("DISCHARGE", "discharged"),
+                          ("TRANSFER", "transferred")):
+        if log[event] != tally[status]:
+            failures.append(f"{event} log entries {log[event]} != {status} results {tally[status]}")
+
+    waitlisted = 0
+    for ward, wl in beds._WAITLIST.items():
+        ids_on_list = [e["patient_id"] for e in wl if e["patient_id"] in patients]
+        waitlisted += len(ids_on_list)
+        if len(ids_on_list) != len(set(ids_on_list)):
+            failures.append(f"duplicate waitlist entries in {ward}")
+    expected_waiting = tally["waitlist_waitlisted"] - tally["waitlist_admitted"]
+    if waitlisted != expected_waiting:
+        failures.append(f"waitlist entries {waitlisted} != new waitlistings less admissions {expected_waiting}")
+
+    # IDs and records
+    by_kind: dict[str, list] = {}
+    for kind, pid, value in ids:
+        by_kind.setdefault(kind, []).append((pid, value))
+    for kind in ("order", "dispense", "triage"):
+        minted = [v for _, v in by_kind.get(kind, [])]
+        if len(minted) != len(set(minted)):
+            failures.append(f"{len(minted) - len(set(minted))} duplicate {kind} IDs")
+    stored_orders = {o["order_id"] for pid, orders in common._INVESTIGATION_ORDERS.items()
+                     if pid.startswith("STRESS-") for o in orders}
+    stored_dispenses = {d["dispense_id"] for pid, recs in pharmacy._DISPENSE_LOG.items()
+                        if pid.startswith("STRESS-") for d in recs}
+    stored_triage = {r["record_id"] for pid, recs in triage._TRIAGE_LOG.items()
+                     if pid.startswith("STRESS-") for r in recs}
+    for kind, stored in (("order", stored_orders), ("dispense", stored_dispenses),
+                         ("triage", stored_triage)):
+        minted = {v for _, v in by_kind.get(kind, [])}
+        if stored != minted:
+            failures.append(f"{kind} store has {len(stored)} records, {len(minted)} minted")
+
+    failures.extend(_check_order_index())
+
+    queued = len(by_kind.get("queue", []))
+    if len(triage._WAITING_QUEUE) != queue_before + queued:
+        failures.append(f"waiting queue {len(triage._WAITING_QUEUE)} != expected {queue_before + queued}")
+    levels = [e["esi_level"] for e in triage._WAITING_QUEUE]
+    if levels != sorted(levels):
+        failures.append("waiting queue is not in ESI order")
+    return failures
+
+
+def _check_order_index() -> list[str]:
+    """Every stored order is indexed once, in the queue matching its status and priority."""
+    failures = []
+    stored = {o["order_id"]: o for orders in common._INVESTIGATION_ORDERS.values() for o in orders}
+    if set(stored) != set(common._ORDER_INDEX):
+        failures.append(f"order index has {len(common._ORDER_INDEX)} IDs, store has {len(stored)}")
+    queued = {}
+    for status, queues in common._ORDER_QUEUES.items():
+        for priority, queue in queues.items():
+            for order_id in queue:
+                queued.setdefault(order_id, []).append((status, priority))
+    for order_id, order in stored.items():
+        if queued.get(order_id) != [(order["status"], order["priority"])]:
+            failures.append(f"order {order_id} queued as {queued.get(order_id)}, is {order['status']}")
+            break
+    pending = {i for i, o in stored.items() if o["status"] in common._PENDING_STATUSES}
+    if set(common._WORKLIST_ENTRIES) != pending:
+        failures.append(f"results worklist has {len(common._WORKLIST_ENTRIES)} orders, {len(pending)} pending")
+    return failures
+
+
+def run_stress(threads: int = 16, iterations: int = 400, patients: int = 40,
+               seed: int = 7, restore: bool = True) -> dict:
+    """Runs the concurrent workload and verifies there were no lost updates.
+
+    Args:
+        threads: Worker threads for each workload (beds, and orders/dispensing/triage).
+        iterations: Operations per thread.
+        patients: Size of the shared patient pool contended for beds.
+        seed: Base random seed.
+        restore: Restore every touched store afterwards.
+
+    Returns:
+        dict: Operation tallies, elapsed time and any invariant violations.
+    """
+    saved = _snapshot() if restore else None
+    pool = [f"STRESS-B{k:03d}" for k in range(patients)]
+    occupied_before = sum(
+        1 for ward in beds._BED_DB.values() for bed in ward["beds"].values()
+        if bed["status"] == "occupied"
+    )
+    queue_before = len(triage._WAITING_QUEUE)
+    tally: Counter = Counter()
+    tally_lock = threading.Lock()
+    ids: list = []
+
+    workers = [
+        threading.Thread(target=_bed_worker, args=(seed + t, iterations, pool, tally, tally_lock))
+        for t in range(threads)
+    ] + [
+        threading.Thread(target=_order_worker, args=(seed + 1000 + t, iterations, ids))
+        for t in range(threads)
+    ]
+
+    previous_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    start = time.perf_counter()
+    try:
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+    finally:
+        sys.setswitchinterval(previous_interval)
+    elapsed = time.perf_counter() - start
+
+    failures = _check(pool, tally, ids, occupied_before, queue_before)
+    if saved is not None:
+        _restore(saved)
+
+    operations = 2 * threads * iterations
+    return {
+        "status": "passed" if not failures else "failed",
+        "threads": 2 * threads,
+        "operations": operations,
+        "elapsed_seconds": round(elapsed, 3),
+        "ops_per_second": round(operations / elapsed, 1) if elapsed else 0.0,
+        "bed_results": dict(tally),
+        "ids_minted": dict(Counter(kind for kind, _, _ in ids)),
+        "failures": failures,
+    }
+
+
+# =============================================================================
+# MULTI-PROCESS RUN — N workers sharing one SQLite state backend
+# =============================================================================
+def _occupancy() -> tuple[int, int]:
+    occupied = sum(
+        1 for ward in beds._BED_DB.values() for bed in ward["beds"].values()
+        if bed["status"] == "occupied"
+    )
+    return occupied, len(triage._WAITING_QUEUE)
+
+
+@state_transaction(readonly=True)
+def _mp_baseline(_=None) -> tuple[int, int]:
+    return _occupancy()
+
+
+def _mp_worker(args: tuple) -> tuple[dict, list, float]:
+    seed, threads, iterations, pool = args
+    tally: Counter = Counter()
+    tally_lock = threading.Lock()
+    ids: list = []
+    workers = [
+        threading.Thread(target=_bed_worker, args=(seed + t, iterations, pool, tally, tally_lock))
+        for t in range(threads)
+    ] + [
+        threading.Thread(target=_order_worker, args=(seed + 1000 + t, iterations, ids))
+        for t in range(threads)
+    ]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return dict(tally), ids, time.perf_counter() - start
+
+
+@state_transaction(readonly=True)
+def _mp_check(args: tuple) -> list[str]:
+    pool, tally, ids, occupied_before, queue_before = args
+    return _check(pool, Counter(tally), ids, occupied_before, queue_before)
+
+
+def run_multiprocess_stress(processes: int = 4, threads: int = 4, iterations: int = 200,
+                            patients: int = 40, seed: int = 7,
+                            db_path: Optional[str] = None, strict: bool = False) -> dict:
+    """Runs the workload in several processes against a shared SQLite backend.
+
+    Args:
+        processes: Worker processes.
+        threads: Threads per workload inside each process.
+        iterations: Operations per thread.
+        patients: Size of the shared patient pool contended for beds.
+        seed: Base random seed.
+        db_path: State database; a temporary file is used when omitted.
+        strict: Run the workers with ``AGENTIC_HOSPITAL_STATE_STRICT`` set.
+
+    Returns:
+        dict: Aggregate tallies, throughput and any invariant violations.
+    """
+    tmp = None
+    if db_path is None:
+        tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp.name, "state.db")
+    previous = {name: os.environ.get(name)
+                for name in ("AGENTIC_HOSPITAL_STATE_BACKEND", "AGENTIC_HOSPITAL_STATE_STRICT")}
+    os.environ["AGENTIC_HOSPITAL_STATE_BACKEND"] = f"sqlite:///{db_path}"
+    os.environ["AGENTIC_HOSPITAL_STATE_STRICT"] = "1" if strict else ""
+    pool_ids = [f"STRESS-B{k:03d}" for k in range(patients)]
+    try:
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(processes, initializer=_mp_baseline) as pool:
+            occupied_before, queue_before = pool.apply(_mp_baseline)
+            results = pool.map(_mp_worker, [
+                (seed + 100 * p, threads, iterations, pool_ids) for p in range(processes)
+            ], chunksize=1)
+            # Wall time of the slowest worker, excluding process start-up and imports
+            elapsed = max(r[2] for r in results)
+            tally: Counter = Counter()
+            ids: list = []
+            for t, i, _ in results:
+                tally.update(t)
+                ids.extend(i)
+            failures = pool.apply(_mp_check, ((pool_ids, dict(tally), ids,
+                                               occupied_before, queue_before),))
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        if tmp is not None:
+            tmp.cleanup()
+
+    operations = processes * 2 * threads * iterations
+    return {
+        "status": "passed" if not failures else "failed",
+        "backend": "sqlite",
+        "strict": strict,
+        "processes": processes,
+        "operations": operations,
+        "elapsed_seconds": round(elapsed, 3),
+        "ops_per_second": round(operations / elapsed, 1) if elapsed else 0.0,
+        "bed_results": dict(tally),
+        "ids_minted": dict(Counter(kind for kind, _, _ in ids)),
+        "failures": failures,
+    }
+
+
+# =============================================================================
+# SCALING — throughput against the number of worker processes
+# =============================================================================
+def _scale_worker(args: tuple) -> tuple[list, float, float]:
+    process, threads, iterations = args
+
+    def work(thread: int, ids: list) -> None:
+        rng = random.Random(process * 1000 + thread)
+        for i in range(iterations):
+            pid = f"SCALE-P{process}-T{thread}-{rng.randrange(50)}"
+            kind = i % 3
+            if kind == 0:
+                order_id = common.order_investigation(pid, "blood_panel", "Scaling order", "routine")["order_id"]
+                common.mock_result_investigation(order_id, pid)
+                ids.append(("order", pid, order_id))
+            elif kind == 1:
+                ids.append(("dispense", pid, pharmacy.dispense_medication(
+                    pid, "Paracetamol", "1g", quantity=8)["dispense_id"]))
+            else:
+                ids.append(("triage", pid, triage.record_nurse_triage(
+                    pid, "Scaling complaint", {"hr": 80}, 2, 3)["record_id"]))
+
+    per_thread = [[] for _ in range(threads)]
+    workers = [threading.Thread(target=work, args=(t, per_thread[t])) for t in range(threads)]
+    start, cpu_start = time.perf_counter(), time.process_time()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return ([entry for ids in per_thread for entry in ids], time.perf_counter() - start,
+            time.process_time() - cpu_start)
+
+
+@state_transaction(readonly=True)
+def _scale_check(ids: list) -> list[str]:
+    stored = {
+        "order": {o["order_id"] for pid, orders in common._INVESTIGATION_ORDERS.items()
+                  if pid.startswith("SCALE-") for o in orders},
+        "dispense": {d["dispense_id"] for pid, recs in pharmacy._DISPENSE_LOG.items()
+                     if pid.startswith("SCALE-") for d in recs},
+        "triage": {r["record_id"] for pid, recs in triage._TRIAGE_LOG.items()
+                   if pid.startswith("SCALE-") for r in recs},
+    }
+    failures = []
+    for kind, records in stored.items():
+        minted = [value for k, _, value in ids if k == kind]
+        if len(minted) != len(set(minted)):
+            failures.append(f"{len(minted) - len(set(minted))} duplicate {kind} IDs")
+        if records != set(minted):
+            failures.append(f"{kind} store has {len(records)} records, {len(minted)} minted")
+    return failures
+
+
+def run_scaling(max_processes: int = 4, threads: int = 2, iterations: int = 300) -> dict:
+    """Measures shared-backend throughput with 1..``max_processes`` worker processes.
+
+    Each run uses a fresh SQLite state database. Elapsed time is the slowest
+    worker's, excluding process start-up and imports. Operations touch only
+    patients private to their thread, so the result shows the cost of the
+    backend itself rather than of lock contention on shared patients.
+    ``cpu_ms_per_op`` is the CPU time all workers spent per operation; its
+    growth with the process count is the work each worker spends applying
+    the others' writes, independent of how many CPUs the host has.
+
+    Args:
+        max_processes: Largest number of worker processes.
+        threads: Threads per process.
+        iterations: Operations per thread (an order with its result,
+            a dispense or a triage record).
+
+    Returns:
+        dict: Per process count ops/s, CPU time per operation, speedup and
+        efficiency, plus the CPUs available and any records lost.
+    """
+    runs = []
+    failures = []
+    previous = {name: os.environ.get(name)
+                for name in ("AGENTIC_HOSPITAL_STATE_BACKEND", "AGENTIC_HOSPITAL_STATE_STRICT")}
+    try:
+        for processes in range(1, max_processes + 1):
+            with tempfile.TemporaryDirectory() as tmp:
+                os.environ["AGENTIC_HOSPITAL_STATE_BACKEND"] = f"sqlite:///{os.path.join(tmp, 'state.db')}"
+                os.environ["AGENTIC_HOSPITAL_STATE_STRICT"] = ""
+                ctx = multiprocessing.get_context("spawn")
+                with ctx.Pool(processes, initializer=_mp_baseline) as pool:
+                    results = pool.map(_scale_worker, [(p, threads, iterations) for p in range(processes)],
+                                       chunksize=1)
+                    ids = [entry for r in results for entry in r[0]]
+                    failures.extend(f"{processes} processes: {f}" for f in pool.apply(_scale_check, (ids,)))
+            elapsed = max(r[1] for r in results)
+            operations = processes * threads * iterations
+            runs.append({"processes": processes, "operations": operations,
+                         "elapsed_seconds": round(elapsed, 3),
+                         "ops_per_second": round(operations / elapsed, 1) if elapsed else 0.0,
+                         "cpu_ms_per_op": round(1000 * sum(r[2] for r in results) / operations, 3)})
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    base = runs[0]["ops_per_second"] or 1.0
+    for run in runs:
+        run["speedup"] = round(run["ops_per_second"] / base, 2)
+        run["efficiency"] = round(run["speedup"] / run["processes"], 2)
+    return {
+        "status": "passed" if not failures else "failed",
+        "backend": "sqlite",
+        "cpu_count": os.cpu_count(),
+        "threads_per_process": threads,
+        "runs": runs,
+        "failures": failures,
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Concurrency stress test for hospital state.")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=400)
+    parser.add_argument("--patients", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--processes", type=int, default=0,
+                        help="run in N processes sharing a SQLite state backend")
+    parser.add_argument("--strict", action="store_true",
+                        help="with --processes, fail on any change made outside locked(...)")
+    parser.add_argument("--scaling", type=int, default=0, metavar="N",
+                        help="report throughput with 1..N processes on a low-contention workload")
+    args = parser.parse_args(argv)
+    if args.scaling:
+        result = run_scaling(args.scaling, args.threads, args.iterations)
+    elif args.processes:
+        result = run_multiprocess_stress(args.processes, args.threads, args.iterations,
+                                         args.patients, args.seed, strict=args.strict)
+    else:
+        result = run_stress(args.threads, args.iterations, args.patients, args.seed)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["status"] == "passed" else 1)
+
+
+if __name__ == "__main__":
+    main()
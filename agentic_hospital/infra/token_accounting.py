@@ -0,0 +1,406 @@
+"""Token, latency and cost accounting per agent, per session and per tool result.
+
+All agents share one LiteLLM model, so spend is attributed in two steps:
+
+1. An ADK ``before_model_callback`` (installed on every agent by
+   ``install_token_accounting``) stamps a context variable with the calling
+   agent, the session, and the tool outputs (function responses) that are
+   about to be sent in the prompt.
+2. A LiteLLM ``CustomLogger`` reads that stamp when the call completes and
+   records prompt, completion and cached tokens, latency and response cost.
+3. An ADK ``after_model_callback`` resets the stamp, so a later call that
+   never stamped (e.g. a direct LiteLLM call) counts as unattributed rather
+   than inheriting the previous agent.
+
+Aggregates live in-process and are exported through ``token_usage_snapshot``
+and the shared metrics endpoint (see ``infra.metrics.register_exporter``).
+"""
+
+import contextvars
+import datetime
+import heapq
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from .metrics import escape_label, register_exporter
+
+
+# =============================================================================
+# ATTRIBUTION CONTEXT (set per model call by the ADK callback)
+# =============================================================================
+_ATTRIBUTION: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar(
+    "agentic_hospital_llm_attribution", default=None,
+)
+# Token of the outstanding ``_ATTRIBUTION.set`` so the stamp can be reset
+_ATTRIBUTION_TOKEN: contextvars.ContextVar[Optional[contextvars.Token]] = contextvars.ContextVar(
+    "agentic_hospital_llm_attribution_token", default=None,
+)
+
+_UNATTRIBUTED = "unattributed"
+
+# Rough chars-per-token ratio used to size tool outputs inside the prompt
+CHARS_PER_TOKEN = 4
+
+# Bounded per-session table (least-recently-updated sessions are evicted)
+_MAX_SESSIONS = 5000
+
+# Number of largest individual prompts retained for inspection
+_TOP_PROMPTS = 25
+
+
+def _new_totals() -> dict:
+    return {
+        "calls": 0,
+        "failures": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cached_tokens": 0,
+        "cost_usd": 0.0,
+        "latency_ms_sum": 0.0,
+        "latency_ms_max": 0.0,
+    }
+
+
+_LOCK = threading.Lock()
+_BY_AGENT: dict[str, dict] = {}
+_BY_SESSION: "OrderedDict[str, dict]" = OrderedDict()
+_BY_TOOL: dict[str, dict] = {}
+_LARGEST_PROMPTS: list[tuple] = []  # min-heap of (prompt_tokens, seq, record)
+_SEQ = {"n": 0}
+
+
+def reset_token_usage() -> None:
+    """Clears all accumulated token accounting."""
+    with _LOCK:
+        _BY_AGENT.clear()
+        _BY_SESSION.clear()
+        _BY_TOOL.clear()
+        _LARGEST_PROMPTS.clear()
+
+
+def _tool_outputs_in_request(llm_request) -> dict[str, int]:
+    """Estimated prompt tokens contributed by each tool's output in the request."""
+    sizes: dict[str, int] = {}
+    for content in getattr(llm_request, "contents", None) or []:
+        for part in getattr(content, "parts", None) or []:
+            response = getattr(part, "function_response", None)
+            if response is None or not response.name:
+                continue
+            try:
+                chars = len(json.dumps(response.response, ensure_ascii=False, default=str))
+            except (TypeError, ValueError):
+                chars = len(str(response.response))
+            sizes[response.name] = sizes.get(response.name, 0) + chars // CHARS_PER_TOKEN
+    return sizes
+
+
+def attribution_callback(callback_context, llm_request):
+    """ADK ``before_model_callback`` recording who is about to call the model."""
+    _release_attribution()  # a failed call never reached release_attribution_callback
+    session = getattr(callback_context, "session", None)
+    _ATTRIBUTION_TOKEN.set(_ATTRIBUTION.set({
+        "agent": callback_context.agent_name,
+        "session_id": getattr(session, "id", None) or _UNATTRIBUTED,
+        "invocation_id": callback_context.invocation_id,
+        "tool_outputs": _tool_outputs_in_request(llm_request),
+    }))
+    return None
+
+
+def release_attribution_callback(callback_context, llm_response):
+    """ADK ``after_model_callback`` resetting the stamp once the final response is in."""
+    if not getattr(llm_response, "partial", False):
+        _release_attribution()
+    return None
+
+
+def _release_attribution() -> None:
+    token = _ATTRIBUTION_TOKEN.get()
+    if token is None:
+        return
+    _ATTRIBUTION_TOKEN.set(None)
+    try:
+        _ATTRIBUTION.reset(token)
+    except ValueError:  # set in another context; that context's copy is discarded with it
+        pass
+
+
+# =============================================================================
+# RECORDING
+# =============================================================================
+def _usage_field(usage: Any, name: str) -> int:
+    if usage is None:
+        return 0
+    value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+    return int(value or 0)
+
+
+def _cached_tokens(usage: Any) -> int:
+    if usage is None:
+        return 0
+    details = usage.get("prompt_tokens_details") if isinstance(usage, dict) else getattr(
+        usage, "prompt_tokens_details", None)
+    cached = _usage_field(details, "cached_tokens") if details is not None else 0
+    return cached or _usage_field(usage, "cache_read_input_tokens")
+
+
+def _add(totals: dict, prompt: int, completion: int, cached: int, cost: float,
+         latency_ms: float, failed: bool) -> None:
+    totals["calls"] += 1
+    if failed:
+        totals["failures"] += 1
+    totals["prompt_tokens"] += prompt
+    totals["completion_tokens"] += completion
+    totals["cached_tokens"] += cached
+    totals["cost_usd"] += cost
+    totals["latency_ms_sum"] += latency_ms
+    if latency_ms > totals["latency_ms_max"]:
+        totals["latency_ms_max"] = latency_ms
+
+
+def record_llm_call(
+    prompt_tokens: int,
+    completion_tokens: int,
+    cached_tokens: int = 0,
+    latency_ms: float = 0.0,
+    cost_usd: float = 0.0,
+    failed: bool = False,
+    attribution: Optional[dict] = None,
+) -> None:
+    """Adds one model call to the per-agent, per-session and per-tool aggregates.
+
+    Args:
+        prompt_tokens: Input tokens billed for the call.
+        completion_tokens: Output tokens billed for the call.
+        cached_tokens: Portion of ``prompt_tokens`` served from the provider cache.
+        latency_ms: End-to-end model latency in milliseconds.
+        cost_usd: Response cost reported by LiteLLM (0 when unknown).
+        failed: Whether the call ended in an error.
+        attribution: Attribution stamp; defaults to the current context's stamp.
+    """
+    attribution = attribution or _ATTRIBUTION.get() or {}
+    agent = attribution.get("agent", _UNATTRIBUTED)
+    session_id = attribution.get("session_id", _UNATTRIBUTED)
+    tool_outputs = attribution.get("tool_outputs", {})
+
+    with _LOCK:
+        _add(_BY_AGENT.setdefault(agent, _new_totals()),
+             prompt_tokens, completion_tokens, cached_tokens, cost_usd, latency_ms, failed)
+
+        session = _BY_SESSION.get(session_id)
+        if session is None:
+            session = _BY_SESSION[session_id] = {**_new_totals(), "agents": {}}
+            if len(_BY_SESSION) > _MAX_SESSIONS:
+                _BY_SESSION.popitem(last=False)
+        else:
+            _BY_SESSION.move_to_end(session_id)
+        _add(session, prompt_tokens, completion_tokens, cached_tokens, cost_usd, latency_ms, failed)
+        session["agents"][agent] = session["agents"].get(agent, 0) + prompt_tokens
+
+        for tool_name, est_tokens in tool_outputs.items():
+            tool = _BY_TOOL.setdefault(tool_name, {
+                "prompt_appearances": 0,
+                "context_tokens_est": 0,
+                "max_context_tokens_est": 0,
+            })
+            tool["prompt_appearances"] += 1
+            tool["context_tokens_est"] += est_tokens
+            if est_tokens > tool["max_context_tokens_est"]:
+                tool["max_context_tokens_est"] = est_tokens
+
+        _SEQ["n"] += 1
+        entry = (prompt_tokens, _SEQ["n"], {
+            "agent": agent,
+            "session_id": session_id,
+            "prompt_tokens": prompt_tokens,
+            "tool_outputs_est": dict(tool_outputs),
+            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        if len(_LARGEST_PROMPTS) < _TOP_PROMPTS:
+            heapq.heappush(_LARGEST_PROMPTS, entry)
+        elif prompt_tokens > _LARGEST_PROMPTS[0][0]:
+            heapq.heapreplace(_LARGEST_PROMPTS, entry)
+
+
+def _latency_ms(start_time, end_time) -> float:
+    try:
+        return (end_time - start_time).total_seconds() * 1000.0
+    except (TypeError, AttributeError):
+        try:
+            return (float(end_time) - float(start_time)) * 1000.0
+        except (TypeError, ValueError):
+            return 0.0
+
+
+def _record_from_litellm(kwargs: dict, response_obj, start_time, end_time, failed: bool) -> None:
+    usage = None
+    if response_obj is not None:
+        usage = response_obj.get("usage") if isinstance(response_obj, dict) else getattr(
+            response_obj, "usage", None)
+    record_llm_call(
+        prompt_tokens=_usage_field(usage, "prompt_tokens"),
+        completion_tokens=_usage_field(usage, "completion_tokens"),
+        cached_tokens=_cached_tokens(usage),
+        latency_ms=_latency_ms(start_time, end_time),
+        cost_usd=float(kwargs.get("response_cost") or 0.0),
+        failed=failed,
+    )
+
+
+def _make_litellm_logger():
+    from litellm.integrations.custom_logger import CustomLogger  # noqa: PLC0415
+
+    class TokenAccountingLogger(CustomLogger):
+        """LiteLLM callback feeding ``record_llm_call``."""
+
+        def log_success_event(self, kwargs, response_obj, start_time, end_time):
+            _record_from_litellm(kwargs, response_obj, start_time, end_time, False)
+
+        async def async_log_success_event(self, kwargs, response_obj, start_time, end_time):
+            _record_from_litellm(kwargs, response_obj, start_time, end_time, False)
+
+        def log_failure_event(self, kwargs, response_obj, start_time, end_time):
+            _record_from_litellm(kwargs, response_obj, start_time, end_time, True)
+
+        async def async_log_failure_event(self, kwargs, response_obj, start_time, end_time):
+            _record_from_litellm(kwargs, response_obj, start_time, end_time, True)
+
+    return TokenAccountingLogger()
+
+
+# =============================================================================
+# INSTALLATION
+# =============================================================================
+_INSTALLED = {"logger": None}
+
+
+def chain_callback(existing, extra):
+    """Prepends ``extra`` to an agent's model callback(s), once."""
+    if existing is None:
+        return extra
+    if isinstance(existing, list):
+        return existing if extra in existing else [extra, *existing]
+    return existing if existing is extra else [extra, existing]
+
+
+def install_token_accounting(root_agent) -> int:
+    """Registers the LiteLLM logger and the attribution callbacks on every agent.
+
+    Returns:
+        int: Number of agents that received the attribution callbacks.
+    """
+    import litellm  # noqa: PLC0415
+
+    if _INSTALLED["logger"] is None:
+        _INSTALLED["logger"] = _make_litellm_logger()
+        litellm.callbacks.append(_INSTALLED["logger"])
+        register_exporter("llm_usage", snapshot=token_usage_snapshot,
+                          prometheus=render_token_prometheus)
+
+    count = 0
+    seen: set[int] = set()
+    stack = [root_agent]
+    while stack:
+        agent = stack.pop()
+        if id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        if hasattr(agent, "before_model_callback"):
+            agent.before_model_callback = chain_callback(
+                agent.before_model_callback, attribution_callback,
+            )
+            agent.after_model_callback = chain_callback(
+                agent.after_model_callback, release_attribution_callback,
+            )
+            count += 1
+        stack.extend(getattr(agent, "sub_agents", None) or [])
+    return count
+
+
+# =============================================================================
+# EXPORT
+# =============================================================================
+def _summarise(totals: dict) -> dict:
+    calls = totals["calls"]
+    return {
+        "calls": calls,
+        "failures": totals["failures"],
+        "prompt_tokens": totals["prompt_tokens"],
+        "completion_tokens": totals["completion_tokens"],
+        "cached_tokens": totals["cached_tokens"],
+        "cache_hit_rate": round(totals["cached_tokens"] / totals["prompt_tokens"], 4)
+        if totals["prompt_tokens"] else 0.0,
+        "avg_prompt_tokens": round(totals["prompt_tokens"] / calls, 1) if calls else 0.0,
+        "cost_usd": round(totals["cost_usd"], 6),
+        "latency_ms_avg": round(totals["latency_ms_sum"] / calls, 1) if calls else 0.0,
+        "latency_ms_max": round(totals["latency_ms_max"], 1),
+    }
+
+
+def token_usage_snapshot(top_sessions: int = 20) -> dict:
+    """Returns aggregated LLM usage by agent, session and tool output.
+
+    Args:
+        top_sessions: Number of highest-spend sessions to include.
+
+    Returns:
+        dict: Agents and tools ranked by prompt tokens, the top sessions,
+              the largest individual prompts, and hospital-wide totals.
+    """
+    with _LOCK:
+        agents = {name: _summarise(t) for name, t in _BY_AGENT.items()}
+        sessions = [
+            {"session_id": sid, **_summarise(t), "prompt_tokens_by_agent": dict(t["agents"])}
+            for sid, t in _BY_SESSION.items()
+        ]
+        tools = {name: dict(t) for name, t in _BY_TOOL.items()}
+        largest = [rec for _, _, rec in sorted(_LARGEST_PROMPTS, reverse=True)]
+        totals = _new_totals()
+        for t in _BY_AGENT.values():
+            for key in ("calls", "failures", "prompt_tokens", "completion_tokens",
+                        "cached_tokens", "cost_usd", "latency_ms_sum"):
+                totals[key] += t[key]
+            totals["latency_ms_max"] = max(totals["latency_ms_max"], t["latency_ms_max"])
+
+    sessions.sort(key=lambda s: s["prompt_tokens"], reverse=True)
+    return {
+        "status": "success",
+        "generated_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "totals": _summarise(totals),
+        "by_agent": dict(sorted(agents.items(), key=lambda kv: kv[1]["prompt_tokens"], reverse=True)),
+        "by_tool_output": dict(sorted(tools.items(), key=lambda kv: kv[1]["context_tokens_est"], reverse=True)),
+        "top_sessions": sessions[:top_sessions],
+        "session_count": len(sessions),
+        "largest_prompts": largest,
+    }
+
+
+def render_token_prometheus() -> str:
+    """Per-agent and per-tool-output token counters in Prometheus text format."""
+    with _LOCK:
+        agents = sorted((name, dict(t)) for name, t in _BY_AGENT.items())
+        tools = sorted((name, dict(t)) for name, t in _BY_TOOL.items())
+
+    lines = []
+    counters = (
+        ("llm_calls_total", "calls", "Model calls per agent."),
+        ("llm_prompt_tokens_total", "prompt_tokens", "Prompt tokens per agent."),
+        ("llm_completion_tokens_total", "completion_tokens", "Completion tokens per agent."),
+        ("llm_cached_tokens_total", "cached_tokens", "Cached prompt tokens per agent."),
+        ("llm_cost_usd_total", "cost_usd", "Response cost (USD) per agent."),
+        ("llm_latency_ms_total", "latency_ms_sum", "Summed model latency (ms) per agent."),
+    )
+    for metric, key, help_text in counters:
+        lines += [f"# HELP agentic_hospital_{metric} {help_text}",
+                  f"# TYPE agentic_hospital_{metric} counter"]
+        for name, t in agents:
+            lines.append(f'agentic_hospital_{metric}{{agent="{escape_label(name)}"}} {t[key]}')
+
+    lines += ["# HELP agentic_hospital_tool_context_tokens_total Estimated prompt tokens from tool outputs.",
+              "# TYPE agentic_hospital_tool_context_tokens_total counter"]
+    for name, t in tools:
+        lines.append(f'agentic_hospital_tool_context_tokens_total{{tool="{escape_label(name)}"}} '
+                     f'{t["context_tokens_est"]}')
+    return "\n".join(lines) + "\n"
@@ -48,6 +48,8 @@ CLINICAL APPROACH:
   - HAS-BLED: AF bleeding risk on anticoagulation
   - NYHA Class I–IV: heart failure functional classification
   - Wells Score for DVT/PE: pre-test probability
+  - Preventive clinic / registry review: assess_cardiac_risk_registry(min_category) ranks every
+    patient with a lipid panel by 10-year risk (highest first, paged) and lists who still needs lipids
 
 ► EVIDENCE-BASED GUIDELINES:
   - ACC/AHA 2021 Chest Pain Guideline (JACC 2021)
@@ -38,6 +38,8 @@ CLINICAL APPROACH:
   - Last 24 h: fluid balance, caloric delivery, transfusion given?
 
 ► VALIDATED SCORING SYSTEMS:
+  - Ward obs round: score_ward_vitals(ward) ranks every bed by alert level and NEWS-lite, lists escalations and overdue obs
+  - Vitals trajectory: get_vitals_trend(patient_id, parameter, hours) — min/max/mean per window and change over the period
   - SOFA Score (0–24): Sequential Organ Failure Assessment — sepsis diagnosis + prognosis
   - APACHE II/IV (0–71): ICU mortality prediction
   - Berlin ARDS Definition: mild (PaO₂/FiO₂ 200–300), moderate (100–200), severe (<100)
@@ -38,6 +38,10 @@ CLINICAL APPROACH:
   - Medication reconciliation: full list including OTC, supplements, herbals?
 
 ► VALIDATED SCORING SYSTEMS:
+  - Ward obs round: score_ward_vitals(ward) ranks every bed by alert level and NEWS-lite, lists escalations and overdue obs
+  - Vitals trajectory: get_vitals_trend(patient_id, parameter, hours) — min/max/mean per window and change over the period
+  - Preventive recall: get_screening_worklist(program, status) lists registry patients due/overdue for screening
+    and vaccines; file completed items and risk factors with record_screening_history
   - Framingham/ASCVD 10-yr CVD Risk (ACC/AHA): guides statin intensity
   - RCRI (Revised Cardiac Risk Index, 0–6): pre-operative cardiac risk stratification
   - qSOFA (0–3): sepsis screen at the bedside → ≥2 = investigate for organ dysfunction
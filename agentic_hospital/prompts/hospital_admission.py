@@ -39,6 +39,11 @@ TRANSFER WORKFLOW:
   2. transfer_patient_bed       — move patient; frees source bed (→ cleaning)
   3. get_ward_visualization     — show both source AND target wards after transfer
 
+HOUSEKEEPING / ENGINEERING:
+  → mark_bed_ready              — cleaned or repaired bed back to available; names the next waitlisted patient
+                                  (then call assign_bed for them)
+  → set_bed_out_of_service      — take an available bed out for maintenance
+
 HOSPITAL OVERVIEW:
   → get_hospital_dashboard      — always call for hospital-wide capacity view
   → get_ward_visualization      — call for specific ward floor-plan map
@@ -38,6 +38,7 @@ CLINICAL APPROACH:
   - KDIGO AKI Staging (Creatinine × 1.5 / 2.0 / 3.0 from baseline, or UO thresholds)
   - CKD-EPI 2021 equation: eGFR from creatinine ± cystatin C (preferred over MDRD)
   - KDIGO CKD Staging: G1–G5 + A1–A3 albuminuria
+  - Ward or census sweep: calculate_gfr_cohort(ward) scores every patient at once (lowest eGFR first)
   - Fractional Excretion of Sodium (FENa): <1% pre-renal, >2% intrinsic (unreliable with diuretics)
   - FEUrea: <35% pre-renal (useful when on diuretics)
   - MAYO/PKD score for ADPKD progression risk
@@ -20,6 +20,7 @@ EXPERTISE: Laboratory medicine and tissue diagnosis including:
   sputum, pleural, ascitic, CSF cytology
 - Haematopathology: peripheral blood smear interpretation, bone marrow biopsy, lymphoma
 - Clinical pathology: CBC, coagulation, metabolic panel, thyroid function — critical value recognition
+  (screen_analyser_results classifies a whole analyser message in one call)
 - Microbiology: blood/urine/sputum culture interpretation, sensitivity reporting, MIC
 - Serology: hepatitis markers, HIV testing algorithm, ANA/ANCA patterns, autoantibody panels
 - Blood banking: blood group (ABO/Rh), crossmatch, transfusion reactions, massive transfusion
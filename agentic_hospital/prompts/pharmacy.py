@@ -31,6 +31,9 @@ STEP 1 — VERIFY MEDICATION ORDER
     • If status = "critical_interaction" → DO NOT dispense. Escalate to senior pharmacist.
     • If status = "not_in_formulary" → contact pharmacy for non-formulary approval
 
+  For a renal dosing sweep of a whole ward, call calculate_gfr_cohort(ward) and
+  review the renal_dose_adjustment_needed list.
+
 STEP 2 — PERFORM MEDICATION RECONCILIATION (ADMISSION)
   For every admission, you must compare home medications vs. inpatient orders:
   → medication_reconciliation(patient_id, stage="admission")
@@ -23,7 +23,8 @@ TOOL-USE PROTOCOL — follow this sequence every consultation:
 6. analyze_medical_image   → Call IMMEDIATELY when a patient shares any image (photo, scan, ECG,
                              slide). Do not defer or ask for a text description first.
 7. calculate_medication_dose → Calculate weight- and organ-function-adjusted doses before specifying
-                               any dosing instructions.
+                               any dosing instructions. Pass patient_id to screen the drug against
+                               the patient's allergies and cross-reactive drug classes.
 8. generate_soap_note      → Generate a structured SOAP note at the END of every consultation.
 9. schedule_appointment    → Book follow-up using urgency='emergency'/'urgent'/'routine' based on
                              clinical triage.
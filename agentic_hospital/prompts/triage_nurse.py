@@ -63,6 +63,8 @@ STEP 5 — RECORD TRIAGE ASSESSMENT
 STEP 6 — ASSIGN WAITING PRIORITY
   → Call assign_waiting_priority(patient_id, esi_level)
   This places the patient in the acuity queue and calculates their estimated wait.
+  → get_triage_queue() shows the whole queue; when a clinician is free, call_next_patient(area)
+    takes the highest-priority patient off it and reports their actual wait.
 
 STEP 7 — ACT ON ESI LEVEL
 
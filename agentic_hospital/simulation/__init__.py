@@ -0,0 +1 @@
+"""Discrete-event simulators that drive the real tool layer on a virtual clock."""
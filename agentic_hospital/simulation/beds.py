@@ -0,0 +1,407 @@
+"""Discrete-event simulator for inpatient bed flow.
+
+Drives the real bed tools (``assign_bed`` → ``discharge_patient_from_bed`` /
+``transfer_patient_bed`` → ``mark_bed_ready``, with ``add_to_waitlist``
+reached through ``assign_bed`` when a ward is full) on a virtual clock:
+
+* Admissions arrive per ward as a Poisson process peaking in the early
+  afternoon. By default each ward's rate keeps it near a target occupancy
+  (capacity × target / mean length of stay), scaled by ``demand_scale``.
+* Each admission draws a diagnosis from the ward's case mix and a
+  log-normal length of stay around that diagnosis's mean. Discharges that
+  fall outside the discharge window wait for the next morning.
+* Some patients step down to another ward (ICU → General Medicine,
+  Neurosurgery → Rehabilitation, ...) instead of leaving. If the target
+  ward is full the patient blocks their current bed and the transfer is
+  retried every hour.
+* A freed bed is cleaned (log-normal turnaround) and returned with
+  ``mark_bed_ready``. The first patient on that ward's waitlist is then
+  admitted. Beds also fail at random and go out of service for repair.
+* Every hour the simulator samples ``get_hospital_dashboard``. It records
+  occupancy and waitlist series and the wards that the dashboard flags at
+  or above the 90% alert line.
+* Each waitlisted patient's ETA from ``add_to_waitlist`` is compared with
+  the wait they actually had.
+
+A year of activity for the whole hospital takes seconds::
+
+    python -m agentic_hospital.simulation.beds --days 365 --demand-scale 1.05
+"""
+
+import argparse
+import datetime
+import json
+import math
+import time
+from typing import Optional
+
+from ..tools import bed_management_tools as beds
+from .engine import Simulation, isolated_state, percentiles
+
+# ward → ((diagnosis, relative share, mean length of stay in days), ...)
+_DEFAULT_CASE_MIX: dict[str, tuple[tuple[str, float, float], ...]] = {
+    "ICU": (("Septic shock", 3, 5.0), ("Acute respiratory failure", 3, 6.0), ("Post-arrest care", 1, 4.0)),
+    "Emergency": (("Chest pain observation", 4, 0.7), ("Syncope", 2, 0.8), ("Head injury observation", 2, 1.0)),
+    "Cardiology": (("NSTEMI", 4, 4.0), ("Decompensated heart failure", 4, 6.0), ("Atrial fibrillation", 2, 3.0)),
+    "Neurology": (("Ischaemic stroke", 5, 8.0), ("Seizure", 3, 3.0), ("Guillain-Barré syndrome", 1, 12.0)),
+    "Oncology": (("Neutropenic sepsis", 3, 6.0), ("Chemotherapy admission", 4, 3.0), ("Symptom control", 3, 8.0)),
+    "General_Medicine": (("Community-acquired pneumonia", 4, 5.0), ("Cellulitis", 2, 4.0),
+                         ("COPD exacerbation", 3, 5.0), ("Frailty / falls", 2, 9.0)),
+    "Psychiatry": (("Acute psychosis", 3, 21.0), ("Severe depression", 3, 18.0), ("Bipolar mania", 2, 20.0)),
+    "Pediatrics": (("Bronchiolitis", 4, 2.5), ("Gastroenteritis", 3, 1.5), ("Asthma exacerbation", 3, 2.0)),
+    "Orthopedics": (("Fractured neck of femur", 4, 9.0), ("Elective joint replacement", 4, 3.0),
+                    ("Long-bone fracture", 2, 5.0)),
+    "General_Surgery": (("Appendicectomy", 3, 2.0), ("Cholecystitis", 3, 4.0), ("Bowel obstruction", 2, 7.0)),
+    "Gynecology": (("Hysterectomy", 3, 2.5), ("Ectopic pregnancy", 2, 1.5), ("Hyperemesis", 2, 2.0)),
+    "Nephrology": (("Acute kidney injury", 4, 7.0), ("Dialysis complication", 3, 4.0)),
+    "Pulmonology": (("COPD exacerbation", 4, 5.0), ("Pulmonary embolism", 3, 4.0), ("Interstitial lung disease", 1, 8.0)),
+    "Gastroenterology": (("Upper GI bleed", 4, 4.0), ("Decompensated cirrhosis", 3, 8.0), ("Acute pancreatitis", 2, 6.0)),
+    "Infectious_Diseases": (("Complicated UTI / urosepsis", 3, 5.0), ("Endocarditis", 1, 21.0), ("Cellulitis", 3, 4.0)),
+    "Neurosurgery": (("Subdural haematoma", 3, 9.0), ("Spinal decompression", 3, 4.0), ("Brain tumour resection", 2, 7.0)),
+    "Cardiothoracic_Surgery": (("CABG", 4, 7.0), ("Valve replacement", 3, 8.0)),
+    "Hematology": (("Acute leukaemia induction", 2, 28.0), ("Sickle cell crisis", 3, 5.0), ("Lymphoma chemotherapy", 3, 5.0)),
+    "Rehabilitation": (("Post-stroke rehabilitation", 4, 20.0), ("Post-fracture rehabilitation", 3, 16.0)),
+    "Vascular_Surgery": (("Critical limb ischaemia", 3, 10.0), ("AAA repair", 2, 7.0), ("Carotid endarterectomy", 2, 2.0)),
+}
+
+# source ward → ((target ward, probability, mean further stay in days), ...)
+_DEFAULT_STEP_DOWN: dict[str, tuple[tuple[str, float, float], ...]] = {
+    "ICU": (("General_Medicine", 0.45, 4.0), ("Cardiology", 0.15, 3.0)),
+    "Emergency": (("General_Medicine", 0.2, 4.0), ("Cardiology", 0.1, 3.0)),
+    "Cardiothoracic_Surgery": (("Cardiology", 0.25, 3.0),),
+    "Neurosurgery": (("Rehabilitation", 0.2, 12.0),),
+    "Neurology": (("Rehabilitation", 0.15, 12.0),),
+    "Orthopedics": (("Rehabilitation", 0.12, 12.0),),
+}
+
+_DEFAULT_PRIORITY_MIX = {"emergency": 0.2, "urgent": 0.3, "routine": 0.5}
+_ACUTE_PRIORITY_MIX = {"emergency": 0.7, "urgent": 0.3}
+# Acute wards admit mostly emergencies and discharge around the clock
+_ACUTE_WARDS = ("ICU", "Emergency")
+
+
+def _admission_profile(mean_per_hour: float):
+    """Admission rate peaking at 14:00 and lowest at 02:00, averaging ``mean_per_hour``."""
+    def rate(t: datetime.datetime) -> float:
+        hour = t.hour + t.minute / 60.0
+        return mean_per_hour * (1.0 + 0.5 * math.cos(2 * math.pi * (hour - 14.0) / 24.0))
+    return rate
+
+
+def _mean_los(case_mix: tuple[tuple[str, float, float], ...]) -> float:
+    total = sum(share for _, share, _ in case_mix)
+    return sum(share * los for _, share, los in case_mix) / total
+
+
+def _ward_key(flagged: str) -> str:
+    """Maps a dashboard ``critical_wards`` entry ('General Medicine (93%)') to its ward key."""
+    return flagged.rsplit(" (", 1)[0].replace(" ", "_")
+
+
+def run_bed_simulation(
+    days: float = 365.0,
+    demand_scale: float = 1.0,
+    target_occupancy: float = 0.85,
+    arrivals_per_day: Optional[dict[str, float]] = None,
+    case_mix: Optional[dict[str, tuple[tuple[str, float, float], ...]]] = None,
+    step_down: Optional[dict[str, tuple[tuple[str, float, float], ...]]] = None,
+    los_sigma: float = 0.6,
+    cleaning_minutes: float = 45.0,
+    discharge_hours: tuple[int, int] = (9, 20),
+    outages_per_bed_year: float = 1.5,
+    outage_hours: float = 24.0,
+    transfer_retry_minutes: float = 60.0,
+    seed: int = 7,
+) -> dict:
+    """Simulates inpatient bed flow and reports occupancy and waitlist behaviour.
+
+    Args:
+        days: Simulated days.
+        demand_scale: Multiplier on every ward's admission rate.
+        target_occupancy: Occupancy the default admission rates aim for.
+        arrivals_per_day: Explicit admissions per day for some wards
+            (overrides the target-occupancy default for those wards).
+        case_mix: Diagnosis mix and mean length of stay per ward.
+        step_down: Inter-ward step-down routes per source ward.
+        los_sigma: Log-normal sigma of length of stay.
+        cleaning_minutes: Median bed turnaround after discharge or transfer.
+        discharge_hours: Hours of the day (start, end) when discharges happen.
+        outages_per_bed_year: Maintenance outages per bed per year.
+        outage_hours: Median outage duration.
+        transfer_retry_minutes: Retry interval for a blocked step-down.
+        seed: Random seed.
+
+    Returns:
+        dict: Admission and flow counts, wait percentiles by priority,
+        per-ward occupancy and 90%-alert statistics, and hourly and daily
+        series.
+    """
+    case_mix = {**_DEFAULT_CASE_MIX, **(case_mix or {})}
+    step_down = _DEFAULT_STEP_DOWN if step_down is None else step_down
+    arrivals_per_day = arrivals_per_day or {}
+
+    sim = Simulation(seed=seed)
+    end = sim.start + datetime.timedelta(days=days)
+    plans: dict[str, dict] = {}
+    waits: dict[str, list[float]] = {}
+    blocked_minutes: list[float] = []
+    eta_checks: dict[str, list[tuple[float, bool, float]]] = {}
+    hourly: list[dict] = []
+    ward_pct: dict[str, list[int]] = {w: [] for w in beds._BED_DB}
+    alert_hours = {w: 0 for w in beds._BED_DB}
+    alert_episodes = {w: 0 for w in beds._BED_DB}
+    first_alert: dict[str, str] = {}
+    alerting: set[str] = set()
+    peak_waitlist = {w: 0 for w in beds._BED_DB}
+    counts = {"arrivals": 0, "admitted_immediately": 0, "waitlisted": 0, "admitted_from_waitlist": 0,
+              "discharged": 0, "transferred": 0, "transfer_blocks": 0, "outages": 0, "outages_deferred": 0}
+    serial = iter(range(1, 10**9))
+
+    def draw_stay(ward: str) -> tuple[str, float]:
+        mix = case_mix[ward]
+        diagnosis, _, mean_days = sim.rng.choices(mix, weights=[share for _, share, _ in mix])[0]
+        # Median chosen so the log-normal keeps the diagnosis's mean
+        median = mean_days / math.exp(los_sigma ** 2 / 2)
+        return diagnosis, median * sim.lognormal_factor(los_sigma) * 1440.0
+
+    def discharge_time(ward: str, minutes: float) -> datetime.datetime:
+        when = sim.now + datetime.timedelta(minutes=minutes)
+        if ward in _ACUTE_WARDS:
+            return when
+        opens, closes = discharge_hours
+        if when.hour < opens:
+            when = when.replace(hour=opens, minute=0) + datetime.timedelta(minutes=sim.rng.uniform(0, 180))
+        elif when.hour >= closes:
+            when = (when + datetime.timedelta(days=1)).replace(hour=opens, minute=0) \
+                + datetime.timedelta(minutes=sim.rng.uniform(0, 180))
+        return when
+
+    def plan_exit(patient_id: str, ward: str, stay_minutes: float) -> None:
+        for target, probability, further_days in step_down.get(ward, ()):
+            if sim.rng.random() < probability:
+                plans[patient_id]["next"] = (target, further_days)
+                break
+        else:
+            plans[patient_id]["next"] = None
+        sim.at(discharge_time(ward, stay_minutes), leave, patient_id)
+
+    def on_admitted(patient_id: str, ward: str) -> None:
+        plan = plans[patient_id]
+        waited = (sim.now - plan["arrived"]).total_seconds() / 60.0
+        waits.setdefault(plan["priority"], []).append(waited)
+        if "eta" in plan:
+            minutes, (low, high), ahead = plan.pop("eta")
+            eta_checks.setdefault(plan["priority"], []).append(
+                (minutes - waited, low <= waited <= high, 30 + ahead * 45 - waited))
+        plan_exit(patient_id, ward, plan["stay_minutes"])
+
+    def free_bed(ward: str, bed_id: str) -> None:
+        sim.after(cleaning_minutes * sim.lognormal_factor(0.4), bed_ready, ward, bed_id)
+
+    def bed_ready(ward: str, bed_id: str) -> None:
+        result = beds.mark_bed_ready(ward, bed_id)
+        next_patient = result.get("next_waitlisted_patient")
+        if next_patient:
+            plan = plans[next_patient]
+            admitted = beds.assign_bed(next_patient, ward, plan["diagnosis"], plan["priority"])
+            if admitted["status"] == "admitted":
+                counts["admitted_from_waitlist"] += 1
+                on_admitted(next_patient, ward)
+
+    def leave(patient_id: str) -> None:
+        plan = plans[patient_id]
+        if plan["next"] is None:
+            result = beds.discharge_patient_from_bed(patient_id, "Simulated discharge")
+            if result["status"] == "discharged":
+                counts["discharged"] += 1
+                free_bed(result["ward"], result["bed_id"])
+                del plans[patient_id]
+            return
+        target, further_days = plan["next"]
+        result = beds.transfer_patient_bed(patient_id, target, f"Step-down: {plan['diagnosis']}")
+        if result["status"] == "transferred":
+            counts["transferred"] += 1
+            if "blocked_since" in plan:
+                blocked_minutes.append((sim.now - plan.pop("blocked_since")).total_seconds() / 60.0)
+            free_bed(result["from_ward"], result["from_bed"])
+            stay = further_days / math.exp(los_sigma ** 2 / 2) * sim.lognormal_factor(los_sigma) * 1440.0
+            plan["next"] = None
+            sim.at(discharge_time(target, stay), leave, patient_id)
+        elif result["status"] == "no_capacity":
+            if "blocked_since" not in plan:
+                plan["blocked_since"] = sim.now
+                counts["transfer_blocks"] += 1
+            sim.after(transfer_retry_minutes, leave, patient_id)
+
+    def arrive(ward: str) -> None:
+        patient_id = f"SIM-{next(serial):06d}"
+        diagnosis, stay_minutes = draw_stay(ward)
+        mix = _ACUTE_PRIORITY_MIX if ward in _ACUTE_WARDS else _DEFAULT_PRIORITY_MIX
+        priority = sim.rng.choices(list(mix), weights=list(mix.values()))[0]
+        plans[patient_id] = {"diagnosis": diagnosis, "priority": priority,
+                             "arrived": sim.now, "stay_minutes": stay_minutes}
+        counts["arrivals"] += 1
+        result = beds.assign_bed(patient_id, ward, diagnosis, priority)
+        if result["status"] == "admitted":
+            counts["admitted_immediately"] += 1
+            on_admitted(patient_id, ward)
+        elif result["status"] == "waitlisted":
+            counts["waitlisted"] += 1
+            details = result["waitlist_details"]
+            plans[patient_id]["eta"] = (details["estimated_wait_minutes"], details["estimated_wait_range_minutes"],
+                                        details["patients_ahead"])
+
+    def outage(ward: str) -> None:
+        available = [b for b, bed in beds._BED_DB[ward]["beds"].items() if bed["status"] == "available"]
+        if not available:
+            counts["outages_deferred"] += 1
+            return
+        bed_id = sim.rng.choice(available)
+        if beds.set_bed_out_of_service(ward, bed_id, "Simulated equipment fault")["status"] == "maintenance":
+            counts["outages"] += 1
+            sim.after(outage_hours * 60.0 * sim.lognormal_factor(0.7), bed_ready, ward, bed_id)
+
+    def sample() -> None:
+        dashboard = beds.get_hospital_dashboard()
+        stats = dashboard["hospital_statistics"]
+        flagged = {_ward_key(entry) for entry in stats["critical_wards"]}
+        stamp = sim.now.strftime("%Y-%m-%d %H:%M")
+        for ward, ward_stats in dashboard["ward_statistics"].items():
+            ward_pct[ward].append(ward_stats["occupancy_pct"])
+            peak_waitlist[ward] = max(peak_waitlist[ward], ward_stats["waitlist"])
+            if ward in flagged:
+                alert_hours[ward] += 1
+                first_alert.setdefault(ward, stamp)
+                if ward not in alerting:
+                    alert_episodes[ward] += 1
+        alerting.clear()
+        alerting.update(flagged)
+        hourly.append({
+            "time": stamp,
+            "occupied": stats["total_occupied"],
+            "occupancy_pct": stats["overall_occupancy_pct"],
+            "cleaning": stats["total_cleaning"],
+            "maintenance": stats["total_maintenance"],
+            "waitlist": stats["waitlist_total"],
+            "wards_at_alert": len(flagged),
+        })
+
+    def seed_current_state() -> None:
+        """Starts from today's census: occupants get a remaining stay, beds in turnover are scheduled."""
+        for ward, ward_data in beds._BED_DB.items():
+            for bed_id, bed in ward_data["beds"].items():
+                if bed["status"] == "occupied":
+                    patient_id = bed["patient_id"] or f"SIM-INIT-{next(serial):04d}"
+                    bed["patient_id"] = patient_id
+                    diagnosis, stay_minutes = draw_stay(ward)
+                    plans[patient_id] = {"diagnosis": bed["diagnosis"] or diagnosis, "priority": "routine",
+                                         "arrived": sim.now, "stay_minutes": stay_minutes}
+                    plan_exit(patient_id, ward, stay_minutes * sim.rng.random())
+                elif bed["status"] == "cleaning":
+                    free_bed(ward, bed_id)
+                elif bed["status"] == "maintenance":
+                    sim.after(outage_hours * 60.0 * sim.rng.random(), bed_ready, ward, bed_id)
+            # Live waitlist entries may be patients who are already admitted elsewhere
+            beds._WAITLIST[ward].clear()
+        beds._rebuild_patient_beds()
+
+    # Default admissions per day fill each ward to the target occupancy,
+    # less the bed-days taken by patients stepping down into it
+    rates: dict[str, float] = {}
+    inflow = {w: 0.0 for w in beds._BED_DB}
+    for ward in beds._BED_DB:
+        if ward not in step_down:
+            continue
+        own = arrivals_per_day.get(ward, beds._BED_DB[ward]["capacity"] * target_occupancy / _mean_los(case_mix[ward]))
+        for target, probability, further_days in step_down[ward]:
+            inflow[target] += own * probability * further_days
+    for ward, ward_data in beds._BED_DB.items():
+        if ward in arrivals_per_day:
+            rates[ward] = arrivals_per_day[ward]
+        else:
+            bed_days = max(ward_data["capacity"] * target_occupancy - inflow[ward], 0.0)
+            rates[ward] = bed_days / _mean_los(case_mix[ward])
+
+    started = time.perf_counter()
+    with isolated_state([(beds, "_BED_DB"), (beds, "_WAITLIST"), (beds, "_ADMISSION_LOG")],
+                        on_restore=[beds._rebuild_patient_beds, beds._rebuild_wait_estimator]):
+        seed_current_state()
+        for ward, ward_data in beds._BED_DB.items():
+            per_hour = rates[ward] / 24.0
+            sim.poisson(_admission_profile(per_hour * demand_scale), arrive, ward)
+            outages_per_hour = ward_data["capacity"] * outages_per_bed_year / (365.0 * 24.0)
+            sim.poisson(outages_per_hour, outage, ward)
+        sim.every(60, sample)
+        sim.run(end)
+        still_waiting = sum(len(wl) for wl in beds._WAITLIST.values())
+    wall = time.perf_counter() - started
+
+    daily: dict[str, dict] = {}
+    for point in hourly:
+        day = daily.setdefault(point["time"][:10], {"date": point["time"][:10], "peak_occupancy_pct": 0,
+                                                    "peak_waitlist": 0, "peak_wards_at_alert": 0})
+        day["peak_occupancy_pct"] = max(day["peak_occupancy_pct"], point["occupancy_pct"])
+        day["peak_waitlist"] = max(day["peak_waitlist"], point["waitlist"])
+        day["peak_wards_at_alert"] = max(day["peak_wards_at_alert"], point["wards_at_alert"])
+
+    hours = len(hourly) or 1
+    wards = {}
+    for ward, series in ward_pct.items():
+        wards[ward] = {
+            "occupancy_pct": percentiles(series, (50, 95)),
+            "hours_at_alert": alert_hours[ward],
+            "pct_time_at_alert": round(100.0 * alert_hours[ward] / hours, 1),
+            "alert_episodes": alert_episodes[ward],
+            "first_alert": first_alert.get(ward),
+            "peak_waitlist": peak_waitlist[ward],
+        }
+
+    return {
+        "simulated_days": days,
+        "wall_seconds": round(wall, 2),
+        "speed_ratio": round(days * 86400 / max(wall, 1e-9)),
+        "events": sim.events_run,
+        "flow": counts,
+        "still_waiting": still_waiting,
+        "admission_wait_minutes": {p: percentiles(v) for p, v in sorted(waits.items())},
+        "waitlist_eta_accuracy": {
+            p: {"n": len(v),
+                "mae_minutes": round(sum(abs(e) for e, _, _ in v) / len(v), 1),
+                "bias_minutes": round(sum(e for e, _, _ in v) / len(v), 1),
+                "within_band_pct": round(100.0 * sum(ok for _, ok, _ in v) / len(v), 1),
+                "fixed_30_plus_45_per_patient_mae_minutes": round(sum(abs(f) for _, _, f in v) / len(v), 1)}
+            for p, v in sorted(eta_checks.items()) if v
+        },
+        "blocked_step_down_minutes": percentiles(blocked_minutes),
+        "hospital_occupancy_pct": percentiles([h["occupancy_pct"] for h in hourly]),
+        "waitlist_size": percentiles([h["waitlist"] for h in hourly]),
+        "wards_ranked_by_alert_time": sorted(
+            (w for w in wards if alert_hours[w]), key=lambda w: -alert_hours[w]),
+        "wards": wards,
+        "daily": list(daily.values()),
+        "hourly": hourly,
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Simulate inpatient bed flow.")
+    parser.add_argument("--days", type=float, default=365.0)
+    parser.add_argument("--demand-scale", type=float, default=1.0)
+    parser.add_argument("--target-occupancy", type=float, default=0.85)
+    parser.add_argument("--cleaning-minutes", type=float, default=45.0)
+    parser.add_argument("--outages-per-bed-year", type=float, default=1.5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--series", action="store_true", help="Include the daily and hourly series")
+    args = parser.parse_args(argv)
+    report = run_bed_simulation(days=args.days, demand_scale=args.demand_scale,
+                                target_occupancy=args.target_occupancy,
+                                cleaning_minutes=args.cleaning_minutes,
+                                outages_per_bed_year=args.outages_per_bed_year, seed=args.seed)
+    if not args.series:
+        report.pop("daily")
+        report.pop("hourly")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
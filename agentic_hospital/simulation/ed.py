@@ -0,0 +1,359 @@
+"""Discrete-event simulator for emergency department flow.
+
+Drives the real triage tools (``calculate_esi_score`` →
+``record_nurse_triage`` → ``assign_waiting_priority`` → ``call_next_patient``)
+on a virtual clock:
+
+* Patients arrive as a Poisson process peaking late morning. Each one has a
+  presentation drawn from a configurable mix (chief complaint, pain range,
+  arrival mechanism, vital-sign profile). The ESI level comes from
+  ``calculate_esi_score`` itself, not from the mix.
+* Triage nurses see arrivals first come, first served. ESI 1 patients go to
+  the resuscitation team. Everyone else joins the ED waiting queue.
+* Clinicians, whose number can vary by hour of day, call the next patient
+  whenever they are free. They assess each one for a log-normal time that
+  depends on ESI level.
+
+Every queued patient records the estimate ``assign_waiting_priority`` gave and
+the wait they actually had. ``fit_wait_model`` fits the queue's estimator
+(``base + per_same_level × same-level patients ahead + per_higher ×
+higher-priority patients ahead``, per ESI level) to those waits. The report
+compares fixed-table and fitted error on held-out days. Install a fitted
+model with ``triage_tools.load_wait_model``, or save it with ``--save`` and
+point ``AGENTIC_HOSPITAL_ED_WAIT_MODEL`` at the file::
+
+    python -m agentic_hospital.simulation.ed --days 28 --clinicians 6 --save ed_wait_model.json
+"""
+
+import argparse
+import datetime
+import json
+import math
+import time
+from collections import deque
+from typing import Optional, Sequence, Union
+
+from ..tools import triage_tools as triage
+from .engine import Simulation, isolated_state, percentiles
+
+# presentation → (relative share, chief complaint, pain range, P(ambulance), vital-sign shifts)
+_DEFAULT_MIX: dict[str, tuple[float, str, tuple[int, int], float, dict]] = {
+    "cardiac_arrest": (0.3, "Collapsed at home, unresponsive, no pulse", (0, 0), 1.0, {"gcs": -12}),
+    "stroke": (2, "Sudden weakness of the left arm and slurred speech", (0, 3), 0.6, {}),
+    "sepsis": (3, "Fever and rigors, possible sepsis from a chest infection", (2, 6), 0.4,
+               {"hr": 28, "temp": 2.0, "rr": 6}),
+    "chest_pain": (10, "Chest pain radiating to the left arm", (3, 8), 0.3, {}),
+    "abdominal_pain": (12, "Abdominal pain with vomiting since yesterday", (4, 8), 0.1, {}),
+    "breathless": (8, "Shortness of breath, worse on exertion", (0, 4), 0.25, {"spo2": -3, "rr": 4}),
+    "head_injury": (5, "Head injury after a fall, brief dizziness", (2, 6), 0.2, {}),
+    "fracture": (8, "Possible fracture of the wrist after a fall", (4, 8), 0.05, {}),
+    "sprain": (10, "Ankle sprain playing football", (2, 6), 0.0, {}),
+    "laceration": (8, "Minor cut to the hand from a kitchen knife", (1, 4), 0.0, {}),
+    "urinary": (6, "Dysuria and urinary symptoms for three days", (1, 4), 0.0, {}),
+    "sore_throat": (5, "Sore throat and fever for two days", (1, 4), 0.0, {}),
+    "minor": (8, "Insect bite on the forearm, itchy", (0, 3), 0.0, {}),
+    "prescription": (4, "Ran out of regular blood pressure tablets", (0, 0), 0.0, {}),
+}
+
+# Vital-sign population (mean, SD) before presentation shifts
+_VITALS = {"hr": (82, 12), "sbp": (132, 16), "dbp": (79, 9), "rr": (16, 2),
+           "spo2": (97.5, 1.2), "temp": (36.9, 0.35), "gcs": (15, 0)}
+
+# Median initial clinician assessment time by ESI level (minutes)
+_DEFAULT_SERVICE = {2: 60.0, 3: 45.0, 4: 25.0, 5: 15.0}
+
+# ESI target time to physician (minutes), from _ESI_META
+_TARGET_MINUTES = {2: 10, 3: 30, 4: 60, 5: 120}
+
+_FEATURES = ("base", "per_same_level", "per_higher")
+
+
+def _arrival_profile(mean_per_hour: float):
+    """ED arrivals peaking at 11:00 and lowest at 04:00 (cosine with a second harmonic)."""
+    def rate(t: datetime.datetime) -> float:
+        hour = t.hour + t.minute / 60.0
+        shape = 1.0 + 0.55 * math.cos(2 * math.pi * (hour - 13.0) / 24.0) \
+            + 0.15 * math.cos(4 * math.pi * (hour - 11.0) / 24.0)
+        return mean_per_hour * shape
+    return rate
+
+
+def _solve(matrix: list[list[float]], vector: list[float]) -> Optional[list[float]]:
+    """Gaussian elimination with partial pivoting; ``None`` if singular."""
+    n = len(vector)
+    a = [row[:] + [vector[i]] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        if abs(a[pivot][col]) < 1e-9:
+            return None
+        a[col], a[pivot] = a[pivot], a[col]
+        for r in range(n):
+            if r != col:
+                factor = a[r][col] / a[col][col]
+                a[r] = [x - factor * y for x, y in zip(a[r], a[col])]
+    return [a[i][n] / a[i][i] for i in range(n)]
+
+
+def _fit_level(rows: list[tuple[int, int, float]]) -> Optional[dict]:
+    """Least-squares fit of wait ~ base + same-level ahead + higher-priority ahead.
+
+    Slopes are kept non-negative: a feature whose slope comes out negative is
+    dropped and the remaining ones refitted.
+    """
+    active = [0, 1, 2]
+    while True:
+        features = [(1.0, float(same), float(higher)) for same, higher, _ in rows]
+        xtx = [[sum(f[i] * f[j] for f in features) for j in active] for i in active]
+        xty = [sum(f[i] * wait for f, (_, _, wait) in zip(features, rows)) for i in active]
+        solution = _solve(xtx, xty)
+        if solution is None:
+            if len(active) == 1:
+                return None
+            active.pop()  # collinear (e.g. never any higher-priority patients ahead)
+            continue
+        coef = dict.fromkeys(_FEATURES, 0.0)
+        for index, value in zip(active, solution):
+            coef[_FEATURES[index]] = value
+        negative = [i for i in active[1:] if coef[_FEATURES[i]] < 0]
+        if not negative:
+            coef["base"] = max(coef["base"], 0.0)
+            return {k: round(v, 2) for k, v in coef.items()}
+        active.remove(negative[0])
+
+
+def fit_wait_model(samples: list[dict], min_samples: int = 30) -> dict:
+    """Fits the ED queue's wait estimator per ESI level from observed waits.
+
+    Args:
+        samples: Dicts with ``esi_level``, ``same_level_ahead``,
+            ``higher_ahead`` and ``waited_minutes`` (as recorded by
+            ``run_ed_simulation``, or from ``call_next_patient`` results).
+        min_samples: Levels with fewer samples keep their current coefficients.
+
+    Returns:
+        dict: ``{"levels": {"2": {...}, ...}, "samples": {...}}`` suitable for
+        ``triage_tools.load_wait_model``.
+    """
+    by_level: dict[int, list[tuple[int, int, float]]] = {}
+    for s in samples:
+        by_level.setdefault(s["esi_level"], []).append(
+            (s["same_level_ahead"], s["higher_ahead"], s["waited_minutes"]))
+    levels, counts = {}, {}
+    for level, rows in sorted(by_level.items()):
+        counts[str(level)] = len(rows)
+        if len(rows) >= min_samples:
+            coef = _fit_level(rows)
+            if coef is not None:
+                levels[str(level)] = coef
+    return {"levels": levels, "samples": counts}
+
+
+def _error(samples: list[dict], levels: dict) -> dict:
+    """Mean absolute error and bias of a model's estimates, per ESI level."""
+    out = {}
+    for level in sorted({s["esi_level"] for s in samples}):
+        coef = levels.get(str(level))
+        rows = [s for s in samples if s["esi_level"] == level]
+        if coef is None or not rows:
+            continue
+        errors = [coef["base"] + coef["per_same_level"] * s["same_level_ahead"]
+                  + coef["per_higher"] * s["higher_ahead"] - s["waited_minutes"] for s in rows]
+        out[str(level)] = {"mae": round(sum(abs(e) for e in errors) / len(errors), 1),
+                           "bias": round(sum(errors) / len(errors), 1)}
+    return out
+
+
+def run_ed_simulation(
+    days: float = 28.0,
+    arrivals_per_day: float = 160.0,
+    mix: Optional[dict[str, tuple[float, str, tuple[int, int], float, dict]]] = None,
+    clinicians: Union[int, Sequence[int]] = 6,
+    triage_nurses: int = 2,
+    triage_minutes: float = 6.0,
+    service_minutes: Optional[dict[int, float]] = None,
+    jitter: float = 0.5,
+    holdout_fraction: float = 0.3,
+    apply: bool = False,
+    seed: int = 7,
+) -> dict:
+    """Simulates ED arrivals, triage and the waiting queue, and calibrates wait estimates.
+
+    Args:
+        days: Simulated days.
+        arrivals_per_day: Mean arrivals per day.
+        mix: Presentation mix (see ``_DEFAULT_MIX``).
+        clinicians: Clinicians on duty — a constant, or 24 hourly counts.
+        triage_nurses: Triage nurses on duty.
+        triage_minutes: Median triage time per patient.
+        service_minutes: Median clinician assessment time per ESI level.
+        jitter: Log-normal sigma of triage and assessment times.
+        holdout_fraction: Share of final days held out to compare estimators.
+        apply: Install the fitted model in the live queue afterwards.
+        seed: Random seed.
+
+    Returns:
+        dict: Arrivals by ESI level, queue-wait percentiles and on-target
+        share per level, the fitted model, and fixed-table and fitted
+        estimation error on the held-out days.
+    """
+    mix = mix or _DEFAULT_MIX
+    service = {**_DEFAULT_SERVICE, **(service_minutes or {})}
+    staffing = [clinicians] * 24 if isinstance(clinicians, int) else list(clinicians)
+    if len(staffing) != 24:
+        raise ValueError("clinicians must be an int or 24 hourly counts")
+    names = list(mix)
+    weights = [mix[n][0] for n in names]
+
+    sim = Simulation(seed=seed)
+    end = sim.start + datetime.timedelta(days=days)
+    triage_queue: deque = deque()
+    state = {"nurses_free": triage_nurses, "busy": 0, "serial": 0}
+    samples: list[dict] = []
+    pending: dict[str, dict] = {}
+    counts = {"arrivals": 0, "resuscitation": 0, "queued": 0, "seen": 0}
+    by_esi = {level: 0 for level in range(1, 6)}
+    triage_waits: list[float] = []
+    queue_series: list[dict] = []
+
+    def draw_vitals(shifts: dict) -> dict:
+        vitals = {}
+        for name, (mean, sd) in _VITALS.items():
+            value = sim.rng.gauss(mean + shifts.get(name, 0), sd)
+            vitals[name] = round(min(value, 100.0), 1) if name in ("spo2", "temp") else int(round(value))
+        vitals["gcs"] = max(3, min(vitals["gcs"], 15))
+        return vitals
+
+    def start_triage() -> None:
+        while state["nurses_free"] and triage_queue:
+            state["nurses_free"] -= 1
+            patient = triage_queue.popleft()
+            triage_waits.append((sim.now - patient["arrived"]).total_seconds() / 60.0)
+            sim.after(triage_minutes * sim.lognormal_factor(jitter), finish_triage, patient)
+
+    def finish_triage(patient: dict) -> None:
+        state["nurses_free"] += 1
+        esi = triage.calculate_esi_score(patient["complaint"], patient["vitals"],
+                                         patient["pain"], patient["mechanism"])["esi_level"]
+        triage.record_nurse_triage(patient["patient_id"], patient["complaint"], patient["vitals"],
+                                   patient["pain"], esi, patient["mechanism"])
+        by_esi[esi] += 1
+        queued = triage.assign_waiting_priority(patient["patient_id"], esi)
+        if queued["status"] == "bypassed_queue":
+            counts["resuscitation"] += 1
+        else:
+            counts["queued"] += 1
+            pending[patient["patient_id"]] = {
+                "esi_level": esi,
+                "same_level_ahead": queued["patients_ahead_same_level"],
+                "higher_ahead": queued["patients_ahead_higher_priority"],
+                "estimated_minutes": queued["estimated_wait_minutes"],
+                "day": int(sim.elapsed_minutes() // 1440),
+            }
+            call_patients()
+        start_triage()
+
+    def call_patients() -> None:
+        while state["busy"] < staffing[sim.now.hour]:
+            called = triage.call_next_patient()
+            if called["status"] != "called":
+                return
+            sample = pending.pop(called["patient_id"])
+            sample["waited_minutes"] = called["waited_minutes"]
+            samples.append(sample)
+            counts["seen"] += 1
+            state["busy"] += 1
+            sim.after(service[called["esi_level"]] * sim.lognormal_factor(jitter), finish_assessment)
+
+    def finish_assessment() -> None:
+        state["busy"] -= 1
+        call_patients()
+
+    def arrive() -> None:
+        state["serial"] += 1
+        _, complaint, (low, high), p_ambulance, shifts = mix[sim.rng.choices(names, weights=weights)[0]]
+        triage_queue.append({
+            "patient_id": f"SIM-ED-{state['serial']:06d}",
+            "complaint": complaint,
+            "pain": sim.rng.randint(low, high),
+            "mechanism": "ambulance" if sim.rng.random() < p_ambulance else "walk-in",
+            "vitals": draw_vitals(shifts),
+            "arrived": sim.now,
+        })
+        counts["arrivals"] += 1
+        start_triage()
+
+    def sample_queue() -> None:
+        call_patients()  # shift change: new clinicians pick up waiting patients
+        queue_series.append({"time": sim.now.strftime("%Y-%m-%d %H:%M"),
+                             "waiting": len(triage._WAITING_QUEUE),
+                             "clinicians": staffing[sim.now.hour]})
+
+    started = time.perf_counter()
+    with isolated_state([(triage, "_TRIAGE_LOG"), (triage, "_WAITING_QUEUE"), (triage, "_WAIT_MODEL"),
+                         (triage, "_TRIAGE_SEQ")]):
+        triage._WAITING_QUEUE.clear()
+        model_in_use = {"levels": dict(triage._WAIT_MODEL["levels"]), "source": triage._WAIT_MODEL["source"]}
+        sim.poisson(_arrival_profile(arrivals_per_day / 24.0), arrive)
+        sim.every(60, sample_queue)
+        sim.run(end)
+    wall = time.perf_counter() - started
+
+    split_day = int(days * (1.0 - holdout_fraction))
+    train = [s for s in samples if s["day"] < split_day] or samples
+    test = [s for s in samples if s["day"] >= split_day] or samples
+    fitted = fit_wait_model(train)
+    staffed = clinicians if isinstance(clinicians, int) else ",".join(map(str, staffing))
+    fitted["source"] = f"ED simulation: {days:g} days, {arrivals_per_day:g}/day, clinicians {staffed}"
+    applied = triage.load_wait_model(fitted) if apply else None
+
+    waits = {level: [s["waited_minutes"] for s in samples if s["esi_level"] == level] for level in range(2, 6)}
+    return {
+        "simulated_days": days,
+        "wall_seconds": round(wall, 2),
+        "events": sim.events_run,
+        "flow": counts,
+        "still_waiting": len(pending),
+        "arrivals_by_esi": {str(level): n for level, n in by_esi.items()},
+        "triage_wait_minutes": percentiles(triage_waits),
+        "queue_wait_minutes": {str(level): percentiles(v) for level, v in waits.items()},
+        "within_target_pct": {
+            str(level): round(100.0 * sum(w <= _TARGET_MINUTES[level] for w in v) / len(v), 1)
+            for level, v in waits.items() if v
+        },
+        "peak_queue": max(queue_series, key=lambda q: q["waiting"]) if queue_series else None,
+        "wait_model": fitted,
+        "holdout_error": {
+            "days": [split_day, days],
+            "model_in_use": {"source": model_in_use["source"], **_error(test, model_in_use["levels"])},
+            "fitted": _error(test, {**model_in_use["levels"], **fitted["levels"]}),
+        },
+        "applied": applied,
+        "queue_series": queue_series,
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Simulate ED flow and fit queue wait estimates.")
+    parser.add_argument("--days", type=float, default=28.0)
+    parser.add_argument("--arrivals-per-day", type=float, default=160.0)
+    parser.add_argument("--clinicians", default="6",
+                        help="Clinicians on duty: one number, or 24 comma-separated hourly counts")
+    parser.add_argument("--triage-nurses", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save", metavar="PATH", help="Write the fitted model as JSON for AGENTIC_HOSPITAL_ED_WAIT_MODEL")
+    parser.add_argument("--series", action="store_true", help="Include the hourly queue series")
+    args = parser.parse_args(argv)
+    counts = [int(c) for c in args.clinicians.split(",")]
+    report = run_ed_simulation(days=args.days, arrivals_per_day=args.arrivals_per_day,
+                               clinicians=counts[0] if len(counts) == 1 else counts,
+                               triage_nurses=args.triage_nurses, seed=args.seed)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(report["wait_model"], fh, indent=2)
+    if not args.series:
+        report.pop("queue_series")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
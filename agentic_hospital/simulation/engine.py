@@ -0,0 +1,167 @@
+"""Discrete-event core shared by the hospital simulators.
+
+A ``Simulation`` is an event calendar (a heap of ``(time, seq, callback)``)
+on a ``VirtualClock``. ``run`` pops events in time order, moves the clock to
+each event and calls it. The clock is installed through ``infra.clock``, so
+the real tool functions stamp records and compute waits in simulated time,
+and a simulated day costs only as much as its events.
+
+``isolated_state`` snapshots the module stores a simulator touches and
+restores them afterwards, so a run never leaks into the live demo hospital.
+"""
+
+import copy
+import datetime
+import heapq
+import itertools
+import math
+import random
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional
+
+from ..infra.backend import is_shared
+from ..infra.clock import VirtualClock, use_clock
+from ..infra.event_log import persistence_suspended
+from ..infra.state import AtomicCounter
+
+
+class Simulation:
+    """An event calendar on a virtual clock.
+
+    Args:
+        start: Simulated start time; defaults to today at 08:00.
+        seed: Seed for ``self.rng``, so runs are reproducible.
+    """
+
+    def __init__(self, start: Optional[datetime.datetime] = None, seed: int = 7):
+        if start is None:
+            start = datetime.datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+        self.start = start
+        self.clock = VirtualClock(start)
+        self.rng = random.Random(seed)
+        self.events_run = 0
+        self._calendar: list[tuple[datetime.datetime, int, Callable, tuple]] = []
+        self._seq = itertools.count()
+
+    @property
+    def now(self) -> datetime.datetime:
+        return self.clock.current
+
+    def elapsed_minutes(self, when: Optional[datetime.datetime] = None) -> float:
+        return ((when or self.now) - self.start).total_seconds() / 60.0
+
+    def at(self, when: datetime.datetime, callback: Callable, *args) -> None:
+        """Schedules ``callback(*args)`` at an absolute simulated time."""
+        heapq.heappush(self._calendar, (max(when, self.now), next(self._seq), callback, args))
+
+    def after(self, minutes: float, callback: Callable, *args) -> None:
+        """Schedules ``callback(*args)`` ``minutes`` from now."""
+        self.at(self.now + datetime.timedelta(minutes=max(minutes, 0.0)), callback, *args)
+
+    def every(self, minutes: float, callback: Callable, *args) -> None:
+        """Calls ``callback(*args)`` now and then every ``minutes`` until the run ends."""
+        def tick():
+            callback(*args)
+            self.after(minutes, tick)
+        self.after(0, tick)
+
+    def poisson(self, rate_per_hour, callback: Callable, *args,
+                peak_per_hour: Optional[float] = None) -> None:
+        """Generates arrivals as a Poisson process calling ``callback(*args)``.
+
+        Args:
+            rate_per_hour: Arrivals per hour, or a function of simulated time
+                (e.g. a diurnal profile) sampled by thinning.
+            callback: Called once per arrival.
+            peak_per_hour: Upper bound of a time-varying rate; defaults to
+                its maximum over the first simulated week, hour by hour.
+        """
+        if callable(rate_per_hour):
+            rate_fn = rate_per_hour
+            if peak_per_hour is None:
+                peak_per_hour = max(rate_fn(self.start + datetime.timedelta(hours=h)) for h in range(168))
+        else:
+            rate_fn = None
+            peak_per_hour = rate_per_hour
+        if not peak_per_hour or peak_per_hour <= 0:
+            return
+
+        def arrive():
+            if rate_fn is None or self.rng.random() * peak_per_hour < rate_fn(self.now):
+                callback(*args)
+            self.after(self.rng.expovariate(peak_per_hour / 60.0), arrive)
+
+        self.after(self.rng.expovariate(peak_per_hour / 60.0), arrive)
+
+    def run(self, until: datetime.datetime) -> int:
+        """Processes events up to ``until`` with the virtual clock installed.
+
+        Returns:
+            int: Number of events processed.
+        """
+        processed = 0
+        with use_clock(self.clock):
+            while self._calendar and self._calendar[0][0] <= until:
+                when, _, callback, args = heapq.heappop(self._calendar)
+                self.clock.advance_to(when)
+                callback(*args)
+                processed += 1
+            self.clock.advance_to(max(until, self.now))
+        self.events_run += processed
+        return processed
+
+    def lognormal_factor(self, sigma: float) -> float:
+        """Multiplicative jitter with median 1 (``sigma`` is the log-scale spread)."""
+        return math.exp(self.rng.gauss(0.0, sigma)) if sigma > 0 else 1.0
+
+
+@contextmanager
+def isolated_state(stores: Iterable[tuple[object, str]],
+                   on_restore: Iterable[Callable[[], None]] = ()) -> Iterator[None]:
+    """Snapshots module stores and restores them in place when the block exits.
+
+    Also pauses audit-log persistence so simulated events are not written to
+    the real audit trail.
+
+    Args:
+        stores: ``(module, attribute)`` pairs of dicts, lists or
+            ``AtomicCounter`` ID sequences to protect. A restored sequence
+            hands out the same IDs again, as if the run never happened.
+        on_restore: Callables run after restoring (e.g. index rebuilds).
+    """
+    if is_shared():
+        raise RuntimeError("Simulations run against the in-memory state backend only; "
+                           "unset AGENTIC_HOSPITAL_STATE_BACKEND.")
+    stores = list(stores)
+    saved = [
+        (module, name, store.value if isinstance(store, AtomicCounter) else copy.deepcopy(store))
+        for module, name in stores for store in (getattr(module, name),)
+    ]
+    with persistence_suspended():
+        try:
+            yield
+        finally:
+            for module, name, value in saved:
+                store = getattr(module, name)
+                if isinstance(store, AtomicCounter):
+                    store.reset(value)
+                elif isinstance(store, dict):
+                    store.clear()
+                    store.update(value)
+                else:
+                    store[:] = value
+            for callback in on_restore:
+                callback()
+
+
+def percentiles(values: list[float], points: Iterable[int] = (50, 90, 95)) -> dict:
+    """Nearest-rank percentiles plus mean and count, rounded for reports."""
+    if not values:
+        return {"n": 0}
+    ordered = sorted(values)
+    out = {"n": len(ordered), "mean": round(sum(ordered) / len(ordered), 1)}
+    for p in points:
+        rank = max(math.ceil(p / 100 * len(ordered)) - 1, 0)
+        out[f"p{p}"] = round(ordered[rank], 1)
+    out["max"] = round(ordered[-1], 1)
+    return out
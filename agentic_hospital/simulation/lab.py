@@ -0,0 +1,372 @@
+"""Discrete-event simulator for investigation turnaround.
+
+Drives the real order engine (``order_investigation`` →
+``mark_investigation_processing`` → ``mock_result_investigation`` →
+``acknowledge_critical_result``) on a virtual clock:
+
+* Orders arrive as a Poisson process with an optional diurnal profile
+  (peak around the morning ward round), with configurable investigation
+  and urgency mixes.
+* Each order's turnaround is the type's ``turnaround_hours`` scaled by an
+  urgency speed-up and a log-normal jitter. A fixed share of it is spent
+  before processing starts (collection and transport).
+* Results come from ``generate_result``. Lab values are drawn around the
+  patient's own ``_LAB_DB`` values (or population reference values when the
+  patient has none), and a configurable share of orders carries a value
+  beyond a ``_CRITICAL_LAB_THRESHOLDS`` limit. Critical results are flagged
+  with the threshold's action and acknowledged after a clinician delay.
+
+Days of lab activity for thousands of orders run in seconds::
+
+    python -m agentic_hospital.simulation.lab --days 7 --orders-per-hour 60
+"""
+
+import argparse
+import datetime
+import json
+import math
+import random
+import time
+from contextlib import nullcontext
+from typing import Optional
+
+from ..tools import common_tools as common
+from ..tools.monitoring_tools import _CRITICAL_LAB_THRESHOLDS
+from .engine import Simulation, isolated_state, percentiles
+
+# Relative order volume by investigation type
+_DEFAULT_MIX: dict[str, float] = {
+    "blood_panel": 30, "renal_function": 12, "cardiac_enzymes": 9, "coagulation": 7,
+    "liver_function": 7, "inflammation": 6, "lipid_panel": 3, "hba1c": 2, "thyroid": 2,
+    "blood_culture": 4, "chest_xray": 7, "ct_head": 3, "ct_chest": 2, "ct_abdomen": 2,
+    "ultrasound_abdomen": 2, "doppler": 1, "mri_brain": 1, "ecg": 6, "echocardiogram": 1,
+}
+_DEFAULT_URGENCY_MIX = {"emergency": 0.15, "urgent": 0.35, "routine": 0.50}
+
+# Multiplier on nominal turnaround by urgency (emergency samples are run first)
+_DEFAULT_SPEEDUP = {"emergency": 0.35, "urgent": 0.65, "routine": 1.0}
+
+# Share of the turnaround before the department starts processing
+_RECEIPT_FRACTION = 0.15
+
+# analyte → (_LAB_DB panel, field, population mean, population SD, decimals)
+_ANALYTES: dict[str, tuple[Optional[str], Optional[str], float, float, int]] = {
+    "WBC": ("CBC", "WBC", 7.5, 2.0, 1),
+    "Hemoglobin": ("CBC", "Hemoglobin", 13.5, 1.5, 1),
+    "Platelets": ("CBC", "Platelets", 250, 60, 0),
+    "Sodium": ("BMP", "Sodium", 139, 3, 0),
+    "Potassium": ("BMP", "Potassium", 4.2, 0.4, 1),
+    "Glucose": ("BMP", "Glucose", 100, 20, 0),
+    "Calcium": ("BMP", "Calcium", 9.3, 0.4, 1),
+    "Bicarbonate": ("BMP", "CO2", 25, 2.5, 0),
+    "BUN": ("BMP", "BUN", 15, 5, 0),
+    "Creatinine": ("BMP", "Creatinine", 0.9, 0.2, 2),
+    "ALT": ("LFTs", "ALT", 25, 10, 0),
+    "AST": ("LFTs", "AST", 24, 8, 0),
+    "Alk_Phos": ("LFTs", "Alk_Phos", 80, 20, 0),
+    "Total_Bilirubin": ("LFTs", "Total_Bilirubin", 0.7, 0.3, 1),
+    "Albumin": ("LFTs", "Albumin", 4.0, 0.4, 1),
+    "Total_Cholesterol": ("Lipid Panel", "Total_Cholesterol", 190, 35, 0),
+    "LDL": ("Lipid Panel", "LDL", 110, 30, 0),
+    "HDL": ("Lipid Panel", "HDL", 50, 12, 0),
+    "Triglycerides": ("Lipid Panel", "Triglycerides", 140, 50, 0),
+    "INR": ("INR", "value", 1.0, 0.1, 1),
+    "BNP": ("BNP", "value", 80, 60, 0),
+    "Troponin_I": (None, None, 0.01, 0.01, 3),
+    "CK_MB": (None, None, 3.0, 1.5, 1),
+    "CRP": (None, None, 3.0, 3.0, 1),
+    "ESR": (None, None, 12, 8, 0),
+    "TSH": ("TSH", "value", 2.0, 1.0, 2),
+    "Free_T4": (None, None, 1.2, 0.2, 2),
+    "HbA1c": ("HbA1c", "value", 5.6, 0.5, 1),
+}
+
+_TYPE_ANALYTES: dict[str, tuple[str, ...]] = {
+    "blood_panel": ("WBC", "Hemoglobin", "Platelets", "Sodium", "Potassium", "Glucose",
+                    "Calcium", "Bicarbonate", "BUN", "Creatinine"),
+    "renal_function": ("Sodium", "Potassium", "BUN", "Creatinine"),
+    "liver_function": ("ALT", "AST", "Alk_Phos", "Total_Bilirubin", "Albumin"),
+    "lipid_panel": ("Total_Cholesterol", "LDL", "HDL", "Triglycerides"),
+    "cardiac_enzymes": ("Troponin_I", "CK_MB", "BNP"),
+    "coagulation": ("INR",),
+    "inflammation": ("CRP", "ESR"),
+    "thyroid": ("TSH", "Free_T4"),
+    "hba1c": ("HbA1c",),
+}
+
+# Non-numeric investigations: (finding, probability, critical)
+_FINDINGS: dict[str, tuple[tuple[str, float, bool], ...]] = {
+    "blood_culture": (("No growth at 48 hours", 0.88, False),
+                      ("Gram-negative bacilli isolated (E. coli) — sensitivities to follow", 0.09, True),
+                      ("Coagulase-negative staphylococcus — probable contaminant", 0.03, False)),
+    "urine_culture": (("No significant growth", 0.8, False),
+                      ("E. coli >10^5 CFU/mL", 0.2, False)),
+    "chest_xray": (("No acute cardiopulmonary process", 0.72, False),
+                   ("Right lower lobe consolidation", 0.14, False),
+                   ("Bilateral pleural effusions", 0.1, False),
+                   ("Large right pneumothorax", 0.04, True)),
+    "ct_head": (("No acute intracranial abnormality", 0.85, False),
+                ("Chronic small vessel ischaemic change", 0.11, False),
+                ("Acute intracranial haemorrhage", 0.04, True)),
+    "ct_chest": (("No pulmonary embolism", 0.82, False),
+                 ("Segmental pulmonary embolism", 0.1, True),
+                 ("Spiculated right upper lobe nodule, 14 mm", 0.08, False)),
+    "ct_abdomen": (("No acute abdominal pathology", 0.78, False),
+                   ("Acute appendicitis", 0.12, False),
+                   ("Free intraperitoneal air", 0.03, True),
+                   ("Simple renal cyst", 0.07, False)),
+    "mri_brain": (("Normal study", 0.8, False), ("White matter hyperintensities", 0.2, False)),
+    "mri_spine": (("Degenerative change without cord compression", 0.93, False),
+                  ("Metastatic cord compression", 0.07, True)),
+    "ecg": (("Normal sinus rhythm", 0.75, False), ("Atrial fibrillation, rate controlled", 0.15, False),
+            ("Anterior ST elevation", 0.03, True), ("Left bundle branch block", 0.07, False)),
+    "echocardiogram": (("Normal LV function, EF 60%", 0.7, False),
+                       ("Moderately impaired LV function, EF 38%", 0.25, False),
+                       ("Pericardial effusion with tamponade physiology", 0.05, True)),
+    "ultrasound_abdomen": (("Normal study", 0.75, False), ("Gallstones without cholecystitis", 0.25, False)),
+    "doppler": (("No deep vein thrombosis", 0.8, False), ("Femoral deep vein thrombosis", 0.2, False)),
+}
+
+
+def _baseline(patient_id: str, analyte: str) -> tuple[float, bool]:
+    """The patient's own value from ``_LAB_DB`` if numeric, else the population mean."""
+    panel, field, mean, _, _ = _ANALYTES[analyte]
+    if panel is not None:
+        value = common._LAB_DB.get(patient_id, {}).get(panel, {}).get(field)
+        if isinstance(value, (int, float)):
+            return float(value), True
+    return float(mean), False
+
+
+def _critical_flag(analyte: str, value: float) -> Optional[dict]:
+    limits = _CRITICAL_LAB_THRESHOLDS.get(analyte)
+    if not limits:
+        return None
+    if "low" in limits and value < limits["low"]:
+        direction = "low"
+    elif "high" in limits and value > limits["high"]:
+        direction = "high"
+    else:
+        return None
+    return {
+        "test": analyte, "value": value, "unit": limits["unit"], "direction": direction,
+        "threshold": limits[direction], "action": limits.get(f"action_{direction}", ""),
+    }
+
+
+def generate_result(investigation_type: str, patient_id: str, rng: Optional[random.Random] = None,
+                    critical_rate: float = 0.0) -> dict:
+    """A plausible result for an order, consistent with the patient's recorded labs.
+
+    Args:
+        investigation_type: Investigation type key (e.g., "blood_panel").
+        patient_id: Patient identifier; their ``_LAB_DB`` values anchor the result.
+        rng: Random source (a fresh one is used when omitted).
+        critical_rate: Probability of forcing one analyte beyond its critical limit.
+
+    Returns:
+        dict: ``result``, ``notes``, ``values`` (lab types), ``critical_values``
+        and ``critical`` flag.
+    """
+    rng = rng or random.Random()
+    inv_key = investigation_type.lower().replace(" ", "_")
+    analytes = _TYPE_ANALYTES.get(inv_key)
+
+    if analytes is None:
+        options = _FINDINGS.get(inv_key, (("No significant abnormality", 1.0, False),))
+        pick, acc = rng.random(), 0.0
+        finding, critical = options[-1][0], options[-1][2]
+        for text, prob, is_critical in options:
+            acc += prob
+            if pick < acc:
+                finding, critical = text, is_critical
+                break
+        return {
+            "result": "Critical" if critical else ("Normal" if finding == options[0][0] else "Abnormal"),
+            "notes": finding,
+            "critical": critical,
+            "critical_values": [],
+        }
+
+    values = {}
+    for analyte in analytes:
+        base, own = _baseline(patient_id, analyte)
+        sd = _ANALYTES[analyte][3] * (0.15 if own else 0.6)
+        values[analyte] = max(base + rng.gauss(0.0, sd), 0.0)
+
+    forced = [a for a in analytes if a in _CRITICAL_LAB_THRESHOLDS]
+    if forced and rng.random() < critical_rate:
+        analyte = rng.choice(forced)
+        limits = _CRITICAL_LAB_THRESHOLDS[analyte]
+        direction = rng.choice([d for d in ("low", "high") if d in limits])
+        factor = rng.uniform(1.03, 1.25) if direction == "high" else rng.uniform(0.75, 0.97)
+        values[analyte] = limits[direction] * factor
+
+    rounded = {a: round(v, _ANALYTES[a][4]) for a, v in values.items()}
+    critical_values = [f for f in (_critical_flag(a, v) for a, v in rounded.items()) if f]
+    return {
+        "result": "Critical" if critical_values else "Resulted",
+        "notes": (
+            "; ".join(f"{c['test']} {c['value']} {c['unit']} ({c['direction']})" for c in critical_values)
+            or "Values within expected range for patient"
+        ),
+        "values": rounded,
+        "critical": bool(critical_values),
+        "critical_values": critical_values,
+    }
+
+
+def _diurnal(mean_per_hour: float):
+    """Order rate peaking at 09:00 and lowest at 21:00, averaging ``mean_per_hour``."""
+    def rate(t: datetime.datetime) -> float:
+        hour = t.hour + t.minute / 60.0
+        return mean_per_hour * (1.0 + 0.6 * math.cos(2 * math.pi * (hour - 9.0) / 24.0))
+    return rate
+
+
+def _pick(rng: random.Random, weights: dict[str, float]) -> str:
+    keys = list(weights)
+    return rng.choices(keys, weights=[weights[k] for k in keys])[0]
+
+
+def run_lab_simulation(
+    days: float = 3.0,
+    orders_per_hour: float = 60.0,
+    mix: Optional[dict[str, float]] = None,
+    urgency_mix: Optional[dict[str, float]] = None,
+    speedup: Optional[dict[str, float]] = None,
+    jitter: float = 0.35,
+    critical_rate: float = 0.03,
+    ack_minutes: float = 20.0,
+    diurnal: bool = True,
+    seed: int = 7,
+    restore: bool = True,
+) -> dict:
+    """Simulates lab and imaging activity and reports turnaround statistics.
+
+    Args:
+        days: Simulated days.
+        orders_per_hour: Mean order arrival rate.
+        mix: Relative volume per investigation type.
+        urgency_mix: Probability per urgency.
+        speedup: Turnaround multiplier per urgency.
+        jitter: Log-normal sigma applied to every turnaround.
+        critical_rate: Share of lab orders forced beyond a critical limit.
+        ack_minutes: Median time for a clinician to acknowledge a critical result.
+        diurnal: Vary the arrival rate over the day.
+        seed: Random seed.
+        restore: Restore the order store afterwards (set False to keep the
+            simulated orders, e.g. to demo the results worklist).
+
+    Returns:
+        dict: Volumes, turnaround percentiles by urgency and department,
+        on-time share, critical acknowledgement times and an hourly backlog
+        series.
+    """
+    mix = {k: v for k, v in (mix or _DEFAULT_MIX).items() if k in common._INVESTIGATION_TYPES}
+    urgency_mix = urgency_mix or _DEFAULT_URGENCY_MIX
+    speedup = {**_DEFAULT_SPEEDUP, **(speedup or {})}
+    patients = sorted(common._PATIENT_DB)
+
+    sim = Simulation(seed=seed)
+    end = sim.start + datetime.timedelta(days=days)
+    pending: dict[str, dict] = {}
+    tat: dict[str, list[float]] = {}
+    tat_dept: dict[str, list[float]] = {}
+    on_time: dict[str, list[bool]] = {}
+    ack_delay: list[float] = []
+    backlog: list[dict] = []
+    counts = {"ordered": 0, "resulted": 0, "critical": 0, "acknowledged": 0}
+
+    def acknowledge(order_id: str, patient_id: str, resulted_at: datetime.datetime) -> None:
+        if common.acknowledge_critical_result(patient_id, order_id, "SIM-CLINICIAN")["status"] == "acknowledged":
+            counts["acknowledged"] += 1
+            ack_delay.append((sim.now - resulted_at).total_seconds() / 60.0)
+
+    def result(order_id: str) -> None:
+        info = pending.pop(order_id)
+        data = generate_result(info["type"], info["patient_id"], sim.rng, critical_rate)
+        common.mock_result_investigation(order_id, info["patient_id"], data)
+        minutes = (sim.now - info["ordered_at"]).total_seconds() / 60.0
+        tat.setdefault(info["urgency"], []).append(minutes)
+        tat_dept.setdefault(info["department"], []).append(minutes)
+        on_time.setdefault(info["urgency"], []).append(sim.now <= info["due_at"])
+        counts["resulted"] += 1
+        if data["critical"]:
+            counts["critical"] += 1
+            sim.after(ack_minutes * sim.lognormal_factor(0.5), acknowledge,
+                      order_id, info["patient_id"], sim.now)
+
+    def start_processing(order_id: str) -> None:
+        common.mark_investigation_processing(order_id, pending[order_id]["patient_id"])
+
+    def arrive() -> None:
+        inv_key = _pick(sim.rng, mix)
+        urgency = _pick(sim.rng, urgency_mix)
+        patient_id = sim.rng.choice(patients)
+        order = common.order_investigation(patient_id, inv_key, "Simulated demand", urgency, "SIM")
+        if order["status"] != "ordered":
+            return
+        spec = common._INVESTIGATION_TYPES[inv_key]
+        minutes = spec["turnaround_hours"] * 60.0 * speedup.get(urgency, 1.0) * sim.lognormal_factor(jitter)
+        pending[order["order_id"]] = {
+            "patient_id": patient_id, "type": inv_key, "urgency": urgency,
+            "department": spec["department"], "ordered_at": sim.now,
+            "due_at": sim.now + datetime.timedelta(hours=spec["turnaround_hours"]),
+        }
+        counts["ordered"] += 1
+        sim.after(minutes * _RECEIPT_FRACTION, start_processing, order["order_id"])
+        sim.after(minutes, result, order["order_id"])
+
+    def sample() -> None:
+        worklist = common.get_results_worklist(page_size=1)
+        backlog.append({
+            "time": sim.now.strftime("%Y-%m-%d %H:%M"),
+            "pending": worklist["total_pending"],
+            "overdue": sum(1 for p in pending.values() if p["due_at"] < sim.now),
+        })
+
+    started = time.perf_counter()
+    isolation = (isolated_state([(common, "_INVESTIGATION_ORDERS"), (common, "_INVESTIGATION_SEQ")],
+                                on_restore=[common._rebuild_order_index])
+                 if restore else nullcontext())
+    with isolation:
+        sim.poisson(_diurnal(orders_per_hour) if diurnal else orders_per_hour, arrive)
+        sim.every(60, sample)
+        sim.run(end)
+    wall = time.perf_counter() - started
+
+    return {
+        "simulated_days": days,
+        "wall_seconds": round(wall, 2),
+        "speed_ratio": round(days * 86400 / max(wall, 1e-9)),
+        "events": sim.events_run,
+        "orders": counts,
+        "still_pending": len(pending),
+        "turnaround_minutes": {u: percentiles(v) for u, v in sorted(tat.items())},
+        "turnaround_by_department": {d: percentiles(v) for d, v in sorted(tat_dept.items())},
+        "on_time_pct": {u: round(100.0 * sum(v) / len(v), 1) for u, v in sorted(on_time.items()) if v},
+        "critical_ack_minutes": percentiles(ack_delay),
+        "peak_backlog": max(backlog, key=lambda b: b["pending"]) if backlog else None,
+        "backlog": backlog,
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Simulate investigation turnaround.")
+    parser.add_argument("--days", type=float, default=3.0)
+    parser.add_argument("--orders-per-hour", type=float, default=60.0)
+    parser.add_argument("--jitter", type=float, default=0.35)
+    parser.add_argument("--critical-rate", type=float, default=0.03)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--series", action="store_true", help="Include the hourly backlog series")
+    args = parser.parse_args(argv)
+    report = run_lab_simulation(days=args.days, orders_per_hour=args.orders_per_hour,
+                                jitter=args.jitter, critical_rate=args.critical_rate, seed=args.seed)
+    if not args.series:
+        report.pop("backlog")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
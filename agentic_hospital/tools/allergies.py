@@ -0,0 +1,215 @@
+"""Drug allergy and cross-reactivity index shared by the prescribing tools.
+
+The patient record (``_PATIENT_DB[...]["allergies"]``) is the only allergy
+list. ``verify_medication_order``, ``generate_treatment_plan`` and
+``calculate_medication_dose`` all check drugs against it through this index:
+
+- ``_DRUG_CLASSES`` lists the member drugs of each class.
+- ``_ALLERGEN_CLASSES`` maps a recorded allergen to the class it rules out.
+  'Sulfa drugs', 'NSAIDs' and 'Amoxicillin' all rule out a class. A drug not
+  listed here rules out only itself, so a clopidogrel entry does not block
+  ticagrelor.
+- ``_CROSS_REACTIVITY`` lists the classes an allergen class or drug
+  cross-reacts with, such as penicillin -> cephalosporins or
+  aspirin -> NSAIDs. Each entry has a severity and a note.
+
+A patient's allergies compile once into a drug -> match dict, so checking a
+drug is one dict lookup per word of its name, however many classes there are.
+
+List what a patient's record rules out with::
+
+    python -m agentic_hospital.tools.allergies P003
+"""
+
+import argparse
+import json
+import re
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence
+
+# =============================================================================
+# DRUG CLASSES AND CROSS-REACTIVITY
+# =============================================================================
+_DRUG_CLASSES: dict[str, tuple[str, ...]] = {
+    "penicillins": ("penicillin", "amoxicillin", "ampicillin", "flucloxacillin", "piperacillin",
+                    "benzylpenicillin", "phenoxymethylpenicillin", "co-amoxiclav", "dicloxacillin",
+                    "nafcillin"),
+    "cephalosporins": ("ceftriaxone", "cefalexin", "cephalexin", "cefazolin", "cefuroxime",
+                       "cefotaxime", "ceftazidime", "cefepime", "cefixime"),
+    "carbapenems": ("meropenem", "imipenem", "ertapenem"),
+    "sulfonamide antibiotics": ("sulfamethoxazole", "co-trimoxazole", "sulfadiazine", "sulfasalazine"),
+    "non-antibiotic sulfonamides": ("furosemide", "bumetanide", "hydrochlorothiazide", "indapamide",
+                                    "acetazolamide"),
+    "fluoroquinolones": ("ciprofloxacin", "levofloxacin", "moxifloxacin", "ofloxacin"),
+    "nsaids": ("aspirin", "ibuprofen", "naproxen", "diclofenac", "ketorolac", "indomethacin",
+               "mefenamic", "ketoprofen"),
+    "cox-2 inhibitors": ("celecoxib", "etoricoxib"),
+    "opioids": ("morphine", "codeine", "hydromorphone", "oxycodone", "hydrocodone", "diamorphine",
+                "dihydrocodeine"),
+    "synthetic opioids": ("fentanyl", "tramadol", "pethidine", "methadone", "tapentadol"),
+    "ace inhibitors": ("lisinopril", "ramipril", "enalapril", "perindopril", "captopril"),
+    "arbs": ("losartan", "candesartan", "valsartan", "irbesartan", "telmisartan"),
+    "neprilysin inhibitors": ("sacubitril",),
+    "iodinated contrast": ("iohexol", "iopamidol", "iodixanol", "iodinated"),
+}
+
+# Recorded allergen (lower case, reaction removed) -> class it rules out
+_ALLERGEN_CLASSES: dict[str, str] = {
+    **dict.fromkeys(("penicillin", "penicillins", "amoxicillin", "ampicillin", "co-amoxiclav"), "penicillins"),
+    **dict.fromkeys(("cephalosporin", "cephalosporins"), "cephalosporins"),
+    **dict.fromkeys(("carbapenem", "carbapenems"), "carbapenems"),
+    **dict.fromkeys(("sulfa", "sulfa drugs", "sulfonamide", "sulfonamides", "sulphonamides",
+                     "co-trimoxazole"), "sulfonamide antibiotics"),
+    **dict.fromkeys(("fluoroquinolone", "fluoroquinolones", "quinolones"), "fluoroquinolones"),
+    **dict.fromkeys(("nsaid", "nsaids"), "nsaids"),
+    **dict.fromkeys(("opioid", "opioids", "opiates"), "opioids"),
+    **dict.fromkeys(("ace inhibitor", "ace inhibitors", "ace-inhibitors", "acei"), "ace inhibitors"),
+    **dict.fromkeys(("iodine contrast", "iodinated contrast", "contrast", "contrast media"), "iodinated contrast"),
+}
+
+# Allergen class or drug -> (cross-reactive class, severity, note)
+_CROSS_REACTIVITY: dict[str, tuple[tuple[str, str, str], ...]] = {
+    "penicillins": (
+        ("cephalosporins", "WARNING", "1–2% cross-reactivity; avoid if the penicillin reaction was anaphylaxis"),
+        ("carbapenems", "WARNING", "<1% cross-reactivity; give the first dose with monitoring"),
+    ),
+    "cephalosporins": (
+        ("penicillins", "WARNING", "1–2% cross-reactivity; confirm the cephalosporin reaction history"),
+    ),
+    "sulfonamide antibiotics": (
+        ("non-antibiotic sulfonamides", "WARNING",
+         "cross-reactivity with non-antibiotic sulfonamides is unlikely; monitor after the first dose"),
+    ),
+    "nsaids": (
+        ("cox-2 inhibitors", "WARNING", "usually tolerated in NSAID hypersensitivity; give the first dose under observation"),
+    ),
+    "aspirin": (
+        ("nsaids", "WARNING", "aspirin-sensitive patients often react to other COX-1 inhibiting NSAIDs"),
+    ),
+    "opioids": (
+        ("synthetic opioids", "WARNING", "low cross-reactivity with morphine-type opioids; monitor"),
+    ),
+    "codeine": (
+        ("opioids", "WARNING", "shares the morphine (phenanthrene) structure; prefer a synthetic opioid such as fentanyl"),
+    ),
+    "morphine": (
+        ("opioids", "WARNING", "shares the morphine (phenanthrene) structure; prefer a synthetic opioid such as fentanyl"),
+    ),
+    "ace inhibitors": (
+        ("arbs", "WARNING", "ARB angioedema cross-reactivity is low; start with monitoring"),
+        ("neprilysin inhibitors", "CRITICAL", "sacubitril/valsartan is contraindicated after ACE-inhibitor angioedema"),
+    ),
+}
+
+_DRUG_CLASS_OF: dict[str, str] = {drug: cls for cls, drugs in _DRUG_CLASSES.items() for drug in drugs}
+_SEVERITY_RANK = {"CRITICAL": 2, "WARNING": 1}
+_TERM = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def drug_terms(text: str) -> frozenset:
+    """Words of a medication name or order; hyphenated names also yield their parts."""
+    terms = set()
+    for term in _TERM.findall(text.lower()):
+        terms.add(term)
+        if "-" in term:
+            terms.update(term.split("-"))
+    return frozenset(terms)
+
+
+def allergen_name(record: str) -> str:
+    """Recorded allergy without its reaction: 'Aspirin (GI intolerance)' -> 'aspirin'."""
+    return " ".join(_TERM.findall(record.split("(")[0].lower()))
+
+
+# =============================================================================
+# PATIENT ALLERGY PROFILES
+# =============================================================================
+def _match(record: str, drug: str, kind: str, drug_class: Optional[str], severity: str, note: str) -> dict:
+    if kind == "allergen":
+        message = f"patient allergic to {record} — {drug} is the recorded allergen"
+    elif kind == "class":
+        message = f"patient allergic to {record} — {drug} is in the {drug_class} class"
+    else:
+        message = f"patient allergic to {record} — {drug} ({drug_class}): {note}"
+    return {"allergy": record, "drug": drug, "drug_class": drug_class, "match": kind,
+            "severity": severity, "message": message}
+
+
+@lru_cache(maxsize=1024)
+def allergy_profile(allergies: tuple[str, ...]) -> dict[str, dict]:
+    """Compiles recorded allergies into drug -> most severe match; cached per allergy list.
+
+    Args:
+        allergies: Allergy records as charted, e.g. ('Sulfa drugs', 'Codeine').
+
+    Returns:
+        dict: Drug name (lower case) -> match dict with ``allergy``, ``drug``,
+              ``drug_class``, ``match`` ('allergen', 'class' or
+              'cross-reactivity'), ``severity`` and ``message``.
+    """
+    profile: dict[str, dict] = {}
+
+    def add(match: dict) -> None:
+        current = profile.get(match["drug"])
+        if current is None or _SEVERITY_RANK[match["severity"]] > _SEVERITY_RANK[current["severity"]]:
+            profile[match["drug"]] = match
+
+    for record in allergies:
+        allergen = allergen_name(record)
+        if not allergen:
+            continue
+        drug_class = _ALLERGEN_CLASSES.get(allergen)
+        # An unlisted allergen rules out the drug it names
+        literal = allergen if drug_class or " " not in allergen else allergen.split()[0]
+        add(_match(record, literal, "allergen", _DRUG_CLASS_OF.get(literal), "CRITICAL", ""))
+        for drug in _DRUG_CLASSES.get(drug_class, ()):
+            if drug != literal:
+                add(_match(record, drug, "class", drug_class, "CRITICAL", ""))
+        for source in dict.fromkeys((drug_class, literal)):
+            for cross_class, severity, note in _CROSS_REACTIVITY.get(source, ()):
+                for drug in _DRUG_CLASSES[cross_class]:
+                    add(_match(record, drug, "cross-reactivity", cross_class, severity, note))
+    return profile
+
+
+def match_terms(profile: dict[str, dict], terms: Iterable[str]) -> list[dict]:
+    """Matches a patient's profile against precomputed ``drug_terms``."""
+    return [profile[term] for term in terms if term in profile]
+
+
+def check_medication(allergies: Sequence[str], medication: str) -> list[dict]:
+    """Allergy and cross-reactivity matches for one medication.
+
+    Args:
+        allergies: Allergy records as charted.
+        medication: Medication name or order text, e.g. 'Piperacillin-Tazobactam 4.5g'.
+
+    Returns:
+        list: Match dicts from ``allergy_profile``, most severe first.
+    """
+    matches = match_terms(allergy_profile(tuple(allergies)), drug_terms(medication))
+    return sorted(matches, key=lambda match: (-_SEVERITY_RANK[match["severity"]], match["drug"]))
+
+
+def patient_allergies(patient_id: str) -> list[str]:
+    """Allergy records from the patient record, the single allergy source."""
+    from .common_tools import _PATIENT_DB
+    return list(_PATIENT_DB.get(patient_id, {}).get("allergies", []))
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="List the drugs a patient's recorded allergies rule out.")
+    parser.add_argument("patient_id")
+    parser.add_argument("--drug", help="Check one medication instead of listing the whole profile.")
+    args = parser.parse_args(argv)
+    allergies = patient_allergies(args.patient_id)
+    if args.drug:
+        report = check_medication(allergies, args.drug)
+    else:
+        report = {"allergies": allergies,
+                  "rules_out": {drug: match["message"] for drug, match in allergy_profile(tuple(allergies)).items()}}
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
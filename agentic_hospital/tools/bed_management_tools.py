@@ -6,10 +6,17 @@ discharge, inter-ward transfer, and priority waitlist management.
 """
 
 import datetime
+import math
 from typing import Optional
 
+from ..infra import clock
+from ..infra.backend import dropped_front, register_store, state_transaction
+from ..infra.event_log import log_event, register_log
+from ..infra.state import locked, named_lock
+
 # Import patient registry for cross-reference
 from .common_tools import _PATIENT_DB
+from .vitals_series import discard_series
 
 
 # =============================================================================
@@ -590,6 +597,37 @@ _WAITLIST: dict[str, list] = {ward: [] for ward in _BED_DB}
 # =============================================================================
 _ADMISSION_LOG: list[dict] = []
 
+# =============================================================================
+# PATIENT → BED INDEX
+# Every bed write goes through _set_bed so lookups by patient are O(1).
+# Anonymous census beds (patient_id "") are not indexed.
+# =============================================================================
+_PATIENT_BEDS: dict[str, tuple[str, str]] = {}
+
+
+def _reindex_ward(ward_name: str, old: Optional[dict], new: Optional[dict]) -> None:
+    """Re-derives one ward's index entries after it is reloaded from the backend."""
+    for pid, (ward, _) in list(_PATIENT_BEDS.items()):
+        if ward == ward_name:
+            _PATIENT_BEDS.pop(pid, None)
+    for bed_id, bed in (new or {}).get("beds", {}).items():
+        if bed["patient_id"]:
+            _PATIENT_BEDS[bed["patient_id"]] = (ward_name, bed_id)
+
+
+def _rebuild_patient_beds() -> None:
+    """Rebuilds the patient → bed index from scratch (after bulk restores)."""
+    _PATIENT_BEDS.clear()
+    for ward_name, ward_data in _BED_DB.items():
+        _reindex_ward(ward_name, None, ward_data)
+
+
+register_store("beds.wards", _BED_DB, "keyed", scope="ward", on_load=_reindex_ward)
+_rebuild_patient_beds()
+register_store("beds.waitlist", _WAITLIST, "keyed", scope="ward")
+register_store("beds.admission_log", _ADMISSION_LOG, "append")
+register_log("beds.admission_log", _ADMISSION_LOG)
+
 
 # =============================================================================
 # HELPERS
@@ -613,11 +651,18 @@ def _count_beds(ward_data: dict) -> tuple[int, int, int, int]:
 
 def _find_patient_bed(patient_id: str) -> tuple[Optional[str], Optional[str]]:
     """Finds (ward_name, bed_id) for a patient. Returns (None, None) if not found."""
-    for ward_name, ward_data in _BED_DB.items():
-        for bed_id, bed in ward_data["beds"].items():
-            if bed["patient_id"] == patient_id:
-                return ward_name, bed_id
-    return None, None
+    return _PATIENT_BEDS.get(patient_id, (None, None))
+
+
+def _set_bed(ward_name: str, bed_id: str, bed: dict) -> None:
+    """Replaces a bed record and keeps the patient → bed index in step. Caller holds the ward lock."""
+    beds = _BED_DB[ward_name]["beds"]
+    previous = beds.get(bed_id)
+    if previous and _PATIENT_BEDS.get(previous["patient_id"]) == (ward_name, bed_id):
+        del _PATIENT_BEDS[previous["patient_id"]]
+    beds[bed_id] = bed
+    if bed["patient_id"]:
+        _PATIENT_BEDS[bed["patient_id"]] = (ward_name, bed_id)
 
 
 def _first_available_bed(ward_name: str) -> Optional[str]:
@@ -641,21 +686,216 @@ def _normalise_ward(ward: str) -> Optional[str]:
 
 
 def _log_event(event_type: str, patient_id: str, ward: str, bed_id: str,
-               details: str) -> None:
-    _ADMISSION_LOG.append({
+               details: str, **extra) -> None:
+    log_event("beds.admission_log", {
         "event_type": event_type,
         "patient_id": patient_id,
         "ward": ward,
         "bed_id": bed_id,
         "details": details,
-        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    })
+        "timestamp": clock.now().strftime("%Y-%m-%d %H:%M:%S"),
+        **extra,
+    }, key=patient_id)
+
+
+# =============================================================================
+# WAIT-TIME ESTIMATOR
+# Learns each ward's bed-release rate (discharges and transfers out), its
+# waitlist arrival rate per priority and its cleaning turnaround from
+# _ADMISSION_LOG. Rates are exponentially weighted over _FLOW_TAU_HOURS. New
+# log entries are folded in incrementally before each query, so an ETA costs
+# the same however long the log grows.
+#
+# Releases are treated as a Poisson process with rate λ. A patient at
+# waitlist position k, with c beds already being cleaned, needs n = k − c
+# releases, plus one for each higher-priority patient who joins meanwhile
+# (rate a, about a·n/λ of them). The wait is taken as Gamma(n, λ²/(λ + a))
+# plus a cleaning turnaround. This first-order correction stays bounded when
+# a noisy estimate of a approaches λ. Bands are the gamma 10th/90th
+# percentiles (Wilson–Hilferty).
+# =============================================================================
+_FLOW_TAU_HOURS = 72.0        # time constant of the exponential weighting
+_FLOW_PRIOR_HOURS = 24.0      # weight of the prior, in hours of observation
+_FLOW_PRIOR_LOS_DAYS = 5.0    # prior release rate = capacity / this
+_TURNOVER_PRIOR_MIN = 30.0    # prior cleaning turnaround (minutes)
+_TURNOVER_ALPHA = 0.2         # EWMA weight of each new turnaround sample
+_BAND_Z = 1.2816              # 10th / 90th percentile
+
+_FLOW: dict[str, dict] = {}
+_FLOW_META = {"processed": 0, "t0": None}
+_FLOW_LOCK = named_lock("bed_wait_estimator")
+
+
+def _reset_flow() -> None:
+    _FLOW.clear()
+    for ward_name in _BED_DB:
+        _FLOW[ward_name] = {
+            "weight": 0.0, "last": None, "releases": 0,
+            "joins": {p: [0.0, None] for p in _PRIORITY_ORDER},   # priority → [weight, last]
+            "turn_mean": _TURNOVER_PRIOR_MIN, "turn_var": (_TURNOVER_PRIOR_MIN / 2) ** 2, "turnovers": 0,
+            "cleaning_since": {},
+        }
+    _FLOW_META["processed"] = 0
+    _FLOW_META["t0"] = None
+
+
+def _decayed(weight: float, last: Optional[float], ts: float) -> float:
+    if last is None:
+        return weight
+    return weight * math.exp(-max(ts - last, 0.0) / (_FLOW_TAU_HOURS * 3600.0))
+
+
+def _observe_release(ward_name: str, bed_id: str, ts: float) -> None:
+    flow = _FLOW[ward_name]
+    flow["weight"] = _decayed(flow["weight"], flow["last"], ts) + 1.0
+    flow["last"] = ts
+    flow["releases"] += 1
+    flow["cleaning_since"][bed_id] = ts
+
+
+def _observe_join(ward_name: str, priority: str, ts: float) -> None:
+    joins = _FLOW[ward_name]["joins"].get(priority)
+    if joins is not None:
+        joins[0] = _decayed(joins[0], joins[1], ts) + 1.0
+        joins[1] = ts
+
+
+def _observe_ready(ward_name: str, bed_id: str, ts: float) -> None:
+    flow = _FLOW[ward_name]
+    released = flow["cleaning_since"].pop(bed_id, None)
+    if released is None:
+        return  # back from maintenance, or cleaning began before the log did
+    minutes = max((ts - released) / 60.0, 0.0)
+    delta = minutes - flow["turn_mean"]
+    flow["turn_mean"] += _TURNOVER_ALPHA * delta
+    flow["turn_var"] = (1 - _TURNOVER_ALPHA) * (flow["turn_var"] + _TURNOVER_ALPHA * delta * delta)
+    flow["turnovers"] += 1
+
+
+def _observe_bed_event(record: dict) -> None:
+    try:
+        ts = datetime.datetime.strptime(record["timestamp"], "%Y-%m-%d %H:%M:%S").timestamp()
+    except (KeyError, ValueError):
+        return
+    if _FLOW_META["t0"] is None:
+        _FLOW_META["t0"] = ts
+    event = record.get("event_type")
+    if event == "DISCHARGE" and record["ward"] in _FLOW:
+        _observe_release(record["ward"], record["bed_id"], ts)
+    elif event == "TRANSFER":
+        source_ward = record["ward"].split(" → ")[0]
+        if source_ward in _FLOW:
+            _observe_release(source_ward, record["bed_id"].split(" → ")[0], ts)
+    elif event == "BED_READY" and record["ward"] in _FLOW:
+        _observe_ready(record["ward"], record["bed_id"], ts)
+    elif event == "WAITLISTED" and record["ward"] in _FLOW:
+        _observe_join(record["ward"], record.get("priority", "routine"), ts)
+
+
+def _sync_flow() -> None:
+    """Folds admission-log entries written since the last call (by any worker) into the rates."""
+    with _FLOW_LOCK:
+        base = dropped_front(_ADMISSION_LOG)
+        total = base + len(_ADMISSION_LOG)
+        if _FLOW_META["processed"] > total:
+            _reset_flow()  # log was replaced (state restore)
+        start = max(_FLOW_META["processed"], base)
+        for record in _ADMISSION_LOG[start - base:]:
+            _observe_bed_event(record)
+        _FLOW_META["processed"] = total
+
+
+def _rebuild_wait_estimator() -> None:
+    """Relearns the wait-time estimator from the admission log (after bulk restores)."""
+    with _FLOW_LOCK:
+        _reset_flow()
+    _sync_flow()
+
+
+def _observed_hours(now_ts: float) -> float:
+    """Effective hours of history behind the exponentially weighted rates."""
+    t0 = _FLOW_META["t0"]
+    if t0 is None:
+        return 0.0
+    return _FLOW_TAU_HOURS * (1 - math.exp(-max(now_ts - t0, 0.0) / (_FLOW_TAU_HOURS * 3600.0)))
+
+
+def _release_rate_per_hour(ward_name: str, now_ts: float) -> float:
+    """Exponentially weighted release rate, shrunk towards capacity / prior LOS."""
+    flow = _FLOW[ward_name]
+    weight = _decayed(flow["weight"], flow["last"], now_ts)
+    prior_rate = _BED_DB[ward_name]["capacity"] / (_FLOW_PRIOR_LOS_DAYS * 24.0)
+    return (weight + prior_rate * _FLOW_PRIOR_HOURS) / (_observed_hours(now_ts) + _FLOW_PRIOR_HOURS)
+
+
+def _outranking_join_rate_per_hour(ward_name: str, priority: str, now_ts: float) -> float:
+    """Rate at which patients who would be placed ahead of ``priority`` join the waitlist."""
+    hours = _observed_hours(now_ts)
+    if hours <= 0:
+        return 0.0
+    rank = _PRIORITY_ORDER.get(priority, _PRIORITY_ORDER["routine"])
+    joins = _FLOW[ward_name]["joins"]
+    return sum(_decayed(w, last, now_ts) for p, (w, last) in joins.items() if _PRIORITY_ORDER[p] < rank) / hours
+
+
+def _gamma_quantile(shape: float, rate: float, z: float) -> float:
+    """Wilson–Hilferty approximation to a Gamma(shape, rate) quantile."""
+    h = 1.0 / (9.0 * shape)
+    return max(shape * (1.0 - h + z * math.sqrt(h)) ** 3, 0.0) / rate
+
+
+def _estimate_bed_wait(ward_name: str, position: int, priority: str = "routine",
+                       cleaning: Optional[int] = None) -> dict:
+    """ETA in minutes, with an 80% band, for the patient at ``position`` on a ward's waitlist.
+
+    Caller has run ``_sync_flow()``.
+    """
+    flow = _FLOW[ward_name]
+    if cleaning is None:
+        cleaning = _count_beds(_BED_DB[ward_name])[1]
+    now_ts = clock.now().timestamp()
+    release_rate = _release_rate_per_hour(ward_name, now_ts)
+    outranking = _outranking_join_rate_per_hour(ward_name, priority, now_ts)
+    leftover = release_rate * release_rate / (release_rate + outranking)
+    rate = leftover / 60.0   # per minute
+    turn_mean = flow["turn_mean"]
+    turn_sd = math.sqrt(max(flow["turn_var"], 0.0))
+    needed = max(position - cleaning, 0)
+    if needed == 0:
+        mean, low, high = turn_mean, max(turn_mean - _BAND_Z * turn_sd, 0.0), turn_mean + _BAND_Z * turn_sd
+    else:
+        mean = needed / rate + turn_mean
+        low = _gamma_quantile(needed, rate, -_BAND_Z) + turn_mean
+        high = _gamma_quantile(needed, rate, _BAND_Z) + turn_mean
+    return {
+        "minutes": int(round(mean)),
+        "low": int(round(low)),
+        "high": int(round(high)),
+        "releases_per_day": round(release_rate * 24.0, 1),
+        "releases_left_per_day": round(leftover * 24.0, 1),
+        "turnover_minutes": int(round(turn_mean)),
+        "observed_releases": flow["releases"],
+    }
+
+
+def _format_minutes(minutes: int) -> str:
+    hours, mins = divmod(int(minutes), 60)
+    return f"{hours}h {mins}min" if hours else f"{mins} min"
+
+
+def _format_eta(eta: dict) -> str:
+    return f"~{_format_minutes(eta['minutes'])} ({_format_minutes(eta['low'])}–{_format_minutes(eta['high'])})"
+
+
+_reset_flow()
+_sync_flow()
 
 
 # =============================================================================
 # TOOL FUNCTIONS
 # =============================================================================
 
+@state_transaction(readonly=True)
 def get_hospital_dashboard() -> dict:
     """Generates a real-time hospital-wide bed management dashboard.
 
@@ -667,10 +907,11 @@ def get_hospital_dashboard() -> dict:
         dict: Dashboard markdown string, per-ward statistics, and hospital-level
               summary including total capacity, occupancy rate, and ward alerts.
     """
-    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    now = clock.now().strftime("%Y-%m-%d %H:%M")
     total_cap = total_occ = total_cln = total_mnt = total_avl = 0
     rows = []
     critical_wards = []
+    ward_statistics = {}
 
     for ward_name, ward_data in _BED_DB.items():
         occ, cln, mnt, avl = _count_beds(ward_data)
@@ -689,6 +930,10 @@ def get_hospital_dashboard() -> dict:
         )
         if pct >= 90:
             critical_wards.append(f"{display} ({pct}%)")
+        ward_statistics[ward_name] = {
+            "capacity": cap, "occupied": occ, "cleaning": cln, "maintenance": mnt,
+            "available": avl, "occupancy_pct": pct, "waitlist": len(_WAITLIST.get(ward_name, [])),
+        }
 
     total_pct = round((total_occ / total_cap) * 100) if total_cap else 0
     waitlist_total = sum(len(wl) for wl in _WAITLIST.values())
@@ -736,6 +981,7 @@ def get_hospital_dashboard() -> dict:
             "waitlist_total": waitlist_total,
             "critical_wards": critical_wards,
         },
+        "ward_statistics": ward_statistics,
         "timestamp": now,
         "note": (
             "Render `dashboard_markdown` in your response. "
@@ -745,6 +991,7 @@ def get_hospital_dashboard() -> dict:
     }
 
 
+@state_transaction(readonly=True)
 def get_ward_visualization(ward: str) -> dict:
     """Generates an ASCII floor-plan visualisation for a specific inpatient ward.
 
@@ -848,6 +1095,7 @@ def get_ward_visualization(ward: str) -> dict:
     }
 
 
+@state_transaction(readonly=True)
 def check_bed_availability(ward: str = "all") -> dict:
     """Checks bed availability for one specific ward or across all wards.
 
@@ -917,6 +1165,7 @@ def check_bed_availability(ward: str = "all") -> dict:
     }
 
 
+@state_transaction
 def assign_bed(
     patient_id: str,
     ward: str,
@@ -946,69 +1195,78 @@ def assign_bed(
             "message": f"Ward '{ward}' not recognised. Available: {list(_BED_DB.keys())}",
         }
 
-    # Check if already admitted
-    existing_ward, existing_bed = _find_patient_bed(patient_id)
-    if existing_ward:
-        return {
-            "status": "already_admitted",
-            "message": (
-                f"Patient {patient_id} is already in {existing_ward} / {existing_bed}. "
-                "Use transfer_patient_bed to move them."
-            ),
-            "current_ward": existing_ward,
-            "current_bed": existing_bed,
-        }
+    with locked(patients=[patient_id], wards=[ward_key]):
+        # Check if already admitted
+        existing_ward, existing_bed = _find_patient_bed(patient_id)
+        if existing_ward:
+            return {
+                "status": "already_admitted",
+                "message": (
+                    f"Patient {patient_id} is already in {existing_ward} / {existing_bed}. "
+                    "Use transfer_patient_bed to move them."
+                ),
+                "current_ward": existing_ward,
+                "current_bed": existing_bed,
+            }
 
-    patient = _PATIENT_DB.get(patient_id, {})
-    patient_name = patient.get("name", patient_id)
-    now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        patient = _PATIENT_DB.get(patient_id, {})
+        patient_name = patient.get("name", patient_id)
+        now_str = clock.now().strftime("%Y-%m-%d %H:%M")
 
-    bed_id = _first_available_bed(ward_key)
-    if bed_id is None:
-        # Auto-waitlist
-        wl_result = add_to_waitlist(patient_id, ward_key, priority, reason)
-        return {
-            "status": "waitlisted",
-            "message": (
-                f"No beds available in {ward_key.replace('_',' ')}. "
-                f"{patient_name} added to waitlist at position {wl_result.get('waitlist_position', '?')}."
-            ),
-            "waitlist_details": wl_result,
-        }
+        bed_id = _first_available_bed(ward_key)
+        if bed_id is None:
+            # Auto-waitlist
+            wl_result = add_to_waitlist(patient_id, ward_key, priority, reason)
+            return {
+                "status": "waitlisted",
+                "message": (
+                    f"No beds available in {ward_key.replace('_',' ')}. "
+                    f"{patient_name} added to waitlist at position {wl_result.get('waitlist_position', '?')}."
+                ),
+                "waitlist_details": wl_result,
+            }
 
-    # Assign the bed
-    _BED_DB[ward_key]["beds"][bed_id] = _make_bed(
-        "occupied", patient_id, patient_name, now_str, reason,
-    )
+        # Assign the bed
+        _set_bed(ward_key, bed_id, _make_bed(
+            "occupied", patient_id, patient_name, now_str, reason,
+        ))
 
-    _log_event("ADMISSION", patient_id, ward_key, bed_id,
-               f"Admitted: {reason} | Priority: {priority}")
+        _log_event("ADMISSION", patient_id, ward_key, bed_id,
+                   f"Admitted: {reason} | Priority: {priority}")
 
-    occ, cln, mnt, avl = _count_beds(_BED_DB[ward_key])
+        # An admitted patient no longer waits for this ward
+        waitlist = _WAITLIST.get(ward_key, [])
+        was_waitlisted = any(e["patient_id"] == patient_id for e in waitlist)
+        if was_waitlisted:
+            waitlist[:] = [e for e in waitlist if e["patient_id"] != patient_id]
 
-    return {
-        "status": "admitted",
-        "patient_id": patient_id,
-        "patient_name": patient_name,
-        "bed_id": bed_id,
-        "ward": ward_key,
-        "floor": _BED_DB[ward_key]["floor"],
-        "nurse_station": _BED_DB[ward_key]["nurse_station"],
-        "bed_type": _BED_DB[ward_key]["bed_type"],
-        "diagnosis_on_admission": reason,
-        "priority": priority,
-        "admission_time": now_str,
-        "ward_occupancy_after": f"{occ}/{_BED_DB[ward_key]['capacity']}",
-        "patient_allergies": patient.get("allergies", []),
-        "patient_medications": patient.get("current_medications", []),
-        "message": (
-            f"✅ {patient_name} admitted to {ward_key.replace('_',' ')} — Bed {bed_id} "
-            f"(Floor {_BED_DB[ward_key]['floor']}) at {now_str}."
-        ),
-        "next_action": f"Call get_ward_visualization('{ward_key}') to confirm bed assignment.",
-    }
+        occ, cln, mnt, avl = _count_beds(_BED_DB[ward_key])
+
+        return {
+            "status": "admitted",
+            "patient_id": patient_id,
+            "patient_name": patient_name,
+            "bed_id": bed_id,
+            "ward": ward_key,
+            "floor": _BED_DB[ward_key]["floor"],
+            "nurse_station": _BED_DB[ward_key]["nurse_station"],
+            "bed_type": _BED_DB[ward_key]["bed_type"],
+            "diagnosis_on_admission": reason,
+            "priority": priority,
+            "admission_time": now_str,
+            "removed_from_waitlist": was_waitlisted,
+            "ward_occupancy_after": f"{occ}/{_BED_DB[ward_key]['capacity']}",
+            "patient_allergies": patient.get("allergies", []),
+            "patient_medications": patient.get("current_medications", []),
+            "message": (
+                f"✅ {patient_name} admitted to {ward_key.replace('_',' ')} — Bed {bed_id} "
+                f"(Floor {_BED_DB[ward_key]['floor']}) at {now_str}."
+            ),
+            "next_action": f"Call get_ward_visualization('{ward_key}') to confirm bed assignment.",
+        }
 
 
+@state_transaction
 def discharge_patient_from_bed(
     patient_id: str,
     discharge_notes: str = "",
@@ -1027,80 +1285,84 @@ def discharge_patient_from_bed(
         dict: Discharge confirmation with length of stay, freed bed details,
               and waitlist notification if applicable.
     """
-    ward_key, bed_id = _find_patient_bed(patient_id)
-    if not ward_key:
-        return {
-            "status": "not_found",
-            "message": f"Patient '{patient_id}' is not currently admitted to any ward.",
-        }
-
-    bed = _BED_DB[ward_key]["beds"][bed_id]
-    patient_name = bed["patient_name"]
-    admitted_str = bed["admitted"]
-    diagnosis = bed["diagnosis"]
-    now = datetime.datetime.now()
-    now_str = now.strftime("%Y-%m-%d %H:%M")
-
-    # Calculate length of stay
-    los_str = "Unknown"
-    try:
-        admitted_dt = datetime.datetime.strptime(admitted_str, "%Y-%m-%d %H:%M")
-        delta = now - admitted_dt
-        days = delta.days
-        hours = delta.seconds // 3600
-        los_str = f"{days}d {hours}h"
-    except (ValueError, TypeError):
-        pass
-
-    # Free the bed → cleaning
-    _BED_DB[ward_key]["beds"][bed_id] = _make_bed(
-        "cleaning", notes="Post-discharge cleaning — ready ~15 min"
-    )
-    _log_event("DISCHARGE", patient_id, ward_key, bed_id,
-               f"Discharged. LoS: {los_str}. Notes: {discharge_notes or 'None'}")
-
-    # Check waitlist
-    waitlist_notification = None
-    wl = _WAITLIST.get(ward_key, [])
-    if wl:
-        next_patient = wl[0]
-        waitlist_notification = {
-            "next_patient_id": next_patient["patient_id"],
-            "next_patient_name": next_patient.get("patient_name", next_patient["patient_id"]),
-            "priority": next_patient["priority"],
-            "reason": next_patient["reason"],
-            "message": (
-                f"📋 Waitlist notification: {next_patient.get('patient_name', next_patient['patient_id'])} "
-                f"(priority: {next_patient['priority']}) is next in queue for {ward_key.replace('_',' ')}. "
-                f"Bed {bed_id} will be ready after cleaning (~15 min). "
-                "Call assign_bed to complete their admission."
-            ),
-        }
+    with locked(patients=[patient_id]):
+        ward_key, bed_id = _find_patient_bed(patient_id)
+        if not ward_key:
+            return {
+                "status": "not_found",
+                "message": f"Patient '{patient_id}' is not currently admitted to any ward.",
+            }
 
-    occ, cln, mnt, avl = _count_beds(_BED_DB[ward_key])
+        with locked(wards=[ward_key]):
+            bed = _BED_DB[ward_key]["beds"][bed_id]
+            patient_name = bed["patient_name"]
+            admitted_str = bed["admitted"]
+            diagnosis = bed["diagnosis"]
+            now = clock.now()
+            now_str = now.strftime("%Y-%m-%d %H:%M")
+
+            # Calculate length of stay
+            los_str = "Unknown"
+            try:
+                admitted_dt = datetime.datetime.strptime(admitted_str, "%Y-%m-%d %H:%M")
+                delta = now - admitted_dt
+                days = delta.days
+                hours = delta.seconds // 3600
+                los_str = f"{days}d {hours}h"
+            except (ValueError, TypeError):
+                pass
+
+            # Free the bed → cleaning
+            _set_bed(ward_key, bed_id, _make_bed(
+                "cleaning", notes="Post-discharge cleaning — ready ~15 min"
+            ))
+            _log_event("DISCHARGE", patient_id, ward_key, bed_id,
+                       f"Discharged. LoS: {los_str}. Notes: {discharge_notes or 'None'}")
+            discard_series(patient_id)
+
+            # Check waitlist
+            waitlist_notification = None
+            wl = _WAITLIST.get(ward_key, [])
+            if wl:
+                next_patient = wl[0]
+                waitlist_notification = {
+                    "next_patient_id": next_patient["patient_id"],
+                    "next_patient_name": next_patient.get("patient_name", next_patient["patient_id"]),
+                    "priority": next_patient["priority"],
+                    "reason": next_patient["reason"],
+                    "message": (
+                        f"📋 Waitlist notification: {next_patient.get('patient_name', next_patient['patient_id'])} "
+                        f"(priority: {next_patient['priority']}) is next in queue for {ward_key.replace('_',' ')}. "
+                        f"Bed {bed_id} will be ready after cleaning (~15 min). "
+                        "Call assign_bed to complete their admission."
+                    ),
+                }
+
+            occ, cln, mnt, avl = _count_beds(_BED_DB[ward_key])
 
-    return {
-        "status": "discharged",
-        "patient_id": patient_id,
-        "patient_name": patient_name,
-        "ward": ward_key,
-        "bed_id": bed_id,
-        "primary_diagnosis": diagnosis,
-        "discharge_time": now_str,
-        "length_of_stay": los_str,
-        "discharge_notes": discharge_notes or "No additional notes.",
-        "bed_status_now": "cleaning",
-        "ward_occupancy_after": f"{occ}/{_BED_DB[ward_key]['capacity']}",
-        "waitlist_notification": waitlist_notification,
-        "message": (
-            f"✅ {patient_name} discharged from {ward_key.replace('_',' ')} / {bed_id} "
-            f"at {now_str}. Length of stay: {los_str}. "
-            f"Bed set to cleaning — available for new admission in ~15 min."
-        ),
-        "next_action": f"Call get_ward_visualization('{ward_key}') to see updated ward status.",
-    }
+            return {
+                "status": "discharged",
+                "patient_id": patient_id,
+                "patient_name": patient_name,
+                "ward": ward_key,
+                "bed_id": bed_id,
+                "primary_diagnosis": diagnosis,
+                "discharge_time": now_str,
+                "length_of_stay": los_str,
+                "discharge_notes": discharge_notes or "No additional notes.",
+                "bed_status_now": "cleaning",
+                "ward_occupancy_after": f"{occ}/{_BED_DB[ward_key]['capacity']}",
+                "waitlist_notification": waitlist_notification,
+                "message": (
+                    f"✅ {patient_name} discharged from {ward_key.replace('_',' ')} / {bed_id} "
+                    f"at {now_str}. Length of stay: {los_str}. "
+                    f"Bed set to cleaning — available for new admission in ~15 min."
+                ),
+                "next_action": f"Call get_ward_visualization('{ward_key}') to see updated ward status.",
+            }
 
 
+@state_transaction
 def transfer_patient_bed(
     patient_id: str,
     target_ward: str,
@@ -1120,86 +1382,154 @@ def transfer_patient_bed(
         dict: Transfer confirmation with old and new bed details, transfer time,
               or error if no bed is available in the target ward.
     """
-    # Find current location
-    source_ward, source_bed = _find_patient_bed(patient_id)
-    if not source_ward:
-        return {
-            "status": "not_found",
-            "message": f"Patient '{patient_id}' is not currently admitted to any ward.",
-        }
+    with locked(patients=[patient_id]):
+        # Find current location
+        source_ward, source_bed = _find_patient_bed(patient_id)
+        if not source_ward:
+            return {
+                "status": "not_found",
+                "message": f"Patient '{patient_id}' is not currently admitted to any ward.",
+            }
 
-    target_key = _normalise_ward(target_ward)
-    if not target_key:
-        return {
-            "status": "error",
-            "message": f"Target ward '{target_ward}' not recognised.",
-            "available_wards": list(_BED_DB.keys()),
-        }
+        target_key = _normalise_ward(target_ward)
+        if not target_key:
+            return {
+                "status": "error",
+                "message": f"Target ward '{target_ward}' not recognised.",
+                "available_wards": list(_BED_DB.keys()),
+            }
 
-    if source_ward == target_key:
-        return {
-            "status": "error",
-            "message": f"Patient is already in {target_key.replace('_',' ')}. No transfer needed.",
-        }
+        if source_ward == target_key:
+            return {
+                "status": "error",
+                "message": f"Patient is already in {target_key.replace('_',' ')}. No transfer needed.",
+            }
+
+        with locked(wards=[source_ward, target_key]):
+            new_bed_id = _first_available_bed(target_key)
+            if new_bed_id is None:
+                return {
+                    "status": "no_capacity",
+                    "message": (
+                        f"No available beds in {target_key.replace('_',' ')}. "
+                        "Call add_to_waitlist or check another ward."
+                    ),
+                    "target_ward": target_key,
+                }
+
+            bed = _BED_DB[source_ward]["beds"][source_bed]
+            patient_name = bed["patient_name"]
+            original_admission = bed["admitted"]
+            now_str = clock.now().strftime("%Y-%m-%d %H:%M")
+
+            # Free source bed
+            _set_bed(source_ward, source_bed, _make_bed(
+                "cleaning", notes=f"Post-transfer cleaning — patient moved to {target_key.replace('_',' ')}"
+            ))
+
+            # Assign target bed (preserve original admission time)
+            _set_bed(target_key, new_bed_id, _make_bed(
+                "occupied", patient_id, patient_name, original_admission, reason,
+            ))
+
+            _log_event("TRANSFER", patient_id, f"{source_ward} → {target_key}",
+                       f"{source_bed} → {new_bed_id}", reason)
+
+            src_occ, *_ = _count_beds(_BED_DB[source_ward])
+            tgt_occ, *_ = _count_beds(_BED_DB[target_key])
+
+            return {
+                "status": "transferred",
+                "patient_id": patient_id,
+                "patient_name": patient_name,
+                "from_ward": source_ward,
+                "from_bed": source_bed,
+                "to_ward": target_key,
+                "to_bed": new_bed_id,
+                "to_floor": _BED_DB[target_key]["floor"],
+                "to_nurse_station": _BED_DB[target_key]["nurse_station"],
+                "transfer_reason": reason,
+                "transfer_time": now_str,
+                "source_ward_occupancy_after": f"{src_occ}/{_BED_DB[source_ward]['capacity']}",
+                "target_ward_occupancy_after": f"{tgt_occ}/{_BED_DB[target_key]['capacity']}",
+                "message": (
+                    f"✅ {patient_name} transferred from {source_ward.replace('_',' ')}/{source_bed} "
+                    f"→ {target_key.replace('_',' ')}/{new_bed_id} (Floor {_BED_DB[target_key]['floor']}) "
+                    f"at {now_str}."
+                ),
+                "next_action": (
+                    f"Call get_ward_visualization('{source_ward}') and "
+                    f"get_ward_visualization('{target_key}') to confirm both wards."
+                ),
+            }
 
-    new_bed_id = _first_available_bed(target_key)
-    if new_bed_id is None:
+
+@state_transaction
+def mark_bed_ready(ward: str, bed_id: str) -> dict:
+    """Returns a cleaned or repaired bed to service (housekeeping / engineering sign-off).
+
+    Args:
+        ward: Ward name.
+        bed_id: Bed identifier (e.g., 'ICU-07').
+
+    Returns:
+        dict: The bed's new status and the next waitlisted patient, if any.
+    """
+    ward_key = _normalise_ward(ward)
+    if not ward_key or bed_id not in _BED_DB[ward_key]["beds"]:
+        return {"status": "error", "message": f"Bed '{bed_id}' not found in ward '{ward}'."}
+
+    with locked(wards=[ward_key]):
+        bed = _BED_DB[ward_key]["beds"][bed_id]
+        if bed["status"] not in ("cleaning", "maintenance"):
+            return {
+                "status": "error",
+                "message": f"Bed {bed_id} is {bed['status']}; only cleaning or maintenance beds can be marked ready.",
+            }
+        previous = bed["status"]
+        _set_bed(ward_key, bed_id, _make_bed("available"))
+        _log_event("BED_READY", "", ward_key, bed_id, f"Returned to service after {previous}")
+        waitlist = _WAITLIST.get(ward_key, [])
         return {
-            "status": "no_capacity",
-            "message": (
-                f"No available beds in {target_key.replace('_',' ')}. "
-                "Call add_to_waitlist or check another ward."
-            ),
-            "target_ward": target_key,
+            "status": "available",
+            "ward": ward_key,
+            "bed_id": bed_id,
+            "previous_status": previous,
+            "next_waitlisted_patient": waitlist[0]["patient_id"] if waitlist else None,
         }
 
-    bed = _BED_DB[source_ward]["beds"][source_bed]
-    patient_name = bed["patient_name"]
-    original_admission = bed["admitted"]
-    now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
 
-    # Free source bed
-    _BED_DB[source_ward]["beds"][source_bed] = _make_bed(
-        "cleaning", notes=f"Post-transfer cleaning — patient moved to {target_key.replace('_',' ')}"
-    )
+@state_transaction
+def set_bed_out_of_service(ward: str, bed_id: str, notes: str = "") -> dict:
+    """Takes an available bed out of service for maintenance.
 
-    # Assign target bed (preserve original admission time)
-    _BED_DB[target_key]["beds"][new_bed_id] = _make_bed(
-        "occupied", patient_id, patient_name, original_admission, reason,
-    )
-
-    _log_event("TRANSFER", patient_id, f"{source_ward} → {target_key}",
-               f"{source_bed} → {new_bed_id}", reason)
+    Args:
+        ward: Ward name.
+        bed_id: Bed identifier.
+        notes: Reason (e.g., 'Bed motor fault').
 
-    src_occ, *_ = _count_beds(_BED_DB[source_ward])
-    tgt_occ, *_ = _count_beds(_BED_DB[target_key])
+    Returns:
+        dict: Confirmation, or an error if the bed is not available.
+    """
+    ward_key = _normalise_ward(ward)
+    if not ward_key or bed_id not in _BED_DB[ward_key]["beds"]:
+        return {"status": "error", "message": f"Bed '{bed_id}' not found in ward '{ward}'."}
 
-    return {
-        "status": "transferred",
-        "patient_id": patient_id,
-        "patient_name": patient_name,
-        "from_ward": source_ward,
-        "from_bed": source_bed,
-        "to_ward": target_key,
-        "to_bed": new_bed_id,
-        "to_floor": _BED_DB[target_key]["floor"],
-        "to_nurse_station": _BED_DB[target_key]["nurse_station"],
-        "transfer_reason": reason,
-        "transfer_time": now_str,
-        "source_ward_occupancy_after": f"{src_occ}/{_BED_DB[source_ward]['capacity']}",
-        "target_ward_occupancy_after": f"{tgt_occ}/{_BED_DB[target_key]['capacity']}",
-        "message": (
-            f"✅ {patient_name} transferred from {source_ward.replace('_',' ')}/{source_bed} "
-            f"→ {target_key.replace('_',' ')}/{new_bed_id} (Floor {_BED_DB[target_key]['floor']}) "
-            f"at {now_str}."
-        ),
-        "next_action": (
-            f"Call get_ward_visualization('{source_ward}') and "
-            f"get_ward_visualization('{target_key}') to confirm both wards."
-        ),
-    }
+    with locked(wards=[ward_key]):
+        bed = _BED_DB[ward_key]["beds"][bed_id]
+        if bed["status"] != "available":
+            return {
+                "status": "error",
+                "message": f"Bed {bed_id} is {bed['status']}; only available beds can be taken out of service.",
+            }
+        _set_bed(ward_key, bed_id, _make_bed(
+            "maintenance", notes=notes or "Out of service — engineering review",
+        ))
+        _log_event("BED_OUT_OF_SERVICE", "", ward_key, bed_id, notes or "Maintenance")
+        return {"status": "maintenance", "ward": ward_key, "bed_id": bed_id}
 
 
+@state_transaction
 def add_to_waitlist(
     patient_id: str,
     ward: str,
@@ -1235,59 +1565,69 @@ def add_to_waitlist(
 
     patient = _PATIENT_DB.get(patient_id, {})
     patient_name = patient.get("name", patient_id)
-    now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # Check if already on waitlist for this ward
-    wl = _WAITLIST[ward_key]
-    for entry in wl:
-        if entry["patient_id"] == patient_id:
-            pos = wl.index(entry) + 1
-            return {
-                "status": "already_waitlisted",
-                "message": f"{patient_name} is already on the {ward_key.replace('_',' ')} waitlist at position {pos}.",
-                "waitlist_position": pos,
-            }
-
-    entry = {
-        "patient_id": patient_id,
-        "patient_name": patient_name,
-        "priority": priority,
-        "reason": reason,
-        "added_at": now_str,
-        "priority_order": _PRIORITY_ORDER[priority],
-    }
-    wl.append(entry)
-    # Sort by priority then arrival time
-    wl.sort(key=lambda x: (x["priority_order"], x["added_at"]))
-    _WAITLIST[ward_key] = wl
-
-    position = wl.index(entry) + 1
-    ahead = position - 1
-    # Estimate wait: ~45 min per patient ahead + 30 min base for cleaning
-    est_minutes = 30 + (ahead * 45)
-    est_hours = est_minutes // 60
-    est_min_rem = est_minutes % 60
-    est_wait = f"~{est_hours}h {est_min_rem}min" if est_hours else f"~{est_min_rem} min"
+    now_str = clock.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    with locked(patients=[patient_id], wards=[ward_key]):
+        # Check if already on waitlist for this ward
+        wl = _WAITLIST[ward_key]
+        for entry in wl:
+            if entry["patient_id"] == patient_id:
+                pos = wl.index(entry) + 1
+                return {
+                    "status": "already_waitlisted",
+                    "message": f"{patient_name} is already on the {ward_key.replace('_',' ')} waitlist at position {pos}.",
+                    "waitlist_position": pos,
+                }
+
+        entry = {
+            "patient_id": patient_id,
+            "patient_name": patient_name,
+            "priority": priority,
+            "reason": reason,
+            "added_at": now_str,
+            "priority_order": _PRIORITY_ORDER[priority],
+        }
+        wl.append(entry)
+        # Sort by priority then arrival time
+        wl.sort(key=lambda x: (x["priority_order"], x["added_at"]))
+        _WAITLIST[ward_key] = wl
+
+        position = wl.index(entry) + 1
+        ahead = position - 1
+        _log_event("WAITLISTED", patient_id, ward_key, "",
+                   f"Waitlisted: {reason} | Priority: {priority}", priority=priority)
+        _sync_flow()
+        eta = _estimate_bed_wait(ward_key, position, priority)
+        est_wait = _format_eta(eta)
 
-    return {
-        "status": "waitlisted",
-        "patient_id": patient_id,
-        "patient_name": patient_name,
-        "ward": ward_key,
-        "priority": priority,
-        "reason": reason,
-        "waitlist_position": position,
-        "patients_ahead": ahead,
-        "estimated_wait": est_wait,
-        "total_waitlist_size": len(wl),
-        "message": (
-            f"📋 {patient_name} added to {ward_key.replace('_',' ')} waitlist. "
-            f"Position: {position} (priority: {priority}). "
-            f"Estimated wait: {est_wait}."
-        ),
-    }
+        return {
+            "status": "waitlisted",
+            "patient_id": patient_id,
+            "patient_name": patient_name,
+            "ward": ward_key,
+            "priority": priority,
+            "reason": reason,
+            "waitlist_position": position,
+            "patients_ahead": ahead,
+            "estimated_wait": est_wait,
+            "estimated_wait_minutes": eta["minutes"],
+            "estimated_wait_range_minutes": [eta["low"], eta["high"]],
+            "estimate_basis": {
+                "bed_releases_per_day": eta["releases_per_day"],
+                "releases_left_after_higher_priority_per_day": eta["releases_left_per_day"],
+                "cleaning_turnaround_minutes": eta["turnover_minutes"],
+                "releases_observed": eta["observed_releases"],
+            },
+            "total_waitlist_size": len(wl),
+            "message": (
+                f"📋 {patient_name} added to {ward_key.replace('_',' ')} waitlist. "
+                f"Position: {position} (priority: {priority}). "
+                f"Estimated wait: {est_wait}."
+            ),
+        }
 
 
+@state_transaction(readonly=True)
 def get_waitlist_status(ward: str = "all") -> dict:
     """Retrieves the current waitlist for one or all wards.
 
@@ -1300,11 +1640,13 @@ def get_waitlist_status(ward: str = "all") -> dict:
         dict: Waitlist entries per ward with patient details, priority,
               position, and estimated wait times.
     """
+    _sync_flow()
     if ward.lower() == "all":
         result = {}
         total = 0
         for ward_name, wl in _WAITLIST.items():
             if wl:
+                cleaning = _count_beds(_BED_DB[ward_name])[1]
                 result[ward_name] = [
                     {
                         "position": i + 1,
@@ -1313,7 +1655,7 @@ def get_waitlist_status(ward: str = "all") -> dict:
                         "priority": e["priority"],
                         "reason": e["reason"],
                         "added_at": e["added_at"],
-                        "est_wait": f"~{30 + i * 45} min",
+                        "est_wait": _format_eta(_estimate_bed_wait(ward_name, i + 1, e["priority"], cleaning)),
                     }
                     for i, e in enumerate(wl)
                 ]
@@ -1340,18 +1682,21 @@ def get_waitlist_status(ward: str = "all") -> dict:
             "total_waiting": 0,
         }
 
-    entries = [
-        {
+    cleaning = _count_beds(_BED_DB[ward_key])[1]
+    entries = []
+    for i, e in enumerate(wl):
+        eta = _estimate_bed_wait(ward_key, i + 1, e["priority"], cleaning)
+        entries.append({
             "position": i + 1,
             "patient_id": e["patient_id"],
             "patient_name": e["patient_name"],
             "priority": e["priority"],
             "reason": e["reason"],
             "added_at": e["added_at"],
-            "est_wait": f"~{30 + i * 45} min",
-        }
-        for i, e in enumerate(wl)
-    ]
+            "est_wait": _format_eta(eta),
+            "est_wait_minutes": eta["minutes"],
+            "est_wait_range_minutes": [eta["low"], eta["high"]],
+        })
 
     return {
         "status": "waitlist_active",
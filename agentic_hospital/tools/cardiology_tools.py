@@ -1,4 +1,24 @@
-"""Cardiology-specific diagnostic and assessment tools."""
+"""Cardiology-specific diagnostic and assessment tools.
+
+``assess_cardiac_risk`` scores one patient. ``assess_cardiac_risk_batch``
+scores whole registries with NumPy, and the ``assess_cardiac_risk_registry``
+tool ranks every patient on file from the stored records. Check the batch
+path against the scalar one, and time it, with::
+
+    python -m agentic_hospital.tools.cardiology_tools --bench 100000
+"""
+
+import argparse
+import json
+import time
+from typing import Optional, Sequence
+
+from ..infra.backend import state_transaction
+from .common_tools import _LAB_DB, _LATEST_VITALS, _PATIENT_DB
+
+# (highest score in band, approximate 10-year risk %, category); the last band is open-ended
+_RISK_BANDS = ((5, 2, "LOW"), (10, 8, "MODERATE"), (15, 15, "HIGH"), (20, 25, "VERY HIGH"), (None, 35, "CRITICAL"))
+_RISK_CATEGORIES = tuple(band[2] for band in _RISK_BANDS)
 
 
 def analyze_ecg(
@@ -154,21 +174,7 @@ def assess_cardiac_risk(
     if diabetic: risk_score += 3
 
     # Calculate approximate 10-year risk percentage
-    if risk_score <= 5:
-        risk_percent = 2
-        category = "LOW"
-    elif risk_score <= 10:
-        risk_percent = 8
-        category = "MODERATE"
-    elif risk_score <= 15:
-        risk_percent = 15
-        category = "HIGH"
-    elif risk_score <= 20:
-        risk_percent = 25
-        category = "VERY HIGH"
-    else:
-        risk_percent = 35
-        category = "CRITICAL"
+    risk_percent, category = next((pct, cat) for top, pct, cat in _RISK_BANDS if top is None or risk_score <= top)
 
     recommendations = []
     if smoker:
@@ -201,3 +207,243 @@ def assess_cardiac_risk(
         },
         "recommendations": recommendations,
     }
+
+
+# =============================================================================
+# REGISTRY (BATCH) SCORING
+# =============================================================================
+# Medication name stems that count as treatment for hypertension
+_ANTIHYPERTENSIVE_STEMS = (
+    "pril", "sartan", "amlodipine", "nifedipine", "felodipine", "diltiazem", "verapamil",
+    "olol", "carvedilol", "labetalol", "thiazide", "chlorthalidone", "indapamide",
+    "spironolactone", "eplerenone", "hydralazine", "clonidine", "doxazosin", "methyldopa",
+)
+_SMOKING_TERMS = ("smok", "tobacco", "nicotine")
+
+
+def _numpy():
+    import numpy as np  # imported lazily: only the batch paths need it
+    return np
+
+
+def assess_cardiac_risk_batch(
+    age: Sequence[float],
+    gender: Sequence,
+    systolic_bp: Sequence[float],
+    total_cholesterol: Sequence[float],
+    hdl_cholesterol: Sequence[float],
+    smoker: Sequence[bool],
+    diabetic: Sequence[bool],
+    on_bp_medication: Sequence[bool],
+) -> dict:
+    """Framingham-like risk points for many patients at once.
+
+    Same points, bands and categories as ``assess_cardiac_risk``, evaluated
+    with NumPy array operations.
+
+    Args:
+        age: Ages in years.
+        gender: 'male'/'female' strings (any case), or booleans (True = male).
+        systolic_bp: Systolic BP in mmHg.
+        total_cholesterol: Total cholesterol in mg/dL.
+        hdl_cholesterol: HDL cholesterol in mg/dL.
+        smoker: Current smokers.
+        diabetic: Patients with diabetes.
+        on_bp_medication: Patients treated for hypertension.
+
+    Returns:
+        dict: ``risk_score`` (int array), ``risk_percent`` (int array) and
+              ``category_index`` (index into the LOW … CRITICAL categories).
+    """
+    np = _numpy()
+    age = np.asarray(age, dtype=np.float64)
+    sex = np.asarray(gender)
+    if sex.dtype == bool:
+        male = sex
+    else:
+        labels, inverse = np.unique(sex.astype(str), return_inverse=True)
+        male = np.array([label.lower() == "male" for label in labels], dtype=bool)[inverse.reshape(sex.shape)]
+    sbp = np.asarray(systolic_bp, dtype=np.float64)
+    tc = np.asarray(total_cholesterol, dtype=np.float64)
+    hdl = np.asarray(hdl_cholesterol, dtype=np.float64)
+    treated = np.asarray(on_bp_medication, dtype=bool)
+
+    age_band = (age >= 40).astype(int) + (age >= 50) + (age >= 60) + (age >= 70)
+    score = np.where(male, np.array([2, 5, 8, 10, 12])[age_band], np.array([1, 3, 6, 8, 10])[age_band])
+    score += np.select([tc >= 280, tc >= 240, tc >= 200], [4, 3, 1], 0)
+    score += np.select([hdl >= 60, hdl < 40, hdl < 50], [-2, 3, 1], 0)
+    sbp_band = (sbp >= 130).astype(int) + (sbp >= 140) + (sbp >= 160)
+    score += np.where(treated, np.array([2, 3, 4, 5])[sbp_band], np.array([0, 2, 3, 4])[sbp_band])
+    score += np.where(np.asarray(smoker, dtype=bool), 4, 0)
+    score += np.where(np.asarray(diabetic, dtype=bool), 3, 0)
+
+    tops = np.array([top for top, _, _ in _RISK_BANDS[:-1]])
+    category = np.searchsorted(tops, score, side="left")
+    return {
+        "risk_score": score,
+        "risk_percent": np.array([pct for _, pct, _ in _RISK_BANDS])[category],
+        "category_index": category,
+    }
+
+
+def _lipid_panel(labs: dict) -> dict:
+    for name, panel in labs.items():
+        if name.replace(" ", "_").lower() == "lipid_panel" and isinstance(panel, dict):
+            return panel
+    return {}
+
+
+def _registry_inputs() -> tuple[list[dict], list[str]]:
+    """One row of risk inputs per patient with a lipid panel, plus the patients without one."""
+    rows, missing_lipids = [], []
+    for pid, patient in _PATIENT_DB.items():
+        lipids = _lipid_panel(_LAB_DB.get(pid, {}))
+        if lipids.get("Total_Cholesterol") is None or lipids.get("HDL") is None:
+            missing_lipids.append(pid)
+            continue
+        conditions = [c.lower() for c in patient.get("chronic_conditions", [])]
+        medications = [m.lower() for m in patient.get("current_medications", [])]
+        vitals = _LATEST_VITALS.get(pid) or {}
+        rows.append({
+            "patient_id": pid,
+            "age": patient["age"],
+            "gender": patient["gender"],
+            # No recorded BP scores as the lowest band: the result is then a lower bound
+            "systolic_bp": vitals.get("systolic"),
+            "total_cholesterol": lipids["Total_Cholesterol"],
+            "hdl_cholesterol": lipids["HDL"],
+            "smoker": any(term in text for text in conditions + medications for term in _SMOKING_TERMS),
+            "diabetic": any("diabetes" in c for c in conditions),
+            "on_bp_medication": any(stem in m.split()[0] for m in medications if m for stem in _ANTIHYPERTENSIVE_STEMS),
+        })
+    return rows, missing_lipids
+
+
+@state_transaction(readonly=True)
+def assess_cardiac_risk_registry(min_category: str = "HIGH", page: int = 1, page_size: int = 20) -> dict:
+    """Ranks every registered patient by 10-year cardiovascular risk for preventive cardiology.
+
+    Pulls age and sex from the patient record, lipids from the latest lipid
+    panel, diabetes from chronic conditions, treated hypertension from current
+    medications and systolic BP from the latest recorded vitals, then scores
+    the whole registry in one batch. Patients without a lipid panel are listed
+    separately so they can be called in for screening.
+
+    Args:
+        min_category: Lowest risk category to list: 'LOW', 'MODERATE', 'HIGH' (default),
+                      'VERY HIGH' or 'CRITICAL'.
+        page: Page number, starting at 1.
+        page_size: Patients per page (1–100).
+
+    Returns:
+        dict: One page of patients at or above the category, highest score first, with
+              counts per category and the patients who need a lipid panel.
+    """
+    wanted = min_category.strip().upper().replace("_", " ")
+    if wanted not in _RISK_CATEGORIES:
+        return {"status": "error",
+                "message": f"Unknown category '{min_category}'. Use one of: {', '.join(_RISK_CATEGORIES)}."}
+
+    rows, missing_lipids = _registry_inputs()
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), 100)
+    result = {
+        "status": "success",
+        "min_category": wanted,
+        "patients_scored": len(rows),
+        "by_category": {category: 0 for category in _RISK_CATEGORIES},
+        "total_matching": 0,
+        "page": page,
+        "pages": 1,
+        "page_size": page_size,
+        "patients": [],
+        "missing_lipid_panel": missing_lipids,
+    }
+    if not rows:
+        return result
+
+    np = _numpy()
+    scored = assess_cardiac_risk_batch(
+        [r["age"] for r in rows], [r["gender"] for r in rows],
+        [r["systolic_bp"] or 0 for r in rows],
+        [r["total_cholesterol"] for r in rows], [r["hdl_cholesterol"] for r in rows],
+        [r["smoker"] for r in rows], [r["diabetic"] for r in rows], [r["on_bp_medication"] for r in rows],
+    )
+    counts = np.bincount(scored["category_index"], minlength=len(_RISK_CATEGORIES))
+    result["by_category"] = {category: int(n) for category, n in zip(_RISK_CATEGORIES, counts)}
+
+    matching = np.flatnonzero(scored["category_index"] >= _RISK_CATEGORIES.index(wanted))
+    ranked = matching[np.argsort(-scored["risk_score"][matching], kind="stable")]
+    total = len(ranked)
+    result["total_matching"] = total
+    result["pages"] = max((total + page_size - 1) // page_size, 1)
+    for i in ranked[(page - 1) * page_size:page * page_size]:
+        row = rows[i]
+        drivers = [label for label, present in (
+            ("diabetes", row["diabetic"]),
+            ("smoker", row["smoker"]),
+            (f"total cholesterol {row['total_cholesterol']}", row["total_cholesterol"] >= 240),
+            (f"HDL {row['hdl_cholesterol']}", row["hdl_cholesterol"] < 40),
+            (f"systolic BP {row['systolic_bp']}", (row["systolic_bp"] or 0) >= 140),
+            ("treated hypertension", row["on_bp_medication"]),
+        ) if present]
+        result["patients"].append({
+            "patient_id": row["patient_id"],
+            "patient_name": _PATIENT_DB[row["patient_id"]].get("name", row["patient_id"]),
+            "age": row["age"],
+            "gender": row["gender"],
+            "risk_score": int(scored["risk_score"][i]),
+            "estimated_10_year_risk": f"{int(scored['risk_percent'][i])}%",
+            "risk_category": _RISK_CATEGORIES[scored["category_index"][i]],
+            "main_risk_factors": drivers,
+            "bp_recorded": row["systolic_bp"] is not None,
+        })
+    return result
+
+
+def _bench(n: int, seed: int = 7) -> dict:
+    """Checks the batch path against ``assess_cardiac_risk`` and times both on ``n`` synthetic patients."""
+    np = _numpy()
+    rng = np.random.default_rng(seed)
+    cohort = {
+        "age": rng.integers(30, 90, n),
+        "gender": np.where(rng.random(n) < 0.5, "male", "female"),
+        "systolic_bp": rng.integers(100, 190, n),
+        "total_cholesterol": rng.integers(140, 320, n),
+        "hdl_cholesterol": rng.integers(25, 90, n),
+        "smoker": rng.random(n) < 0.2,
+        "diabetic": rng.random(n) < 0.15,
+        "on_bp_medication": rng.random(n) < 0.35,
+    }
+    started = time.perf_counter()
+    batch = assess_cardiac_risk_batch(**cohort)
+    batch_s = time.perf_counter() - started
+
+    rows = [dict(zip(cohort, values)) for values in zip(*(column.tolist() for column in cohort.values()))]
+    started = time.perf_counter()
+    scalar = [assess_cardiac_risk(**row) for row in rows]
+    scalar_s = time.perf_counter() - started
+
+    return {
+        "patients": n,
+        "scalar_seconds": round(scalar_s, 3),
+        "batch_seconds": round(batch_s, 4),
+        "speedup": round(scalar_s / max(batch_s, 1e-9)),
+        "score_mismatches": int(np.sum(batch["risk_score"] != np.array([r["risk_score"] for r in scalar]))),
+        "category_mismatches": int(np.sum(np.array(_RISK_CATEGORIES)[batch["category_index"]]
+                                          != np.array([r["risk_category"] for r in scalar]))),
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Check and time the batch cardiac risk path.")
+    parser.add_argument("--bench", type=int, default=100_000, metavar="N")
+    args = parser.parse_args(argv)
+    report = _bench(args.bench)
+    print(json.dumps(report, indent=2))
+    if report["score_mismatches"] or report["category_mismatches"]:
+        raise SystemExit("batch cardiac risk disagrees with assess_cardiac_risk")
+
+
+if __name__ == "__main__":
+    main()
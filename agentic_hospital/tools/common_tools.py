@@ -1,8 +1,20 @@
 """Common tools shared across all medical department agents."""
 
 import datetime
+import heapq
+import itertools
 from typing import Optional
 
+from ..infra import clock
+from ..infra.backend import append_lock, register_store, state_transaction
+from ..infra.event_log import log_event, register_log
+from ..infra.ids import new_id
+from ..infra.state import AtomicCounter, locked, named_lock
+from .allergies import allergy_profile, check_medication, match_terms
+from .early_warning import evaluate_vitals, news_interpretation
+from .protocols import ProtocolIndex
+from .vitals_series import record_sample
+
 
 # =============================================================================
 # PATIENT DATABASE (10 diverse patients)
@@ -13,7 +25,7 @@ _PATIENT_DB = {
         "age": 55,
         "gender": "Male",
         "blood_type": "A+",
-        "allergies": ["Penicillin"],
+        "allergies": ["Penicillin", "Sulfa"],
         "chronic_conditions": ["Hypertension", "Type 2 Diabetes"],
         "current_medications": ["Metformin 500mg twice daily", "Lisinopril 10mg daily",
                                  "Atorvastatin 20mg daily"],
@@ -26,7 +38,7 @@ _PATIENT_DB = {
         "age": 34,
         "gender": "Female",
         "blood_type": "O-",
-        "allergies": [],
+        "allergies": ["Aspirin", "NSAIDs"],
         "chronic_conditions": ["PCOS", "Iron-deficiency Anemia"],
         "current_medications": ["Metformin 500mg daily", "Combined oral contraceptive pill",
                                  "Ferrous sulfate 325mg daily"],
@@ -53,7 +65,7 @@ _PATIENT_DB = {
         "age": 28,
         "gender": "Female",
         "blood_type": "AB+",
-        "allergies": ["Latex"],
+        "allergies": ["Latex", "Morphine"],
         "chronic_conditions": ["Migraines"],
         "current_medications": ["Sumatriptan 50mg PRN"],
         "emergency_contact": "Tom Davis (Father) - 555-0404",
@@ -65,7 +77,7 @@ _PATIENT_DB = {
         "age": 45,
         "gender": "Male",
         "blood_type": "O+",
-        "allergies": ["Aspirin (GI intolerance)", "Codeine"],
+        "allergies": ["Aspirin (GI intolerance)", "Codeine", "Penicillin", "Latex"],
         "chronic_conditions": ["Chronic Lower Back Pain (L4-L5 disc herniation)", "Generalized Anxiety Disorder"],
         "current_medications": ["Gabapentin 300mg three times daily", "Sertraline 50mg daily",
                                  "Cyclobenzaprine 5mg PRN"],
@@ -78,7 +90,7 @@ _PATIENT_DB = {
         "age": 68,
         "gender": "Female",
         "blood_type": "A-",
-        "allergies": ["NSAIDs (asthma exacerbation)"],
+        "allergies": ["NSAIDs (asthma exacerbation)", "Codeine"],
         "chronic_conditions": ["COPD (GOLD Stage III)", "Osteoporosis", "Major Depressive Disorder",
                                 "Gastroesophageal Reflux Disease"],
         "current_medications": ["Fluticasone/Salmeterol inhaler twice daily",
@@ -108,7 +120,7 @@ _PATIENT_DB = {
         "age": 55,
         "gender": "Female",
         "blood_type": "B-",
-        "allergies": ["Sulfonamides", "Fluoroquinolones (tendinopathy)"],
+        "allergies": ["Sulfonamides", "Fluoroquinolones (tendinopathy)", "Vancomycin"],
         "chronic_conditions": ["Systemic Lupus Erythematosus (SLE)", "Lupus Nephritis (Class III)",
                                 "Hypertension", "Secondary Sjögren's Syndrome"],
         "current_medications": ["Hydroxychloroquine 200mg twice daily",
@@ -125,7 +137,7 @@ _PATIENT_DB = {
         "age": 45,
         "gender": "Male",
         "blood_type": "A+",
-        "allergies": ["Abacavir (HLA-B*5701 positive — absolute contraindication)"],
+        "allergies": ["Abacavir (HLA-B*5701 positive — absolute contraindication)", "Aspirin"],
         "chronic_conditions": ["HIV-1 (undetectable viral load on ART)",
                                 "Generalized Anxiety Disorder", "Hepatitis B co-infection (treated)"],
         "current_medications": ["Bictegravir/emtricitabine/tenofovir alafenamide (Biktarvy) once daily",
@@ -139,7 +151,8 @@ _PATIENT_DB = {
         "age": 72,
         "gender": "Male",
         "blood_type": "AB+",
-        "allergies": ["ACE inhibitors (angioedema — use ARB instead)", "Clopidogrel (poor metabolizer, CYP2C19)"],
+        "allergies": ["ACE inhibitors (angioedema — use ARB instead)", "Clopidogrel (poor metabolizer, CYP2C19)",
+                      "Sulfa", "Morphine"],
         "chronic_conditions": ["Post-CABG (3-vessel, 3 years ago)", "Persistent Atrial Fibrillation",
                                 "Systolic Heart Failure (EF 35%)", "CKD Stage 3b (eGFR 34 mL/min)",
                                 "Type 2 Diabetes", "Hypertension"],
@@ -322,6 +335,8 @@ _LAB_DB = {
                          "status": "Systolic dysfunction — optimize GDMT"},
     },
 }
+# Analyser results are upserted per patient by ``lab_ingest``
+register_store("common.lab_results", _LAB_DB, "keyed", scope="patient")
 
 
 # =============================================================================
@@ -492,9 +507,12 @@ _DRUG_INTERACTIONS: dict[tuple, dict] = {
 
 # Appointment schedule (runtime list)
 _APPOINTMENTS: list[dict] = []
+register_store("common.appointments", _APPOINTMENTS, "append")
 
 # SOAP notes store
 _SOAP_NOTES: list[dict] = []
+register_store("common.soap_notes", _SOAP_NOTES, "append")
+register_log("common.soap_notes", _SOAP_NOTES)
 
 
 # =============================================================================
@@ -691,6 +709,20 @@ _MED_DOSING: dict[str, dict] = {
 }
 
 
+# Latest observation set per patient, for ward-wide early-warning rounds
+_LATEST_VITALS: dict[str, dict] = {}
+register_store("common.latest_vitals", _LATEST_VITALS, "keyed", scope="patient")
+
+
+def _parse_blood_pressure(blood_pressure: str) -> tuple[Optional[int], Optional[int]]:
+    """Splits a 'systolic/diastolic' reading; (None, None) if it does not parse."""
+    try:
+        systolic, diastolic = map(int, blood_pressure.split("/"))
+    except (ValueError, TypeError, AttributeError):
+        return None, None
+    return systolic, diastolic
+
+
 # =============================================================================
 # TOOL FUNCTIONS
 # =============================================================================
@@ -717,6 +749,7 @@ def get_patient_info(patient_id: str) -> dict:
     }
 
 
+@state_transaction
 def record_vitals(
     patient_id: str,
     blood_pressure: str,
@@ -740,95 +773,17 @@ def record_vitals(
     Returns:
         dict: Vitals record with automated clinical analysis and alert level.
     """
-    analysis = []
-    alert_level = "NORMAL"
-
-    # Blood pressure
-    try:
-        systolic, diastolic = map(int, blood_pressure.split("/"))
-        if systolic >= 180 or diastolic >= 120:
-            analysis.append("CRITICAL: Hypertensive crisis — immediate intervention needed (IV labetalol/nicardipine)")
-            alert_level = "CRITICAL"
-        elif systolic >= 160 or diastolic >= 100:
-            analysis.append("WARNING: Hypertension Stage 2 — consider urgent medication")
-            alert_level = max(alert_level, "WARNING")
-        elif systolic >= 130 or diastolic >= 80:
-            analysis.append("ELEVATED: Hypertension Stage 1")
-            alert_level = max(alert_level, "ELEVATED")
-        elif systolic < 70:
-            analysis.append("CRITICAL: Severe hypotension / shock — immediate fluid resuscitation")
-            alert_level = "CRITICAL"
-        elif systolic < 90 or diastolic < 60:
-            analysis.append("WARNING: Hypotension — assess volume status and cause")
-            alert_level = max(alert_level, "WARNING")
-        else:
-            analysis.append("BP: Normal")
-
-        # MAP calculation
-        map_value = round((systolic + 2 * diastolic) / 3)
-        if map_value < 65:
-            analysis.append(f"WARNING: MAP {map_value} mmHg — below perfusion threshold (target ≥65)")
-            alert_level = max(alert_level, "WARNING")
-        else:
-            analysis.append(f"MAP: {map_value} mmHg (normal ≥65)")
-
-    except (ValueError, TypeError):
-        analysis.append("BP: Unable to parse — verify format 'systolic/diastolic'")
-
-    # Heart rate
-    if heart_rate > 150:
-        analysis.append("CRITICAL: Severe tachycardia — 12-lead ECG immediately")
-        alert_level = "CRITICAL"
-    elif heart_rate > 100:
-        analysis.append("WARNING: Tachycardia — evaluate for pain, fever, dehydration, arrhythmia")
-        alert_level = max(alert_level, "WARNING")
-    elif heart_rate < 40:
-        analysis.append("CRITICAL: Severe bradycardia — consider atropine/pacing if symptomatic")
-        alert_level = "CRITICAL"
-    elif heart_rate < 60:
-        analysis.append("NOTE: Bradycardia — may be normal (athletes) or medication effect")
-    else:
-        analysis.append("HR: Normal")
-
-    # Temperature
-    if temperature >= 104.0:
-        analysis.append("CRITICAL: Hyperpyrexia — aggressive cooling, blood cultures, antibiotics")
-        alert_level = "CRITICAL"
-    elif temperature >= 100.4:
-        analysis.append("WARNING: Fever — evaluate for infection source; blood cultures if T≥38.5°C")
-        alert_level = max(alert_level, "WARNING")
-    elif temperature < 95.0:
-        analysis.append("WARNING: Hypothermia — warm blankets, warm IV fluids, identify cause")
-        alert_level = max(alert_level, "WARNING")
-    else:
-        analysis.append("Temp: Normal (36.1–38.0°C / 97.0–100.4°F)")
-
-    # SpO2
-    if spo2 < 88:
-        analysis.append("CRITICAL: Severe hypoxemia — immediate supplemental O2, prepare for intubation")
-        alert_level = "CRITICAL"
-    elif spo2 < 92:
-        analysis.append("WARNING: Hypoxemia — high-flow O2, evaluate for respiratory failure")
-        alert_level = max(alert_level, "WARNING")
-    elif spo2 < 95:
-        analysis.append("ELEVATED: Low-normal SpO2 — supplemental O2 and monitoring")
-        alert_level = max(alert_level, "ELEVATED")
-    else:
-        analysis.append("SpO2: Normal (≥95%)")
-
-    # Respiratory rate
-    if respiratory_rate is not None:
-        if respiratory_rate > 30:
-            analysis.append("CRITICAL: Respiratory distress (RR >30) — immediate evaluation")
-            alert_level = "CRITICAL"
-        elif respiratory_rate > 20:
-            analysis.append("WARNING: Tachypnea — assess for underlying cause (infection, metabolic, cardiac)")
-            alert_level = max(alert_level, "WARNING")
-        elif respiratory_rate < 8:
-            analysis.append("CRITICAL: Bradypnea — risk of respiratory arrest; consider opioid reversal")
-            alert_level = "CRITICAL"
-        else:
-            analysis.append("RR: Normal (12–20 breaths/min)")
+    systolic, diastolic = _parse_blood_pressure(blood_pressure)
+    alert_level, analysis, news_points = evaluate_vitals({
+        "systolic": systolic,
+        "diastolic": diastolic,
+        "heart_rate": heart_rate,
+        "temperature": temperature,
+        "spo2": spo2,
+        "respiratory_rate": respiratory_rate,
+    })
+    if systolic is None:
+        analysis.insert(0, "BP: Unable to parse — verify format 'systolic/diastolic'")
 
     # Pain
     if pain_level is not None:
@@ -839,32 +794,25 @@ def record_vitals(
         elif pain_level > 0:
             analysis.append(f"Pain Level {pain_level}/10: Mild pain")
 
-    # Early Warning Score (simple NEWS-lite)
-    news_points = 0
-    try:
-        systolic, _ = map(int, blood_pressure.split("/"))
-        if systolic <= 90 or systolic >= 220:
-            news_points += 3
-        elif systolic <= 100:
-            news_points += 2
-        elif systolic <= 110:
-            news_points += 1
-    except (ValueError, TypeError):
-        pass
-    if heart_rate <= 40 or heart_rate >= 131:
-        news_points += 3
-    elif heart_rate <= 50 or heart_rate >= 111:
-        news_points += 2
-    if spo2 < 92:
-        news_points += 3
-    elif spo2 < 94:
-        news_points += 2
-    elif spo2 < 96:
-        news_points += 1
-    if temperature < 35.1 or temperature >= 104.0:
-        news_points += 3
-    elif temperature < 36.1 or temperature >= 101.1:
-        news_points += 1
+    now = clock.now()
+    with locked(patients=[patient_id]):
+        _LATEST_VITALS[patient_id] = {
+            "systolic": systolic,
+            "diastolic": diastolic,
+            "heart_rate": heart_rate,
+            "temperature_F": temperature,
+            "spo2": spo2,
+            "respiratory_rate": respiratory_rate,
+            "recorded_at": now.strftime("%Y-%m-%d %H:%M"),
+        }
+    record_sample(patient_id, int(now.timestamp()), {
+        "systolic_bp": systolic,
+        "diastolic_bp": diastolic,
+        "heart_rate": heart_rate,
+        "spo2": spo2,
+        "respiratory_rate": respiratory_rate,
+        "temperature_f": temperature,
+    })
 
     return {
         "status": "recorded",
@@ -878,14 +826,10 @@ def record_vitals(
             "pain_level": pain_level,
         },
         "clinical_analysis": analysis,
-        "overall_alert_level": alert_level,
+        "overall_alert_level": alert_level.name,
         "early_warning_score": news_points,
-        "ews_interpretation": (
-            "Low risk" if news_points <= 4 else
-            "Medium risk — increase monitoring frequency" if news_points <= 6 else
-            "HIGH risk — urgent clinical review required"
-        ),
-        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "ews_interpretation": news_interpretation(news_points),
+        "timestamp": now.strftime("%Y-%m-%d %H:%M"),
     }
 
 
@@ -948,6 +892,7 @@ def check_drug_interactions(medications: list[str]) -> dict:
     }
 
 
+@state_transaction
 def schedule_appointment(department: str, urgency: str, patient_id: str, reason: str) -> dict:
     """Schedules a follow-up appointment for a patient.
 
@@ -969,7 +914,7 @@ def schedule_appointment(department: str, urgency: str, patient_id: str, reason:
     sched = scheduling.get(urgency.lower(), {"timeframe": "Within 1–2 weeks", "priority": 3})
 
     appointment = {
-        "appointment_id": f"APT-{len(_APPOINTMENTS) + 1001}",
+        "appointment_id": f"APT-{new_id()}",
         "patient_id": patient_id,
         "department": department,
         "urgency": urgency,
@@ -983,7 +928,8 @@ def schedule_appointment(department: str, urgency: str, patient_id: str, reason:
             "routine": "Patient will receive confirmation by phone/email within 24 hours.",
         }.get(urgency.lower(), "Standard booking confirmation will be sent."),
     }
-    _APPOINTMENTS.append(appointment)
+    with append_lock(_APPOINTMENTS):
+        _APPOINTMENTS.append(appointment)
 
     return {
         "status": "scheduled",
@@ -992,6 +938,7 @@ def schedule_appointment(department: str, urgency: str, patient_id: str, reason:
     }
 
 
+@state_transaction(readonly=True)
 def get_lab_results(patient_id: str, test_type: str) -> dict:
     """Retrieves laboratory test results for a patient.
 
@@ -1039,6 +986,7 @@ def get_lab_results(patient_id: str, test_type: str) -> dict:
     }
 
 
+@state_transaction
 def generate_soap_note(patient_id: str, chief_complaint: str, subjective: str,
                        objective_findings: dict, assessment: str,
                        plan: list[str]) -> dict:
@@ -1065,7 +1013,7 @@ def generate_soap_note(patient_id: str, chief_complaint: str, subjective: str,
     allergies = patient.get("allergies", [])
     medications = patient.get("current_medications", [])
 
-    note_id = f"SOAP-{patient_id}-{datetime.datetime.now().strftime('%Y%m%d%H%M')}"
+    note_id = f"SOAP-{patient_id}-{new_id()}"
 
     # Format objective section
     obj_text = []
@@ -1116,7 +1064,7 @@ Patient must be seen by licensed healthcare professional for definitive care.
         "plan": plan,
         "formatted_text": formatted_note.strip(),
     }
-    _SOAP_NOTES.append(note_record)
+    log_event("common.soap_notes", note_record, key=patient_id)
 
     return {
         "status": "generated",
@@ -1128,7 +1076,8 @@ Patient must be seen by licensed healthcare professional for definitive care.
 
 
 def calculate_medication_dose(medication: str, weight_kg: float, age_years: int,
-                               renal_egfr: float, hepatic_impairment: str) -> dict:
+                               renal_egfr: float, hepatic_impairment: str,
+                               patient_id: Optional[str] = None) -> dict:
     """Calculates adjusted medication dosing based on patient-specific factors.
 
     Applies weight-based, age-adjusted, renal-adjusted, and hepatic-adjusted dosing.
@@ -1141,6 +1090,8 @@ def calculate_medication_dose(medication: str, weight_kg: float, age_years: int,
         age_years: Patient age in years.
         renal_egfr: Estimated GFR in mL/min/1.73m² (use 90 if normal, <15 if dialysis-dependent).
         hepatic_impairment: Degree of liver impairment: 'none', 'mild', 'moderate', or 'severe'.
+        patient_id: Optional patient identifier; the medication is checked against
+                    the patient's allergies and cross-reactive drug classes.
 
     Returns:
         dict: Recommended dosing, adjustments, monitoring parameters, and contraindication flags.
@@ -1202,6 +1153,12 @@ def calculate_medication_dose(medication: str, weight_kg: float, age_years: int,
             contraindications_triggered.append(f"⚠ CONTRAINDICATED: {contra}")
         if "pregnan" in contra.lower():
             contraindications_triggered.append(f"⚠ CAUTION: {contra}")
+    if patient_id:
+        allergy_matches = check_medication(_PATIENT_DB.get(patient_id, {}).get("allergies", []), medication)
+        contraindications_triggered[:0] = [
+            f"⚠ ALLERGY {'CONTRAINDICATED' if m['severity'] == 'CRITICAL' else 'CAUTION'}: {m['message']}"
+            for m in allergy_matches
+        ]
 
     return {
         "status": "calculated",
@@ -1622,8 +1579,10 @@ def triage_assessment(symptoms: list[str], duration: str, severity: str) -> dict
 # EPISODIC PATIENT MEMORY
 # =============================================================================
 _PATIENT_ENCOUNTERS: dict[str, list] = {}
+register_store("common.encounters", _PATIENT_ENCOUNTERS, "keyed", scope="patient")
 
 
+@state_transaction
 def record_patient_encounter(
     patient_id: str,
     department: str,
@@ -1648,7 +1607,7 @@ def record_patient_encounter(
         dict: Encounter record confirmation with encounter ID and longitudinal summary.
     """
     encounter = {
-        "encounter_id": f"ENC-{patient_id}-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}",
+        "encounter_id": f"ENC-{patient_id}-{new_id()}",
         "patient_id": patient_id,
         "department": department,
         "date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
@@ -1658,11 +1617,9 @@ def record_patient_encounter(
         "follow_up_date": follow_up_date or "As clinically indicated",
     }
 
-    if patient_id not in _PATIENT_ENCOUNTERS:
-        _PATIENT_ENCOUNTERS[patient_id] = []
-    _PATIENT_ENCOUNTERS[patient_id].append(encounter)
-
-    total_encounters = len(_PATIENT_ENCOUNTERS[patient_id])
+    with locked(patients=[patient_id]):
+        _PATIENT_ENCOUNTERS.setdefault(patient_id, []).append(encounter)
+        total_encounters = len(_PATIENT_ENCOUNTERS[patient_id])
     patient_name = _PATIENT_DB.get(patient_id, {}).get("name", patient_id)
 
     return {
@@ -1683,6 +1640,7 @@ def record_patient_encounter(
     }
 
 
+@state_transaction(readonly=True)
 def get_patient_encounter_history(
     patient_id: str,
     last_n: int = 5,
@@ -1761,8 +1719,10 @@ _VALID_DEPARTMENTS = {
 }
 
 _MDT_CONSULTATIONS: list[dict] = []
+register_store("common.mdt_consultations", _MDT_CONSULTATIONS, "append")
 
 
+@state_transaction
 def request_mdt_consultation(
     patient_id: str,
     departments: list[str],
@@ -1812,7 +1772,7 @@ def request_mdt_consultation(
             "message": f"No valid departments found. Please use department names from: {', '.join(sorted(_VALID_DEPARTMENTS))}",
         }
 
-    consultation_id = f"MDT-{patient_id}-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
+    consultation_id = f"MDT-{patient_id}-{new_id()}"
 
     # Build per-department focus areas
     dept_focus_map = {
@@ -1859,7 +1819,8 @@ def request_mdt_consultation(
         "routing_plan": routing_plan,
         "requested_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
     }
-    _MDT_CONSULTATIONS.append(record)
+    with append_lock(_MDT_CONSULTATIONS):
+        _MDT_CONSULTATIONS.append(record)
 
     return {
         "status": "mdt_initiated",
@@ -2467,6 +2428,48 @@ _TREATMENT_PROTOCOLS: dict[str, dict] = {
     },
 }
 
+# Protocol key -> (ICD-10 codes, synonyms) for ``_PROTOCOL_INDEX``. Codes match
+# by their most specific indexed prefix, so 'I48.91' resolves through 'I48'.
+_PROTOCOL_ALIASES: dict[str, tuple[tuple[str, ...], tuple[str, ...]]] = {
+    "stemi": (("I21.0", "I21.1", "I21.2", "I21.3"),
+              ("ST elevation MI", "ST elevation myocardial infarction")),
+    "atrial_fibrillation": (("I48",), ("AF", "AFib", "A-fib", "paroxysmal AF", "persistent AF")),
+    "heart_failure_hfref": (("I50.2", "I50.9"),
+                            ("HFrEF", "heart failure with reduced ejection fraction", "systolic heart failure",
+                             "congestive heart failure", "CHF")),
+    "hypertension": (("I10",), ("HTN", "high blood pressure", "essential hypertension")),
+    "copd_exacerbation": (("J44.0", "J44.1"), ("AECOPD", "COPD flare", "chronic obstructive pulmonary disease")),
+    "pulmonary_embolism": (("I26",), ("PE", "acute PE", "acute pulmonary embolism")),
+    "ischemic_stroke": (("I63",), ("ischaemic stroke", "stroke", "CVA", "cerebral infarction")),
+    "epilepsy": (("G40", "R56.9"), ("seizure", "seizures", "seizure disorder")),
+    "ckd_management": (("N18",), ("CKD", "chronic kidney disease", "chronic renal failure")),
+    "type2_diabetes": (("E11",), ("T2DM", "DM2", "NIDDM", "type 2 diabetes", "diabetes mellitus type 2")),
+    "hypothyroidism": (("E03",), ("underactive thyroid",)),
+    "community_acquired_pneumonia": (("J13", "J15", "J18"), ("CAP", "pneumonia")),
+    "sepsis": (("A41", "R65.2"), ("septic shock", "severe sepsis", "urosepsis")),
+    "breast_cancer_early": (("C50",), ("breast cancer", "breast carcinoma")),
+    "iron_deficiency_anemia": (("D50",), ("IDA", "iron deficiency anaemia")),
+    "dvt_treatment": (("I82.4",), ("DVT", "acute DVT", "deep vein thrombosis", "deep venous thrombosis")),
+    "major_depressive_disorder": (("F32", "F33"), ("MDD", "depression", "major depression")),
+    "rheumatoid_arthritis": (("M05", "M06"), ("RA",)),
+    "gerd": (("K21",), ("GORD", "acid reflux", "reflux", "gastroesophageal reflux disease")),
+    "osteoarthritis_knee": (("M17",), ("knee OA", "knee osteoarthritis", "gonarthrosis")),
+    "hyperkalemia": (("E87.5",), ("hyperkalaemia", "high potassium")),
+    "kidney_stones": (("N20",), ("nephrolithiasis", "urolithiasis", "renal colic", "renal calculi")),
+}
+
+# Qualifiers that rule a protocol out when its key is only part of a longer diagnosis
+_PROTOCOL_CONFLICTS: dict[str, tuple[str, ...]] = {
+    "stemi": ("nstemi",),
+    "heart_failure_hfref": ("preserved", "hfpef", "diastolic"),
+    "hypertension": ("pulmonary", "portal", "intracranial", "gestational"),
+    "ischemic_stroke": ("hemorrhagic", "haemorrhagic", "hemorrhage", "haemorrhage"),
+    "type2_diabetes": ("type1", "gestational"),
+    "breast_cancer_early": ("metastatic", "advanced"),
+}
+
+_PROTOCOL_INDEX = ProtocolIndex(_TREATMENT_PROTOCOLS, _PROTOCOL_ALIASES, _PROTOCOL_CONFLICTS)
+
 
 def generate_treatment_plan(
     diagnosis: str,
@@ -2486,7 +2489,8 @@ def generate_treatment_plan(
                    'hypothyroidism', 'rheumatoid_arthritis', 'gerd', 'hyperkalemia',
                    'pulmonary_embolism', 'dvt_treatment', 'breast_cancer_early',
                    'major_depressive_disorder', 'hypertension', 'osteoarthritis_knee',
-                   'community_acquired_pneumonia', 'kidney_stones').
+                   'community_acquired_pneumonia', 'kidney_stones'), a full name or
+                   synonym ('Type 2 Diabetes', 'DVT'), or an ICD-10 code ('I48.91').
         severity: Clinical severity — 'mild', 'moderate', 'severe', or 'critical'.
         patient_id: Patient identifier for allergy and comorbidity cross-check.
         contraindications: Optional list of medications or procedures to avoid.
@@ -2495,17 +2499,8 @@ def generate_treatment_plan(
         dict: Complete treatment protocol with first-line, second-line, monitoring,
               follow-up, evidence grade, and patient-specific safety flags.
     """
-    # Normalize diagnosis key
-    diag_key = diagnosis.lower().strip().replace(" ", "_").replace("-", "_")
-
-    # Try exact match first, then partial
-    protocol = _TREATMENT_PROTOCOLS.get(diag_key)
-    if not protocol:
-        for key, val in _TREATMENT_PROTOCOLS.items():
-            if diag_key in key or key in diag_key or diag_key in val.get("full_name", "").lower():
-                protocol = val
-                diag_key = key
-                break
+    diag_key, matched_by = _PROTOCOL_INDEX.resolve(diagnosis)
+    protocol = _TREATMENT_PROTOCOLS.get(diag_key) if diag_key else None
 
     if not protocol:
         available = ", ".join(_TREATMENT_PROTOCOLS.keys())
@@ -2516,11 +2511,12 @@ def generate_treatment_plan(
                 f"Available diagnoses: {available}. "
                 "For unlisted conditions, use web_search to retrieve current clinical guidelines."
             ),
+            "closest_matches": _PROTOCOL_INDEX.suggest(diagnosis),
         }
 
     # Load patient profile for safety cross-check
     patient = _PATIENT_DB.get(patient_id, {})
-    patient_allergies = [a.lower() for a in patient.get("allergies", [])]
+    allergies = allergy_profile(tuple(patient.get("allergies", [])))
     patient_meds = [m.lower() for m in patient.get("current_medications", [])]
     patient_conditions = [c.lower() for c in patient.get("chronic_conditions", [])]
     patient_age = patient.get("age", 0)
@@ -2529,17 +2525,23 @@ def generate_treatment_plan(
     all_contraindications = list(contraindications or [])
     safety_flags = []
 
-    combined_restrictions = [c.lower() for c in all_contraindications] + patient_allergies
-
-    flagged_steps = []
-    for step in protocol["first_line"]:
-        for restriction in combined_restrictions:
-            if restriction.split()[0] in step.lower():
-                flagged_steps.append({
-                    "step": step,
-                    "flag": f"Patient allergy or contraindication: '{restriction}' — review before prescribing",
-                    "severity": "WARNING",
-                })
+    flagged_steps = [
+        {
+            "step": step,
+            "flag": f"Allergy: {match['message']} — review before prescribing",
+            "severity": match["severity"],
+        }
+        for step, terms in _PROTOCOL_INDEX.step_terms(diag_key)
+        for match in match_terms(allergies, terms)
+    ]
+    flagged_steps += [
+        {
+            "step": step,
+            "flag": f"Contraindication: '{restriction}' — review before prescribing",
+            "severity": "WARNING",
+        }
+        for step, restriction in _PROTOCOL_INDEX.flag_steps(diag_key, [c.lower() for c in all_contraindications])
+    ]
 
     # Age-specific flags
     if patient_age >= 65:
@@ -2561,6 +2563,7 @@ def generate_treatment_plan(
         "status": "generated",
         "diagnosis": protocol["full_name"],
         "matched_key": diag_key,
+        "matched_by": matched_by,
         "department": protocol["department"],
         "is_emergency": protocol.get("emergency", False),
         "severity": severity,
@@ -2595,34 +2598,216 @@ def generate_treatment_plan(
 # Investigation order states
 _INVESTIGATION_ORDERS: dict[str, list[dict]] = {}  # patient_id → list of orders
 
-# Investigation types and typical turnaround times
+# Investigation types, typical turnaround times and performing department
 _INVESTIGATION_TYPES = {
-    "blood_panel": {"name": "Blood Panel (CBC, BMP)", "turnaround_hours": 2},
-    "lipid_panel": {"name": "Lipid Panel", "turnaround_hours": 4},
-    "liver_function": {"name": "LFTs", "turnaround_hours": 4},
-    "renal_function": {"name": "Renal Function", "turnaround_hours": 3},
-    "cardiac_enzymes": {"name": "Cardiac Enzymes (Troponin, CK-MB)", "turnaround_hours": 1},
-    "coagulation": {"name": "Coagulation Panel (PT/INR, APTT)", "turnaround_hours": 2},
-    "inflammation": {"name": "Inflammatory Markers (CRP, ESR)", "turnaround_hours": 6},
-    "thyroid": {"name": "Thyroid Function (TSH, Free T4)", "turnaround_hours": 24},
-    "hba1c": {"name": "HbA1c", "turnaround_hours": 24},
-    "blood_culture": {"name": "Blood Culture", "turnaround_hours": 48},
-    "urineCulture": {"name": "Urine Culture", "turnaround_hours": 48},
-    "chest_xray": {"name": "Chest X-Ray", "turnaround_hours": 2},
-    "ct_chest": {"name": "CT Chest", "turnaround_hours": 6},
-    "ct_abdomen": {"name": "CT Abdomen/Pelvis", "turnaround_hours": 8},
-    "ct_head": {"name": "CT Head", "turnaround_hours": 2},
-    "mri_brain": {"name": "MRI Brain", "turnaround_hours": 24},
-    "mri_spine": {"name": "MRI Spine", "turnaround_hours": 24},
-    "ecg": {"name": "12-Lead ECG", "turnaround_hours": 0.5},
-    "echocardiogram": {"name": "Echocardiogram", "turnaround_hours": 24},
-    "ultrasound_abdomen": {"name": "Abdominal Ultrasound", "turnaround_hours": 4},
-    "doppler": {"name": "Doppler Ultrasound", "turnaround_hours": 6},
+    "blood_panel": {"name": "Blood Panel (CBC, BMP)", "turnaround_hours": 2, "department": "laboratory"},
+    "lipid_panel": {"name": "Lipid Panel", "turnaround_hours": 4, "department": "laboratory"},
+    "liver_function": {"name": "LFTs", "turnaround_hours": 4, "department": "laboratory"},
+    "renal_function": {"name": "Renal Function", "turnaround_hours": 3, "department": "laboratory"},
+    "cardiac_enzymes": {"name": "Cardiac Enzymes (Troponin, CK-MB)", "turnaround_hours": 1, "department": "laboratory"},
+    "coagulation": {"name": "Coagulation Panel (PT/INR, APTT)", "turnaround_hours": 2, "department": "laboratory"},
+    "inflammation": {"name": "Inflammatory Markers (CRP, ESR)", "turnaround_hours": 6, "department": "laboratory"},
+    "thyroid": {"name": "Thyroid Function (TSH, Free T4)", "turnaround_hours": 24, "department": "laboratory"},
+    "hba1c": {"name": "HbA1c", "turnaround_hours": 24, "department": "laboratory"},
+    "blood_culture": {"name": "Blood Culture", "turnaround_hours": 48, "department": "microbiology"},
+    "urineCulture": {"name": "Urine Culture", "turnaround_hours": 48, "department": "microbiology"},
+    "chest_xray": {"name": "Chest X-Ray", "turnaround_hours": 2, "department": "radiology"},
+    "ct_chest": {"name": "CT Chest", "turnaround_hours": 6, "department": "radiology"},
+    "ct_abdomen": {"name": "CT Abdomen/Pelvis", "turnaround_hours": 8, "department": "radiology"},
+    "ct_head": {"name": "CT Head", "turnaround_hours": 2, "department": "radiology"},
+    "mri_brain": {"name": "MRI Brain", "turnaround_hours": 24, "department": "radiology"},
+    "mri_spine": {"name": "MRI Spine", "turnaround_hours": 24, "department": "radiology"},
+    "ecg": {"name": "12-Lead ECG", "turnaround_hours": 0.5, "department": "cardiology"},
+    "echocardiogram": {"name": "Echocardiogram", "turnaround_hours": 24, "department": "cardiology"},
+    "ultrasound_abdomen": {"name": "Abdominal Ultrasound", "turnaround_hours": 4, "department": "radiology"},
+    "doppler": {"name": "Doppler Ultrasound", "turnaround_hours": 6, "department": "radiology"},
+}
+
+_INVESTIGATION_SEQ = AtomicCounter("investigation_seq")
+
+# ── Order engine ──────────────────────────────────────────────────────────────
+# _INVESTIGATION_ORDERS stays the system of record (per-patient lists, synced
+# by the state backend). The indexes below hold the same order dicts:
+#   _ORDER_INDEX  — order_id → order, for O(1) lookup by ID
+#   _ORDER_QUEUES — status → priority → order IDs in arrival order (dicts used
+#                   as ordered sets, so add/remove/move are O(1))
+_ORDER_TRANSITIONS: dict[str, tuple[str, ...]] = {
+    "ordered": ("processing",),
+    "processing": ("resulted",),
+    "resulted": ("reviewed",),
+    "reviewed": (),
 }
+_ORDER_PRIORITIES = {"emergency": 1, "urgent": 2, "routine": 3}
+_PENDING_STATUSES = ("ordered", "processing")
+
+_ORDER_INDEX: dict[str, dict] = {}
+_ORDER_QUEUES: dict[str, dict[int, dict[str, None]]] = {
+    status: {p: {} for p in sorted(_ORDER_PRIORITIES.values())} for status in _ORDER_TRANSITIONS
+}
+_ORDER_INDEX_LOCK = named_lock("investigation_order_index")
+
 
-_INVESTIGATION_SEQ: dict[str, int] = {"n": 0}
+# ── Results worklist ──────────────────────────────────────────────────────────
+# Hospital-wide list of pending orders ordered by (priority, due time), where
+# due time = ordered_at + turnaround_hours. One min-heap per investigation type
+# holds [priority, due_ts, tiebreak, order_id, type] entries. Entries are
+# removed lazily: the order_id slot is cleared and the entry is dropped when
+# it next surfaces, or when stale entries outnumber live ones.
+_WORKLIST_HEAPS: dict[str, list[list]] = {}
+_WORKLIST_ENTRIES: dict[str, list] = {}   # order_id → its live heap entry
+_WORKLIST_LIVE: dict[str, int] = {}       # investigation type → live entries
+_WORKLIST_TIEBREAK = itertools.count()
 
 
+def _investigation_key(order: dict) -> str:
+    return order["investigation_type"].lower().replace(" ", "_")
+
+
+def _order_due_at(order: dict) -> datetime.datetime:
+    ordered_at = datetime.datetime.strptime(order["ordered_at"], "%Y-%m-%d %H:%M")
+    hours = order.get("estimated_turnaround_hours")
+    if hours is None:
+        hours = _INVESTIGATION_TYPES.get(_investigation_key(order), {}).get("turnaround_hours", 24)
+    return ordered_at + datetime.timedelta(hours=hours)
+
+
+def _worklist_discard(order_id: str) -> None:
+    entry = _WORKLIST_ENTRIES.pop(order_id, None)
+    if entry is None:
+        return
+    entry[3] = None
+    inv_key = entry[4]
+    _WORKLIST_LIVE[inv_key] -= 1
+    heap = _WORKLIST_HEAPS[inv_key]
+    if len(heap) > 2 * _WORKLIST_LIVE[inv_key] + 64:
+        heap[:] = [e for e in heap if e[3] is not None]
+        heapq.heapify(heap)
+
+
+def _worklist_add(order: dict) -> None:
+    _worklist_discard(order["order_id"])
+    inv_key = _investigation_key(order)
+    entry = [order["priority"], _order_due_at(order).timestamp(), next(_WORKLIST_TIEBREAK),
+             order["order_id"], inv_key]
+    _WORKLIST_ENTRIES[order["order_id"]] = entry
+    _WORKLIST_LIVE[inv_key] = _WORKLIST_LIVE.get(inv_key, 0) + 1
+    heapq.heappush(_WORKLIST_HEAPS.setdefault(inv_key, []), entry)
+
+
+def _worklist_page(inv_keys: list[str], offset: int, limit: int) -> list[dict]:
+    """Orders ``offset .. offset+limit`` of the merged worklist for ``inv_keys``.
+
+    Pops entries in order from each type's heap (k-way merge), then pushes
+    the live ones back, so a page costs O((offset + limit) log n).
+    """
+    with _ORDER_INDEX_LOCK:
+        popped: list[tuple[list, list]] = []
+
+        def drain(heap: list):
+            while heap:
+                entry = heapq.heappop(heap)
+                if entry[3] is None:
+                    continue
+                popped.append((heap, entry))
+                yield entry
+
+        taken = []
+        if offset + limit > 0:
+            for entry in heapq.merge(*(drain(_WORKLIST_HEAPS[k]) for k in inv_keys if k in _WORKLIST_HEAPS)):
+                taken.append(entry)
+                if len(taken) >= offset + limit:
+                    break
+        for heap, entry in popped:
+            heapq.heappush(heap, entry)
+        return [_ORDER_INDEX[e[3]] for e in taken[offset:]]
+
+
+def _index_order(order: dict) -> None:
+    with _ORDER_INDEX_LOCK:
+        _ORDER_INDEX[order["order_id"]] = order
+        _ORDER_QUEUES[order["status"]].setdefault(order["priority"], {})[order["order_id"]] = None
+        if order["status"] in _PENDING_STATUSES:
+            _worklist_add(order)
+
+
+def _unindex_order(order: dict) -> None:
+    with _ORDER_INDEX_LOCK:
+        if _ORDER_INDEX.get(order["order_id"]) is order:
+            del _ORDER_INDEX[order["order_id"]]
+            _worklist_discard(order["order_id"])
+        _ORDER_QUEUES.get(order["status"], {}).get(order["priority"], {}).pop(order["order_id"], None)
+
+
+def _reindex_patient_orders(patient_id: str, old: Optional[list], new: Optional[list]) -> None:
+    """Backend load hook: follows a patient's order list replaced by another worker."""
+    for order in old or ():
+        _unindex_order(order)
+    for order in new or ():
+        _index_order(order)
+
+
+def _rebuild_order_index() -> None:
+    """Rebuilds every index from ``_INVESTIGATION_ORDERS`` (after a bulk restore)."""
+    with _ORDER_INDEX_LOCK:
+        _ORDER_INDEX.clear()
+        for queues in _ORDER_QUEUES.values():
+            for queue in queues.values():
+                queue.clear()
+        _WORKLIST_HEAPS.clear()
+        _WORKLIST_ENTRIES.clear()
+        _WORKLIST_LIVE.clear()
+        for orders in _INVESTIGATION_ORDERS.values():
+            for order in orders:
+                _index_order(order)
+
+
+def _find_order(order_id: str, patient_id: Optional[str] = None) -> Optional[dict]:
+    """Looks up an order by ID; with ``patient_id``, only if it belongs to that patient."""
+    order = _ORDER_INDEX.get(order_id)
+    if order is None or (patient_id is not None and order["patient_id"] != patient_id):
+        return None
+    return order
+
+
+def _transition_order(order: dict, new_status: str) -> Optional[str]:
+    """Moves an order to ``new_status`` if the state machine allows it.
+
+    Caller holds the patient's lock. Stamps ``<status>_at`` on the order.
+
+    Returns:
+        Optional[str]: ``None`` on success, otherwise the reason it was refused.
+    """
+    current = order["status"]
+    if new_status not in _ORDER_TRANSITIONS.get(current, ()):
+        allowed = ", ".join(_ORDER_TRANSITIONS.get(current, ())) or "none (final state)"
+        return f"Cannot move order {order['order_id']} from '{current}' to '{new_status}'. Allowed: {allowed}"
+    with _ORDER_INDEX_LOCK:
+        queues = _ORDER_QUEUES[current]
+        queues.get(order["priority"], {}).pop(order["order_id"], None)
+        order["status"] = new_status
+        order[f"{new_status}_at"] = clock.now().strftime("%Y-%m-%d %H:%M")
+        _ORDER_QUEUES[new_status].setdefault(order["priority"], {})[order["order_id"]] = None
+        if new_status not in _PENDING_STATUSES:
+            _worklist_discard(order["order_id"])
+    return None
+
+
+def _orders_in(statuses: tuple[str, ...], priorities: Optional[tuple[int, ...]] = None) -> list[dict]:
+    """Orders in the given statuses, most urgent priority first, then arrival order."""
+    with _ORDER_INDEX_LOCK:
+        ids = []
+        for priority in sorted(priorities or _ORDER_PRIORITIES.values()):
+            for status in statuses:
+                ids.extend(_ORDER_QUEUES[status].get(priority, ()))
+        return [_ORDER_INDEX[i] for i in ids if i in _ORDER_INDEX]
+
+
+register_store("common.investigation_orders", _INVESTIGATION_ORDERS, "keyed", scope="patient",
+               on_load=_reindex_patient_orders)
+_rebuild_order_index()
+
+
+@state_transaction
 def order_investigation(
     patient_id: str,
     investigation_type: str,
@@ -2657,11 +2842,9 @@ def order_investigation(
             "message": f"Unknown investigation type: {investigation_type}. Available: {', '.join(_INVESTIGATION_TYPES.keys())}",
         }
 
-    _INVESTIGATION_SEQ["n"] += 1
-    now = datetime.datetime.now()
-    order_id = f"INV-{now.strftime('%Y%m%d')}-{_INVESTIGATION_SEQ['n']:04d}"
-
-    urgency_priority = {"emergency": 1, "urgent": 2, "routine": 3}
+    seq = _INVESTIGATION_SEQ.next()
+    now = clock.now()
+    order_id = f"INV-{now.strftime('%Y%m%d')}-{seq:04d}"
 
     order = {
         "order_id": order_id,
@@ -2670,14 +2853,17 @@ def order_investigation(
         "investigation_name": inv_type["name"],
         "clinical_indication": clinical_indication,
         "urgency": urgency,
-        "priority": urgency_priority.get(urgency, 3),
+        "priority": _ORDER_PRIORITIES.get(urgency, 3),
         "ordered_by": ordered_by or "System",
         "ordered_at": now.strftime("%Y-%m-%d %H:%M"),
         "status": "ordered",
         "estimated_turnaround_hours": inv_type["turnaround_hours"],
+        "department": inv_type["department"],
     }
 
-    _INVESTIGATION_ORDERS.setdefault(patient_id, []).append(order)
+    with locked(patients=[patient_id]):
+        _INVESTIGATION_ORDERS.setdefault(patient_id, []).append(order)
+        _index_order(order)
 
     return {
         "status": "ordered",
@@ -2690,6 +2876,7 @@ def order_investigation(
     }
 
 
+@state_transaction(readonly=True)
 def get_pending_results(
     patient_id: str,
     status_filter: str = "all",
@@ -2738,6 +2925,144 @@ def get_pending_results(
     }
 
 
+@state_transaction
+def mark_investigation_processing(order_id: str, patient_id: str) -> dict:
+    """Records that the lab or imaging department has started on an order.
+
+    Args:
+        order_id: The order ID (e.g., "INV-20250101-0001").
+        patient_id: Patient identifier the order belongs to.
+
+    Returns:
+        dict: The updated order, or the reason the transition was refused.
+    """
+    with locked(patients=[patient_id]):
+        order = _find_order(order_id, patient_id)
+        if order is None:
+            return {
+                "status": "not_found",
+                "message": f"Order {order_id} not found for patient {patient_id}",
+            }
+        error = _transition_order(order, "processing")
+        if error:
+            return {"status": "invalid_transition", "message": error}
+        return {"status": "processing", "order": dict(order)}
+
+
+@state_transaction(readonly=True)
+def get_orders_by_status(status: str = "pending", urgency: str = "all", limit: int = 50) -> dict:
+    """Lists investigation orders across all patients by status and urgency.
+
+    Answers questions like "all pending emergency orders" from the order
+    engine's status queues, without scanning every patient.
+
+    Args:
+        status: "pending" (ordered + processing), "ordered", "processing",
+            "resulted" or "reviewed".
+        urgency: "all", "emergency", "urgent" or "routine".
+        limit: Maximum number of orders returned.
+
+    Returns:
+        dict: Orders, most urgent first and oldest first within an urgency.
+    """
+    statuses = _PENDING_STATUSES if status == "pending" else (status,)
+    if any(s not in _ORDER_TRANSITIONS for s in statuses):
+        return {
+            "status": "invalid_status",
+            "message": f"Unknown status: {status}. Use pending, {', '.join(_ORDER_TRANSITIONS)}.",
+        }
+    if urgency != "all" and urgency not in _ORDER_PRIORITIES:
+        return {
+            "status": "invalid_urgency",
+            "message": f"Unknown urgency: {urgency}. Use all, {', '.join(_ORDER_PRIORITIES)}.",
+        }
+    priorities = None if urgency == "all" else (_ORDER_PRIORITIES[urgency],)
+    orders = _orders_in(statuses, priorities)
+
+    return {
+        "status": "success",
+        "filter": {"status": status, "urgency": urgency},
+        "total": len(orders),
+        "orders": orders[:max(limit, 0)],
+    }
+
+
+@state_transaction(readonly=True)
+def get_results_worklist(
+    investigation_type: str = "all",
+    department: str = "all",
+    page: int = 1,
+    page_size: int = 20,
+) -> dict:
+    """Returns the hospital-wide worklist of investigations awaiting a result.
+
+    Orders from all patients that are still ordered or processing, most
+    urgent first and, within an urgency, soonest due first (ordered time
+    plus the investigation's typical turnaround).
+
+    Args:
+        investigation_type: "all" or one investigation type (e.g., "ct_head").
+        department: "all", "laboratory", "microbiology", "radiology" or "cardiology".
+        page: Page number, starting at 1.
+        page_size: Orders per page (1–100).
+
+    Returns:
+        dict: One page of the worklist with due times and overdue flags.
+    """
+    departments = sorted({t["department"] for t in _INVESTIGATION_TYPES.values()})
+    inv_keys = list(_INVESTIGATION_TYPES)
+    if investigation_type != "all":
+        wanted = investigation_type.lower().replace(" ", "_")
+        if wanted not in _INVESTIGATION_TYPES:
+            return {
+                "status": "invalid_type",
+                "message": f"Unknown investigation type: {investigation_type}. Available: {', '.join(_INVESTIGATION_TYPES.keys())}",
+            }
+        inv_keys = [wanted]
+    if department != "all":
+        if department.lower() not in departments:
+            return {
+                "status": "invalid_department",
+                "message": f"Unknown department: {department}. Available: {', '.join(departments)}",
+            }
+        inv_keys = [k for k in inv_keys if _INVESTIGATION_TYPES[k]["department"] == department.lower()]
+
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), 100)
+    total = sum(_WORKLIST_LIVE.get(k, 0) for k in inv_keys)
+    now = clock.now()
+
+    items = []
+    for order in _worklist_page(inv_keys, (page - 1) * page_size, page_size):
+        due_at = _order_due_at(order)
+        minutes_to_due = int((due_at - now).total_seconds() // 60)
+        items.append({
+            "order_id": order["order_id"],
+            "patient_id": order["patient_id"],
+            "investigation": order["investigation_name"],
+            "investigation_type": _investigation_key(order),
+            "department": _INVESTIGATION_TYPES.get(_investigation_key(order), {}).get("department", "unknown"),
+            "urgency": order["urgency"],
+            "status": order["status"],
+            "ordered_at": order["ordered_at"],
+            "due_at": due_at.strftime("%Y-%m-%d %H:%M"),
+            "minutes_to_due": minutes_to_due,
+            "overdue": minutes_to_due < 0,
+        })
+
+    return {
+        "status": "success",
+        "filter": {"investigation_type": investigation_type, "department": department},
+        "total_pending": total,
+        "overdue_on_page": sum(1 for i in items if i["overdue"]),
+        "page": page,
+        "pages": max((total + page_size - 1) // page_size, 1),
+        "page_size": page_size,
+        "orders": items,
+    }
+
+
+@state_transaction
 def acknowledge_critical_result(
     patient_id: str,
     investigation_id: str,
@@ -2757,34 +3082,30 @@ def acknowledge_critical_result(
     Returns:
         dict: Acknowledgment confirmation.
     """
-    if patient_id not in _INVESTIGATION_ORDERS:
-        return {
-            "status": "not_found",
-            "message": f"No investigation orders found for patient {patient_id}",
-        }
-
-    order = None
-    for o in _INVESTIGATION_ORDERS[patient_id]:
-        if o["order_id"] == investigation_id:
-            order = o
-            break
-
-    if not order:
-        return {
-            "status": "not_found",
-            "message": f"Order {investigation_id} not found for patient {patient_id}",
-        }
-
-    if order["status"] != "resulted":
-        return {
-            "status": "not_resulted",
-            "message": f"Order {investigation_id} has not been resulted yet. Current status: {order['status']}",
-        }
-
-    order["status"] = "reviewed"
-    order["acknowledged_by"] = clinician_id
-    order["acknowledged_at"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-    order["acknowledgment_notes"] = notes
+    with locked(patients=[patient_id]):
+        if patient_id not in _INVESTIGATION_ORDERS:
+            return {
+                "status": "not_found",
+                "message": f"No investigation orders found for patient {patient_id}",
+            }
+
+        order = _find_order(investigation_id, patient_id)
+        if not order:
+            return {
+                "status": "not_found",
+                "message": f"Order {investigation_id} not found for patient {patient_id}",
+            }
+
+        if order["status"] != "resulted":
+            return {
+                "status": "not_resulted",
+                "message": f"Order {investigation_id} has not been resulted yet. Current status: {order['status']}",
+            }
+
+        _transition_order(order, "reviewed")
+        order["acknowledged_by"] = clinician_id
+        order["acknowledged_at"] = order["reviewed_at"]
+        order["acknowledgment_notes"] = notes
 
     return {
         "status": "acknowledged",
@@ -2798,17 +3119,29 @@ def acknowledge_critical_result(
 
 
 # Mock function to simulate results being available (for testing)
+@state_transaction
 def mock_result_investigation(order_id: str, patient_id: str, result_data: dict = None) -> dict:
-    """Simulates a lab/radiology result being available (for demo purposes)."""
-    if patient_id not in _INVESTIGATION_ORDERS:
-        return {"status": "not_found"}
-
-    for order in _INVESTIGATION_ORDERS[patient_id]:
-        if order["order_id"] == order_id:
-            order["status"] = "resulted"
-            order["resulted_at"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-            order["result_data"] = result_data or {"result": "Normal", "notes": "No significant abnormalities"}
-            return {"status": "resulted", "order": order}
-
-    return {"status": "not_found"}
+    """Simulates a lab/radiology result being available (for demo purposes).
 
+    Without ``result_data`` a result consistent with the patient's recorded
+    labs is generated (see ``simulation.lab.generate_result``); an empty dict
+    records a normal result.
+    """
+    with locked(patients=[patient_id]):
+        order = _find_order(order_id, patient_id)
+        if order is None:
+            return {"status": "not_found"}
+
+        # The demo skips the lab's own processing step
+        if order["status"] == "ordered":
+            _transition_order(order, "processing")
+        error = _transition_order(order, "resulted")
+        if error:
+            return {"status": "invalid_transition", "message": error}
+        if result_data is None:
+            from ..simulation.lab import generate_result
+            result_data = generate_result(order["investigation_type"], patient_id)
+        elif not result_data:
+            result_data = {"result": "Normal", "notes": "No significant abnormalities"}
+        order["result_data"] = result_data
+        return {"status": "resulted", "order": order}
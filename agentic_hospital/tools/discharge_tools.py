@@ -3,11 +3,21 @@
 from datetime import datetime, timedelta
 from typing import Optional
 
+from ..infra.backend import register_store, state_transaction
+from ..infra.event_log import log_event, register_log
+from ..infra.state import AtomicCounter, locked
+
 # ── In-memory state ───────────────────────────────────────────────────────────
 _DISCHARGE_SUMMARY_LOG: dict[str, list[dict]] = {}  # patient_id → discharge summaries
 _GP_LETTER_LOG: dict[str, list[dict]] = {}  # patient_id → GP letters sent
 _COMMUNITY_REFERRAL_LOG: dict[str, list[dict]] = {}  # patient_id → community referrals
-_DISCHARGE_SEQ: dict[str, int] = {"n": 0}  # auto-increment for discharge IDs
+_DISCHARGE_SEQ = AtomicCounter("discharge_seq")  # auto-increment for discharge IDs
+
+register_store("discharge.summaries", _DISCHARGE_SUMMARY_LOG, "keyed", scope="patient")
+register_store("discharge.gp_letters", _GP_LETTER_LOG, "keyed", scope="patient")
+register_store("discharge.community_referrals", _COMMUNITY_REFERRAL_LOG, "keyed", scope="patient")
+register_log("discharge.summaries", _DISCHARGE_SUMMARY_LOG)
+register_log("discharge.gp_letters", _GP_LETTER_LOG)
 
 # ── Community services ───────────────────────────────────────────────────────
 _COMMUNITY_SERVICES = {
@@ -184,6 +194,7 @@ def check_discharge_criteria(
     }
 
 
+@state_transaction
 def generate_discharge_summary(
     patient_id: str,
     admitting_diagnosis: str,
@@ -216,9 +227,9 @@ def generate_discharge_summary(
     Returns:
         dict: Complete discharge summary document.
     """
-    _DISCHARGE_SEQ["n"] += 1
+    seq = _DISCHARGE_SEQ.next()
     now = datetime.now()
-    summary_id = f"DS-{now.strftime('%Y%m%d')}-{_DISCHARGE_SEQ['n']:04d}"
+    summary_id = f"DS-{now.strftime('%Y%m%d')}-{seq:04d}"
 
     patient_info = _get_patient_info(patient_id)
 
@@ -248,7 +259,7 @@ def generate_discharge_summary(
         "generated_at": now.strftime("%Y-%m-%d %H:%M"),
     }
 
-    _DISCHARGE_SUMMARY_LOG.setdefault(patient_id, []).append(summary)
+    log_event("discharge.summaries", summary, key=patient_id)
 
     return {
         "status": "generated",
@@ -259,6 +270,7 @@ def generate_discharge_summary(
     }
 
 
+@state_transaction
 def send_gp_letter(
     patient_id: str,
     gp_name: str,
@@ -278,9 +290,9 @@ def send_gp_letter(
     Returns:
         dict: GP letter with confirmation.
     """
-    _DISCHARGE_SEQ["n"] += 1
+    seq = _DISCHARGE_SEQ.next()
     now = datetime.now()
-    letter_id = f"GPL-{now.strftime('%Y%m%d')}-{_DISCHARGE_SEQ['n']:04d}"
+    letter_id = f"GPL-{now.strftime('%Y%m%d')}-{seq:04d}"
 
     patient_info = _get_patient_info(patient_id)
 
@@ -309,7 +321,7 @@ def send_gp_letter(
         "generated_at": now.strftime("%Y-%m-%d %H:%M"),
     }
 
-    _GP_LETTER_LOG.setdefault(patient_id, []).append(gp_letter)
+    log_event("discharge.gp_letters", gp_letter, key=patient_id)
 
     return {
         "status": "sent",
@@ -321,6 +333,7 @@ def send_gp_letter(
     }
 
 
+@state_transaction
 def arrange_community_services(
     patient_id: str,
     services_required: list[str],
@@ -351,10 +364,10 @@ def arrange_community_services(
         if not service:
             continue
 
-        _DISCHARGE_SEQ["n"] += 1
+        seq = _DISCHARGE_SEQ.next()
 
         referral = {
-            "referral_id": f"REF-{datetime.now().strftime('%Y%m%d')}-{_DISCHARGE_SEQ['n']:04d}",
+            "referral_id": f"REF-{datetime.now().strftime('%Y%m%d')}-{seq:04d}",
             "patient_id": patient_id,
             "patient_name": patient_info["name"],
             "patient_address": patient_info.get("address", ""),
@@ -368,7 +381,8 @@ def arrange_community_services(
         }
         referrals.append(referral)
 
-    _COMMUNITY_REFERRAL_LOG.setdefault(patient_id, []).extend(referrals)
+    with locked(patients=[patient_id]):
+        _COMMUNITY_REFERRAL_LOG.setdefault(patient_id, []).extend(referrals)
 
     urgency_timeline = {
         "routine": "within 2-4 weeks",
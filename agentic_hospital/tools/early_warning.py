@@ -0,0 +1,180 @@
+"""Early-warning scoring shared by bedside and ward-wide vitals tools.
+
+``record_vitals`` scores one set of observations; ``score_vitals_batch``
+scores a whole ward's columns in one NumPy pass. Both evaluate the
+``VITAL_ALERT_RULES`` and ``NEWS_RULES`` tables from ``rules``, so a bedside
+reading and the ward round always agree. Alert levels are an ordinal
+``AlertLevel`` enum, so ``max`` picks the most severe one.
+
+Check the batch path against the scalar one, and time it, with::
+
+    python -m agentic_hospital.tools.early_warning --bench 100000
+"""
+
+import argparse
+import json
+import time
+from typing import Optional, Sequence
+
+from .rules import NEWS_RULES, VITAL_ALERT_RULES, AlertLevel
+
+# Vitals columns, in the order the batch API takes them. ``map`` is derived
+# from systolic/diastolic the same way on both paths.
+VITAL_COLUMNS = ("systolic", "diastolic", "heart_rate", "temperature", "spo2", "respiratory_rate")
+
+
+# NEWS interpretation bands: (minimum points, interpretation, monitoring frequency)
+_NEWS_RISK = (
+    (7, "HIGH risk — urgent clinical review required", "Continuous monitoring"),
+    (5, "Medium risk — increase monitoring frequency", "Hourly"),
+    (0, "Low risk", "4-hourly"),
+)
+
+
+def news_interpretation(points: int) -> str:
+    """Risk wording for a NEWS-lite total, as reported by ``record_vitals``."""
+    return next(text for floor, text, _ in _NEWS_RISK if points >= floor)
+
+
+def observation_frequency(points: int) -> str:
+    """Observation frequency for a NEWS-lite total."""
+    return next(freq for floor, _, freq in _NEWS_RISK if points >= floor)
+
+
+# =============================================================================
+# SCALAR PATH
+# =============================================================================
+def mean_arterial_pressure(systolic: float, diastolic: float) -> int:
+    return round((systolic + 2 * diastolic) / 3)
+
+
+def evaluate_vitals(values: dict) -> tuple[AlertLevel, list[str], int]:
+    """Scores one set of observations.
+
+    Args:
+        values: ``VITAL_COLUMNS`` keys (plus optional ``map``); missing or
+            ``None`` values skip their rules.
+
+    Returns:
+        tuple: (alert level, analysis lines, NEWS-lite points).
+    """
+    values = dict(values)
+    if values.get("map") is None and values.get("systolic") is not None and values.get("diastolic") is not None:
+        values["map"] = mean_arterial_pressure(values["systolic"], values["diastolic"])
+
+    level, analysis = AlertLevel.NORMAL, []
+    for group, payload in VITAL_ALERT_RULES.match(values):
+        if payload is None:
+            analysis.append(group["normal"].format(**values))
+        else:
+            level = max(level, payload[0])
+            analysis.append(payload[1].format(**values))
+
+    points = sum(payload[0] for _, payload in NEWS_RULES.match(values) if payload)
+    return level, analysis, points
+
+
+# =============================================================================
+# BATCH PATH
+# =============================================================================
+def _numpy():
+    import numpy as np  # imported lazily: only the batch paths need it
+    return np
+
+
+def score_vitals_batch(
+    systolic: Sequence[float],
+    diastolic: Sequence[float],
+    heart_rate: Sequence[float],
+    temperature: Sequence[float],
+    spo2: Sequence[float],
+    respiratory_rate: Optional[Sequence[float]] = None,
+) -> dict:
+    """Scores columns of observations for many patients in one pass.
+
+    Applies the same rule tables as ``evaluate_vitals``. NaN marks a missing
+    value; blood-pressure rules and MAP are skipped when either BP column is NaN.
+
+    Args:
+        systolic: Systolic BP in mmHg.
+        diastolic: Diastolic BP in mmHg.
+        heart_rate: Heart rate in bpm.
+        temperature: Temperature in °F.
+        spo2: SpO2 in %.
+        respiratory_rate: Breaths/min (optional; NaN or ``None`` if not taken).
+
+    Returns:
+        dict: ``alert_level`` (int array of ``AlertLevel`` values) and
+              ``news`` (int array of NEWS-lite points).
+    """
+    np = _numpy()
+    columns = {
+        "systolic": np.asarray(systolic, dtype=np.float64),
+        "diastolic": np.asarray(diastolic, dtype=np.float64),
+        "heart_rate": np.asarray(heart_rate, dtype=np.float64),
+        "temperature": np.asarray(temperature, dtype=np.float64),
+        "spo2": np.asarray(spo2, dtype=np.float64),
+    }
+    n = columns["systolic"].shape
+    columns["respiratory_rate"] = (np.full(n, np.nan) if respiratory_rate is None
+                                   else np.asarray(respiratory_rate, dtype=np.float64))
+    # Round half to even, like the scalar round(); NaN propagates
+    columns["map"] = np.round((columns["systolic"] + 2 * columns["diastolic"]) / 3)
+    bp_missing = np.isnan(columns["systolic"]) | np.isnan(columns["diastolic"])
+    for name in ("systolic", "diastolic"):
+        columns[name] = np.where(bp_missing, np.nan, columns[name])
+
+    # NaN marks a missing value: its groups match no rule and score nothing
+    level = VITAL_ALERT_RULES.select(VITAL_ALERT_RULES.match_batch(columns), 0, 0).max(axis=1).astype(np.int8)
+    news = NEWS_RULES.select(NEWS_RULES.match_batch(columns), 0, 0).sum(axis=1).astype(np.int8)
+    return {"alert_level": level, "news": news}
+
+
+def _bench(n: int, seed: int = 7) -> dict:
+    """Checks ``score_vitals_batch`` against ``evaluate_vitals`` and times both on ``n`` synthetic obs sets."""
+    np = _numpy()
+    rng = np.random.default_rng(seed)
+    obs = {
+        "systolic": rng.integers(55, 240, n).astype(float),
+        "diastolic": rng.integers(35, 130, n).astype(float),
+        "heart_rate": rng.integers(30, 180, n).astype(float),
+        "temperature": np.round(rng.uniform(93.0, 106.0, n), 1),
+        "spo2": rng.integers(80, 101, n).astype(float),
+        "respiratory_rate": rng.integers(5, 40, n).astype(float),
+    }
+    missing = rng.random(n) < 0.1
+    obs["respiratory_rate"][missing] = np.nan
+    obs["systolic"][rng.random(n) < 0.02] = np.nan
+
+    started = time.perf_counter()
+    batch = score_vitals_batch(**obs)
+    batch_s = time.perf_counter() - started
+
+    rows = [{name: (None if np.isnan(obs[name][i]) else obs[name][i].item()) for name in VITAL_COLUMNS}
+            for i in range(n)]
+    started = time.perf_counter()
+    scalar = [evaluate_vitals(row) for row in rows]
+    scalar_s = time.perf_counter() - started
+
+    return {
+        "observation_sets": n,
+        "scalar_seconds": round(scalar_s, 3),
+        "batch_seconds": round(batch_s, 4),
+        "speedup": round(scalar_s / max(batch_s, 1e-9)),
+        "alert_level_mismatches": int(np.sum(batch["alert_level"] != np.array([int(s[0]) for s in scalar]))),
+        "news_mismatches": int(np.sum(batch["news"] != np.array([s[2] for s in scalar]))),
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Check and time the batch early-warning path.")
+    parser.add_argument("--bench", type=int, default=100_000, metavar="N")
+    args = parser.parse_args(argv)
+    report = _bench(args.bench)
+    print(json.dumps(report, indent=2))
+    if report["alert_level_mismatches"] or report["news_mismatches"]:
+        raise SystemExit("batch early-warning scores disagree with evaluate_vitals")
+
+
+if __name__ == "__main__":
+    main()
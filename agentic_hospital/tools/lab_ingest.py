@@ -0,0 +1,725 @@
+"""HL7v2 ORU^R01 lab result ingestion into the lab store.
+
+Analysers and the LIS report results as HL7v2 ORU^R01 messages: an MSH header,
+the patient (PID), one OBR per order or panel, and one OBX per analyte::
+
+    MSH|^~\\&|COBAS|CORE_LAB|AGENTIC_HOSPITAL|WARD|20260220101500||ORU^R01|MSG0001|P|2.5
+    PID|1||P001^^^AH^MR
+    OBR|1|INV-20260220-0001||blood_panel^Blood Panel|||20260220100500|||||||||||||||||F
+    OBX|1|NM|2823-3^Potassium^LN||6.9|mmol/L|3.5-5.1|HH|||F
+
+The NDJSON stand-in carries the same content, one OBR group per line::
+
+    {"patient_id": "P001", "order_id": "INV-20260220-0001", "service": "blood_panel",
+     "observed_at": "2026-02-20T10:05:00", "results": [{"code": "2823-3", "name": "Potassium",
+     "value": 6.9, "unit": "mmol/L", "flags": "HH", "status": "F"}]}
+
+``LabResultIngestor`` buffers parsed results and flushes them in batches, one
+state transaction each. A flush:
+
+* upserts each analyte into ``_LAB_DB`` under the panel/field that
+  ``get_lab_results`` reads (Potassium -> ``BMP``/``Potassium``, INR ->
+  ``INR``/``value``). Values of the critical-value tests are stored in the
+  table unit (glucose mmol/L -> mg/dL), so other tools read one unit.
+* classifies the batch with ``pathology_tools.classify_results_batch``.
+  Critical values raise ``generate_deterioration_alert``-format alerts on
+  the ``monitoring.alerts`` log.
+* rejects groups for a patient ID that is not in ``_PATIENT_DB`` (counted
+  as ``unknown_patient``), so a misrouted result never creates a lab record.
+* resolves the matching order in ``_INVESTIGATION_ORDERS``, either by the OBR
+  placer number or by the patient's oldest pending order of a matching
+  investigation type. Final results move it to ``resulted`` with the values
+  in ``result_data``, which is what ``acknowledge_critical_result`` closes.
+
+Memory is bounded by the batch size: messages are parsed as they are read, and
+only counts and the most recent alerts are kept. Ingest a file, stdin, or
+a local MLLP socket (each message is ACKed once its batch is stored)::
+
+    python -m agentic_hospital.tools.lab_ingest ingest results.hl7
+    python -m agentic_hospital.tools.lab_ingest listen --port 2575
+    python -m agentic_hospital.tools.lab_ingest bench --results 50000
+"""
+
+import argparse
+import datetime
+import io
+import json
+import random
+import socket
+import sys
+import time
+from collections import deque
+from functools import lru_cache
+from typing import IO, Iterable, Iterator, Optional, Sequence, Union
+
+from ..infra import clock
+from ..infra.backend import state_transaction
+from ..infra.event_log import log_event
+from ..infra.ids import new_id
+from ..infra.state import locked
+from .common_tools import (
+    _INVESTIGATION_ORDERS,
+    _LAB_DB,
+    _PATIENT_DB,
+    _PENDING_STATUSES,
+    _find_order,
+    _investigation_key,
+    _transition_order,
+)
+from .monitoring_tools import _alert_record
+from .pathology_tools import _name_key, _resolve_result, classify_results_batch
+from .rules import PATHOLOGY_RULES
+
+# Analyte -> (_LAB_DB panel, field, LOINC codes and analyser names)
+_ANALYTES: dict[str, tuple[str, str, tuple[str, ...]]] = {
+    "WBC": ("CBC", "WBC", ("6690-2", "white blood cells", "leukocytes")),
+    "RBC": ("CBC", "RBC", ("789-8", "red blood cells", "erythrocytes")),
+    "Hemoglobin": ("CBC", "Hemoglobin", ("718-7", "Hb", "HGB", "haemoglobin")),
+    "Hematocrit": ("CBC", "Hematocrit", ("4544-3", "HCT", "haematocrit")),
+    "MCV": ("CBC", "MCV", ("787-2",)),
+    "Platelets": ("CBC", "Platelets", ("777-3", "26515-7", "PLT", "platelet count")),
+    "Glucose": ("BMP", "Glucose", ("2345-7", "2339-0", "GLU")),
+    "BUN": ("BMP", "BUN", ("3094-0", "urea nitrogen")),
+    "Creatinine": ("BMP", "Creatinine", ("2160-0", "CREA")),
+    "eGFR": ("BMP", "eGFR", ("33914-3", "62238-1")),
+    "Sodium": ("BMP", "Sodium", ("2951-2", "2947-0", "Na")),
+    "Potassium": ("BMP", "Potassium", ("2823-3", "6298-4", "K")),
+    "Chloride": ("BMP", "Chloride", ("2075-0", "Cl")),
+    "CO2": ("BMP", "CO2", ("2028-9", "bicarbonate", "HCO3")),
+    "Calcium": ("BMP", "Calcium", ("17861-6", "Ca")),
+    "Total_Cholesterol": ("Lipid Panel", "Total_Cholesterol", ("2093-3", "cholesterol")),
+    "LDL": ("Lipid Panel", "LDL", ("13457-7", "2089-1")),
+    "HDL": ("Lipid Panel", "HDL", ("2085-9",)),
+    "Triglycerides": ("Lipid Panel", "Triglycerides", ("2571-8", "TRIG")),
+    "ALT": ("LFTs", "ALT", ("1742-6",)),
+    "AST": ("LFTs", "AST", ("1920-8",)),
+    "Alk_Phos": ("LFTs", "Alk_Phos", ("6768-6", "ALP", "alkaline phosphatase")),
+    "Total_Bilirubin": ("LFTs", "Total_Bilirubin", ("1975-2", "bilirubin")),
+    "Albumin": ("LFTs", "Albumin", ("1751-7", "ALB")),
+    "Troponin_I": ("Cardiac_Enzymes", "Troponin_I", ("10839-9", "troponin", "troponin I", "TnI")),
+    "CK_MB": ("Cardiac_Enzymes", "CK_MB", ("13969-1", "CK-MB")),
+    "BNP": ("BNP", "value", ("30934-4",)),
+    "INR": ("INR", "value", ("6301-6", "34714-6", "PT-INR")),
+    "CRP": ("Inflammatory_Markers", "CRP", ("1988-5",)),
+    "ESR": ("Inflammatory_Markers", "ESR", ("4537-7",)),
+    "TSH": ("TSH", "value", ("3016-3",)),
+    "Free_T4": ("Thyroid", "Free_T4", ("3024-7", "FT4")),
+    "HbA1c": ("HbA1c", "value", ("4548-4", "A1c")),
+    "Lactate": ("Lactate", "value", ("2524-7", "32693-4", "lactic acid")),
+}
+
+# Panel -> investigation types whose pending orders it can result
+_PANEL_INVESTIGATIONS: dict[str, tuple[str, ...]] = {
+    "CBC": ("blood_panel",),
+    "BMP": ("blood_panel", "renal_function"),
+    "LFTs": ("liver_function",),
+    "Lipid Panel": ("lipid_panel",),
+    "Cardiac_Enzymes": ("cardiac_enzymes",),
+    "BNP": ("cardiac_enzymes",),
+    "INR": ("coagulation",),
+    "Inflammatory_Markers": ("inflammation",),
+    "TSH": ("thyroid",),
+    "Thyroid": ("thyroid",),
+    "HbA1c": ("hba1c",),
+}
+
+# OBX-11 result status
+_PRELIMINARY_STATUSES = ("P", "I", "R", "S")  # preliminary, pending, unverified, partial
+_SKIPPED_STATUSES = ("X", "D", "W")           # cannot be obtained, deleted, wrong patient
+_MLLP_START, _MLLP_END = "\x0b", "\x1c"
+
+
+def _build_analyte_index() -> dict[str, str]:
+    index = {}
+    for analyte, (_, _, aliases) in _ANALYTES.items():
+        for name in (analyte, *aliases):
+            index[_name_key(name)] = analyte
+    return index
+
+
+_ANALYTE_INDEX = _build_analyte_index()
+
+
+# =============================================================================
+# PARSING
+# =============================================================================
+def _hl7_time(value: str) -> Optional[str]:
+    """HL7 DTM (YYYYMMDDHHMM[SS][+ZZZZ]) -> 'YYYY-MM-DD HH:MM', or ``None``."""
+    digits = value.split("+")[0].split("-")[0].split(".")[0]
+    for fmt in ("%Y%m%d%H%M%S", "%Y%m%d%H%M", "%Y%m%d"):
+        try:
+            return datetime.datetime.strptime(digits, fmt).strftime("%Y-%m-%d %H:%M")
+        except ValueError:
+            continue
+    return None
+
+
+def _unescape(text: str, fs: str, cs: str, rs: str, es: str, ss: str) -> str:
+    if es not in text:
+        return text
+    for code, char in (("F", fs), ("S", cs), ("R", rs), ("T", ss), ("E", es)):
+        text = text.replace(f"{es}{code}{es}", char)
+    return text
+
+
+def _number(value) -> Union[float, str, None]:
+    """Numeric values as floats; text results ('Negative', '>60') kept as strings."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def parse_oru(message: str) -> list[dict]:
+    """Parses one HL7v2 ORU^R01 message into OBR groups.
+
+    Args:
+        message: The message text; segments separated by CR or newlines.
+
+    Returns:
+        list: One dict per OBR: ``patient_id``, ``order_id`` (placer number),
+              ``service``, ``observed_at``, ``control_id`` and ``results``
+              (``code``, ``name``, ``value``, ``unit``, ``flags``, ``status``).
+
+    Raises:
+        ValueError: Not an ORU^R01 message, or no patient identifier.
+    """
+    segments = [s.strip(_MLLP_START + _MLLP_END + "\n") for s in message.replace("\r", "\n").split("\n")]
+    segments = [s for s in segments if s]
+    if not segments or not segments[0].startswith("MSH") or len(segments[0]) < 8:
+        raise ValueError("message does not start with an MSH segment")
+    fs = segments[0][3]
+    cs, rs, es, ss = (segments[0][4:8] + "^~\\&"[len(segments[0][4:8]):])[:4]
+    msh = segments[0].split(fs)
+    if len(msh) < 10 or not msh[8].startswith(f"ORU{cs}R01"):
+        raise ValueError(f"unsupported message type '{msh[8] if len(msh) > 8 else ''}'")
+
+    def field(fields: list, n: int) -> str:
+        return fields[n] if n < len(fields) else ""
+
+    control_id, patient_id, groups = msh[9], None, []
+    for segment in segments[1:]:
+        fields = segment.split(fs)
+        kind = fields[0]
+        if kind == "PID":
+            ids = field(fields, 3) or field(fields, 2)
+            patient_id = ids.split(rs)[0].split(cs)[0] or None
+        elif kind == "OBR":
+            service = field(fields, 4).split(cs)
+            groups.append({
+                "patient_id": patient_id,
+                "order_id": field(fields, 2).split(cs)[0] or None,
+                "service": service[0],
+                "service_name": service[1] if len(service) > 1 else service[0],
+                "observed_at": _hl7_time(field(fields, 7)),
+                "control_id": control_id,
+                "results": [],
+            })
+        elif kind == "OBX":
+            if not groups:  # OBX before any OBR: give it an unnamed group
+                groups.append({"patient_id": patient_id, "order_id": None, "service": "", "service_name": "",
+                               "observed_at": None, "control_id": control_id, "results": []})
+            identifier = field(fields, 3).split(cs)
+            raw = _unescape(field(fields, 5).split(rs)[0], fs, cs, rs, es, ss)
+            groups[-1]["results"].append({
+                "code": identifier[0],
+                "name": identifier[1] if len(identifier) > 1 and identifier[1] else identifier[0],
+                "value": _number(raw) if field(fields, 2) in ("NM", "SN", "") else raw,
+                "unit": field(fields, 6).split(cs)[0],
+                "flags": field(fields, 8),
+                "status": field(fields, 11) or "F",
+            })
+            if not groups[-1]["observed_at"]:
+                groups[-1]["observed_at"] = _hl7_time(field(fields, 14))
+    if patient_id is None:
+        raise ValueError(f"message {control_id}: no patient identifier in PID-3")
+    return groups
+
+
+def _ndjson_group(record: dict) -> dict:
+    if not record.get("patient_id"):
+        raise ValueError("record has no patient_id")
+    observed = record.get("observed_at")
+    if observed:
+        observed = datetime.datetime.fromisoformat(str(observed)).strftime("%Y-%m-%d %H:%M")
+    results = record.get("results")
+    if results is None:  # one result per line
+        results = [record]
+    return {
+        "patient_id": record["patient_id"],
+        "order_id": record.get("order_id"),
+        "service": record.get("service", ""),
+        "service_name": record.get("service", ""),
+        "observed_at": observed,
+        "control_id": record.get("control_id"),
+        "results": [{
+            "code": str(r.get("code", "")),
+            "name": r.get("name") or r.get("test") or r.get("test_name") or str(r.get("code", "")),
+            "value": _number(r.get("value")),
+            "unit": r.get("unit", ""),
+            "flags": r.get("flags", ""),
+            "status": r.get("status", "F"),
+        } for r in results],
+    }
+
+
+def read_messages(source: Union[str, IO[str]], errors: Optional[list] = None) -> Iterator[dict]:
+    """Yields OBR groups from HL7v2 or NDJSON, read incrementally.
+
+    Args:
+        source: File path, '-' for stdin, or an open text stream. HL7 messages
+            (optionally MLLP-framed) and NDJSON lines may be mixed.
+        errors: If given, unparseable messages are appended here instead of raising.
+    """
+    if isinstance(source, str):
+        if source == "-":
+            yield from read_messages(sys.stdin, errors)
+            return
+        with open(source, encoding="utf-8") as handle:
+            yield from read_messages(handle, errors)
+            return
+
+    def parsed(parse, payload):
+        try:
+            return parse(payload)
+        except (ValueError, KeyError, TypeError, AttributeError) as exc:
+            if errors is None:
+                raise
+            errors.append(str(exc))
+            return []
+
+    buffer: list[str] = []
+    for line in source:
+        line = line.strip().strip(_MLLP_START + _MLLP_END)
+        if not line:
+            continue
+        if line.startswith("MSH") or line.startswith("{"):
+            if buffer:
+                yield from parsed(parse_oru, "\r".join(buffer))
+                buffer = []
+            if line.startswith("{"):
+                yield from parsed(lambda text: [_ndjson_group(json.loads(text))], line)
+                continue
+        buffer.append(line)
+    if buffer:
+        yield from parsed(parse_oru, "\r".join(buffer))
+
+
+# =============================================================================
+# INGESTION
+# =============================================================================
+@lru_cache(maxsize=None)
+def _critical_reference(test: str, level: str) -> str:
+    group = PATHOLOGY_RULES.group(test)
+    for rule in group["rules"]:
+        if rule[1] == level:
+            _, op, threshold = rule[0][0]
+            return f"{op}{threshold} {group['unit']} (AACC critical value)"
+    return "AACC critical value"
+
+
+def _panel_key(labs: dict, panel: str) -> str:
+    """The patient's existing spelling of a panel ('Lipid_Panel' vs 'Lipid Panel')."""
+    wanted = panel.lower().replace(" ", "_")
+    for key in labs:
+        if key.lower().replace(" ", "_") == wanted:
+            return key
+    return panel
+
+
+def _classify_name(result: dict) -> str:
+    """The OBX identifier the critical value table knows: the code if indexed, else the name."""
+    return result["code"] if _resolve_result(result["code"], result["unit"])[0] else result["name"]
+
+
+def _match_order(patient_id: str, group: dict, panels: set) -> Optional[dict]:
+    """The order a result group answers: by placer number, else the oldest pending order of a matching type."""
+    if group["order_id"]:
+        return _find_order(group["order_id"], patient_id)
+    wanted = {group["service"].lower().replace(" ", "_")}
+    for panel in panels:
+        wanted.update(_PANEL_INVESTIGATIONS.get(panel, ()))
+    pending = [o for o in _INVESTIGATION_ORDERS.get(patient_id, ())
+               if o["status"] in _PENDING_STATUSES and _investigation_key(o) in wanted]
+    return min(pending, key=lambda o: (o["priority"], o["ordered_at"]), default=None)
+
+
+class LabResultIngestor:
+    """Batches analyser results into the lab store, order book and alert log.
+
+    Args:
+        batch_size: Results per flush; each flush is one state transaction.
+        log_alerts: Write critical-value alerts to the ``monitoring.alerts`` log.
+        keep_alerts: How many of the most recent alerts to keep in ``recent_alerts``.
+    """
+
+    def __init__(self, batch_size: int = 500, log_alerts: bool = True, keep_alerts: int = 100):
+        self.batch_size = max(batch_size, 1)
+        self.log_alerts = log_alerts
+        self.recent_alerts: deque = deque(maxlen=keep_alerts)
+        self.rejected: list[dict] = []  # groups the last flush dropped for an unregistered patient
+        self._pending: list[dict] = []
+        self._pending_results = 0
+        self.counts = {"groups": 0, "results": 0, "skipped": 0, "unmapped": 0, "critical": 0,
+                       "orders_resulted": 0, "orders_updated": 0, "orders_unmatched": 0, "unknown_patient": 0,
+                       "batches": 0}
+
+    def add(self, group: dict) -> list[dict]:
+        """Buffers one OBR group; flushes (and returns the alerts raised) once the batch is full."""
+        self._pending.append(group)
+        self._pending_results += len(group["results"])
+        if self._pending_results >= self.batch_size:
+            return self.flush()
+        return []
+
+    def ingest(self, groups: Iterable[dict]) -> list[dict]:
+        """Adds every group, flushes the remainder and returns the alerts raised."""
+        alerts = []
+        for group in groups:
+            alerts.extend(self.add(group))
+        alerts.extend(self.flush())
+        return alerts
+
+    def flush(self) -> list[dict]:
+        """Stores the buffered groups in one transaction and returns the alerts raised."""
+        groups, self._pending, self._pending_results = self._pending, [], 0
+        self.rejected = []
+        if not groups:
+            return []
+        alerts, self.rejected = self._apply(groups)
+        self.counts["batches"] += 1
+        self.recent_alerts.extend(alerts)
+        return alerts
+
+    @state_transaction
+    def _apply(self, groups: list[dict]) -> tuple[list[dict], list[dict]]:
+        """Stores one batch; returns the alerts raised and the groups dropped for an unregistered patient."""
+        self.counts["groups"] += len(groups)
+        rejected = [g for g in groups if g["patient_id"] not in _PATIENT_DB]
+        self.counts["unknown_patient"] += len(rejected)
+        if rejected:
+            groups = [g for g in groups if g["patient_id"] in _PATIENT_DB]
+        numeric = [r for g in groups for r in g["results"]
+                   if isinstance(r["value"], float) and r["status"] not in _SKIPPED_STATUSES]
+        batch = classify_results_batch([_classify_name(r) for r in numeric], [r["value"] for r in numeric],
+                                       [r["unit"] for r in numeric])
+        classified = {id(r): (batch["test"][i], batch["alert_level"][i], batch["value"][i].item(),
+                              bool(batch["unit_recognised"][i]))
+                      for i, r in enumerate(numeric)}
+
+        alerts = []
+        with locked(patients=sorted({g["patient_id"] for g in groups})):
+            for group in groups:
+                alerts.extend(self._store_group(group, classified))
+        return alerts, rejected
+
+    def _store_group(self, group: dict, classified: dict) -> list[dict]:
+        """Upserts one OBR group into the patient's labs and resolves its order. Caller holds the lock."""
+        patient_id = group["patient_id"]
+        labs = _LAB_DB.setdefault(patient_id, {})
+        resulted_at = group["observed_at"] or clock.now().strftime("%Y-%m-%d %H:%M")
+        alerts, stored, critical_values = [], {}, []
+        notes: dict[str, tuple[list, list]] = {}  # panel -> (critical analytes, flagged analytes)
+        for result in group["results"]:
+            if result["status"] in _SKIPPED_STATUSES or result["value"] is None:
+                self.counts["skipped"] += 1
+                continue
+            self.counts["results"] += 1
+            analyte = _ANALYTE_INDEX.get(_name_key(result["code"])) or _ANALYTE_INDEX.get(_name_key(result["name"]))
+            if analyte is None:
+                self.counts["unmapped"] += 1
+                panel, field = group["service_name"] or "Other", result["name"]
+            else:
+                panel, field = _ANALYTES[analyte][:2]
+            name = analyte or result["name"]
+            value, unit = result["value"], result["unit"]
+            test, level, converted, unit_known = classified.get(id(result), (None, None, None, False))
+            if test is not None and unit_known:
+                value, unit = round(converted, 4), PATHOLOGY_RULES.group(test)["unit"]
+
+            panel = _panel_key(labs, panel)
+            entry = labs.setdefault(panel, {})
+            entry[field] = value
+            if field == "value" and unit:
+                entry["unit"] = unit
+            entry["resulted_at"] = resulted_at
+            stored.setdefault(panel, {})[field] = value
+            critical, flagged = notes.setdefault(panel, ([], []))
+
+            if level is not None and "CRITICAL" in level:
+                direction = "LOW" if level.endswith("LOW") else "HIGH"
+                reference = _critical_reference(test, level)
+                _, _, action = PATHOLOGY_RULES.match_one(test, converted)
+                critical.append(name)
+                critical_values.append({"test": name, "value": value, "unit": unit, "direction": direction.lower(),
+                                        "threshold": reference, "action": action})
+                alert = _alert_record(
+                    patient_id, name, value, unit,
+                    threshold_type="lab", direction=direction, severity="CRITICAL",
+                    threshold_reference=reference, action=action,
+                    clinical_context=f"Analyser result ({group['order_id'] or group['service_name'] or panel})",
+                )
+                alerts.append(alert)
+                if self.log_alerts:
+                    log_event("monitoring.alerts", alert, key=patient_id)
+            elif result["flags"] and result["flags"].upper() != "N":
+                flagged.append(f"{name} ({result['flags']})")
+
+        for panel, (critical, flagged) in notes.items():
+            labs[panel]["status"] = "; ".join(filter(None, (
+                f"CRITICAL: {', '.join(critical)}" if critical else "",
+                f"Flagged: {', '.join(flagged)}" if flagged else "",
+            ))) or f"Resulted {resulted_at}"
+        self.counts["critical"] += len(critical_values)
+        if stored:
+            flagged = [f for _, panel_flagged in notes.values() for f in panel_flagged]
+            self._resolve_order(patient_id, group, stored, critical_values, flagged)
+        return alerts
+
+    def _resolve_order(self, patient_id: str, group: dict, stored: dict, critical_values: list,
+                       flagged: list) -> None:
+        order = _match_order(patient_id, group, set(stored))
+        if order is None:
+            self.counts["orders_unmatched"] += 1
+            return
+        if order["status"] in _PENDING_STATUSES:
+            if order["status"] == "ordered":
+                _transition_order(order, "processing")
+            if any(r["status"] in _PRELIMINARY_STATUSES for r in group["results"]):
+                return  # preliminary results: the lab is still processing
+            _transition_order(order, "resulted")
+            order["result_data"] = {"result": "Normal", "notes": "", "values": {}, "critical_values": [],
+                                    "critical": False}
+            self.counts["orders_resulted"] += 1
+        else:
+            # A later OBR group, or a corrected result, for an order already resulted
+            self.counts["orders_updated"] += 1
+        data = order.setdefault("result_data", {})
+        for panel, values in stored.items():
+            data.setdefault("values", {}).setdefault(panel, {}).update(values)
+        data["critical_values"] = data.get("critical_values", []) + critical_values
+        data["critical"] = bool(data["critical_values"])
+        if data["critical"]:
+            data["result"] = "Critical"
+        elif flagged or data.get("result") == "Abnormal":
+            data["result"] = "Abnormal"
+        else:
+            data["result"] = "Normal"
+        data["notes"] = "; ".join(filter(None, (f"Analyser message {group['control_id'] or ''}".strip(),
+                                                f"flagged: {', '.join(flagged)}" if flagged else "")))
+
+
+def ingest(source: Union[str, IO[str]], ingestor: Optional[LabResultIngestor] = None) -> dict:
+    """Ingests every message from a file, stdin ('-') or text stream.
+
+    Returns:
+        dict: Counts, throughput, parse errors (first 20) and the most recent alerts.
+    """
+    ingestor = ingestor or LabResultIngestor()
+    errors: list[str] = []
+    started = time.perf_counter()
+    ingestor.ingest(read_messages(source, errors))
+    elapsed = time.perf_counter() - started
+    return {
+        **ingestor.counts,
+        "parse_errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "results_per_minute": round(ingestor.counts["results"] * 60 / elapsed) if elapsed else None,
+        "errors": errors[:20],
+        "recent_alerts": [f"{a['patient_id']} {a['trigger']} {a['value']} {a['direction']}"
+                          for a in ingestor.recent_alerts],
+    }
+
+
+def _ack(control_id: Optional[str], code: str = "AA", text: str = "", error: str = "") -> bytes:
+    """An ACK^R01; ``error`` is an ERR segment (without the trailing carriage return)."""
+    stamp = clock.now().strftime("%Y%m%d%H%M%S")
+    message = (f"MSH|^~\\&|AGENTIC_HOSPITAL|LAB|||{stamp}||ACK^R01|ACK{new_id()}|P|2.5\r"
+               f"MSA|{code}|{control_id or ''}|{text}\r" + (f"{error}\r" if error else ""))
+    return (_MLLP_START + message + _MLLP_END + "\r").encode("utf-8")
+
+
+def listen(host: str = "127.0.0.1", port: int = 2575, ingestor: Optional[LabResultIngestor] = None,
+           max_connections: Optional[int] = None) -> dict:
+    """Receives MLLP-framed ORU^R01 messages on a local socket, one connection at a time.
+
+    Frames are stored in batches: everything already received is flushed before
+    reading more, and each message is ACKed once its batch is stored: ``AA``,
+    or ``AE`` if it could not be parsed or names a patient who is not
+    registered (its results are then not stored; the ERR segment points at
+    PID-3).
+    """
+    ingestor = ingestor or LabResultIngestor()
+    connections = 0
+    with socket.create_server((host, port)) as server:
+        while max_connections is None or connections < max_connections:
+            conn, _ = server.accept()
+            connections += 1
+            with conn:
+                buffer, received = b"", []  # (control ID, groups, parse error) per message
+                dropped: set[int] = set()  # ids of groups dropped by any flush, including those add() runs
+                while True:
+                    chunk = conn.recv(65536)
+                    if not chunk:
+                        break
+                    buffer += chunk
+                    while _MLLP_END.encode() in buffer:
+                        frame, buffer = buffer.split(_MLLP_END.encode(), 1)
+                        buffer = buffer.lstrip(b"\r")
+                        text = frame.decode("utf-8", errors="replace").lstrip(_MLLP_START)
+                        try:
+                            groups = parse_oru(text)
+                        except ValueError as exc:
+                            received.append((None, [], str(exc)[:80]))
+                            continue
+                        for group in groups:
+                            ingestor.add(group)
+                            dropped.update(map(id, ingestor.rejected))
+                        received.append((groups[0]["control_id"] if groups else None, groups, ""))
+                    if received:
+                        ingestor.flush()
+                        dropped.update(map(id, ingestor.rejected))
+                        conn.sendall(b"".join(_listen_ack(*message, dropped) for message in received))
+                        received, dropped = [], set()
+    return dict(ingestor.counts)
+
+
+def _listen_ack(control_id: Optional[str], groups: list[dict], parse_error: str, dropped: set[int]) -> bytes:
+    if parse_error:
+        return _ack(None, "AE", parse_error)
+    unknown = sorted({g["patient_id"] for g in groups if id(g) in dropped})
+    if not unknown:
+        return _ack(control_id)
+    text = f"Unknown patient {', '.join(unknown)}; results not stored"
+    return _ack(control_id, "AE", text, f"ERR||PID^1^3|204^Unknown key identifier^HL70357|E||||{text}")
+
+
+# =============================================================================
+# SYNTHETIC MESSAGES AND BENCHMARK
+# =============================================================================
+_SYNTHETIC_PANELS = {
+    "blood_panel": ("WBC", "Hemoglobin", "Platelets", "Sodium", "Potassium", "Glucose", "Calcium",
+                    "BUN", "Creatinine"),
+    "liver_function": ("ALT", "AST", "Alk_Phos", "Total_Bilirubin", "Albumin"),
+    "coagulation": ("INR",),
+    "cardiac_enzymes": ("Troponin_I", "BNP"),
+}
+_SYNTHETIC_MEANS = {"WBC": 7.5, "Hemoglobin": 13.5, "Platelets": 250, "Sodium": 139, "Potassium": 4.2,
+                    "Glucose": 100, "Calcium": 9.3, "BUN": 15, "Creatinine": 0.9, "ALT": 25, "AST": 24,
+                    "Alk_Phos": 80, "Total_Bilirubin": 0.7, "Albumin": 4.0, "INR": 1.0, "Troponin_I": 0.01,
+                    "BNP": 80}
+
+
+def synthetic_messages(results: int = 50_000, patients: Optional[Sequence[str]] = None,
+                       critical_rate: float = 0.01, seed: int = 7, orders: Sequence[dict] = (),
+                       unknown_rate: float = 0.0) -> Iterator[str]:
+    """HL7 ORU^R01 messages carrying about ``results`` results, a share of them critical.
+
+    Args:
+        patients: Patient IDs to report on; defaults to the patients in ``_PATIENT_DB``.
+        orders: Open orders of the synthetic panel types to answer first, one
+            message each. Half carry the placer number; the rest follow them
+            and are matched by investigation type.
+        unknown_rate: Share of the remaining messages sent for an unregistered patient ID.
+    """
+    rng = random.Random(seed)
+    start = datetime.datetime(2026, 2, 20, 6, 0)
+    patients = sorted(_PATIENT_DB) if patients is None else list(patients)
+    answers = [(o, o["order_id"]) for o in orders[::2]] + [(o, "") for o in orders[1::2]]
+    sent, seq = 0, 0
+    while sent < results or seq < len(answers):
+        if seq < len(answers):
+            order, placer = answers[seq]
+            service, patient = order["investigation_type"], order["patient_id"]
+        else:
+            service, placer = rng.choice(list(_SYNTHETIC_PANELS)), ""
+            patient = f"X{seq:06d}" if rng.random() < unknown_rate else rng.choice(patients)
+        seq += 1
+        stamp = (start + datetime.timedelta(seconds=seq)).strftime("%Y%m%d%H%M%S")
+        lines = [f"MSH|^~\\&|ANALYSER|CORE_LAB|AGENTIC_HOSPITAL|WARD|{stamp}||ORU^R01|MSG{seq:07d}|P|2.5",
+                 f"PID|1||{patient}^^^AH^MR",
+                 f"OBR|1|{placer}||{service}^{service.replace('_', ' ').title()}|||{stamp}"]
+        for i, analyte in enumerate(_SYNTHETIC_PANELS[service], 1):
+            mean = _SYNTHETIC_MEANS[analyte]
+            value = max(rng.gauss(mean, mean * 0.12), 0.0)
+            if rng.random() < critical_rate:
+                value *= rng.choice((0.3, 3.0))
+            code = _ANALYTES[analyte][2][0]
+            lines.append(f"OBX|{i}|NM|{code}^{analyte}^LN||{value:.3g}|||||F")
+        sent += len(_SYNTHETIC_PANELS[service])
+        yield "\r".join(lines)
+
+
+def _bench(results: int, batch_size: int, orders: Optional[int] = None) -> dict:
+    """Ingests synthetic messages into a snapshot of the stores, which is restored afterwards.
+
+    Open orders are placed first and the messages answer them, so the report
+    also checks that every order was resulted and that results for
+    unregistered patients created no lab records.
+    """
+    from ..simulation.engine import isolated_state  # imported here: simulation imports the tools
+    from . import common_tools
+
+    orders = results // 50 if orders is None else orders
+    stores = [(common_tools, "_LAB_DB"), (common_tools, "_INVESTIGATION_ORDERS"),
+              (common_tools, "_INVESTIGATION_SEQ")]
+    with isolated_state(stores, on_restore=[common_tools._rebuild_order_index]):
+        patients, services = sorted(_PATIENT_DB), list(_SYNTHETIC_PANELS)
+        placed = []
+        for i in range(orders):
+            patient_id, service = patients[i % len(patients)], services[i // len(patients) % len(services)]
+            order = common_tools.order_investigation(patient_id, service, "Ingest benchmark", ordered_by="bench")
+            placed.append({"order_id": order["order_id"], "patient_id": patient_id, "investigation_type": service})
+        text = "\n".join(synthetic_messages(results, patients, orders=placed, unknown_rate=0.01))
+        report = ingest(io.StringIO(text), LabResultIngestor(batch_size=batch_size, log_alerts=False))
+        report["orders_placed"] = len(placed)
+        report["orders_unresolved"] = sum(_find_order(o["order_id"], o["patient_id"])["status"] != "resulted"
+                                          for o in placed)
+        report["phantom_patients"] = len(_LAB_DB.keys() - _PATIENT_DB.keys())
+    report.pop("recent_alerts")
+    return report
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Ingest HL7v2 ORU^R01 / NDJSON lab results into the lab store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ing = commands.add_parser("ingest", help="Ingest a file of HL7 or NDJSON messages ('-' for stdin).")
+    ing.add_argument("source")
+    srv = commands.add_parser("listen", help="Receive MLLP-framed messages on a local socket.")
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=2575)
+    gen = commands.add_parser("generate", help="Write synthetic HL7 messages.")
+    gen.add_argument("out")
+    bench = commands.add_parser("bench", help="Measure throughput on synthetic messages.")
+    for sub in (gen, bench):
+        sub.add_argument("--results", type=int, default=50_000)
+    bench.add_argument("--orders", type=int, help="Open orders to answer (default: one per 50 results).")
+    for sub in (ing, srv, bench):
+        sub.add_argument("--batch-size", type=int, default=500)
+    for sub in (ing, srv):
+        sub.add_argument("--no-log", action="store_true", help="Do not write alerts to the audit log.")
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        report = ingest(args.source, LabResultIngestor(batch_size=args.batch_size, log_alerts=not args.no_log))
+    elif args.command == "listen":
+        report = listen(args.host, args.port, LabResultIngestor(batch_size=args.batch_size,
+                                                                log_alerts=not args.no_log))
+    elif args.command == "generate":
+        with open(args.out, "w", encoding="utf-8") as handle:
+            count = 0
+            for count, message in enumerate(synthetic_messages(args.results), 1):
+                handle.write(message.replace("\r", "\n") + "\n")
+        print(f"Wrote {count} messages to {args.out}")
+        return
+    else:
+        report = _bench(args.results, args.batch_size, args.orders)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.command == "bench" and (report["orders_unresolved"] or report["phantom_patients"]):
+        raise SystemExit("lab ingest bench: orders left unresolved or results stored for unknown patients")
+
+
+if __name__ == "__main__":
+    main()
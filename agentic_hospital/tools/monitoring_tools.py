@@ -2,107 +2,87 @@
 
 Implements autonomous critical value detection against AACC (American Association
 for Clinical Chemistry) critical lab value thresholds and vital sign danger zones.
+The thresholds and their compiled rule tables live in ``rules``.
 """
 
 import datetime
 from typing import Optional
 
-# Import shared patient data
-from .common_tools import _PATIENT_DB, _LAB_DB
-
+from ..infra import clock
+from ..infra.backend import register_store, state_transaction
+from ..infra.event_log import log_event, register_log
+from ..infra.ids import new_id
 
-# =============================================================================
-# AACC CRITICAL VALUE THRESHOLDS
-# Reference: AACC Critical Values 2022 / Joint Commission Standards
-# =============================================================================
-_CRITICAL_LAB_THRESHOLDS: dict[str, dict] = {
-    # Electrolytes
-    "Potassium":      {"low": 2.5,   "high": 6.5,  "unit": "mEq/L",    "panel": "BMP",
-                       "action_low":  "IV KCl replacement; continuous cardiac monitoring; recheck in 2h",
-                       "action_high": "Calcium gluconate IV; insulin + dextrose; telemetry; nephrology consult"},
-    "Sodium":         {"low": 120.0, "high": 160.0, "unit": "mEq/L",    "panel": "BMP",
-                       "action_low":  "Hypertonic saline if severe (<115) or symptomatic; neurology consult; correct ≤8 mEq/day to prevent osmotic demyelination",
-                       "action_high": "Free water replacement; correct slowly ≤10 mEq/24h; neurology consult"},
-    "Glucose":        {"low": 40.0,  "high": 500.0, "unit": "mg/dL",    "panel": "BMP",
-                       "action_low":  "D50 50 mL IV stat if altered consciousness; orange juice if alert; recheck in 15 min",
-                       "action_high": "Insulin protocol; hydration; investigate DKA/HHS; ABG"},
-    "Calcium":        {"low": 6.5,   "high": 13.5,  "unit": "mg/dL",    "panel": "BMP",
-                       "action_low":  "IV calcium gluconate 1–2 g; cardiac monitoring; recheck albumin-corrected",
-                       "action_high": "IV hydration 200–300 mL/h; bisphosphonate; calcitonin; malignancy workup"},
-    "Bicarbonate":    {"low": 10.0,  "high": 40.0,  "unit": "mEq/L",    "panel": "BMP",
-                       "action_low":  "ABG stat; treat underlying acidosis; sodium bicarbonate if pH <7.1",
-                       "action_high": "ABG stat; identify metabolic alkalosis cause; chloride replacement if hypochloremic"},
-    "BUN":            {"high": 100.0, "unit": "mg/dL", "panel": "BMP",
-                       "action_high": "Nephrology consult; assess for acute uremia; dialysis if BUN >100 with symptoms"},
-    "Creatinine":     {"high": 10.0,  "unit": "mg/dL", "panel": "BMP",
-                       "action_high": "Nephrology emergent consult; dialysis evaluation; discontinue nephrotoxic drugs"},
-    # Hematology
-    "Hemoglobin":     {"low": 6.0,   "high": 20.0,  "unit": "g/dL",     "panel": "CBC",
-                       "action_low":  "Type and crossmatch; transfusion threshold Hgb <7 (or <8 if cardiac); identify bleeding source",
-                       "action_high": "Phlebotomy if polycythemia vera; hydration; hyperviscosity workup"},
-    "Platelets":      {"low": 20.0,  "high": 1000.0,"unit": "×10³/µL",  "panel": "CBC",
-                       "action_low":  "Hematology consult; platelet transfusion if <10K or active bleeding; hold anticoagulants",
-                       "action_high": "Hematology consult; rule out ET; aspirin for thrombocytosis if reactive"},
-    "WBC":            {"low": 2.0,   "high": 30.0,  "unit": "×10³/µL",  "panel": "CBC",
-                       "action_low":  "Neutropenia precautions; G-CSF consideration; bone marrow evaluation; reverse isolation",
-                       "action_high": "Peripheral smear; hematology consult; blast differential; leukemia workup"},
-    # Coagulation
-    "INR":            {"high": 4.0,   "unit": "",     "panel": "INR",
-                       "action_high": "Hold Warfarin; Vitamin K 2.5–5 mg PO (or 10 mg IV if urgent); FFP if active bleeding; hematology"},
-    # Cardiac
-    "BNP":            {"high": 500.0, "unit": "pg/mL","panel": "BNP",
-                       "action_high": "Cardiology consult; chest X-ray; echocardiogram; optimize diuresis; loop diuretic IV"},
-    # Liver
-    "Total_Bilirubin":{"high": 15.0,  "unit": "mg/dL","panel": "LFTs",
-                       "action_high": "GI/hepatology consult; liver failure workup; coagulation panel; acetaminophen level"},
-    "ALT":            {"high": 500.0, "unit": "U/L",  "panel": "LFTs",
-                       "action_high": "Hepatology consult; acetaminophen toxicity? viral hepatitis panel; discontinue hepatotoxic drugs"},
-}
+# Import shared patient data
+from .bed_management_tools import _BED_DB, _normalise_ward
+from .common_tools import _PATIENT_DB, _LAB_DB, _LATEST_VITALS
+from .early_warning import AlertLevel, news_interpretation, observation_frequency, score_vitals_batch
+from .rules import (
+    DETERIORATION_RULES,
+    LAB_SCAN_RULES,
+    _CRITICAL_LAB_THRESHOLDS,
+    _CRITICAL_VITAL_THRESHOLDS,
+)
+from .vitals_series import PARAMETERS as _SERIES_PARAMETERS, TIERS as _SERIES_TIERS, read_range
 
-_CRITICAL_VITAL_THRESHOLDS = {
-    "systolic_bp": {
-        "critical_low":  70,  "warning_low":  90,
-        "warning_high": 180,  "critical_high": 220,
-        "unit": "mmHg",
-        "action_low":  "Shock protocol: IV access x2, fluid challenge 500 mL, vasopressors if refractory; ICU alert",
-        "action_high": "Hypertensive emergency: IV labetalol/nicardipine; reduce MAP ≤25% in first hour",
-    },
-    "heart_rate": {
-        "critical_low":  40, "warning_low":  50,
-        "warning_high": 130, "critical_high": 160,
-        "unit": "bpm",
-        "action_low":  "Atropine 0.5 mg IV; transcutaneous pacing if unstable; cardiology",
-        "action_high": "12-lead ECG; rate control; cardioversion if hemodynamically unstable",
-    },
-    "spo2": {
-        "critical_low": 88, "warning_low": 92,
-        "unit": "%",
-        "action_low":  "High-flow O2; prepare for NIV/intubation if declining; ICU alert; ABG stat",
-    },
-    "respiratory_rate": {
-        "critical_low":  8, "warning_low": 10,
-        "warning_high": 25, "critical_high": 35,
-        "unit": "breaths/min",
-        "action_low":  "Assess for opioid toxicity (naloxone); airway; ABG",
-        "action_high": "Respiratory distress: O2; identify cause (PE, pneumonia, HF); may need NIV",
-    },
-    "temperature_f": {
-        "critical_low":  95.0, "warning_low":  96.8,
-        "warning_high": 101.3, "critical_high": 104.0,
-        "unit": "°F",
-        "action_low":  "Active warming: blankets, warm IV fluids; check TSH/sepsis; ICU if <94°F",
-        "action_high": "Blood cultures x2; broad-spectrum antibiotics; acetaminophen; cooling measures if >40°C",
-    },
-}
 
 # In-session alert log
 _ALERT_LOG: list[dict] = []
+register_store("monitoring.alerts", _ALERT_LOG, "append")
+register_log("monitoring.alerts", _ALERT_LOG)
+
+
+def _alert_record(
+    patient_id: str,
+    trigger: str,
+    value: float,
+    unit: str,
+    *,
+    threshold_type: str,
+    direction: str,
+    severity: str,
+    threshold_reference: str,
+    action: str,
+    clinical_context: Optional[str] = None,
+    interaction_flags: Optional[list] = None,
+    when: Optional[datetime.datetime] = None,
+    alert_id: Optional[str] = None,
+) -> dict:
+    """Builds a deterioration alert in the record format of ``generate_deterioration_alert``."""
+    patient = _PATIENT_DB.get(patient_id, {})
+    patient_name = patient.get("name", patient_id)
+    medications = patient.get("current_medications", [])
+    return {
+        "status": "alert_generated",
+        "alert_id": alert_id or f"ALERT-{patient_id}-{new_id()}",
+        "patient_id": patient_id,
+        "patient_name": patient_name,
+        "trigger": trigger,
+        "value": f"{value} {unit}",
+        "threshold_type": threshold_type,
+        "direction": direction,
+        "severity": severity,
+        "threshold_reference": threshold_reference,
+        "immediate_action": action,
+        "clinical_context": clinical_context or "Not specified",
+        "medication_interaction_flags": interaction_flags or [],
+        "patient_allergies": patient.get("allergies", []),
+        "current_medications": medications[:6] if medications else [],
+        "timestamp": (when or clock.now()).strftime("%Y-%m-%d %H:%M"),
+        "notification_required": True,
+        "escalation_message": (
+            f"{'🚨' if severity == 'CRITICAL' else '⚠️'} {severity} ALERT — {patient_name} ({patient_id}): "
+            f"{trigger} = {value} {unit} ({direction}). "
+            f"Immediate action: {action}"
+        ),
+    }
 
 
 # =============================================================================
 # TOOL FUNCTIONS
 # =============================================================================
 
+@state_transaction
 def check_critical_lab_values(patient_id: str) -> dict:
     """Scans all available lab results for a patient against AACC critical value thresholds.
 
@@ -153,49 +133,31 @@ def check_critical_lab_values(patient_id: str) -> dict:
             if value is None:
                 continue
 
-            low = threshold.get("low")
-            high = threshold.get("high")
-            unit = threshold.get("unit", "")
-
+            band = LAB_SCAN_RULES.match_one(analyte, value)
+            if band is None:
+                continue
+            severity, direction, threshold_text, action = band
             alert_entry = {
                 "analyte": analyte,
                 "value": value,
-                "unit": unit,
+                "unit": threshold.get("unit", ""),
                 "panel": panel_name,
                 "patient_id": patient_id,
                 "patient_name": patient_name,
                 "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+                "direction": direction,
+                "threshold": threshold_text,
+                "severity": severity,
+                "immediate_action": action,
             }
-
-            if low is not None and value < low:
-                severity = "CRITICAL" if value < low * 0.85 else "WARNING"
-                alert_entry.update({
-                    "direction": "LOW",
-                    "threshold": f"Critical low: <{low} {unit}",
-                    "severity": severity,
-                    "immediate_action": threshold.get("action_low", "Notify physician immediately"),
-                })
-                if severity == "CRITICAL":
-                    critical_alerts.append(alert_entry)
-                else:
-                    warning_alerts.append(alert_entry)
-
-            elif high is not None and value > high:
-                severity = "CRITICAL" if value > high * 1.15 else "WARNING"
-                alert_entry.update({
-                    "direction": "HIGH",
-                    "threshold": f"Critical high: >{high} {unit}",
-                    "severity": severity,
-                    "immediate_action": threshold.get("action_high", "Notify physician immediately"),
-                })
-                if severity == "CRITICAL":
-                    critical_alerts.append(alert_entry)
-                else:
-                    warning_alerts.append(alert_entry)
+            if severity == "CRITICAL":
+                critical_alerts.append(alert_entry)
+            else:
+                warning_alerts.append(alert_entry)
 
     # Log all alerts
     for alert in critical_alerts + warning_alerts:
-        _ALERT_LOG.append(alert)
+        log_event("monitoring.alerts", alert, key=patient_id)
 
     if not critical_alerts and not warning_alerts:
         return {
@@ -233,6 +195,7 @@ def check_critical_lab_values(patient_id: str) -> dict:
     }
 
 
+@state_transaction
 def generate_deterioration_alert(
     patient_id: str,
     trigger: str,
@@ -260,7 +223,7 @@ def generate_deterioration_alert(
     allergies = patient.get("allergies", [])
     medications = patient.get("current_medications", [])
 
-    alert_id = f"ALERT-{patient_id}-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
+    alert_id = f"ALERT-{patient_id}-{new_id()}"
 
     # Look up in lab thresholds first, then vitals
     trigger_key = trigger.strip().title()
@@ -290,25 +253,12 @@ def generate_deterioration_alert(
             "patient_allergies": allergies,
             "current_medications": medications[:5] if medications else [],
         }
-        _ALERT_LOG.append(alert)
+        log_event("monitoring.alerts", alert, key=patient_id)
         return alert
 
     # Determine direction and severity
-    low = threshold_data.get("low") or threshold_data.get("critical_low") or threshold_data.get("warning_low")
-    high = threshold_data.get("high") or threshold_data.get("critical_high") or threshold_data.get("warning_high")
-
-    if low and value < low:
-        direction = "CRITICALLY LOW"
-        action = threshold_data.get("action_low", "Notify physician immediately")
-        severity = "CRITICAL"
-    elif high and value > high:
-        direction = "CRITICALLY HIGH"
-        action = threshold_data.get("action_high", "Notify physician immediately")
-        severity = "CRITICAL"
-    else:
-        direction = "ABNORMAL"
-        action = "Clinical review required"
-        severity = "WARNING"
+    band = DETERIORATION_RULES.match_one(trigger_key if threshold_type == "lab" else trigger_lower, value)
+    direction, severity, action = band or ("ABNORMAL", "WARNING", "Clinical review required")
 
     # Check for medication interactions with the alert context
     interaction_flags = []
@@ -323,30 +273,202 @@ def generate_deterioration_alert(
             if any(m in med.lower() for m in inr_meds):
                 interaction_flags.append(f"Possible INR elevation contributor: '{med}'")
 
-    alert = {
-        "status": "alert_generated",
-        "alert_id": alert_id,
+    alert = _alert_record(
+        patient_id, trigger, value, unit,
+        threshold_type=threshold_type,
+        direction=direction,
+        severity=severity,
+        threshold_reference=f"Low: {threshold_data.get('low', 'N/A')} | High: {threshold_data.get('high', 'N/A')} {unit}",
+        action=action,
+        clinical_context=clinical_context,
+        interaction_flags=interaction_flags,
+        alert_id=alert_id,
+    )
+    log_event("monitoring.alerts", alert, key=patient_id)
+    return alert
+
+
+# =============================================================================
+# WARD EARLY-WARNING ROUND
+# =============================================================================
+_OBS_ROUND_HOURS = 4
+
+
+@state_transaction(readonly=True)
+def score_ward_vitals(ward: str = "all", limit: int = 25) -> dict:
+    """Runs the early-warning obs round for every occupied bed on a ward (or the whole hospital).
+
+    Scores each patient's latest recorded vitals (from record_vitals) in one
+    batch and ranks the ward by alert level and NEWS-lite score. Beds with no
+    observations in the last 4 hours are listed as due.
+
+    Args:
+        ward: Ward name (e.g. 'ICU', 'General Medicine') or 'all' for every ward.
+        limit: Maximum number of ranked patients to return (default 25); escalations are always listed in full.
+
+    Returns:
+        dict: Counts by alert level, patients needing escalation (NEWS ≥7 or a CRITICAL
+              vital), the ranked patient list, and beds whose observations are due.
+    """
+    if ward.strip().lower() == "all":
+        ward_keys = list(_BED_DB)
+    else:
+        ward_key = _normalise_ward(ward)
+        if not ward_key:
+            return {"status": "error", "message": f"Ward '{ward}' not recognised. Available: {', '.join(_BED_DB)}"}
+        ward_keys = [ward_key]
+
+    now = clock.now()
+    due_before = (now - datetime.timedelta(hours=_OBS_ROUND_HOURS)).strftime("%Y-%m-%d %H:%M")
+    beds, observations, due, occupied = [], [], [], 0
+    for ward_key in ward_keys:
+        for bed_id, bed in _BED_DB[ward_key]["beds"].items():
+            if bed["status"] != "occupied":
+                continue
+            occupied += 1
+            obs = _LATEST_VITALS.get(bed["patient_id"]) if bed["patient_id"] else None
+            if obs is None or obs["recorded_at"] < due_before:
+                due.append({"ward": ward_key, "bed_id": bed_id, "patient_id": bed["patient_id"] or None,
+                            "last_recorded": obs["recorded_at"] if obs else None})
+            if obs is not None:
+                beds.append((ward_key, bed_id, bed))
+                observations.append(obs)
+
+    by_level = {level.name: 0 for level in reversed(AlertLevel)}
+    result = {
+        "status": "scored",
+        "ward": ward if len(ward_keys) > 1 else ward_keys[0],
+        "occupied_beds": occupied,
+        "patients_scored": len(beds),
+        "by_alert_level": by_level,
+        "escalations": [],
+        "patients": [],
+        "observations_due": due,
+        "timestamp": now.strftime("%Y-%m-%d %H:%M"),
+    }
+    if not beds:
+        return result
+
+    def column(name):
+        return [float("nan") if obs[name] is None else obs[name] for obs in observations]
+
+    scores = score_vitals_batch(column("systolic"), column("diastolic"), column("heart_rate"),
+                                column("temperature_F"), column("spo2"), column("respiratory_rate"))
+    levels, news = scores["alert_level"], scores["news"]
+
+    ranked = []
+    for i in sorted(range(len(beds)), key=lambda i: (-levels[i], -news[i])):
+        ward_key, bed_id, bed = beds[i]
+        level, points = AlertLevel(int(levels[i])), int(news[i])
+        by_level[level.name] += 1
+        ranked.append({
+            "ward": ward_key,
+            "bed_id": bed_id,
+            "patient_id": bed["patient_id"],
+            "patient_name": bed["patient_name"],
+            "alert_level": level.name,
+            "early_warning_score": points,
+            "ews_interpretation": news_interpretation(points),
+            "observation_frequency": observation_frequency(points),
+            "recorded_at": observations[i]["recorded_at"],
+        })
+        if points >= 7 or level is AlertLevel.CRITICAL:
+            result["escalations"].append(ranked[-1])
+    result["patients"] = ranked[:max(limit, 0)]
+    return result
+
+
+# =============================================================================
+# VITALS TRENDS
+# =============================================================================
+_TREND_PARAMETER_ALIASES = {
+    "all": _SERIES_PARAMETERS,
+    "blood_pressure": ("systolic_bp", "diastolic_bp"),
+    "bp": ("systolic_bp", "diastolic_bp"),
+    "temperature": ("temperature_f",),
+}
+_TREND_MAX_WINDOWS = 96
+
+
+def get_vitals_trend(
+    patient_id: str,
+    parameter: str = "all",
+    hours: float = 24,
+    resolution: str = "auto",
+) -> dict:
+    """Summarises how a patient's vital signs have moved over time, as min/max/mean per time window.
+
+    Covers everything charted with record_vitals plus any bedside-monitor stream.
+
+    Args:
+        patient_id: The patient identifier.
+        parameter: 'systolic_bp', 'diastolic_bp', 'heart_rate', 'spo2', 'respiratory_rate',
+                   'temperature_f', 'blood_pressure', or 'all' (default).
+        hours: Look-back period in hours (default 24).
+        resolution: Window size — 'raw' (individual readings), '1min', '15min', 'hour', or
+                    'auto' (default; the finest size giving at most 200 windows).
+
+    Returns:
+        dict: Per-window min/max/mean for each parameter (most recent windows last) and an
+              overall summary with the change from the first to the last window.
+    """
+    key = parameter.strip().lower()
+    names = _TREND_PARAMETER_ALIASES.get(key, (key,) if key in _SERIES_PARAMETERS else None)
+    if names is None:
+        return {"status": "error",
+                "message": f"Unknown parameter '{parameter}'. Use one of: {', '.join(_SERIES_PARAMETERS)}, blood_pressure, all."}
+    if resolution not in _SERIES_TIERS and resolution != "auto":
+        return {"status": "error",
+                "message": f"Unknown resolution '{resolution}'. Use one of: {', '.join(_SERIES_TIERS)}, auto."}
+
+    now = clock.now()
+    end = int(now.timestamp()) + 1
+    start = end - int(max(hours, 0) * 3600)
+    data = read_range(patient_id, start, end, resolution)
+    patient_name = _PATIENT_DB.get(patient_id, {}).get("name", patient_id)
+    if data is None or not len(data["start"]):
+        return {"status": "no_data", "patient_id": patient_id, "patient_name": patient_name,
+                "message": f"No vitals recorded for {patient_name} in the last {hours:g} hours."}
+
+    columns = [_SERIES_PARAMETERS.index(name) for name in names]
+    windows, summary = [], {}
+    for row, window_start in enumerate(data["start"]):
+        window = {}
+        for name, col in zip(names, columns):
+            if data["count"][row, col]:
+                window[name] = {"min": round(float(data["min"][row, col]), 1),
+                                "max": round(float(data["max"][row, col]), 1),
+                                "mean": round(float(data["mean"][row, col]), 1),
+                                "n": int(data["count"][row, col])}
+        if window:
+            windows.append({"start": datetime.datetime.fromtimestamp(int(window_start)).strftime("%Y-%m-%d %H:%M"),
+                            **window})
+
+    for name, col in zip(names, columns):
+        measured = data["count"][:, col] > 0
+        if not measured.any():
+            continue
+        means = data["mean"][measured, col]
+        counts = data["count"][measured, col]
+        first, last = float(means[0]), float(means[-1])
+        summary[name] = {
+            "min": round(float(data["min"][measured, col].min()), 1),
+            "max": round(float(data["max"][measured, col].max()), 1),
+            "mean": round(float((means * counts).sum() / counts.sum()), 1),
+            "first_window_mean": round(first, 1),
+            "last_window_mean": round(last, 1),
+            "change": round(last - first, 1),
+            "readings": int(counts.sum()),
+        }
+
+    return {
+        "status": "success",
         "patient_id": patient_id,
         "patient_name": patient_name,
-        "trigger": trigger,
-        "value": f"{value} {unit}",
-        "threshold_type": threshold_type,
-        "direction": direction,
-        "severity": severity,
-        "threshold_reference": f"Low: {threshold_data.get('low', 'N/A')} | High: {threshold_data.get('high', 'N/A')} {unit}",
-        "immediate_action": action,
-        "clinical_context": clinical_context or "Not specified",
-        "medication_interaction_flags": interaction_flags,
-        "patient_allergies": allergies,
-        "current_medications": medications[:6] if medications else [],
-        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
-        "notification_required": True,
-        "escalation_message": (
-            f"🚨 CRITICAL ALERT — {patient_name} ({patient_id}): "
-            f"{trigger} = {value} {unit} ({direction}). "
-            f"Immediate action: {action}"
-        ),
+        "resolution": data["resolution"],
+        "period": f"last {hours:g} hours",
+        "summary": summary,
+        "windows": windows[-_TREND_MAX_WINDOWS:],
+        "windows_omitted": max(len(windows) - _TREND_MAX_WINDOWS, 0),
+        "timestamp": now.strftime("%Y-%m-%d %H:%M"),
     }
-
-    _ALERT_LOG.append(alert)
-    return alert
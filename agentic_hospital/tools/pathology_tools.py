@@ -1,4 +1,21 @@
-"""Pathology-specific biopsy interpretation and critical lab value tools."""
+"""Pathology-specific biopsy interpretation and critical lab value tools.
+
+``critical_lab_value_alert`` classifies one result; ``screen_analyser_results``
+classifies a whole analyser message (many analytes for many patients) in one
+NumPy pass. Both look results up by normalised test name and unit, so
+abbreviations, LOINC codes and SI units are assessed against the same
+``PATHOLOGY_RULES`` limits. Check the batch path against the scalar one with::
+
+    python -m agentic_hospital.tools.pathology_tools --bench 100000
+"""
+
+import argparse
+import json
+import time
+from functools import lru_cache
+from typing import Optional, Sequence
+
+from .rules import PATHOLOGY_RULES
 
 
 def interpret_biopsy_result(tissue_type: str, microscopic_description: str,
@@ -165,6 +182,86 @@ def interpret_biopsy_result(tissue_type: str, microscopic_description: str,
     }
 
 
+# =============================================================================
+# TEST NAME AND UNIT INDEX
+# =============================================================================
+# Analyser/LIS names and LOINC codes for each PATHOLOGY_RULES test
+_TEST_ALIASES = {
+    "potassium": ("K", "K+", "serum potassium", "potassium serum", "2823-3", "6298-4"),
+    "sodium": ("Na", "Na+", "serum sodium", "sodium serum", "2951-2", "2947-0"),
+    "glucose": ("GLU", "blood glucose", "serum glucose", "plasma glucose", "2345-7", "2339-0"),
+    "hemoglobin": ("Hb", "HGB", "haemoglobin", "718-7"),
+    "platelets": ("PLT", "platelet", "platelet count", "777-3", "26515-7"),
+    "inr": ("PT-INR", "PT INR", "6301-6", "34714-6"),
+    "calcium": ("Ca", "total calcium", "serum calcium", "17861-6"),
+    "lactate": ("LAC", "lactic acid", "2524-7", "32693-4"),
+    "troponin": ("troponin I", "troponin T", "TnI", "TnT", "cTnI", "cTnT", "10839-9", "6598-7"),
+}
+
+# Unit -> factor into the table unit (the first entry)
+_UNIT_FACTORS = {
+    "potassium": {"mEq/L": 1.0, "mmol/L": 1.0},
+    "sodium": {"mEq/L": 1.0, "mmol/L": 1.0},
+    "glucose": {"mg/dL": 1.0, "mmol/L": 18.016},
+    "hemoglobin": {"g/dL": 1.0, "g/L": 0.1, "mmol/L": 1.611},
+    "platelets": {"x10³/µL": 1.0, "K/µL": 1.0, "x10⁹/L": 1.0, "/nL": 1.0, "/µL": 0.001},
+    "inr": {"ratio": 1.0, "INR": 1.0, "": 1.0},
+    "calcium": {"mg/dL": 1.0, "mmol/L": 4.008, "mEq/L": 2.004},
+    "lactate": {"mmol/L": 1.0, "mEq/L": 1.0, "mg/dL": 1 / 9.008},
+    "troponin": {"ng/mL": 1.0, "µg/L": 1.0, "ng/L": 0.001, "pg/mL": 0.001},
+}
+
+
+def _name_key(name: str) -> str:
+    return str(name).strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def _unit_key(unit: str) -> str:
+    key = str(unit or "").strip().lower().replace(" ", "")
+    for old, new in (("μ", "u"), ("µ", "u"), ("mc", "u"), ("×", "x"), ("³", "^3"), ("⁹", "^9"),
+                     ("*", "^"), ("10e", "10^")):
+        key = key.replace(old, new)
+    return key.removeprefix("x")
+
+
+def _build_result_index() -> tuple[dict, dict]:
+    tests, results = {}, {}
+    for test in (group["parameter"] for group in PATHOLOGY_RULES.groups):
+        for name in (test, *_TEST_ALIASES.get(test, ())):
+            tests[_name_key(name)] = test
+    for name_key, test in tests.items():
+        for unit, factor in _UNIT_FACTORS.get(test, {PATHOLOGY_RULES.group(test)["unit"]: 1.0}).items():
+            results[(name_key, _unit_key(unit))] = (test, factor)
+    return tests, results
+
+
+# Normalised test name -> test; (normalised name, normalised unit) -> (test, factor)
+_TEST_INDEX, _RESULT_INDEX = _build_result_index()
+_GROUP_INDEX = {group["parameter"]: i for i, group in enumerate(PATHOLOGY_RULES.groups)}
+
+
+@lru_cache(maxsize=4096)
+def _resolve_result(test_name: str, unit: str) -> tuple[Optional[str], float, bool]:
+    """(table test or ``None``, factor into the table unit, whether the unit was recognised)."""
+    name = _name_key(test_name)
+    hit = _RESULT_INDEX.get((name, _unit_key(unit)))
+    if hit:
+        return hit[0], hit[1], True
+    # An unrecognised unit is assessed as the table unit, as before, and flagged
+    return _TEST_INDEX.get(name), 1.0, False
+
+
+def _unit_note(test: str, unit: str) -> str:
+    return (f"Unit '{unit}' not recognised for {test}; assessed as "
+            f"{PATHOLOGY_RULES.group(test)['unit']}. Confirm the unit before acting on this result.")
+
+
+_NOTIFICATION_PROTOCOL = (
+    "STAT phone notification to ordering provider within 30 minutes. "
+    "Document: provider name, time called, read-back of value confirmed."
+)
+
+
 def critical_lab_value_alert(test_name: str, result_value: float,
                               result_unit: str, patient_id: str,
                               patient_age: int, patient_sex: str) -> dict:
@@ -176,8 +273,10 @@ def critical_lab_value_alert(test_name: str, result_value: float,
         test_name: Laboratory test name (e.g., 'potassium', 'sodium', 'glucose',
                    'hemoglobin', 'platelets', 'INR', 'creatinine', 'calcium',
                    'troponin', 'pH', 'pO2', 'lactate', 'ammonia', 'lithium').
+                   Analyser abbreviations and LOINC codes ('K', 'HGB', '2823-3') are accepted.
         result_value: Numerical result value.
         result_unit: Unit of measurement (e.g., 'mEq/L', 'mg/dL', 'g/dL', 'x10³/µL').
+                     SI units (e.g. glucose in mmol/L) are converted before classification.
         patient_id: Patient identifier for alert documentation.
         patient_age: Patient age in years.
         patient_sex: Patient sex ('male' or 'female').
@@ -186,112 +285,12 @@ def critical_lab_value_alert(test_name: str, result_value: float,
         dict: Critical value classification, immediate management, differential diagnosis,
               and provider notification protocol.
     """
-    test_lower = test_name.lower().replace(" ", "_")
-
-    # Critical value thresholds (AACC/CAP standards)
-    critical_thresholds = {
-        "potassium": {
-            "critical_low": 2.5, "low": 3.5, "high": 5.5, "critical_high": 6.5,
-            "unit": "mEq/L",
-            "low_dx": ["GI losses (vomiting/diarrhea)", "Diuretic use", "Hypomagnesemia", "Hyperaldosteronism", "Alkalosis"],
-            "high_dx": ["Renal failure", "ACE inhibitor/ARB + K+ supplement", "Hemolyzed sample", "Acidosis", "Rhabdomyolysis"],
-            "low_mgmt": "K <2.5: IV KCl 10–20 mEq/hr via central line; cardiac monitoring; correct Mg²⁺. Oral supplement if mild.",
-            "high_mgmt": "K >6.5: Calcium gluconate 1 g IV (stabilize membrane); Insulin 10U + D50W; Kayexalate/patiromer; dialysis if refractory.",
-        },
-        "sodium": {
-            "critical_low": 120, "low": 135, "high": 145, "critical_high": 160,
-            "unit": "mEq/L",
-            "low_dx": ["SIADH", "Heart failure", "Cirrhosis", "Psychogenic polydipsia", "Hypothyroidism"],
-            "high_dx": ["Hypernatremic dehydration", "Diabetes insipidus", "Excessive Na+ intake", "Hypotonic fluid loss"],
-            "low_mgmt": "Na <120: Hypertonic saline (3%) if severe/symptomatic — correct ≤8–10 mEq/L in 24h (ODS risk). Fluid restrict if SIADH.",
-            "high_mgmt": "Na >160: Gradual correction with D5W or hypotonic saline — lower ≤10–12 mEq/L per 24h. Identify and treat cause.",
-        },
-        "glucose": {
-            "critical_low": 40, "low": 70, "high": 200, "critical_high": 500,
-            "unit": "mg/dL",
-            "low_dx": ["Insulin excess", "Sulfonylurea use", "Insulinoma", "Adrenal insufficiency", "Sepsis"],
-            "high_dx": ["Diabetic ketoacidosis (DKA)", "Hyperosmolar hyperglycemic state (HHS)", "Stress hyperglycemia", "Steroid use"],
-            "low_mgmt": "Glucose <40: D50W 25 mL IV bolus; recheck in 15 min; glucagon 1 mg IM if no IV access; continuous glucose monitoring.",
-            "high_mgmt": "Glucose >500: IV insulin drip + aggressive hydration. Rule out DKA (AG, ketones) vs HHS (hyperosmolarity). ICU monitoring.",
-        },
-        "hemoglobin": {
-            "critical_low": 7.0, "low": 12.0, "high": 17.5, "critical_high": 20.0,
-            "unit": "g/dL",
-            "low_dx": ["Acute hemorrhage", "Iron deficiency anemia", "Hemolytic anemia", "Aplastic anemia", "Chronic disease"],
-            "high_dx": ["Polycythemia vera", "Secondary polycythemia (hypoxia, EPO)", "Dehydration", "CO poisoning"],
-            "low_mgmt": "Hgb <7: pRBC transfusion (threshold varies: <8 for cardiac disease). Identify and treat underlying cause. Iron/B12/folate if deficient.",
-            "high_mgmt": "Hgb >20: Phlebotomy. Hydroxyurea for polycythemia vera. Supplemental O2 for hypoxia-driven polycythemia.",
-        },
-        "platelets": {
-            "critical_low": 20, "low": 150, "high": 450, "critical_high": 1000,
-            "unit": "x10³/µL",
-            "low_dx": ["ITP", "HIT", "TTP/HUS", "Aplastic anemia", "Heparin exposure", "DIC"],
-            "high_dx": ["Essential thrombocythemia", "Reactive thrombocytosis (infection, iron deficiency)", "CML", "Post-splenectomy"],
-            "low_mgmt": "Plt <20 (or <50 with bleeding): Platelet transfusion (1 apheresis unit). Avoid aspirin/NSAIDs. TTP: PLASMA EXCHANGE (never platelet transfusion). HIT: stop heparin immediately.",
-            "high_mgmt": "Plt >1000: Aspirin 81 mg (reduces thrombosis risk in ET). Cytoreduction (hydroxyurea/anagrelide) if ET. Rule out reactive causes.",
-        },
-        "inr": {
-            "critical_low": 0.5, "low": 0.8, "high": 3.0, "critical_high": 5.0,
-            "unit": "ratio",
-            "low_dx": ["Thrombotic state", "Factor V Leiden (not directly)", "Early DIC"],
-            "high_dx": ["Warfarin overdose", "Liver failure", "DIC", "Factor deficiency", "Vitamin K deficiency"],
-            "low_mgmt": "INR <0.8: Investigate hypercoagulable state; clinical correlation.",
-            "high_mgmt": "INR >5 (no bleeding): Hold warfarin; oral Vit K 2.5–5 mg. INR >5 (with bleeding/surgery): 4-factor PCC 25–50 U/kg IV + Vit K 10 mg IV. FFP 4 units if PCC unavailable.",
-        },
-        "calcium": {
-            "critical_low": 6.0, "low": 8.5, "high": 10.5, "critical_high": 13.0,
-            "unit": "mg/dL",
-            "low_dx": ["Hypoparathyroidism", "Vitamin D deficiency", "Pancreatitis", "Renal failure", "Sepsis"],
-            "high_dx": ["Hyperparathyroidism", "Malignancy (PTHrP)", "Sarcoidosis", "Vitamin D toxicity", "Thiazide diuretics"],
-            "low_mgmt": "Ca <6 (symptomatic): IV calcium gluconate 1–2 g over 10–20 min; continuous monitoring; correct Mg²⁺ and Vit D.",
-            "high_mgmt": "Ca >13: IV saline hydration 200–300 mL/hr; furosemide after hydration; zoledronic acid 4 mg IV (best for malignancy). Calcitonin for rapid lowering.",
-        },
-        "lactate": {
-            "critical_low": 0, "low": 0, "high": 2.0, "critical_high": 4.0,
-            "unit": "mmol/L",
-            "low_dx": [],
-            "high_dx": ["Septic shock", "Cardiogenic shock", "Mesenteric ischemia", "Hemorrhagic shock", "Metformin toxicity", "Cyanide poisoning"],
-            "low_mgmt": "N/A",
-            "high_mgmt": "Lactate >4: Sepsis bundle (30 mL/kg IV fluids, antibiotics, vasopressors if MAP <65, ICU). Serial lactate every 2 hours. Target clearance >10% per 2h.",
-        },
-        "troponin": {
-            "critical_low": 0, "low": 0, "high": 0.04, "critical_high": 1.0,
-            "unit": "ng/mL",
-            "low_dx": [],
-            "high_dx": ["STEMI/NSTEMI", "Myocarditis", "PE", "Stress cardiomyopathy (Takotsubo)", "CKD", "Sepsis"],
-            "low_mgmt": "N/A",
-            "high_mgmt": "Troponin rising: STAT 12-lead ECG; cardiology consult; dual antiplatelet + anticoagulation if ACS confirmed; cath lab activation for STEMI.",
-        },
-    }
+    test, factor, unit_known = _resolve_result(test_name, result_unit)
+    value = result_value * factor
 
-    thresholds = critical_thresholds.get(test_lower, {})
-
-    if thresholds:
-        crit_low = thresholds.get("critical_low", float("-inf"))
-        crit_high = thresholds.get("critical_high", float("inf"))
-        low = thresholds.get("low", float("-inf"))
-        high = thresholds.get("high", float("inf"))
-
-        if result_value <= crit_low:
-            alert_level = "CRITICAL LOW"
-            differential = thresholds.get("low_dx", [])
-            management = thresholds.get("low_mgmt", "Immediate clinical assessment required.")
-        elif result_value >= crit_high:
-            alert_level = "CRITICAL HIGH"
-            differential = thresholds.get("high_dx", [])
-            management = thresholds.get("high_mgmt", "Immediate clinical assessment required.")
-        elif result_value < low:
-            alert_level = "LOW"
-            differential = thresholds.get("low_dx", [])
-            management = "Monitor and investigate underlying cause."
-        elif result_value > high:
-            alert_level = "HIGH"
-            differential = thresholds.get("high_dx", [])
-            management = "Monitor and investigate underlying cause."
-        else:
-            alert_level = "NORMAL"
-            differential = []
-            management = "No immediate action required."
+    if test is not None:
+        alert_level, differential, management = PATHOLOGY_RULES.match_one(test, value) or (
+            "NORMAL", [], "No immediate action required.")
     else:
         alert_level = "UNKNOWN TEST — manual review required"
         differential = []
@@ -299,22 +298,220 @@ def critical_lab_value_alert(test_name: str, result_value: float,
 
     is_critical = "CRITICAL" in alert_level
 
-    return {
+    result = {
         "status": "alerted",
         "patient_id": patient_id,
         "test_name": test_name,
         "result": f"{result_value} {result_unit}",
         "alert_level": alert_level,
         "is_critical_value": is_critical,
-        "differential_diagnosis": differential,
+        "differential_diagnosis": list(differential),
         "immediate_management": management,
         "notification_required": is_critical,
-        "notification_protocol": (
-            "STAT phone notification to ordering provider within 30 minutes. "
-            "Document: provider name, time called, read-back of value confirmed."
-        ) if is_critical else "Report in standard lab result workflow.",
+        "notification_protocol": _NOTIFICATION_PROTOCOL if is_critical else "Report in standard lab result workflow.",
         "repeat_testing": "Repeat in 2–4 hours after intervention" if is_critical else "Per clinical protocol.",
         "age": patient_age,
         "sex": patient_sex,
         "reference_source": "AACC Critical Value Guidelines | CAP Laboratory Standards | Clinical correlate required.",
     }
+    if test is not None and factor != 1.0:
+        result["assessed_as"] = f"{value:.4g} {PATHOLOGY_RULES.group(test)['unit']}"
+    if test is not None and not unit_known:
+        result["unit_note"] = _unit_note(test, result_unit)
+    return result
+
+
+# =============================================================================
+# BATCH PATH: ANALYSER RESULT MESSAGES
+# =============================================================================
+def _numpy():
+    import numpy as np  # imported lazily: only the batch paths need it
+    return np
+
+
+@lru_cache(maxsize=1)
+def _levels():
+    """(tests, rules + 2) object array of alert levels; the last two columns serve indices -2 and -1."""
+    np = _numpy()
+    width = max(len(group["rules"]) for group in PATHOLOGY_RULES.groups)
+    rows = [[rule[1] for rule in group["rules"]] + [None] * (width - len(group["rules"])) + [None, "NORMAL"]
+            for group in PATHOLOGY_RULES.groups]
+    levels = np.empty((len(rows), width + 2), dtype=object)
+    levels[:] = rows
+    return levels
+
+
+def classify_results_batch(test_names: Sequence[str], values: Sequence[float], units: Sequence[str]) -> dict:
+    """Classifies many results against ``PATHOLOGY_RULES`` in one pass.
+
+    Applies the same name/unit index and limits as ``critical_lab_value_alert``.
+
+    Args:
+        test_names: Test name, abbreviation or LOINC code per result.
+        values: Result values (NaN marks a missing result).
+        units: Result unit per result.
+
+    Returns:
+        dict: ``test`` (table test name, or ``None`` if unknown), ``value``
+              (float array in the table unit), ``unit_recognised`` (bool array)
+              and ``alert_level`` (object array; ``None`` for unknown tests and
+              missing values).
+    """
+    np = _numpy()
+    # A message repeats a handful of (name, unit) spellings: resolve each once
+    pairs = list(zip(test_names, units))
+    spellings = {pair: i for i, pair in enumerate(dict.fromkeys(pairs))}
+    codes = np.fromiter(map(spellings.__getitem__, pairs), dtype=np.intp, count=len(pairs))
+    resolved = [_resolve_result(name, unit) for name, unit in spellings]
+    tests = [test for test, _, _ in resolved]
+    group = np.array([_GROUP_INDEX[test] if test else -1 for test in tests], dtype=np.intp)[codes]
+    factor = np.array([f for _, f, _ in resolved], dtype=np.float64)[codes]
+    n = len(codes)
+    value = np.asarray(values, dtype=np.float64) * factor
+
+    # One column per test, NaN except on that test's rows
+    columns = {test: np.where(group == j, value, np.nan) for test, j in _GROUP_INDEX.items()}
+    matches = PATHOLOGY_RULES.match_batch(columns)
+    known = group >= 0
+    picked = matches[np.arange(n), np.maximum(group, 0)]
+    # -1 (no rule fired) reads 'NORMAL' and -2 (missing value) reads None
+    level = _levels()[np.maximum(group, 0), picked]
+    level[~known] = None
+    return {
+        "test": [tests[code] for code in codes.tolist()],
+        "value": value,
+        "unit_recognised": np.array([ok for _, _, ok in resolved], dtype=bool)[codes],
+        "alert_level": level,
+    }
+
+
+def screen_analyser_results(results: list[dict], critical_only: bool = True) -> dict:
+    """Classifies a whole analyser result message against the critical value table in one pass.
+
+    Args:
+        results: One dict per result, as carried by the analyser or lab interface:
+            {'patient_id': 'P001', 'test_name': 'K', 'value': 6.9, 'unit': 'mmol/L'}.
+            Test names may be abbreviations or LOINC codes; SI units are converted.
+        critical_only: List only critical results (default) or every abnormal one.
+
+    Returns:
+        dict: Counts by alert level, flagged results grouped by patient (critical
+              first) with management, unknown tests, unrecognised units and rejected rows.
+    """
+    rejected, accepted = [], []
+    for index, row in enumerate(results):
+        if not isinstance(row, dict) or not row.get("test_name"):
+            rejected.append({"index": index, "reason": "missing test_name"})
+            continue
+        try:
+            value = float(row.get("value"))
+        except (TypeError, ValueError):
+            value = float("nan")
+        if value != value:
+            rejected.append({"index": index, "test_name": row["test_name"], "reason": f"non-numeric value {row.get('value')!r}"})
+            continue
+        accepted.append((index, row, value))
+
+    batch = classify_results_batch([row["test_name"] for _, row, _ in accepted],
+                                   [value for _, _, value in accepted],
+                                   [row.get("unit", "") for _, row, _ in accepted])
+
+    counts: dict[str, int] = {}
+    patients: dict[str, list] = {}
+    unknown_tests, unrecognised_units = {}, {}
+    for i, (index, row, value) in enumerate(accepted):
+        test, level = batch["test"][i], batch["alert_level"][i]
+        if test is None:
+            unknown_tests[row["test_name"]] = unknown_tests.get(row["test_name"], 0) + 1
+            continue
+        unit = row.get("unit", "")
+        if not batch["unit_recognised"][i]:
+            unrecognised_units[f"{test} [{unit}]"] = _unit_note(test, unit)
+        counts[level] = counts.get(level, 0) + 1
+        is_critical = "CRITICAL" in level
+        if level == "NORMAL" or (critical_only and not is_critical):
+            continue
+        _, differential, management = PATHOLOGY_RULES.match_one(test, batch["value"][i].item())
+        entry = {
+            "index": index,
+            "test_name": row["test_name"],
+            "result": f"{row['value']} {unit}".strip(),
+            "alert_level": level,
+            "is_critical_value": is_critical,
+            "immediate_management": management,
+        }
+        if _resolve_result(row["test_name"], unit)[1] != 1.0:
+            entry["assessed_as"] = f"{batch['value'][i]:.4g} {PATHOLOGY_RULES.group(test)['unit']}"
+        if is_critical:
+            entry["differential_diagnosis"] = list(differential)
+        patients.setdefault(str(row.get("patient_id", "unknown")), []).append(entry)
+
+    flagged = [{"patient_id": pid,
+                "critical_count": sum(e["is_critical_value"] for e in entries),
+                "results": entries}
+               for pid, entries in patients.items()]
+    flagged.sort(key=lambda p: -p["critical_count"])
+    critical_total = sum(p["critical_count"] for p in flagged)
+    return {
+        "status": "screened",
+        "results_received": len(results),
+        "results_classified": sum(counts.values()),
+        "alert_counts": counts,
+        "critical_count": critical_total,
+        "patients_flagged": flagged,
+        "notification_protocol": _NOTIFICATION_PROTOCOL if critical_total else "Report in standard lab result workflow.",
+        "unknown_tests": unknown_tests,
+        "unrecognised_units": unrecognised_units,
+        "rejected": rejected,
+        "reference_source": "AACC Critical Value Guidelines | CAP Laboratory Standards | Clinical correlate required.",
+    }
+
+
+def _bench(n: int, seed: int = 7) -> dict:
+    """Checks ``classify_results_batch`` against ``critical_lab_value_alert`` and times both on ``n`` results."""
+    np = _numpy()
+    rng = np.random.default_rng(seed)
+    spellings = [(name, unit, test, factor) for (name, unit), (test, factor) in _RESULT_INDEX.items()]
+    spellings += [("ammonia", "umol/L", None, 1.0), ("potassium", "units", "potassium", 1.0)]
+    picks = rng.integers(0, len(spellings), n)
+    names = [spellings[i][0] for i in picks]
+    units = [spellings[i][1] for i in picks]
+    values = []
+    for i in picks:
+        test, factor = spellings[i][2], spellings[i][3]
+        limits = [t for rule in PATHOLOGY_RULES.group(test)["rules"] for _, _, t in rule[0]] if test else [0, 100]
+        lo, hi = min(limits), max(limits)
+        values.append(round(rng.uniform(lo - 0.3 * abs(lo) - 1, hi * 1.3 + 1) / factor, 3))
+
+    started = time.perf_counter()
+    batch = classify_results_batch(names, values, units)
+    batch_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scalar = [critical_lab_value_alert(name, value, unit, "P001", 50, "male")["alert_level"]
+              for name, value, unit in zip(names, values, units)]
+    scalar_s = time.perf_counter() - started
+
+    mismatches = sum(1 for expected, actual in zip(scalar, batch["alert_level"])
+                     if (actual or "UNKNOWN") != expected and not (actual is None and expected.startswith("UNKNOWN")))
+    return {
+        "results": n,
+        "scalar_seconds": round(scalar_s, 3),
+        "batch_seconds": round(batch_s, 4),
+        "speedup": round(scalar_s / max(batch_s, 1e-9)),
+        "alert_level_mismatches": mismatches,
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Check and time the batch critical value path.")
+    parser.add_argument("--bench", type=int, default=100_000, metavar="N")
+    args = parser.parse_args(argv)
+    report = _bench(args.bench)
+    print(json.dumps(report, indent=2))
+    if report["alert_level_mismatches"]:
+        raise SystemExit("batch critical values disagree with critical_lab_value_alert")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,20 @@
 from datetime import datetime, timedelta
 from typing import Optional
 
+from ..infra.backend import register_store, state_transaction
+from ..infra.event_log import history, log_event, register_log
+from ..infra.state import AtomicCounter, locked
+from .allergies import check_medication, patient_allergies
+
 # ── In-memory state ───────────────────────────────────────────────────────────
 _DISPENSE_LOG: dict[str, list[dict]] = {}  # patient_id → list of dispensing records
 _RECONCILIATION_LOG: dict[str, list[dict]] = {}  # patient_id → reconciliation records
-_PRESCRIPTION_SEQ: dict[str, int] = {"n": 0}  # auto-increment for prescription IDs
+_PRESCRIPTION_SEQ = AtomicCounter("prescription_seq")  # auto-increment for prescription IDs
+
+register_store("pharmacy.dispense_log", _DISPENSE_LOG, "keyed", scope="patient")
+register_store("pharmacy.reconciliation_log", _RECONCILIATION_LOG, "keyed", scope="patient")
+register_log("pharmacy.dispense_log", _DISPENSE_LOG)
+register_log("pharmacy.reconciliation_log", _RECONCILIATION_LOG)
 
 # ── Hospital formulary (subset) ──────────────────────────────────────────────
 _FORMULARY: dict[str, dict] = {
@@ -49,29 +59,14 @@ _FORMULARY: dict[str, dict] = {
     "Dabigatran": {"dose": "75-150mg", "route": "oral", "frequency": "twice daily", "form": "capsule"},
 }
 
-# ── Allergy database (shared with common_tools) ──────────────────────────────
-_ALLERGIES: dict[str, list[str]] = {
-    "P001": ["Penicillin", "Sulfa"],
-    "P002": ["Aspirin", "NSAIDs"],
-    "P003": [],
-    "P004": ["Morphine"],
-    "P005": ["Penicillin", "Latex"],
-    "P006": ["Codeine"],
-    "P007": [],
-    "P008": ["Vancomycin"],
-    "P009": ["Aspirin"],
-    "P010": ["Sulfa", "Morphine"],
-}
-
 
 def _get_patient_info(patient_id: str) -> dict:
     """Fetch basic patient info including allergies."""
     from .common_tools import _PATIENT_DB
     patient = _PATIENT_DB.get(patient_id, {})
-    allergies = _ALLERGIES.get(patient_id, [])
     return {
         "name": patient.get("name", "Unknown"),
-        "allergies": allergies,
+        "allergies": patient_allergies(patient_id),
         "age": patient.get("age"),
         "gender": patient.get("gender"),
     }
@@ -125,19 +120,11 @@ def verify_medication_order(
             "recommendation": "Contact pharmacy for non-formulary approval or consider alternative.",
         }
 
-    # ── Check allergies ────────────────────────────────────────────────────────
-    allergy_warnings = []
-    patient_allergies = [a.lower() for a in patient_info["allergies"]]
-    med_lower = med_normalized.lower()
-
-    for allergy in patient_allergies:
-        if allergy.lower() in med_lower or med_lower in allergy.lower():
-            allergy_warnings.append(f"ALLERGY MATCH: Patient allergic to {allergy}")
-
-    if "penicillin" in patient_allergies and "amoxicillin" in med_lower:
-        allergy_warnings.append("CROSS-REACTIVITY: Penicillin allergy — confirm no reaction history")
-    if "nsaids" in patient_allergies and ("ibuprofen" in med_lower or "aspirin" in med_lower):
-        allergy_warnings.append("NSAID CROSS-REACTIVITY: Patient has NSAID allergy")
+    # ── Check allergies and cross-reactivity ─────────────────────────────────────
+    allergy_warnings = [
+        f"{'CROSS-REACTIVITY' if match['match'] == 'cross-reactivity' else 'ALLERGY MATCH'}: {match['message']}"
+        for match in check_medication(patient_info["allergies"], medication)
+    ]
 
     # ── Check drug interactions with current meds ─────────────────────────────
     from .common_tools import check_drug_interactions
@@ -173,6 +160,7 @@ def verify_medication_order(
     }
 
 
+@state_transaction
 def dispense_medication(
     patient_id: str,
     medication: str,
@@ -197,9 +185,9 @@ def dispense_medication(
     Returns:
         dict: Dispensing record with ID and confirmation.
     """
-    _PRESCRIPTION_SEQ["n"] += 1
+    seq = _PRESCRIPTION_SEQ.next()
     now = datetime.now()
-    dispense_id = f"DISP-{now.strftime('%Y%m%d')}-{_PRESCRIPTION_SEQ['n']:04d}"
+    dispense_id = f"DISP-{now.strftime('%Y%m%d')}-{seq:04d}"
 
     import random
     batch_number = f"BN{random.randint(10000, 99999)}"
@@ -219,7 +207,8 @@ def dispense_medication(
         "status": "dispensed",
     }
 
-    _DISPENSE_LOG.setdefault(patient_id, []).append(dispense_record)
+    with locked(patients=[patient_id]):
+        log_event("pharmacy.dispense_log", dispense_record, key=patient_id)
 
     return {
         "status": "dispensed",
@@ -235,6 +224,7 @@ def dispense_medication(
     }
 
 
+@state_transaction
 def medication_reconciliation(
     patient_id: str,
     stage: str = "admission",
@@ -254,8 +244,10 @@ def medication_reconciliation(
     home_meds = _get_patient_medications(patient_id)
 
     inpatient_meds = []
-    if patient_id in _DISPENSE_LOG:
-        inpatient_meds = list(set([d["medication"] for d in _DISPENSE_LOG[patient_id]]))
+    with locked(patients=[patient_id]):
+        dispensed = history("pharmacy.dispense_log", patient_id)
+        if dispensed:
+            inpatient_meds = list(set([d["medication"] for d in dispensed]))
 
     home_normalized = [m.split()[0].strip() for m in home_meds]
     inpatient_normalized = [m.split()[0].strip() for m in inpatient_meds]
@@ -300,13 +292,13 @@ def medication_reconciliation(
                     "action": "Assess if needs to be restarted on discharge",
                 })
 
-    _RECONCILIATION_LOG.setdefault(patient_id, []).append({
+    log_event("pharmacy.reconciliation_log", {
         "stage": stage,
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
         "home_medications": home_meds,
         "inpatient_medications": inpatient_meds,
         "discrepancies": discrepancies,
-    })
+    }, key=patient_id)
 
     return {
         "status": "reconciliation_complete",
@@ -324,6 +316,7 @@ def medication_reconciliation(
     }
 
 
+@state_transaction
 def generate_tta_prescription(
     patient_id: str,
     discharge_medications: list[dict],
@@ -348,9 +341,9 @@ def generate_tta_prescription(
     Returns:
         dict: TTA prescription document.
     """
-    _PRESCRIPTION_SEQ["n"] += 1
+    seq = _PRESCRIPTION_SEQ.next()
     now = datetime.now()
-    rx_id = f"TTA-{now.strftime('%Y%m%d')}-{_PRESCRIPTION_SEQ['n']:04d}"
+    rx_id = f"TTA-{now.strftime('%Y%m%d')}-{seq:04d}"
 
     patient_info = _get_patient_info(patient_id)
 
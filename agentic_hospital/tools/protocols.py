@@ -0,0 +1,351 @@
+"""Indexed resolution of diagnoses to treatment protocols.
+
+``generate_treatment_plan`` looks diagnoses up through a ``ProtocolIndex``
+built once over ``_TREATMENT_PROTOCOLS``. A lookup does not scan the library:
+
+1. **Exact**: the normalised diagnosis equals a protocol key, full name or
+   synonym ('Type 2 Diabetes', 'type2_diabetes', 'T2DM'), also once
+   qualifiers such as 'suspected' or 'possible' are dropped.
+2. **ICD-10**: a code resolves via its most specific indexed prefix
+   ('I21.09' -> 'I21.0' -> STEMI).
+3. **Partial**: the remaining words are a run of words of a protocol key or
+   one word of its full name ('heart failure', 'embolism'), the last word
+   possibly truncated ('pneumo'). Every word has to match, so a qualifier
+   that may change the diagnosis ('hemorrhagic stroke', 'acute heart
+   failure', 'metastatic breast cancer') finds nothing rather than the wrong
+   protocol. The earliest
+   protocol in the library wins, as the old first-match scan did.
+4. **Contained**: otherwise the longest protocol key contained in the
+   diagnosis as a run of words ('acute sepsis', 'anterior STEMI', 'new onset
+   atrial fibrillation'), as the old scan's 'key anywhere in the text' rule
+   did. It is rejected when preceded by a negation ('non-STEMI') or when the
+   diagnosis carries one of the protocol's conflicting qualifiers
+   ('ischemic stroke with hemorrhagic transformation', 'pulmonary
+   hypertension').
+
+Partial names and key phrases are dicts built once, plus a sorted list for
+truncated words, so a lookup costs a few dict probes and one bisect whatever
+the library size.
+
+Each protocol's first-line steps are precompiled for the safety screen: their
+drug words for the allergy index (``allergies``), and the lowered steps joined
+for contraindications, so a restriction costs one substring test per protocol
+and steps are only examined on a hit.
+
+Check resolution and flags against the previous linear scan, and time both on
+the real library and a synthetic library of thousands of protocols, with::
+
+    python -m agentic_hospital.tools.protocols --bench 5000
+"""
+
+import argparse
+import bisect
+import heapq
+import json
+import re
+import time
+from typing import Iterable, Optional
+
+from .allergies import drug_terms
+
+_WORD = re.compile(r"[a-z0-9]+")
+_ICD10 = re.compile(r"^[A-Z][0-9][0-9A-Z](?:\.?[0-9A-Z]{1,4})?$")
+# Words that never change which protocol applies, including clinical qualifiers
+_STOPWORDS = frozenset({"a", "an", "and", "the", "of", "with", "in", "on", "for", "to",
+                        "suspected", "possible", "probable", "likely", "follow", "up"})
+# Words that negate the key phrase they precede ('non-STEMI', 'no sepsis')
+_NEGATIONS = frozenset({"non", "no", "not", "without"})
+_PREFIX_MIN = 3        # shortest query word expanded as a prefix
+_PREFIX_LIMIT = 64     # most index words one prefix expands to
+
+
+def _words(text: str) -> list[str]:
+    return _WORD.findall(text.lower())
+
+
+class ProtocolIndex:
+    """Diagnosis -> protocol index over a protocol library; rebuild it if the library changes.
+
+    Args:
+        protocols: Protocol key -> protocol dict (``full_name``, ``first_line``, ...).
+        aliases: Protocol key -> (ICD-10 codes, synonyms).
+        conflicts: Protocol key -> qualifier words that rule it out when its key
+            is only contained in a longer diagnosis ('hemorrhagic' for ischemic_stroke).
+    """
+
+    def __init__(self, protocols: dict, aliases: Optional[dict] = None, conflicts: Optional[dict] = None):
+        self.protocols = protocols
+        self._conflicts = {key: frozenset(words) for key, words in (conflicts or {}).items()}
+        self._phrases: dict[str, str] = {}
+        self._order: dict[str, int] = {}
+        self._exact: dict[str, str] = {}
+        self._codes: dict[str, str] = {}
+        self._partial: dict[str, str] = {}
+        self._postings: dict[str, list[str]] = {}
+        self._steps: dict[str, tuple[str, tuple[str, ...]]] = {}
+        self._step_terms: dict[str, tuple[tuple[str, frozenset], ...]] = {}
+        for position, (key, protocol) in enumerate(protocols.items()):
+            self._order[key] = position
+            codes, synonyms = (aliases or {}).get(key, ((), ()))
+            full_name = _words(protocol.get("full_name", ""))
+            tokens = set()
+            for words in (_words(key), full_name, *map(_words, synonyms)):
+                if words:
+                    self._exact.setdefault("_".join(words), key)
+                    tokens.update(words)
+            # Partial names: any run of words of the key, or one word of the full name
+            words = _words(key)
+            self._phrases.setdefault("_".join(words), key)
+            for start in range(len(words)):
+                for end in range(start + 1, len(words) + 1):
+                    self._partial.setdefault("_".join(words[start:end]), key)
+            for word in full_name:
+                self._partial.setdefault(word, key)
+            for code in codes:
+                self._codes.setdefault(code.replace(".", "").upper(), key)
+            for token in tokens:
+                self._postings.setdefault(token, []).append(key)
+            steps = tuple(step.lower() for step in protocol.get("first_line", ()))
+            self._steps[key] = ("\n".join(steps), steps)
+            self._step_terms[key] = tuple((step, drug_terms(step)) for step in protocol.get("first_line", ()))
+        self._partial_sorted = sorted(self._partial)
+        self._phrase_lengths = sorted({name.count("_") + 1 for name in self._phrases}, reverse=True)
+        self._vocabulary = sorted(self._postings)
+
+    def __len__(self) -> int:
+        return len(self.protocols)
+
+    def _expand(self, word: str) -> list[str]:
+        if word in self._postings:
+            return [word]
+        if len(word) < _PREFIX_MIN:
+            return []
+        start = bisect.bisect_left(self._vocabulary, word)
+        matches = []
+        for token in self._vocabulary[start:start + _PREFIX_LIMIT]:
+            if not token.startswith(word):
+                break
+            matches.append(token)
+        return matches
+
+    def resolve(self, diagnosis: str) -> tuple[Optional[str], str]:
+        """Resolves a free-text diagnosis or ICD-10 code.
+
+        Returns:
+            tuple: (protocol key or ``None``, how it matched: 'exact', 'icd10', 'partial'
+            or 'contained').
+        """
+        words = _words(diagnosis)
+        key = self._exact.get("_".join(words))
+        if key is not None:
+            return key, "exact"
+        code = diagnosis.strip().upper()
+        if _ICD10.match(code):
+            code = code.replace(".", "")
+            for end in range(len(code), 2, -1):
+                key = self._codes.get(code[:end])
+                if key is not None:
+                    return key, "icd10"
+
+        # Every remaining word must belong to the name: 'hemorrhagic stroke' is not a stroke protocol
+        query = "_".join(w for w in words if w not in _STOPWORDS)
+        if not query:
+            return None, ""
+        key = self._exact.get(query)
+        if key is not None:
+            return key, "exact"
+        key = self._partial.get(query)
+        if key is not None:
+            return key, "partial"
+        if len(query) >= _PREFIX_MIN:
+            # A truncated last word ('pneumo', 'heart fail'): the earliest protocol it begins
+            start = bisect.bisect_left(self._partial_sorted, query)
+            keys = []
+            for name in self._partial_sorted[start:start + _PREFIX_LIMIT]:
+                if not name.startswith(query):
+                    break
+                keys.append(self._partial[name])
+            if keys:
+                return min(keys, key=self._order.__getitem__), "partial"
+        key = self._contained(words)
+        return (key, "contained") if key is not None else (None, "")
+
+    def _contained(self, words: list[str]) -> Optional[str]:
+        """The longest protocol key the words contain, unless negated or contradicted by a qualifier."""
+        present = set(words)
+        for length in self._phrase_lengths:
+            keys = []
+            for start in range(len(words) - length + 1):
+                key = self._phrases.get("_".join(words[start:start + length]))
+                if key is None or (start and words[start - 1] in _NEGATIONS):
+                    continue
+                if not present & self._conflicts.get(key, frozenset()):
+                    keys.append(key)
+            if keys:
+                return min(keys, key=self._order.__getitem__)
+        return None
+
+    def suggest(self, diagnosis: str, limit: int = 5) -> list[str]:
+        """Protocols sharing the most words with an unresolved diagnosis."""
+        hits: dict[str, int] = {}
+        for word in dict.fromkeys(_words(diagnosis)):
+            if word not in _STOPWORDS:
+                for key in {key for token in self._expand(word) for key in self._postings[token]}:
+                    hits[key] = hits.get(key, 0) + 1
+        return heapq.nsmallest(limit, hits, key=lambda key: (-hits[key], self._order[key]))
+
+    def step_terms(self, key: str) -> tuple[tuple[str, frozenset], ...]:
+        """(first-line step, its ``drug_terms``) pairs, for the allergy index."""
+        return self._step_terms[key]
+
+    def flag_steps(self, key: str, restrictions: Iterable[str]) -> list[tuple[str, str]]:
+        """(first-line step, restriction) pairs where the restriction's first word occurs in the step.
+
+        Args:
+            key: Protocol key.
+            restrictions: Lower-cased contraindications.
+        """
+        text, lowered = self._steps[key]
+        present = []
+        for restriction in restrictions:
+            words = restriction.split()
+            if words and words[0] in text:
+                present.append((restriction, words[0]))
+        if not present:
+            return []
+        return [(step, restriction)
+                for step, step_lower in zip(self.protocols[key]["first_line"], lowered)
+                for restriction, word in present if word in step_lower]
+
+
+# =============================================================================
+# BENCHMARK AGAINST THE PREVIOUS LINEAR SCAN
+# =============================================================================
+def _legacy_resolve(protocols: dict, diagnosis: str) -> Optional[str]:
+    """The linear scan ``generate_treatment_plan`` used before the index."""
+    diag_key = diagnosis.lower().strip().replace(" ", "_").replace("-", "_")
+    if diag_key in protocols:
+        return diag_key
+    for key, val in protocols.items():
+        if diag_key in key or key in diag_key or diag_key in val.get("full_name", "").lower():
+            return key
+    return None
+
+
+def _legacy_flags(protocol: dict, restrictions: list[str]) -> list[tuple[str, str]]:
+    return [(step, restriction) for step in protocol["first_line"] for restriction in restrictions
+            if restriction.split()[0] in step.lower()]
+
+
+def _queries(protocols: dict) -> list[str]:
+    """Diagnoses as agents phrase them: keys, full names, their words and clinical context around them."""
+    queries = []
+    for key, protocol in protocols.items():
+        words = key.split("_")
+        queries += [key, key.replace("_", " "), protocol["full_name"], protocol["full_name"].lower(),
+                    f"suspected {key.replace('_', ' ')}", f"acute {key}", f"{key} follow-up"]
+        queries += words + [" ".join(words[:i]) for i in range(2, len(words))]
+    return queries + ["acute kidney injury", "type 1 diabetes", "migraine", "knee cap pain", "asthma",
+                      "hemorrhagic stroke", "non-ST elevation MI", "hospital-acquired pneumonia",
+                      "postpartum depression", "metastatic breast cancer", "acute heart failure",
+                      "acute sepsis", "uncontrolled hypertension", "severe hyperkalemia", "anterior STEMI",
+                      "new onset atrial fibrillation", "focal epilepsy"]
+
+
+# Diagnoses only the alias tables resolve, and what they must resolve to
+_ALIAS_CASES = {
+    "T2DM": "type2_diabetes", "Deep vein thrombosis": "dvt_treatment", "suspected DVT": "dvt_treatment",
+    "I48.91": "atrial_fibrillation", "I21.09": "stemi", "I21.4": None, "N17.9": None,
+    "congestive heart failure": "heart_failure_hfref", "pneumo": "community_acquired_pneumonia",
+    # Key contained in the text, but negated or contradicted by a qualifier
+    "non-STEMI": None, "no sepsis": None, "pulmonary hypertension": None,
+    "ischemic stroke with hemorrhagic transformation": None, "sepsis": "sepsis",
+    "acute ischemic stroke": "ischemic_stroke",
+}
+
+
+def _synthetic_library(protocols: dict, size: int) -> tuple[dict, dict]:
+    """``size`` protocols: the real ones plus conditions named from made-up words, as a growing library adds."""
+    from .common_tools import _PROTOCOL_ALIASES
+
+    syllables = ("bra", "cor", "dex", "fen", "gal", "hox", "lum", "mir", "nov", "pex", "quor", "tav", "zel")
+    library, aliases = dict(protocols), dict(_PROTOCOL_ALIASES)
+    base = list(protocols.values())
+    for i in range(size - len(protocols)):
+        word = "".join(syllables[(i // len(syllables) ** d) % len(syllables)] for d in range(4))
+        key = f"{word}_syndrome"
+        library[key] = {**base[i % len(base)], "full_name": f"{word.title()} Syndrome"}
+        aliases[key] = ((f"Q{i % 100:02d}.{i // 100}",), (f"{word} disease",))
+    return library, aliases
+
+
+def _bench(size: int, repeat: int = 20) -> dict:
+    """Checks ``ProtocolIndex`` against the linear scan and times both on the real and a synthetic library."""
+    from .common_tools import _PATIENT_DB, _PROTOCOL_ALIASES, _PROTOCOL_CONFLICTS, _TREATMENT_PROTOCOLS
+
+    index = ProtocolIndex(_TREATMENT_PROTOCOLS, _PROTOCOL_ALIASES, _PROTOCOL_CONFLICTS)
+    queries = _queries(_TREATMENT_PROTOCOLS)
+    mismatches, resolved_by_name, no_longer_resolved = [], [], []
+    for query in queries:
+        legacy, (key, how) = _legacy_resolve(_TREATMENT_PROTOCOLS, query), index.resolve(query)
+        if legacy == key or query in _ALIAS_CASES:
+            continue
+        # Only a full name or synonym may resolve what the scan did not; free text may not.
+        # Whatever the scan resolved must still resolve, to the same protocol.
+        if legacy is None and how == "exact":
+            resolved_by_name.append(query)
+        elif key is None:
+            no_longer_resolved.append(query)
+        else:
+            mismatches.append({"query": query, "linear_scan": legacy, "index": key, "matched_by": how})
+    for query, expected in _ALIAS_CASES.items():
+        key, how = index.resolve(query)
+        if key != expected:
+            mismatches.append({"query": query, "expected": expected, "index": key, "matched_by": how})
+
+    restriction_sets = [[a.lower() for a in p.get("allergies", [])] for p in _PATIENT_DB.values()]
+    restriction_sets += [["aspirin", "heparin"], ["metoprolol succinate", "ace inhibitors"], ["warfarin"]]
+    flag_mismatches = sum(index.flag_steps(key, restrictions) != _legacy_flags(protocol, restrictions)
+                          for key, protocol in _TREATMENT_PROTOCOLS.items() for restrictions in restriction_sets
+                          if all(r.split() for r in restrictions))
+
+    report = {"queries": len(queries) + len(_ALIAS_CASES), "resolution_mismatches": mismatches,
+              "resolved_by_name": resolved_by_name, "no_longer_resolved": no_longer_resolved,
+              "flag_mismatches": flag_mismatches, "timings_us_per_lookup": {}}
+    for name, (library, aliases) in {"library": (_TREATMENT_PROTOCOLS, _PROTOCOL_ALIASES),
+                                     f"synthetic_{size}": _synthetic_library(_TREATMENT_PROTOCOLS, size)}.items():
+        started = time.perf_counter()
+        big = ProtocolIndex(library, aliases)
+        build_s = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                _legacy_resolve(library, query)
+        legacy_s = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                big.resolve(query)
+        index_s = time.perf_counter() - started
+        lookups = repeat * len(queries)
+        report["timings_us_per_lookup"][name] = {
+            "protocols": len(library),
+            "index_build_ms": round(build_s * 1000, 1),
+            "linear_scan": round(legacy_s / lookups * 1e6, 1),
+            "index": round(index_s / lookups * 1e6, 1),
+        }
+    return report
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Check and time indexed protocol resolution.")
+    parser.add_argument("--bench", type=int, default=5000, metavar="N", help="Synthetic library size.")
+    args = parser.parse_args(argv)
+    report = _bench(args.bench)
+    print(json.dumps(report, indent=2))
+    if report["resolution_mismatches"] or report["no_longer_resolved"] or report["flag_mismatches"]:
+        raise SystemExit("indexed protocol resolution disagrees with the linear scan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,756 @@
+"""Clinical threshold tables and the rule engine that evaluates them.
+
+Every threshold-based tool reads its limits from this module:
+
+* ``record_vitals`` / ``score_vitals_batch`` — ``VITAL_ALERT_RULES`` and ``NEWS_RULES``
+* ``triage_assessment`` (ESI danger zone) — ``TRIAGE_DANGER_RULES``
+* ``VitalsStreamMonitor`` — ``VITAL_BAND_RULES``, built from ``_CRITICAL_VITAL_THRESHOLDS``
+* ``generate_deterioration_alert`` — ``DETERIORATION_RULES``
+* ``check_critical_lab_values`` — ``LAB_SCAN_RULES``, built from ``_CRITICAL_LAB_THRESHOLDS``
+* ``critical_lab_value_alert`` (pathology) — ``PATHOLOGY_RULES``, built from ``_PATHOLOGY_CRITICAL_VALUES``
+
+A table is a tuple of groups, one per parameter::
+
+    {"parameter": "heart_rate", "inputs": ("heart_rate",), "unit": "bpm", "rules": (
+        ((("heart_rate", ">", 150),), AlertLevel.CRITICAL, "CRITICAL: Severe tachycardia ..."),
+        ...
+    )}
+
+A rule fires when any of its ``(input, op, threshold)`` conditions holds, and
+the first rule to fire in a group wins, like an if/elif chain. Whatever
+follows the conditions is the rule's payload. ``RuleTable`` compiles a table
+once. ``match`` evaluates one set of values; ``match_batch`` evaluates NumPy
+columns for many patients and returns rule indices that ``select`` maps back
+to payload columns.
+
+The tools deliberately keep their own limits. A triage danger zone is not a
+ward alert threshold. ``--report`` puts each vital's limits from every table
+side by side, in common units, so differences are visible::
+
+    python -m agentic_hospital.tools.rules --report
+    python -m agentic_hospital.tools.rules --conformance   # replay recorded tool behaviour
+    python -m agentic_hospital.tools.rules --bench 100000  # batch vs scalar, every table
+"""
+
+import argparse
+import json
+import operator
+import os
+import time
+from enum import IntEnum
+from typing import Iterable, Optional
+
+_OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+class AlertLevel(IntEnum):
+    """Ordinal vitals alert level; compare and ``max`` them directly."""
+    NORMAL = 0
+    ELEVATED = 1
+    WARNING = 2
+    CRITICAL = 3
+
+
+def _numpy():
+    import numpy as np  # imported lazily: only the batch paths need it
+    return np
+
+
+# =============================================================================
+# RULE ENGINE
+# =============================================================================
+class RuleTable:
+    """A threshold rule table compiled for scalar and batch evaluation.
+
+    Args:
+        groups: Group dicts (see the module docstring). Keys other than
+            ``parameter``, ``inputs`` and ``rules`` (``unit``, ``normal`` text
+            and so on) are kept for the caller.
+    """
+
+    def __init__(self, groups: Iterable[dict]):
+        self.groups = tuple(groups)
+        self._index = {group["parameter"]: i for i, group in enumerate(self.groups)}
+        compiled = []
+        for group in self.groups:
+            inputs = tuple(group["inputs"])
+            rules = []
+            for rule in group["rules"]:
+                conditions = []
+                for name, op, threshold in rule[0]:
+                    if name not in inputs:
+                        raise ValueError(f"{group['parameter']}: condition on '{name}' is not one of its inputs {inputs}")
+                    if op not in _OPS:
+                        raise ValueError(f"{group['parameter']}: unknown operator '{op}'")
+                    conditions.append((name, _OPS[op], threshold))
+                rules.append((tuple(conditions), tuple(rule[1:])))
+            compiled.append((inputs, tuple(rules)))
+        self._compiled = tuple(compiled)
+        self.columns = tuple(dict.fromkeys(name for inputs, _ in self._compiled for name in inputs))
+
+    def __contains__(self, parameter: str) -> bool:
+        return parameter in self._index
+
+    def group(self, parameter: str) -> dict:
+        return self.groups[self._index[parameter]]
+
+    def match(self, values: dict) -> list[tuple[dict, Optional[tuple]]]:
+        """Evaluates one set of values.
+
+        Returns:
+            list: ``(group, payload)`` for every group whose inputs are all
+                  present (not ``None``); ``payload`` is ``None`` when no rule fired.
+        """
+        matched = []
+        for group, (inputs, rules) in zip(self.groups, self._compiled):
+            for name in inputs:
+                if values.get(name) is None:
+                    break
+            else:
+                matched.append((group, self._first(rules, values)))
+        return matched
+
+    @staticmethod
+    def _first(rules: tuple, values: dict) -> Optional[tuple]:
+        for conditions, payload in rules:
+            for name, op, threshold in conditions:
+                if op(values[name], threshold):
+                    return payload
+        return None
+
+    def match_one(self, parameter: str, value: float) -> Optional[tuple]:
+        """Payload of the first rule to fire for a single-input group, or ``None``."""
+        _, rules = self._compiled[self._index[parameter]]
+        for conditions, payload in rules:
+            for _, op, threshold in conditions:
+                if op(value, threshold):
+                    return payload
+        return None
+
+    def match_batch(self, columns: dict):
+        """Evaluates columns of values for many rows at once.
+
+        Args:
+            columns: Input name -> array-like of floats; NaN (or an absent
+                column) marks a missing value.
+
+        Returns:
+            numpy.ndarray: (rows, groups) int16 index of the rule that fired,
+            -1 where none fired and -2 where the group's inputs are missing.
+        """
+        np = _numpy()
+        arrays = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()
+                  if name in self.columns}
+        rows = len(next(iter(arrays.values()))) if arrays else 0
+        result = np.full((rows, len(self.groups)), -2, dtype=np.int16)
+        for j, (inputs, rules) in enumerate(self._compiled):
+            if any(name not in arrays for name in inputs):
+                continue
+            missing = np.logical_or.reduce([np.isnan(arrays[name]) for name in inputs])
+            fired = [np.logical_or.reduce([op(arrays[name], threshold) for name, op, threshold in conditions])
+                     for conditions, _ in rules]
+            result[:, j] = np.where(missing, -2, np.select(fired, list(range(len(rules))), -1))
+        return result
+
+    def select(self, matches, position: int = 0, default=0):
+        """Maps ``match_batch`` indices to payload element ``position`` ((rows, groups) array)."""
+        np = _numpy()
+        width = max(len(rules) for _, rules in self._compiled) + 2
+        lookup = np.array([[payload[position] for _, payload in rules]
+                           + [default] * (width - len(rules)) for _, rules in self._compiled])
+        # -1 and -2 index the two trailing default columns
+        return lookup[np.arange(len(self.groups)), matches]
+
+
+# =============================================================================
+# WARD VITALS: record_vitals / score_vitals_batch (°F)
+# =============================================================================
+# Payload: (AlertLevel, analysis line formatted with the vitals); a group's
+# ``normal`` line is reported when none of its rules fire.
+VITAL_ALERT_RULES = RuleTable((
+    {"parameter": "blood_pressure", "inputs": ("systolic", "diastolic"), "normal": "BP: Normal", "rules": (
+        ((("systolic", ">=", 180), ("diastolic", ">=", 120)), AlertLevel.CRITICAL,
+         "CRITICAL: Hypertensive crisis — immediate intervention needed (IV labetalol/nicardipine)"),
+        ((("systolic", ">=", 160), ("diastolic", ">=", 100)), AlertLevel.WARNING,
+         "WARNING: Hypertension Stage 2 — consider urgent medication"),
+        ((("systolic", ">=", 130), ("diastolic", ">=", 80)), AlertLevel.ELEVATED,
+         "ELEVATED: Hypertension Stage 1"),
+        ((("systolic", "<", 70),), AlertLevel.CRITICAL,
+         "CRITICAL: Severe hypotension / shock — immediate fluid resuscitation"),
+        ((("systolic", "<", 90), ("diastolic", "<", 60)), AlertLevel.WARNING,
+         "WARNING: Hypotension — assess volume status and cause"),
+    )},
+    {"parameter": "map", "inputs": ("map",), "normal": "MAP: {map} mmHg (normal ≥65)", "rules": (
+        ((("map", "<", 65),), AlertLevel.WARNING,
+         "WARNING: MAP {map} mmHg — below perfusion threshold (target ≥65)"),
+    )},
+    {"parameter": "heart_rate", "inputs": ("heart_rate",), "normal": "HR: Normal", "rules": (
+        ((("heart_rate", ">", 150),), AlertLevel.CRITICAL, "CRITICAL: Severe tachycardia — 12-lead ECG immediately"),
+        ((("heart_rate", ">", 100),), AlertLevel.WARNING,
+         "WARNING: Tachycardia — evaluate for pain, fever, dehydration, arrhythmia"),
+        ((("heart_rate", "<", 40),), AlertLevel.CRITICAL,
+         "CRITICAL: Severe bradycardia — consider atropine/pacing if symptomatic"),
+        ((("heart_rate", "<", 60),), AlertLevel.NORMAL,
+         "NOTE: Bradycardia — may be normal (athletes) or medication effect"),
+    )},
+    {"parameter": "temperature", "inputs": ("temperature",), "normal": "Temp: Normal (36.1–38.0°C / 97.0–100.4°F)", "rules": (
+        ((("temperature", ">=", 104.0),), AlertLevel.CRITICAL,
+         "CRITICAL: Hyperpyrexia — aggressive cooling, blood cultures, antibiotics"),
+        ((("temperature", ">=", 100.4),), AlertLevel.WARNING,
+         "WARNING: Fever — evaluate for infection source; blood cultures if T≥38.5°C"),
+        ((("temperature", "<", 95.0),), AlertLevel.WARNING,
+         "WARNING: Hypothermia — warm blankets, warm IV fluids, identify cause"),
+    )},
+    {"parameter": "spo2", "inputs": ("spo2",), "normal": "SpO2: Normal (≥95%)", "rules": (
+        ((("spo2", "<", 88),), AlertLevel.CRITICAL,
+         "CRITICAL: Severe hypoxemia — immediate supplemental O2, prepare for intubation"),
+        ((("spo2", "<", 92),), AlertLevel.WARNING, "WARNING: Hypoxemia — high-flow O2, evaluate for respiratory failure"),
+        ((("spo2", "<", 95),), AlertLevel.ELEVATED, "ELEVATED: Low-normal SpO2 — supplemental O2 and monitoring"),
+    )},
+    {"parameter": "respiratory_rate", "inputs": ("respiratory_rate",), "normal": "RR: Normal (12–20 breaths/min)", "rules": (
+        ((("respiratory_rate", ">", 30),), AlertLevel.CRITICAL, "CRITICAL: Respiratory distress (RR >30) — immediate evaluation"),
+        ((("respiratory_rate", ">", 20),), AlertLevel.WARNING,
+         "WARNING: Tachypnea — assess for underlying cause (infection, metabolic, cardiac)"),
+        ((("respiratory_rate", "<", 8),), AlertLevel.CRITICAL,
+         "CRITICAL: Bradypnea — risk of respiratory arrest; consider opioid reversal"),
+    )},
+))
+
+# NEWS-lite points per parameter, first matching band wins. Temperature is in
+# °F like the rest of the vitals (95.2 °F ≈ 35.1 °C, 97.0 °F ≈ 36.1 °C).
+_NEWS_BANDS: dict[str, tuple[tuple[str, float, int], ...]] = {
+    "systolic":    (("<=", 90, 3), (">=", 220, 3), ("<=", 100, 2), ("<=", 110, 1)),
+    "heart_rate":  (("<=", 40, 3), (">=", 131, 3), ("<=", 50, 2), (">=", 111, 2)),
+    "spo2":        (("<", 92, 3), ("<", 94, 2), ("<", 96, 1)),
+    "temperature": (("<", 95.2, 3), (">=", 104.0, 3), ("<", 97.0, 1), (">=", 101.1, 1)),
+}
+# Payload: (points,)
+NEWS_RULES = RuleTable(
+    {"parameter": name, "inputs": (name,), "rules": tuple((((name, op, threshold),), points) for op, threshold, points in bands)}
+    for name, bands in _NEWS_BANDS.items()
+)
+
+
+# =============================================================================
+# TRIAGE: ESI danger-zone vitals (temperature in °C)
+# =============================================================================
+# Payload: (ESI level the finding forces, finding text formatted with the vitals)
+TRIAGE_DANGER_RULES = RuleTable((
+    {"parameter": "hr", "inputs": ("hr",), "unit": "bpm", "rules": (
+        ((("hr", "<", 30), ("hr", ">", 180)), 1, "HR {hr} bpm — life-threatening (arrhythmia / extreme bradycardia)"),
+        ((("hr", "<", 50), ("hr", ">", 120)), 2, "HR {hr} bpm — danger zone"),
+    )},
+    {"parameter": "sbp", "inputs": ("sbp",), "unit": "mmHg", "rules": (
+        ((("sbp", "<", 60),), 1, "SBP {sbp} mmHg — profound shock (immediate intervention)"),
+        ((("sbp", "<", 90), ("sbp", ">", 220)), 2, "SBP {sbp} mmHg — haemodynamic concern"),
+    )},
+    {"parameter": "rr", "inputs": ("rr",), "unit": "breaths/min", "rules": (
+        ((("rr", "<", 8), ("rr", ">", 36)), 1, "RR {rr}/min — respiratory failure threshold"),
+        ((("rr", "<", 10), ("rr", ">", 28)), 2, "RR {rr}/min — respiratory distress"),
+    )},
+    {"parameter": "spo2", "inputs": ("spo2",), "unit": "%", "rules": (
+        ((("spo2", "<", 85),), 1, "SpO₂ {spo2}% — critical hypoxia (immediate oxygenation)"),
+        ((("spo2", "<", 92),), 2, "SpO₂ {spo2}% — danger zone hypoxia"),
+    )},
+    {"parameter": "gcs", "inputs": ("gcs",), "unit": "", "rules": (
+        ((("gcs", "<=", 8),), 1, "GCS {gcs}/15 — severe impairment (intubation threshold)"),
+        ((("gcs", "<", 14),), 2, "GCS {gcs}/15 — altered consciousness"),
+    )},
+    {"parameter": "temp", "inputs": ("temp",), "unit": "°C", "rules": (
+        ((("temp", ">=", 41.5), ("temp", "<", 34.0)), 1, "Temperature {temp}°C — extreme thermoregulatory failure"),
+        ((("temp", ">=", 38.5), ("temp", "<", 35.5)), 2, "Temperature {temp}°C — fever / hypothermia concern"),
+    )},
+))
+
+
+# =============================================================================
+# AACC CRITICAL VALUE THRESHOLDS
+# Reference: AACC Critical Values 2022 / Joint Commission Standards
+# =============================================================================
+_CRITICAL_LAB_THRESHOLDS: dict[str, dict] = {
+    # Electrolytes
+    "Potassium":      {"low": 2.5,   "high": 6.5,  "unit": "mEq/L",    "panel": "BMP",
+                       "action_low":  "IV KCl replacement; continuous cardiac monitoring; recheck in 2h",
+                       "action_high": "Calcium gluconate IV; insulin + dextrose; telemetry; nephrology consult"},
+    "Sodium":         {"low": 120.0, "high": 160.0, "unit": "mEq/L",    "panel": "BMP",
+                       "action_low":  "Hypertonic saline if severe (<115) or symptomatic; neurology consult; correct ≤8 mEq/day to prevent osmotic demyelination",
+                       "action_high": "Free water replacement; correct slowly ≤10 mEq/24h; neurology consult"},
+    "Glucose":        {"low": 40.0,  "high": 500.0, "unit": "mg/dL",    "panel": "BMP",
+                       "action_low":  "D50 50 mL IV stat if altered consciousness; orange juice if alert; recheck in 15 min",
+                       "action_high": "Insulin protocol; hydration; investigate DKA/HHS; ABG"},
+    "Calcium":        {"low": 6.5,   "high": 13.5,  "unit": "mg/dL",    "panel": "BMP",
+                       "action_low":  "IV calcium gluconate 1–2 g; cardiac monitoring; recheck albumin-corrected",
+                       "action_high": "IV hydration 200–300 mL/h; bisphosphonate; calcitonin; malignancy workup"},
+    "Bicarbonate":    {"low": 10.0,  "high": 40.0,  "unit": "mEq/L",    "panel": "BMP",
+                       "action_low":  "ABG stat; treat underlying acidosis; sodium bicarbonate if pH <7.1",
+                       "action_high": "ABG stat; identify metabolic alkalosis cause; chloride replacement if hypochloremic"},
+    "BUN":            {"high": 100.0, "unit": "mg/dL", "panel": "BMP",
+                       "action_high": "Nephrology consult; assess for acute uremia; dialysis if BUN >100 with symptoms"},
+    "Creatinine":     {"high": 10.0,  "unit": "mg/dL", "panel": "BMP",
+                       "action_high": "Nephrology emergent consult; dialysis evaluation; discontinue nephrotoxic drugs"},
+    # Hematology
+    "Hemoglobin":     {"low": 6.0,   "high": 20.0,  "unit": "g/dL",     "panel": "CBC",
+                       "action_low":  "Type and crossmatch; transfusion threshold Hgb <7 (or <8 if cardiac); identify bleeding source",
+                       "action_high": "Phlebotomy if polycythemia vera; hydration; hyperviscosity workup"},
+    "Platelets":      {"low": 20.0,  "high": 1000.0,"unit": "×10³/µL",  "panel": "CBC",
+                       "action_low":  "Hematology consult; platelet transfusion if <10K or active bleeding; hold anticoagulants",
+                       "action_high": "Hematology consult; rule out ET; aspirin for thrombocytosis if reactive"},
+    "WBC":            {"low": 2.0,   "high": 30.0,  "unit": "×10³/µL",  "panel": "CBC",
+                       "action_low":  "Neutropenia precautions; G-CSF consideration; bone marrow evaluation; reverse isolation",
+                       "action_high": "Peripheral smear; hematology consult; blast differential; leukemia workup"},
+    # Coagulation
+    "INR":            {"high": 4.0,   "unit": "",     "panel": "INR",
+                       "action_high": "Hold Warfarin; Vitamin K 2.5–5 mg PO (or 10 mg IV if urgent); FFP if active bleeding; hematology"},
+    # Cardiac
+    "BNP":            {"high": 500.0, "unit": "pg/mL","panel": "BNP",
+                       "action_high": "Cardiology consult; chest X-ray; echocardiogram; optimize diuresis; loop diuretic IV"},
+    # Liver
+    "Total_Bilirubin":{"high": 15.0,  "unit": "mg/dL","panel": "LFTs",
+                       "action_high": "GI/hepatology consult; liver failure workup; coagulation panel; acetaminophen level"},
+    "ALT":            {"high": 500.0, "unit": "U/L",  "panel": "LFTs",
+                       "action_high": "Hepatology consult; acetaminophen toxicity? viral hepatitis panel; discontinue hepatotoxic drugs"},
+}
+
+_CRITICAL_VITAL_THRESHOLDS = {
+    "systolic_bp": {
+        "critical_low":  70,  "warning_low":  90,
+        "warning_high": 180,  "critical_high": 220,
+        "unit": "mmHg",
+        "action_low":  "Shock protocol: IV access x2, fluid challenge 500 mL, vasopressors if refractory; ICU alert",
+        "action_high": "Hypertensive emergency: IV labetalol/nicardipine; reduce MAP ≤25% in first hour",
+    },
+    "heart_rate": {
+        "critical_low":  40, "warning_low":  50,
+        "warning_high": 130, "critical_high": 160,
+        "unit": "bpm",
+        "action_low":  "Atropine 0.5 mg IV; transcutaneous pacing if unstable; cardiology",
+        "action_high": "12-lead ECG; rate control; cardioversion if hemodynamically unstable",
+    },
+    "spo2": {
+        "critical_low": 88, "warning_low": 92,
+        "unit": "%",
+        "action_low":  "High-flow O2; prepare for NIV/intubation if declining; ICU alert; ABG stat",
+    },
+    "respiratory_rate": {
+        "critical_low":  8, "warning_low": 10,
+        "warning_high": 25, "critical_high": 35,
+        "unit": "breaths/min",
+        "action_low":  "Assess for opioid toxicity (naloxone); airway; ABG",
+        "action_high": "Respiratory distress: O2; identify cause (PE, pneumonia, HF); may need NIV",
+    },
+    "temperature_f": {
+        "critical_low":  95.0, "warning_low":  96.8,
+        "warning_high": 101.3, "critical_high": 104.0,
+        "unit": "°F",
+        "action_low":  "Active warming: blankets, warm IV fluids; check TSH/sepsis; ICU if <94°F",
+        "action_high": "Blood cultures x2; broad-spectrum antibiotics; acetaminophen; cooling measures if >40°C",
+    },
+}
+
+# Bands are checked worst first; a value beyond a critical limit never
+# reports the warning band on the same side
+_BAND_ORDER = (
+    ("critical_low", "<", "CRITICAL", "CRITICALLY LOW", "action_low", "Notify physician immediately"),
+    ("critical_high", ">", "CRITICAL", "CRITICALLY HIGH", "action_high", "Notify physician immediately"),
+    ("warning_low", "<", "WARNING", "LOW", "action_low", "Clinical review required"),
+    ("warning_high", ">", "WARNING", "HIGH", "action_high", "Clinical review required"),
+)
+
+
+def band_table(thresholds: dict[str, dict]) -> RuleTable:
+    """Compiles critical/warning band dicts (``_CRITICAL_VITAL_THRESHOLDS`` format).
+
+    Payload: (severity, direction, action).
+    """
+    return RuleTable(
+        {"parameter": parameter, "inputs": (parameter,), "unit": spec.get("unit", ""),
+         "rules": tuple(
+             (((parameter, op, spec[key]),), severity, direction, spec.get(action_key, fallback))
+             for key, op, severity, direction, action_key, fallback in _BAND_ORDER if key in spec)}
+        for parameter, spec in thresholds.items()
+    )
+
+
+def _lab_scan_groups():
+    # A result past the limit is a WARNING; past it by more than 15% it is CRITICAL
+    for analyte, spec in _CRITICAL_LAB_THRESHOLDS.items():
+        unit, rules = spec.get("unit", ""), []
+        if spec.get("low") is not None:
+            low, action = spec["low"], spec.get("action_low", "Notify physician immediately")
+            rules += [(((analyte, "<", low * 0.85),), "CRITICAL", "LOW", f"Critical low: <{low} {unit}", action),
+                      (((analyte, "<", low),), "WARNING", "LOW", f"Critical low: <{low} {unit}", action)]
+        if spec.get("high") is not None:
+            high, action = spec["high"], spec.get("action_high", "Notify physician immediately")
+            rules += [(((analyte, ">", high * 1.15),), "CRITICAL", "HIGH", f"Critical high: >{high} {unit}", action),
+                      (((analyte, ">", high),), "WARNING", "HIGH", f"Critical high: >{high} {unit}", action)]
+        yield {"parameter": analyte, "inputs": (analyte,), "unit": unit, "rules": tuple(rules)}
+
+
+def _deterioration_groups():
+    # One low and one high limit per trigger: a lab's own limit, else the
+    # vital's critical band, else its warning band
+    for parameter, spec in (*_CRITICAL_LAB_THRESHOLDS.items(), *_CRITICAL_VITAL_THRESHOLDS.items()):
+        low = spec.get("low") or spec.get("critical_low") or spec.get("warning_low")
+        high = spec.get("high") or spec.get("critical_high") or spec.get("warning_high")
+        rules = []
+        if low:
+            rules.append((((parameter, "<", low),), "CRITICALLY LOW", "CRITICAL",
+                          spec.get("action_low", "Notify physician immediately")))
+        if high:
+            rules.append((((parameter, ">", high),), "CRITICALLY HIGH", "CRITICAL",
+                          spec.get("action_high", "Notify physician immediately")))
+        yield {"parameter": parameter, "inputs": (parameter,), "unit": spec.get("unit", ""), "rules": tuple(rules)}
+
+
+# Payload: (severity, direction, action)
+VITAL_BAND_RULES = band_table(_CRITICAL_VITAL_THRESHOLDS)
+# Payload: (severity, direction, threshold text, action)
+LAB_SCAN_RULES = RuleTable(_lab_scan_groups())
+# Payload: (direction, severity, action); no rule firing means ABNORMAL / WARNING
+DETERIORATION_RULES = RuleTable(_deterioration_groups())
+
+
+# =============================================================================
+# PATHOLOGY CRITICAL VALUES (AACC/CAP, with reference ranges)
+# =============================================================================
+_PATHOLOGY_CRITICAL_VALUES: dict[str, dict] = {
+    "potassium": {
+        "critical_low": 2.5, "low": 3.5, "high": 5.5, "critical_high": 6.5,
+        "unit": "mEq/L",
+        "low_dx": ["GI losses (vomiting/diarrhea)", "Diuretic use", "Hypomagnesemia", "Hyperaldosteronism", "Alkalosis"],
+        "high_dx": ["Renal failure", "ACE inhibitor/ARB + K+ supplement", "Hemolyzed sample", "Acidosis", "Rhabdomyolysis"],
+        "low_mgmt": "K <2.5: IV KCl 10–20 mEq/hr via central line; cardiac monitoring; correct Mg²⁺. Oral supplement if mild.",
+        "high_mgmt": "K >6.5: Calcium gluconate 1 g IV (stabilize membrane); Insulin 10U + D50W; Kayexalate/patiromer; dialysis if refractory.",
+    },
+    "sodium": {
+        "critical_low": 120, "low": 135, "high": 145, "critical_high": 160,
+        "unit": "mEq/L",
+        "low_dx": ["SIADH", "Heart failure", "Cirrhosis", "Psychogenic polydipsia", "Hypothyroidism"],
+        "high_dx": ["Hypernatremic dehydration", "Diabetes insipidus", "Excessive Na+ intake", "Hypotonic fluid loss"],
+        "low_mgmt": "Na <120: Hypertonic saline (3%) if severe/symptomatic — correct ≤8–10 mEq/L in 24h (ODS risk). Fluid restrict if SIADH.",
+        "high_mgmt": "Na >160: Gradual correction with D5W or hypotonic saline — lower ≤10–12 mEq/L per 24h. Identify and treat cause.",
+    },
+    "glucose": {
+        "critical_low": 40, "low": 70, "high": 200, "critical_high": 500,
+        "unit": "mg/dL",
+        "low_dx": ["Insulin excess", "Sulfonylurea use", "Insulinoma", "Adrenal insufficiency", "Sepsis"],
+        "high_dx": ["Diabetic ketoacidosis (DKA)", "Hyperosmolar hyperglycemic state (HHS)", "Stress hyperglycemia", "Steroid use"],
+        "low_mgmt": "Glucose <40: D50W 25 mL IV bolus; recheck in 15 min; glucagon 1 mg IM if no IV access; continuous glucose monitoring.",
+        "high_mgmt": "Glucose >500: IV insulin drip + aggressive hydration. Rule out DKA (AG, ketones) vs HHS (hyperosmolarity). ICU monitoring.",
+    },
+    "hemoglobin": {
+        "critical_low": 7.0, "low": 12.0, "high": 17.5, "critical_high": 20.0,
+        "unit": "g/dL",
+        "low_dx": ["Acute hemorrhage", "Iron deficiency anemia", "Hemolytic anemia", "Aplastic anemia", "Chronic disease"],
+        "high_dx": ["Polycythemia vera", "Secondary polycythemia (hypoxia, EPO)", "Dehydration", "CO poisoning"],
+        "low_mgmt": "Hgb <7: pRBC transfusion (threshold varies: <8 for cardiac disease). Identify and treat underlying cause. Iron/B12/folate if deficient.",
+        "high_mgmt": "Hgb >20: Phlebotomy. Hydroxyurea for polycythemia vera. Supplemental O2 for hypoxia-driven polycythemia.",
+    },
+    "platelets": {
+        "critical_low": 20, "low": 150, "high": 450, "critical_high": 1000,
+        "unit": "x10³/µL",
+        "low_dx": ["ITP", "HIT", "TTP/HUS", "Aplastic anemia", "Heparin exposure", "DIC"],
+        "high_dx": ["Essential thrombocythemia", "Reactive thrombocytosis (infection, iron deficiency)", "CML", "Post-splenectomy"],
+        "low_mgmt": "Plt <20 (or <50 with bleeding): Platelet transfusion (1 apheresis unit). Avoid aspirin/NSAIDs. TTP: PLASMA EXCHANGE (never platelet transfusion). HIT: stop heparin immediately.",
+        "high_mgmt": "Plt >1000: Aspirin 81 mg (reduces thrombosis risk in ET). Cytoreduction (hydroxyurea/anagrelide) if ET. Rule out reactive causes.",
+    },
+    "inr": {
+        "critical_low": 0.5, "low": 0.8, "high": 3.0, "critical_high": 5.0,
+        "unit": "ratio",
+        "low_dx": ["Thrombotic state", "Factor V Leiden (not directly)", "Early DIC"],
+        "high_dx": ["Warfarin overdose", "Liver failure", "DIC", "Factor deficiency", "Vitamin K deficiency"],
+        "low_mgmt": "INR <0.8: Investigate hypercoagulable state; clinical correlation.",
+        "high_mgmt": "INR >5 (no bleeding): Hold warfarin; oral Vit K 2.5–5 mg. INR >5 (with bleeding/surgery): 4-factor PCC 25–50 U/kg IV + Vit K 10 mg IV. FFP 4 units if PCC unavailable.",
+    },
+    "calcium": {
+        "critical_low": 6.0, "low": 8.5, "high": 10.5, "critical_high": 13.0,
+        "unit": "mg/dL",
+        "low_dx": ["Hypoparathyroidism", "Vitamin D deficiency", "Pancreatitis", "Renal failure", "Sepsis"],
+        "high_dx": ["Hyperparathyroidism", "Malignancy (PTHrP)", "Sarcoidosis", "Vitamin D toxicity", "Thiazide diuretics"],
+        "low_mgmt": "Ca <6 (symptomatic): IV calcium gluconate 1–2 g over 10–20 min; continuous monitoring; correct Mg²⁺ and Vit D.",
+        "high_mgmt": "Ca >13: IV saline hydration 200–300 mL/hr; furosemide after hydration; zoledronic acid 4 mg IV (best for malignancy). Calcitonin for rapid lowering.",
+    },
+    "lactate": {
+        "critical_low": 0, "low": 0, "high": 2.0, "critical_high": 4.0,
+        "unit": "mmol/L",
+        "low_dx": [],
+        "high_dx": ["Septic shock", "Cardiogenic shock", "Mesenteric ischemia", "Hemorrhagic shock", "Metformin toxicity", "Cyanide poisoning"],
+        "low_mgmt": "N/A",
+        "high_mgmt": "Lactate >4: Sepsis bundle (30 mL/kg IV fluids, antibiotics, vasopressors if MAP <65, ICU). Serial lactate every 2 hours. Target clearance >10% per 2h.",
+    },
+    "troponin": {
+        "critical_low": 0, "low": 0, "high": 0.04, "critical_high": 1.0,
+        "unit": "ng/mL",
+        "low_dx": [],
+        "high_dx": ["STEMI/NSTEMI", "Myocarditis", "PE", "Stress cardiomyopathy (Takotsubo)", "CKD", "Sepsis"],
+        "low_mgmt": "N/A",
+        "high_mgmt": "Troponin rising: STAT 12-lead ECG; cardiology consult; dual antiplatelet + anticoagulation if ACS confirmed; cath lab activation for STEMI.",
+    },
+}
+
+
+def _pathology_groups():
+    for test, spec in _PATHOLOGY_CRITICAL_VALUES.items():
+        yield {"parameter": test, "inputs": (test,), "unit": spec.get("unit", ""), "rules": (
+            (((test, "<=", spec["critical_low"]),), "CRITICAL LOW", spec.get("low_dx", []),
+             spec.get("low_mgmt", "Immediate clinical assessment required.")),
+            (((test, ">=", spec["critical_high"]),), "CRITICAL HIGH", spec.get("high_dx", []),
+             spec.get("high_mgmt", "Immediate clinical assessment required.")),
+            (((test, "<", spec["low"]),), "LOW", spec.get("low_dx", []), "Monitor and investigate underlying cause."),
+            (((test, ">", spec["high"]),), "HIGH", spec.get("high_dx", []), "Monitor and investigate underlying cause."),
+        )}
+
+
+# Payload: (alert level, differential, management); no rule firing means NORMAL
+PATHOLOGY_RULES = RuleTable(_pathology_groups())
+
+
+# =============================================================================
+# CROSS-TABLE REPORT
+# =============================================================================
+_TABLES = {
+    "record_vitals": VITAL_ALERT_RULES,
+    "news": NEWS_RULES,
+    "triage_danger_zone": TRIAGE_DANGER_RULES,
+    "stream_bands": VITAL_BAND_RULES,
+    "deterioration_alert": DETERIORATION_RULES,
+    "lab_scan": LAB_SCAN_RULES,
+    "pathology": PATHOLOGY_RULES,
+}
+# Input names used by the tables -> one name per vital sign
+_VITAL_NAMES = {
+    "systolic": "systolic_bp", "sbp": "systolic_bp", "diastolic": "diastolic_bp",
+    "hr": "heart_rate", "rr": "respiratory_rate",
+    "temperature": "temperature_f", "temp": "temperature_f",
+}
+
+
+def threshold_report() -> dict:
+    """Each table's limits per vital sign or analyte, side by side (temperatures in °F).
+
+    Returns:
+        dict: parameter -> table name -> limits such as ``">150"``, in rule order.
+    """
+    report: dict[str, dict] = {}
+    for table_name, table in _TABLES.items():
+        for group in table.groups:
+            celsius = group.get("unit") == "°C"
+            for rule in group["rules"]:
+                for name, op, threshold in rule[0]:
+                    if celsius:
+                        threshold = round(threshold * 9 / 5 + 32, 1)
+                    limits = report.setdefault(_VITAL_NAMES.get(name, name.lower()), {}).setdefault(table_name, [])
+                    if f"{op}{threshold:g}" not in limits:
+                        limits.append(f"{op}{threshold:g}")
+    return dict(sorted(report.items()))
+
+
+# =============================================================================
+# CONFORMANCE
+# =============================================================================
+# Tool outputs recorded for edge cases around every threshold, replayed by
+# --conformance. Re-record (--record) only when a behaviour change is intended.
+_CONFORMANCE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules_conformance.json")
+
+
+def _around(threshold: float, step: float) -> list[float]:
+    return sorted({round(threshold - 1, 3), round(threshold - step, 3), threshold,
+                   round(threshold + step, 3), round(threshold + 1, 3)})
+
+
+def _thresholds(table: RuleTable) -> dict[str, list[float]]:
+    found: dict[str, set] = {}
+    for group in table.groups:
+        for rule in group["rules"]:
+            for name, _, threshold in rule[0]:
+                found.setdefault(name, set()).add(threshold)
+    return {name: sorted(values) for name, values in found.items()}
+
+
+def _conformance_cases(seed: int = 46) -> list[tuple[str, dict]]:
+    """Edge cases around every threshold of every table, plus random full sets of vitals."""
+    import random
+
+    rng = random.Random(seed)
+    cases = []
+    ward = {"systolic": 120, "diastolic": 75, "heart_rate": 75, "temperature": 98.6, "spo2": 98, "respiratory_rate": 16}
+    for table in (VITAL_ALERT_RULES, NEWS_RULES):
+        for name, thresholds in _thresholds(table).items():
+            cases += [("early_warning", {**ward, name: v}) for t in thresholds for v in _around(t, 0.05)]
+    for _ in range(300):
+        values = {"systolic": rng.randint(55, 240), "diastolic": rng.randint(35, 130), "heart_rate": rng.randint(30, 180),
+                  "temperature": round(rng.uniform(93, 106), 1), "spo2": rng.randint(80, 100),
+                  "respiratory_rate": rng.randint(5, 40)}
+        cases.append(("early_warning", {k: (None if rng.random() < 0.1 else v) for k, v in values.items()}))
+
+    for name, thresholds in _thresholds(TRIAGE_DANGER_RULES).items():
+        cases += [("triage", {name: v}) for t in thresholds for v in _around(t, 0.05)]
+    for _ in range(300):
+        values = {"hr": rng.randint(20, 200), "sbp": rng.randint(40, 240), "rr": rng.randint(4, 45),
+                  "spo2": rng.randint(75, 100), "gcs": rng.randint(3, 15), "temp": round(rng.uniform(32, 43), 1)}
+        cases.append(("triage", {k: v for k, v in values.items() if rng.random() > 0.15}))
+
+    for name, thresholds in _thresholds(VITAL_BAND_RULES).items():
+        cases += [("vital_band", {"parameter": name, "value": v}) for t in thresholds for v in _around(t, 0.05)]
+    for name, thresholds in _thresholds(DETERIORATION_RULES).items():
+        unit = DETERIORATION_RULES.group(name)["unit"]
+        cases += [("deterioration", {"trigger": name, "value": v, "unit": unit})
+                  for t in thresholds for v in _around(t, 0.05)]
+    cases.append(("deterioration", {"trigger": "lactate", "value": 5.0, "unit": "mmol/L"}))
+    for name, thresholds in _thresholds(LAB_SCAN_RULES).items():
+        cases += [("lab_scan", {"analyte": name, "value": v}) for t in thresholds for v in _around(t, 0.05)]
+    for name, thresholds in _thresholds(PATHOLOGY_RULES).items():
+        cases += [("pathology", {"test": name, "value": v}) for t in thresholds for v in _around(t, 0.01)]
+    cases += [("pathology", {"test": name, "value": 5.0}) for name in ("Potassium", "HEMOGLOBIN", "unknown test")]
+    return cases
+
+
+def _replay(kind: str, args: dict):
+    """Runs one case through the current tool code and returns its comparable output."""
+    # Imported here: these modules import this one
+    from . import early_warning, monitoring_tools, pathology_tools, triage_tools
+    from .common_tools import _LAB_DB
+
+    if kind == "early_warning":
+        level, analysis, points = early_warning.evaluate_vitals(args)
+        return [int(level), analysis, points]
+    if kind == "triage":
+        return list(triage_tools._check_vital_danger_zone(args))
+    if kind == "vital_band":
+        band = VITAL_BAND_RULES.match_one(args["parameter"], args["value"])
+        return list(band) if band else None
+    if kind == "deterioration":
+        alert = monitoring_tools.generate_deterioration_alert("P001", args["trigger"], args["value"], args["unit"])
+        return [alert.get("threshold_type"), alert["direction"], alert["severity"],
+                alert.get("threshold_reference", alert.get("threshold")), alert["immediate_action"]]
+    if kind == "lab_scan":
+        _LAB_DB["__conformance__"] = {"Panel": {args["analyte"]: args["value"]}}
+        try:
+            result = monitoring_tools.check_critical_lab_values("__conformance__")
+        finally:
+            del _LAB_DB["__conformance__"]
+        alerts = result.get("critical_alerts", []) + result.get("warning_alerts", [])
+        return [result["status"], [[a["analyte"], a["direction"], a["severity"], a["threshold"], a["immediate_action"]]
+                                   for a in alerts]]
+    if kind == "pathology":
+        result = pathology_tools.critical_lab_value_alert(args["test"], args["value"], "units", "P001", 50, "male")
+        return [result["alert_level"], result["is_critical_value"], result["differential_diagnosis"],
+                result["immediate_management"]]
+    raise ValueError(f"unknown conformance case kind '{kind}'")
+
+
+def _pack(value, strings: dict):
+    """Replaces strings with '#<index>' into a shared table; recorded outputs repeat them a lot."""
+    if isinstance(value, str):
+        return f"#{strings.setdefault(value, len(strings))}"
+    if isinstance(value, (list, tuple)):
+        return [_pack(item, strings) for item in value]
+    return value
+
+
+def _unpack(value, strings: list):
+    if isinstance(value, str):
+        return strings[int(value[1:])]
+    if isinstance(value, list):
+        return [_unpack(item, strings) for item in value]
+    return value
+
+
+def record_conformance(path: str = _CONFORMANCE_FILE) -> int:
+    """Records the current tool outputs for every conformance case; returns the case count."""
+    strings: dict[str, int] = {}
+    cases = [[kind, args, _pack(_replay(kind, args), strings)] for kind, args in _conformance_cases()]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"strings": list(strings), "cases": cases}, f, ensure_ascii=False, separators=(",", ":"))
+        f.write("\n")
+    return len(cases)
+
+
+def check_conformance(path: str = _CONFORMANCE_FILE) -> dict:
+    """Replays the recorded cases against the current tools.
+
+    Returns:
+        dict: Case counts per kind and the first few mismatches (expected vs actual).
+    """
+    with open(path, encoding="utf-8") as f:
+        recorded = json.load(f)
+    counts: dict[str, int] = {}
+    mismatches = []
+    for kind, args, expected in recorded["cases"]:
+        counts[kind] = counts.get(kind, 0) + 1
+        expected = _unpack(expected, recorded["strings"])
+        actual = json.loads(json.dumps(_replay(kind, args), ensure_ascii=False))
+        if actual != expected:
+            mismatches.append({"kind": kind, "args": args, "expected": expected, "actual": actual})
+    return {"cases": counts, "mismatch_count": len(mismatches), "mismatches": mismatches[:10]}
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+def _bench(n: int, seed: int = 7) -> dict:
+    """Checks ``match_batch`` against ``match`` for every table on ``n`` random rows, and times both."""
+    np = _numpy()
+    rng = np.random.default_rng(seed)
+    report = {}
+    for table_name, table in _TABLES.items():
+        limits = _thresholds(table)
+        columns = {}
+        for name in table.columns:
+            lo, hi = min(limits[name]), max(limits[name])
+            span = max(hi - lo, abs(hi) * 0.5, 1.0)
+            values = np.round(rng.uniform(lo - span * 0.25, hi + span * 0.25, n), 2)
+            values[rng.random(n) < 0.05] = np.nan
+            columns[name] = values
+
+        started = time.perf_counter()
+        matches = table.match_batch(columns)
+        batch_s = time.perf_counter() - started
+
+        rows = [{name: (None if np.isnan(v) else v) for name, v in zip(columns, row)}
+                for row in zip(*(columns[name].tolist() for name in columns))]
+        started = time.perf_counter()
+        scalar = [table.match(row) for row in rows]
+        scalar_s = time.perf_counter() - started
+
+        mismatches = 0
+        for i, matched in enumerate(scalar):
+            expected = {group["parameter"]: payload for group, payload in matched}
+            for j, group in enumerate(table.groups):
+                index = int(matches[i, j])
+                if index == -2:
+                    mismatches += group["parameter"] in expected
+                    continue
+                payload = None if index == -1 else tuple(group["rules"][index][1:])
+                mismatches += expected.get(group["parameter"], "missing") != payload
+        report[table_name] = {"scalar_seconds": round(scalar_s, 3), "batch_seconds": round(batch_s, 4),
+                              "speedup": round(scalar_s / max(batch_s, 1e-9)), "mismatches": mismatches}
+    return {"rows": n, "tables": report}
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Clinical threshold rule tables: report, conformance and benchmark.")
+    parser.add_argument("--report", action="store_true", help="print every table's limits per parameter")
+    parser.add_argument("--conformance", action="store_true", help="replay the recorded tool outputs (default)")
+    parser.add_argument("--record", action="store_true", help="re-record the tool outputs after an intended change")
+    parser.add_argument("--bench", type=int, metavar="N", help="check batch against scalar evaluation on N rows")
+    args = parser.parse_args(argv)
+
+    if args.report:
+        print(json.dumps(threshold_report(), indent=2, ensure_ascii=False))
+    elif args.record:
+        print(json.dumps({"recorded_cases": record_conformance(), "file": _CONFORMANCE_FILE}, indent=2))
+    elif args.bench:
+        report = _bench(args.bench)
+        print(json.dumps(report, indent=2))
+        if any(table["mismatches"] for table in report["tables"].values()):
+            raise SystemExit("batch rule evaluation disagrees with the scalar path")
+    else:
+        report = check_conformance()
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        if report["mismatch_count"]:
+            raise SystemExit("threshold tools no longer match the recorded behaviour")
+
+
+if __name__ == "__main__":
+    main()
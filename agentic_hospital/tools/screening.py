@@ -0,0 +1,611 @@
+"""Population screening and immunisation worklists.
+
+``cancer_screening_recommendation``, ``vaccination_schedule`` and
+``vaccination_tracker`` answer for one patient on demand. The program table
+below holds the same eligibility rules as columns, so the whole registry is
+evaluated in one NumPy pass. Each patient's result is cached against a
+fingerprint of their age, sex, conditions and screening history, and a rerun
+only recomputes the patients whose fingerprint changed. The cache holds due
+dates rather than statuses, so "due" and "overdue" always reflect today.
+
+Check the batch path against the three per-patient tools, and time it, with::
+
+    python -m agentic_hospital.tools.screening --bench 20000
+"""
+
+import argparse
+import datetime
+import functools
+import json
+import re
+import threading
+import time
+from typing import Optional
+
+from ..infra import clock
+from ..infra.backend import register_store, state_transaction
+from ..infra.state import locked
+from .common_tools import _PATIENT_DB
+
+_MONTH_DAYS = 30.4375  # 365.25 / 12; ages and intervals are in months, due dates in days
+
+
+# =============================================================================
+# DECISION TABLE
+# =============================================================================
+# Risk flags derived per patient. ``family`` terms match the recorded family
+# history as substrings, as the oncology tool does; ``conditions`` terms match
+# whole words in the chronic conditions, so registry wording such as
+# "COPD (GOLD Stage II)" or "Type 2 Diabetes" qualifies; ``history`` names a
+# yes/no field of the screening history.
+_RISK_FLAGS: dict[str, dict] = {
+    "family_colorectal": {"family": ("colon", "colorectal")},
+    "family_breast": {"family": ("breast",)},
+    "family_breast_ovarian": {"family": ("breast", "ovarian")},
+    "family_skin": {"family": ("melanoma", "skin")},
+    "family_liver": {"family": ("liver", "hepatitis")},
+    "smoker": {"history": "smoking_history"},
+    "previous_cancer": {"history": "previous_cancer",
+                        "conditions": ("cancer", "carcinoma", "lymphoma", "leukemia", "leukaemia",
+                                       "melanoma", "myeloma", "sarcoma")},
+    "pneumococcal_risk": {"conditions": ("diabetes", "copd", "asthma", "heart disease", "heart failure",
+                                         "coronary", "cabg", "immunocompromised", "hiv", "kidney disease",
+                                         "ckd", "nephritis")},
+    "hepatitis_a_risk": {"conditions": ("liver disease", "cirrhosis", "hepatitis b", "hepatitis c", "travel")},
+    "hepatitis_b_infection": {"conditions": ("hepatitis b",)},
+}
+
+# One row per screening test or vaccine. Eligibility columns are ANDed:
+#   audience   'adult' (18+), 'child' (under 18) or None for both
+#   sex        'female'/'male', or None for both
+#   min_age/max_age  inclusive limits in years (None = open)
+#   age_or     risk flags that make the patient eligible outside the age limits
+#   requires   at least one of these risk flags must be set (empty = none needed)
+#   unless     any of these risk flags rules the patient out
+# Scheduling: ``doses`` in the series, due ``dose_gap`` months apart or at
+# ``dose_ages`` months of age; ``repeat`` months until the next round once
+# complete (None = once), shortened to ``repeat_if`` = (flag, months) when
+# the flag is set; ``grace`` days past due before the item is overdue.
+# ``aliases`` map free-text history entries to the program (longest wins).
+_PROGRAMS: tuple[dict, ...] = (
+    # --- Cancer screening (oncology: cancer_screening_recommendation) ---
+    {"id": "colonoscopy", "name": "Colonoscopy", "department": "oncology",
+     "min_age": 45, "age_or": ("family_colorectal",), "repeat": 120, "repeat_if": ("family_colorectal", 60),
+     "aliases": ("colonoscopy",)},
+    {"id": "mammography", "name": "Mammography", "department": "oncology",
+     "sex": "female", "min_age": 40, "age_or": ("family_breast",), "repeat": 12,
+     "aliases": ("mammogram", "mammography")},
+    {"id": "brca_testing", "name": "BRCA Genetic Testing", "department": "oncology",
+     "sex": "female", "requires": ("family_breast_ovarian",),
+     "aliases": ("brca",)},
+    {"id": "cervical_screening", "name": "Pap Smear / HPV Co-testing", "department": "oncology",
+     "sex": "female", "min_age": 21, "max_age": 65, "repeat": 36,
+     "aliases": ("pap", "cervical", "hpv test", "hpv co-test")},
+    {"id": "lung_ldct", "name": "Low-Dose CT Chest", "department": "oncology",
+     "min_age": 50, "requires": ("smoker",), "repeat": 12,
+     "aliases": ("low-dose ct", "low dose ct", "ldct")},
+    {"id": "psa", "name": "PSA Blood Test + Digital Rectal Exam", "department": "oncology",
+     "sex": "male", "min_age": 50, "repeat": 24,
+     "aliases": ("psa",)},
+    {"id": "skin_exam", "name": "Full-Body Skin Examination", "department": "oncology",
+     "requires": ("previous_cancer", "family_skin"), "repeat": 12,
+     "aliases": ("skin exam", "skin check")},
+    {"id": "liver_surveillance", "name": "Liver Ultrasound + AFP", "department": "oncology",
+     "requires": ("family_liver",), "repeat": 6,
+     "aliases": ("liver ultrasound", "afp")},
+    {"id": "survivorship", "name": "Comprehensive Survivorship Follow-up", "department": "oncology",
+     "requires": ("previous_cancer",), "repeat": 12,
+     "aliases": ("survivorship",)},
+    # --- Adult immunisation (general medicine: vaccination_schedule) ---
+    {"id": "influenza", "name": "Influenza (Flu)", "department": "general_medicine",
+     "audience": "adult", "repeat": 12, "aliases": ("flu", "influenza")},
+    {"id": "covid19", "name": "COVID-19 Updated Vaccine", "department": "general_medicine",
+     "audience": "adult", "repeat": 12, "aliases": ("covid",)},
+    {"id": "tdap", "name": "Tdap/Td (Tetanus, Diphtheria, Pertussis)", "department": "general_medicine",
+     "audience": "adult", "repeat": 120, "aliases": ("tdap", "td ", "td booster", "tetanus")},
+    {"id": "shingrix", "name": "Shingrix (Recombinant Zoster)", "department": "general_medicine",
+     "audience": "adult", "min_age": 50, "doses": 2, "dose_gap": 2,
+     "aliases": ("shingrix", "shingles", "zoster")},
+    {"id": "pneumococcal", "name": "PCV20 (Prevnar 20) or PCV15 + PPSV23", "department": "general_medicine",
+     "audience": "adult", "min_age": 65, "age_or": ("pneumococcal_risk",),
+     "aliases": ("pneumo", "prevnar", "pcv", "ppsv")},
+    {"id": "hpv", "name": "HPV (Gardasil 9)", "department": "general_medicine",
+     "audience": "adult", "max_age": 45, "doses": 2, "dose_gap": 6,
+     "aliases": ("hpv", "gardasil")},
+    {"id": "hepatitis_b", "name": "Hepatitis B", "department": "general_medicine",
+     "audience": "adult", "max_age": 59, "unless": ("hepatitis_b_infection",), "doses": 2, "dose_gap": 1,
+     "aliases": ("hep b", "hepatitis b", "heplisav")},
+    {"id": "rsv", "name": "RSV Vaccine", "department": "general_medicine",
+     "audience": "adult", "min_age": 60, "aliases": ("rsv",)},
+    {"id": "hepatitis_a", "name": "Hepatitis A", "department": "general_medicine",
+     "audience": "adult", "requires": ("hepatitis_a_risk",), "doses": 2, "dose_gap": 6,
+     "aliases": ("hep a", "hepatitis a")},
+    # --- Childhood schedule (pediatrics: vaccination_tracker), overdue 2 months past due ---
+    {"id": "child_hepatitis_b", "name": "Hepatitis B", "department": "pediatrics", "audience": "child",
+     "doses": 3, "dose_ages": (0, 1, 6), "grace": 61, "aliases": ("hep b", "hepatitis b", "hepb")},
+    {"id": "child_dtap", "name": "DTaP", "department": "pediatrics", "audience": "child",
+     "doses": 5, "dose_ages": (2, 4, 6, 15, 48), "grace": 61, "aliases": ("dtap",)},
+    {"id": "child_hib", "name": "Hib", "department": "pediatrics", "audience": "child",
+     "doses": 4, "dose_ages": (2, 4, 6, 12), "grace": 61, "aliases": ("hib",)},
+    {"id": "child_ipv", "name": "IPV (Polio)", "department": "pediatrics", "audience": "child",
+     "doses": 4, "dose_ages": (2, 4, 6, 48), "grace": 61, "aliases": ("ipv", "polio")},
+    {"id": "child_pcv", "name": "PCV (Pneumococcal)", "department": "pediatrics", "audience": "child",
+     "doses": 4, "dose_ages": (2, 4, 6, 12), "grace": 61, "aliases": ("pcv", "prevnar", "pneumo")},
+    {"id": "child_rotavirus", "name": "Rotavirus", "department": "pediatrics", "audience": "child",
+     "doses": 3, "dose_ages": (2, 4, 6), "grace": 61, "aliases": ("rota",)},
+    {"id": "child_mmr", "name": "MMR", "department": "pediatrics", "audience": "child",
+     "doses": 2, "dose_ages": (12, 48), "grace": 61, "aliases": ("mmr",)},
+    {"id": "child_varicella", "name": "Varicella", "department": "pediatrics", "audience": "child",
+     "doses": 2, "dose_ages": (12, 48), "grace": 61, "aliases": ("varicella", "chickenpox")},
+    {"id": "child_hepatitis_a", "name": "Hepatitis A", "department": "pediatrics", "audience": "child",
+     "doses": 2, "dose_ages": (12, 18), "grace": 61, "aliases": ("hep a", "hepatitis a", "hepa")},
+    {"id": "child_influenza", "name": "Influenza", "department": "pediatrics", "audience": "child",
+     "dose_ages": (6,), "repeat": 12, "grace": 61, "aliases": ("flu", "influenza")},
+)
+
+_DEFAULT_GRACE_DAYS = 90
+_PROGRAM_INDEX = {program["id"]: i for i, program in enumerate(_PROGRAMS)}
+_FLAG_NAMES = tuple(_RISK_FLAGS)
+
+
+def _any_term(terms: tuple, whole_words: bool) -> Optional[re.Pattern]:
+    if not terms:
+        return None
+    body = "|".join(re.escape(term) for term in terms)
+    return re.compile(rf"\b(?:{body})\b" if whole_words else body)
+
+
+# Compiled once: (flag, family pattern, conditions pattern, history field)
+_FLAG_MATCHERS = tuple(
+    (name, _any_term(rule.get("family", ()), False), _any_term(rule.get("conditions", ()), True), rule.get("history"))
+    for name, rule in _RISK_FLAGS.items()
+)
+
+
+def _numpy():
+    import numpy as np  # imported lazily: only the batch paths need it
+    return np
+
+
+@functools.lru_cache(maxsize=None)
+def _table() -> dict:
+    """The program table as NumPy columns, built on first use."""
+    np = _numpy()
+    n_programs, n_flags = len(_PROGRAMS), len(_FLAG_NAMES)
+    max_doses = max(program.get("doses", 1) for program in _PROGRAMS)
+
+    def flag_matrix(column: str):
+        matrix = np.zeros((n_flags, n_programs), dtype=np.int32)
+        for j, program in enumerate(_PROGRAMS):
+            for flag in program.get(column, ()):
+                matrix[_FLAG_NAMES.index(flag), j] = 1
+        return matrix
+
+    dose_ages = np.full((n_programs, max_doses), np.nan)
+    for j, program in enumerate(_PROGRAMS):
+        ages = program.get("dose_ages", ())
+        dose_ages[j, :len(ages)] = ages
+    repeat_if = [program.get("repeat_if") for program in _PROGRAMS]
+    return {
+        "adult_only": np.array([p.get("audience") == "adult" for p in _PROGRAMS]),
+        "child_only": np.array([p.get("audience") == "child" for p in _PROGRAMS]),
+        "female_only": np.array([p.get("sex") == "female" for p in _PROGRAMS]),
+        "male_only": np.array([p.get("sex") == "male" for p in _PROGRAMS]),
+        "min_age": np.array([p.get("min_age", -np.inf) for p in _PROGRAMS], dtype=np.float64),
+        "has_min_age": np.array(["min_age" in p for p in _PROGRAMS]),
+        "max_age": np.array([p.get("max_age", np.inf) for p in _PROGRAMS], dtype=np.float64),
+        "age_or": flag_matrix("age_or"),
+        "requires": flag_matrix("requires"),
+        "has_requires": np.array([bool(p.get("requires")) for p in _PROGRAMS]),
+        "unless": flag_matrix("unless"),
+        "doses": np.array([p.get("doses", 1) for p in _PROGRAMS]),
+        "dose_gap": np.array([p.get("dose_gap", 0) for p in _PROGRAMS], dtype=np.float64) * _MONTH_DAYS,
+        "dose_ages": dose_ages * _MONTH_DAYS,
+        "has_dose_ages": np.array(["dose_ages" in p for p in _PROGRAMS]),
+        "repeat": np.array([p.get("repeat") or np.nan for p in _PROGRAMS], dtype=np.float64) * _MONTH_DAYS,
+        "repeat_if_flag": np.array([_FLAG_NAMES.index(r[0]) if r else 0 for r in repeat_if]),
+        "has_repeat_if": np.array([r is not None for r in repeat_if]),
+        "repeat_if": np.array([r[1] if r else np.nan for r in repeat_if], dtype=np.float64) * _MONTH_DAYS,
+        "grace": np.array([p.get("grace", _DEFAULT_GRACE_DAYS) for p in _PROGRAMS], dtype=np.float64),
+    }
+
+
+# =============================================================================
+# BATCH EVALUATION
+# =============================================================================
+def evaluate_programs_batch(age_years, age_months, female, male, flags, doses_done, last_day, today: float) -> dict:
+    """Evaluates every program for every patient in one pass.
+
+    Args:
+        age_years: Ages in whole years, shape (n,).
+        age_months: Ages in months, shape (n,); used for dates of birth and the childhood schedule.
+        female: Female patients, shape (n,).
+        male: Male patients, shape (n,).
+        flags: Risk flags, shape (n, len(_FLAG_NAMES)), columns in ``_RISK_FLAGS`` order.
+        doses_done: Doses or rounds recorded per program, shape (n, len(_PROGRAMS)).
+        last_day: Day number (``date.toordinal()``) of the latest one, NaN if none, shape (n, len(_PROGRAMS)).
+        today: Day number of the evaluation date.
+
+    Returns:
+        dict: ``eligible`` (bool, n × programs) and ``due_day`` (float day numbers,
+              NaN where nothing further is due).
+    """
+    np = _numpy()
+    t = _table()
+    age_years = np.asarray(age_years, dtype=np.float64)[:, None]
+    birth = today - np.asarray(age_months, dtype=np.float64)[:, None] * _MONTH_DAYS
+    adult = age_years >= 18
+    female = np.asarray(female, dtype=bool)[:, None]
+    male = np.asarray(male, dtype=bool)[:, None]
+    flags = np.asarray(flags, dtype=np.int32)
+    doses_done = np.asarray(doses_done)
+    last_day = np.asarray(last_day, dtype=np.float64)
+
+    in_age = (age_years >= t["min_age"]) & (age_years <= t["max_age"])
+    eligible = (
+        ~(t["adult_only"] & ~adult) & ~(t["child_only"] & adult)
+        & ~(t["female_only"] & ~female) & ~(t["male_only"] & ~male)
+        & (in_age | ((flags @ t["age_or"]) > 0))
+        & (~t["has_requires"] | ((flags @ t["requires"]) > 0))
+        & ((flags @ t["unless"]) == 0)
+    )
+
+    # First due date: the age the program starts at, or today when eligibility
+    # comes from a risk flag alone
+    first_due = np.where(t["has_min_age"] & in_age, birth + t["min_age"] * 12 * _MONTH_DAYS, today)
+    scheduled = birth + t["dose_ages"][np.arange(len(_PROGRAMS)), np.minimum(doses_done, t["dose_ages"].shape[1] - 1)]
+    next_dose = np.where(t["has_dose_ages"], scheduled, np.where(doses_done == 0, first_due, last_day + t["dose_gap"]))
+    repeat = np.where(t["has_repeat_if"] & (flags[:, t["repeat_if_flag"]] > 0), t["repeat_if"], t["repeat"])
+    due_day = np.where(doses_done < t["doses"], next_dose, last_day + repeat)
+    return {"eligible": eligible, "due_day": np.where(eligible, due_day, np.nan)}
+
+
+def _patient_flags(patient: dict, history: dict) -> list[bool]:
+    family = "\n".join(history.get("family_history", [])).lower()
+    conditions = "\n".join(patient.get("chronic_conditions", [])).lower()
+    return [
+        bool((family_re and family_re.search(family))
+             or (conditions_re and conditions_re.search(conditions))
+             or (field and history.get(field)))
+        for _, family_re, conditions_re, field in _FLAG_MATCHERS
+    ]
+
+
+def _evaluate(records: list[tuple[dict, dict]], today: float) -> dict:
+    """Builds the batch columns for (patient, history) pairs and evaluates them."""
+    np = _numpy()
+    n, n_programs = len(records), len(_PROGRAMS)
+    doses_done = np.zeros((n, n_programs), dtype=np.int64)
+    last_day = np.full((n, n_programs), np.nan)
+    for i, (_, history) in enumerate(records):
+        for program_id, dates in history.get("events", {}).items():
+            j = _PROGRAM_INDEX.get(program_id)
+            if j is not None and dates:
+                doses_done[i, j] = len(dates)
+                last_day[i, j] = datetime.date.fromisoformat(max(dates)).toordinal()
+    genders = [str(patient.get("gender", "")).lower() for patient, _ in records]
+    return evaluate_programs_batch(
+        [patient["age"] for patient, _ in records],
+        [patient.get("age_months", patient["age"] * 12) for patient, _ in records],
+        [g == "female" for g in genders],
+        [g == "male" for g in genders],
+        [_patient_flags(patient, history) for patient, history in records],
+        doses_done, last_day, today,
+    )
+
+
+# =============================================================================
+# STORES AND INCREMENTAL CACHE
+# =============================================================================
+# Per-patient screening history: family history, smoking/cancer history and
+# completed items as {program_id: [ISO dates]}
+_SCREENING_HISTORY: dict[str, dict] = {}
+register_store("screening.history", _SCREENING_HISTORY, "keyed", scope="patient")
+
+# patient_id -> (fingerprint, [(program index, due day, doses done), ...]).
+# Derived data, rebuilt on demand, so it is not persisted.
+_WORKLIST_CACHE: dict[str, tuple] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def _fingerprint(patient: dict, history: dict) -> tuple:
+    return (patient.get("age"), patient.get("age_months"), str(patient.get("gender", "")).lower(),
+            tuple(patient.get("chronic_conditions", [])), json.dumps(history, sort_keys=True))
+
+
+def refresh_worklists() -> dict:
+    """Brings the cached results up to date, re-evaluating only changed patients.
+
+    Returns:
+        dict: ``patients`` on the registry and how many were ``recomputed``.
+    """
+    today = float(clock.now().date().toordinal())
+    with _CACHE_LOCK:
+        stale = []
+        for patient_id, patient in list(_PATIENT_DB.items()):
+            history = _SCREENING_HISTORY.get(patient_id, {})
+            fingerprint = _fingerprint(patient, history)
+            cached = _WORKLIST_CACHE.get(patient_id)
+            if cached is None or cached[0] != fingerprint:
+                stale.append((patient_id, fingerprint, patient, history))
+        for patient_id in set(_WORKLIST_CACHE) - set(_PATIENT_DB):
+            del _WORKLIST_CACHE[patient_id]
+        if stale:
+            np = _numpy()
+            result = _evaluate([(patient, history) for _, _, patient, history in stale], today)
+            due_day = result["due_day"]
+            for i, (patient_id, fingerprint, _, history) in enumerate(stale):
+                events = history.get("events", {})
+                _WORKLIST_CACHE[patient_id] = (fingerprint, [
+                    (int(j), float(due_day[i, j]), len(events.get(_PROGRAMS[j]["id"], [])))
+                    for j in np.flatnonzero(~np.isnan(due_day[i]))
+                ])
+    return {"patients": len(_PATIENT_DB), "recomputed": len(stale)}
+
+
+def _resolve_program(text: str, adult: bool) -> Optional[dict]:
+    """Maps a free-text item (or program id) to a program for the patient's age group."""
+    key = text.strip().lower()
+    if key in _PROGRAM_INDEX:
+        return _PROGRAMS[_PROGRAM_INDEX[key]]
+    best, best_len = None, 0
+    for program in _PROGRAMS:
+        if program.get("audience") == ("child" if adult else "adult"):
+            continue
+        for alias in program["aliases"]:
+            if alias in key + " " and len(alias) > best_len:
+                best, best_len = program, len(alias)
+    return best
+
+
+# =============================================================================
+# TOOLS
+# =============================================================================
+@state_transaction
+def record_screening_history(
+    patient_id: str,
+    completed: str = "",
+    date: str = "",
+    family_history: Optional[list[str]] = None,
+    smoking_history: Optional[bool] = None,
+    previous_cancer: Optional[bool] = None,
+) -> dict:
+    """Records a completed screening test or vaccine dose, and screening risk factors.
+
+    Args:
+        patient_id: The patient's unique identifier (e.g., 'P001').
+        completed: Test or vaccine given (e.g., 'colonoscopy', 'flu', 'Shingrix dose 1');
+                   leave empty to update risk factors only.
+        date: Date it was done, YYYY-MM-DD (default today).
+        family_history: Cancers in first-degree relatives; replaces the stored list.
+        smoking_history: Whether the patient has ever smoked.
+        previous_cancer: Whether the patient has had cancer before.
+
+    Returns:
+        dict: The program the item was filed under and the updated screening history.
+    """
+    patient = _PATIENT_DB.get(patient_id)
+    if patient is None:
+        return {
+            "status": "not_found",
+            "message": f"No patient found with ID '{patient_id}'. Available IDs: {', '.join(_PATIENT_DB.keys())}",
+        }
+    today = clock.now().date()
+    program = None
+    if completed:
+        program = _resolve_program(completed, patient["age"] >= 18)
+        if program is None:
+            return {"status": "error",
+                    "message": f"Unrecognised screening item '{completed}'. Known programs: {', '.join(_PROGRAM_INDEX)}."}
+    try:
+        done_on = datetime.date.fromisoformat(date) if date else today
+    except ValueError:
+        return {"status": "error", "message": f"Invalid date '{date}'. Use YYYY-MM-DD."}
+    if done_on > today:
+        return {"status": "error", "message": f"Date {done_on.isoformat()} is in the future."}
+
+    with locked(patients=[patient_id]):
+        history = dict(_SCREENING_HISTORY.get(patient_id, {}))
+        history["events"] = {k: list(v) for k, v in history.get("events", {}).items()}
+        if program is not None:
+            dates = history["events"].setdefault(program["id"], [])
+            dates.append(done_on.isoformat())
+            dates.sort()
+        if family_history is not None:
+            history["family_history"] = list(family_history)
+        if smoking_history is not None:
+            history["smoking_history"] = bool(smoking_history)
+        if previous_cancer is not None:
+            history["previous_cancer"] = bool(previous_cancer)
+        _SCREENING_HISTORY[patient_id] = history
+
+    return {
+        "status": "recorded",
+        "patient_id": patient_id,
+        "program": program["id"] if program else None,
+        "program_name": program["name"] if program else None,
+        "date": done_on.isoformat() if program else None,
+        "screening_history": history,
+    }
+
+
+@state_transaction(readonly=True)
+def get_screening_worklist(
+    program: str = "all",
+    status: str = "all",
+    page: int = 1,
+    page_size: int = 20,
+) -> dict:
+    """Lists registry patients due or overdue for cancer screening and immunisations.
+
+    Applies the rules of the cancer screening, adult vaccination and childhood
+    vaccination tools to every patient, using their recorded screening
+    history, and re-evaluates only patients whose details changed since the
+    last run. Most overdue first.
+
+    Args:
+        program: Program id (e.g. 'colonoscopy', 'influenza', 'child_mmr'), a department
+                 ('oncology', 'general_medicine', 'pediatrics') or 'all'.
+        status: 'overdue', 'due' (due but not yet overdue) or 'all' (both).
+        page: Page number, starting at 1.
+        page_size: Items per page (1–100).
+
+    Returns:
+        dict: One page of worklist items plus due/overdue counts per program.
+    """
+    wanted = program.strip().lower()
+    departments = {p["department"] for p in _PROGRAMS}
+    if wanted != "all" and wanted not in _PROGRAM_INDEX and wanted not in departments:
+        return {"status": "error",
+                "message": f"Unknown program '{program}'. Use 'all', a department ({', '.join(sorted(departments))}) "
+                           f"or a program id: {', '.join(_PROGRAM_INDEX)}."}
+    status = status.strip().lower()
+    if status not in ("all", "due", "overdue"):
+        return {"status": "error", "message": "status must be 'all', 'due' or 'overdue'."}
+
+    run = refresh_worklists()
+    today = clock.now().date().toordinal()
+    counts: dict[str, dict] = {}
+    items = []
+    with _CACHE_LOCK:
+        cached = list(_WORKLIST_CACHE.items())
+    for patient_id, (_, entries) in cached:
+        for j, due_day, done in entries:
+            if due_day > today:
+                continue
+            spec = _PROGRAMS[j]
+            days_overdue = today - due_day
+            item_status = "overdue" if days_overdue > spec.get("grace", _DEFAULT_GRACE_DAYS) else "due"
+            tally = counts.setdefault(spec["id"], {"due": 0, "overdue": 0})
+            tally[item_status] += 1
+            if wanted not in ("all", spec["id"], spec["department"]) or status not in ("all", item_status):
+                continue
+            items.append((days_overdue, patient_id, spec, due_day, done, item_status))
+    items.sort(key=lambda item: (-item[0], item[1], item[2]["id"]))
+
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), 100)
+    total = len(items)
+    worklist = []
+    for days_overdue, patient_id, spec, due_day, done, item_status in items[(page - 1) * page_size:page * page_size]:
+        doses = spec.get("doses", 1)
+        worklist.append({
+            "patient_id": patient_id,
+            "patient_name": _PATIENT_DB.get(patient_id, {}).get("name", patient_id),
+            "age": _PATIENT_DB.get(patient_id, {}).get("age"),
+            "program": spec["id"],
+            "item": spec["name"],
+            "department": spec["department"],
+            "next": f"Dose {done + 1} of {doses}" if done < doses and doses > 1 else ("Repeat" if done else "Initial"),
+            "due_date": datetime.date.fromordinal(int(due_day)).isoformat(),
+            "days_overdue": int(days_overdue),
+            "status": item_status,
+        })
+    return {
+        "status": "success",
+        "program": wanted,
+        "filter": status,
+        "as_of": datetime.date.fromordinal(today).isoformat(),
+        "patients_on_registry": run["patients"],
+        "patients_recomputed": run["recomputed"],
+        "counts_by_program": counts,
+        "total_matching": total,
+        "page": page,
+        "pages": max((total + page_size - 1) // page_size, 1),
+        "page_size": page_size,
+        "worklist": worklist,
+    }
+
+
+# =============================================================================
+# CONFORMANCE AND BENCHMARK
+# =============================================================================
+_BENCH_FAMILY = ("colon cancer", "colorectal cancer", "breast cancer", "ovarian cancer", "melanoma",
+                 "skin cancer", "liver cancer", "hepatitis", "prostate cancer")
+_BENCH_CONDITIONS = ("diabetes", "copd", "asthma", "heart disease", "immunocompromised", "kidney disease",
+                     "liver disease", "hepatitis c", "travel", "hypertension", "migraines")
+_BENCH_VACCINES = ("flu_2024", "covid_booster", "tdap", "shingrix", "prevnar 20", "gardasil", "hep b",
+                   "rsv", "hep a")
+
+
+def _bench(n: int, seed: int = 7) -> dict:
+    """Checks the batch path against the three per-patient tools on ``n`` synthetic patients each way."""
+    import random
+
+    from .general_medicine_tools import vaccination_schedule
+    from .oncology_tools import cancer_screening_recommendation
+    from .pediatrics_tools import vaccination_tracker
+
+    np = _numpy()
+    rng = random.Random(seed)
+    today = clock.now().date()
+    names = {(p["department"], p["name"]): j for j, p in enumerate(_PROGRAMS)}
+
+    adults = []
+    for _ in range(n):
+        received = rng.sample(_BENCH_VACCINES, rng.randint(0, 4))
+        events = {}
+        for vaccine in received:
+            spec = _resolve_program(vaccine, True)
+            events[spec["id"]] = [today.isoformat()] * spec.get("doses", 1)
+        adults.append((
+            {"age": rng.randint(18, 90), "gender": rng.choice(("Male", "Female")),
+             "chronic_conditions": rng.sample(_BENCH_CONDITIONS, rng.randint(0, 2))},
+            {"family_history": rng.sample(_BENCH_FAMILY, rng.choice((0, 0, 1, 2))),
+             "smoking_history": rng.random() < 0.25, "previous_cancer": rng.random() < 0.1, "events": events},
+            received,
+        ))
+    children = [({"age": m // 12, "age_months": m, "gender": "Female", "chronic_conditions": []}, {}, [])
+                for m in (rng.randint(0, 71) for _ in range(n))]
+
+    started = time.perf_counter()
+    due_adults = _evaluate([(p, h) for p, h, _ in adults], today.toordinal())["due_day"]
+    due_children = _evaluate([(p, h) for p, h, _ in children], today.toordinal())["due_day"]
+    batch_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scalar_adults = [
+        (cancer_screening_recommendation(p["age"], p["gender"], h["family_history"], h["smoking_history"],
+                                         h["previous_cancer"]),
+         vaccination_schedule(p["age"], p["gender"], p["chronic_conditions"], received))
+        for p, h, received in adults
+    ]
+    scalar_children = [vaccination_tracker(p["age_months"], []) for p, _, _ in children]
+    scalar_s = time.perf_counter() - started
+
+    mismatches = 0
+    grace = _table()["grace"]
+    for i, (screening, vaccines) in enumerate(scalar_adults):
+        expected = {names["oncology", s["test"]] for s in screening["recommended_screenings"]}
+        expected |= {names["general_medicine", v["vaccine"]] for v in vaccines["recommended_vaccinations"]}
+        listed = set(np.flatnonzero(due_adults[i] <= today.toordinal()).tolist())
+        mismatches += expected != listed
+    for i, tracker in enumerate(scalar_children):
+        expected = {(names["pediatrics", entry.split(":")[0]], state)
+                    for state in ("due_now", "overdue") for entry in tracker[state] if ": Dose" in entry}
+        listed = {(j, "overdue" if today.toordinal() - due_children[i, j] > grace[j] else "due_now")
+                  for j in np.flatnonzero(due_children[i] <= today.toordinal()).tolist()}
+        mismatches += expected != listed
+
+    return {
+        "patients": 2 * n,
+        "scalar_seconds": round(scalar_s, 3),
+        "batch_seconds": round(batch_s, 3),
+        "speedup": round(scalar_s / max(batch_s, 1e-9), 1),
+        "mismatches": mismatches,
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Check and time the batch screening worklist path.")
+    parser.add_argument("--bench", type=int, default=20_000, metavar="N",
+                        help="synthetic adults and children to compare (N of each)")
+    args = parser.parse_args(argv)
+    report = _bench(args.bench)
+    print(json.dumps(report, indent=2))
+    if report["mismatches"]:
+        raise SystemExit("batch screening disagrees with the per-patient tools")
+
+
+if __name__ == "__main__":
+    main()
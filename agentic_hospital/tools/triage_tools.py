@@ -6,12 +6,44 @@ Implements the full ESI v4 decision algorithm:
   Step 3 — How many resources are expected? 2+ → ESI 3, 1 → ESI 4, 0 → ESI 5
 """
 
+import json
+import logging
+import os
 from datetime import datetime
 
+from ..infra import clock
+from ..infra.backend import register_store, state_transaction
+from ..infra.event_log import log_event, register_log
+from ..infra.state import AtomicCounter, named_lock
+from .rules import TRIAGE_DANGER_RULES
+
+_logger = logging.getLogger(__name__)
+
 # ── In-memory state ───────────────────────────────────────────────────────────
 _TRIAGE_LOG: dict[str, list[dict]] = {}   # patient_id → list of triage records
 _WAITING_QUEUE: list[dict] = []           # priority-ordered waiting list
-_TRIAGE_SEQ: dict[str, int] = {"n": 0}   # auto-increment for record IDs
+_TRIAGE_SEQ = AtomicCounter("triage_seq")  # auto-increment for record IDs
+_QUEUE_LOCK = named_lock("triage_waiting_queue")
+
+register_store("triage.log", _TRIAGE_LOG, "keyed", scope="patient")
+register_store("triage.waiting_queue", _WAITING_QUEUE, "document", lock="triage_waiting_queue")
+register_log("triage.log", _TRIAGE_LOG)
+
+# ── Wait-time model ───────────────────────────────────────────────────────────
+# Estimated wait for ESI level k =
+#   base + per_same_level × (same-level patients ahead) + per_higher × (higher-priority patients ahead)
+# The defaults are the original fixed tables. `python -m agentic_hospital.simulation.ed --save`
+# fits a model from simulated ED flow; point AGENTIC_HOSPITAL_ED_WAIT_MODEL at the saved
+# JSON (or call load_wait_model) to use it.
+_DEFAULT_WAIT_MODEL: dict[str, dict] = {
+    "2": {"base": 10, "per_same_level": 5,  "per_higher": 0},
+    "3": {"base": 30, "per_same_level": 15, "per_higher": 0},
+    "4": {"base": 60, "per_same_level": 20, "per_higher": 0},
+    "5": {"base": 120, "per_same_level": 25, "per_higher": 0},
+}
+_WAIT_MODEL: dict = {"levels": dict(_DEFAULT_WAIT_MODEL), "source": "default"}
+
+register_store("triage.wait_model", _WAIT_MODEL, "document", lock="triage_waiting_queue")
 
 # ── ESI level metadata ────────────────────────────────────────────────────────
 _ESI_META: dict[int, dict] = {
@@ -103,69 +135,20 @@ _ESI4_KEYWORDS = frozenset({
 
 
 def _check_vital_danger_zone(vitals: dict) -> tuple[bool, bool, list[str]]:
-    """Checks vital signs against ESI danger zone thresholds.
+    """Checks vital signs against the ESI danger zones in ``TRIAGE_DANGER_RULES``.
 
     Returns:
         tuple: (esi1_triggered, esi2_triggered, list_of_findings)
     """
     esi1, esi2 = False, False
     findings: list[str] = []
-
-    hr   = vitals.get("hr")
-    sbp  = vitals.get("sbp")
-    rr   = vitals.get("rr")
-    spo2 = vitals.get("spo2")
-    gcs  = vitals.get("gcs")
-    temp = vitals.get("temp")
-
-    if hr is not None:
-        if hr < 30 or hr > 180:
-            esi1 = True
-            findings.append(f"HR {hr} bpm — life-threatening (arrhythmia / extreme bradycardia)")
-        elif hr < 50 or hr > 120:
-            esi2 = True
-            findings.append(f"HR {hr} bpm — danger zone")
-
-    if sbp is not None:
-        if sbp < 60:
-            esi1 = True
-            findings.append(f"SBP {sbp} mmHg — profound shock (immediate intervention)")
-        elif sbp < 90 or sbp > 220:
-            esi2 = True
-            findings.append(f"SBP {sbp} mmHg — haemodynamic concern")
-
-    if rr is not None:
-        if rr < 8 or rr > 36:
-            esi1 = True
-            findings.append(f"RR {rr}/min — respiratory failure threshold")
-        elif rr < 10 or rr > 28:
-            esi2 = True
-            findings.append(f"RR {rr}/min — respiratory distress")
-
-    if spo2 is not None:
-        if spo2 < 85:
-            esi1 = True
-            findings.append(f"SpO₂ {spo2}% — critical hypoxia (immediate oxygenation)")
-        elif spo2 < 92:
-            esi2 = True
-            findings.append(f"SpO₂ {spo2}% — danger zone hypoxia")
-
-    if gcs is not None:
-        if gcs <= 8:
-            esi1 = True
-            findings.append(f"GCS {gcs}/15 — severe impairment (intubation threshold)")
-        elif gcs < 14:
-            esi2 = True
-            findings.append(f"GCS {gcs}/15 — altered consciousness")
-
-    if temp is not None:
-        if temp >= 41.5 or temp < 34.0:
-            esi1 = True
-            findings.append(f"Temperature {temp}°C — extreme thermoregulatory failure")
-        elif temp >= 38.5 or temp < 35.5:
-            esi2 = True
-            findings.append(f"Temperature {temp}°C — fever / hypothermia concern")
-
+    for _, payload in TRIAGE_DANGER_RULES.match(vitals):
+        if payload is None:
+            continue
+        esi_level, finding = payload
+        esi1 = esi1 or esi_level == 1
+        esi2 = esi2 or esi_level == 2
+        findings.append(finding.format(**vitals))
     return esi1, esi2, findings
 
 
@@ -198,6 +181,63 @@ def _predict_resources(symptoms_lower: str, pain_score: int) -> int:
     return 0
 
 
+def _estimate_wait(esi_level: int, same_level_ahead: int, higher_ahead: int) -> int:
+    """Estimated minutes until a clinician sees the patient, from the current wait model."""
+    coef = _WAIT_MODEL["levels"].get(str(esi_level))
+    if coef is None:
+        return 0
+    minutes = coef["base"] + coef["per_same_level"] * same_level_ahead + coef["per_higher"] * higher_ahead
+    return max(int(round(minutes)), 0)
+
+
+@state_transaction
+def load_wait_model(model: dict, source: str = "fitted") -> dict:
+    """Installs a fitted wait-time model for the ED queue.
+
+    Args:
+        model: ``{"levels": {"2": {"base", "per_same_level", "per_higher"}, ...}}``
+               as produced by ``simulation.ed.fit_wait_model``. Levels that are
+               missing keep their current coefficients.
+        source: Free-text provenance shown by get_triage_queue.
+
+    Returns:
+        dict: The model now in use, or an error if it is malformed.
+    """
+    if not isinstance(model, dict):
+        return {"status": "error",
+                "message": f"Malformed wait model: expected a JSON object, got {type(model).__name__}"}
+    levels = model.get("levels", model)
+    try:
+        parsed = {
+            str(level): {k: float(coef[k]) for k in ("base", "per_same_level", "per_higher")}
+            for level, coef in levels.items() if str(level) in _DEFAULT_WAIT_MODEL
+        }
+    except (KeyError, TypeError, ValueError, AttributeError) as exc:
+        return {"status": "error", "message": f"Malformed wait model: {exc}"}
+    with _QUEUE_LOCK:
+        _WAIT_MODEL["levels"] = {**_WAIT_MODEL["levels"], **parsed}
+        _WAIT_MODEL["source"] = model.get("source", source)
+    return {"status": "loaded", "source": _WAIT_MODEL["source"], "levels": _WAIT_MODEL["levels"]}
+
+
+def _load_wait_model_from_env() -> None:
+    """Installs the model named by AGENTIC_HOSPITAL_ED_WAIT_MODEL; a bad file keeps the built-in model."""
+    path = os.environ.get("AGENTIC_HOSPITAL_ED_WAIT_MODEL")
+    if not path:
+        return
+    try:
+        with open(path, encoding="utf-8") as fh:
+            result = load_wait_model(json.load(fh), source=path)
+    except (OSError, ValueError) as exc:
+        result = {"status": "error", "message": str(exc)}
+    if result["status"] != "loaded":
+        _logger.warning("AGENTIC_HOSPITAL_ED_WAIT_MODEL=%s: %s; using the %s wait model",
+                        path, result["message"], _WAIT_MODEL["source"])
+
+
+_load_wait_model_from_env()
+
+
 def calculate_esi_score(
     symptoms: str,
     vitals: dict,
@@ -255,7 +295,7 @@ def calculate_esi_score(
                 "Establish 2× large-bore IV access; draw bloods simultaneously",
                 "Notify attending physician STAT — stay at bedside",
             ],
-            "calculated_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
+            "calculated_at": clock.now().strftime("%Y-%m-%d %H:%M"),
         }
 
     # ── STEP 2: High-risk / danger zone / severe pain? ────────────────────────
@@ -295,7 +335,7 @@ def calculate_esi_score(
                 "12-lead ECG if chest pain / palpitations / syncope",
                 "Repeat vital signs every 5–10 minutes until physician assessment",
             ],
-            "calculated_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
+            "calculated_at": clock.now().strftime("%Y-%m-%d %H:%M"),
         }
 
     # ── STEP 3: Resource prediction → ESI 3 / 4 / 5 ─────────────────────────
@@ -340,10 +380,11 @@ def calculate_esi_score(
         "resources_expected": resources,
         "rationale": rationale,
         "immediate_actions": actions_map[esi_level],
-        "calculated_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "calculated_at": clock.now().strftime("%Y-%m-%d %H:%M"),
     }
 
 
+@state_transaction
 def record_nurse_triage(
     patient_id: str,
     chief_complaint: str,
@@ -375,9 +416,9 @@ def record_nurse_triage(
     Returns:
         dict: Triage record ID, full structured triage note, and formatted triage ticket.
     """
-    _TRIAGE_SEQ["n"] += 1
-    now = datetime.now()
-    record_id = f"TR-{now.strftime('%Y%m%d')}-{_TRIAGE_SEQ['n']:04d}"
+    seq = _TRIAGE_SEQ.next()
+    now = clock.now()
+    record_id = f"TR-{now.strftime('%Y%m%d')}-{seq:04d}"
     timestamp  = now.strftime("%Y-%m-%d %H:%M")
 
     bp_str = (
@@ -427,7 +468,7 @@ def record_nurse_triage(
         ),
     }
 
-    _TRIAGE_LOG.setdefault(patient_id, []).append(record)
+    log_event("triage.log", record, key=patient_id)
 
     # Formatted triage ticket for display
     w = 46
@@ -467,6 +508,7 @@ def record_nurse_triage(
     }
 
 
+@state_transaction
 def assign_waiting_priority(patient_id: str, esi_level: int) -> dict:
     """Places the patient in the ED waiting queue based on ESI level.
 
@@ -482,7 +524,7 @@ def assign_waiting_priority(patient_id: str, esi_level: int) -> dict:
         dict: Queue position, estimated wait time (minutes), area assigned,
               and patient instruction message.
     """
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    timestamp = clock.now().strftime("%Y-%m-%d %H:%M:%S")
 
     # ESI 1 — bypass queue entirely
     if esi_level == 1:
@@ -511,23 +553,22 @@ def assign_waiting_priority(patient_id: str, esi_level: int) -> dict:
     }
 
     # Insert maintaining ESI order (lower ESI = higher priority), then FIFO within level
-    insert_index = len(_WAITING_QUEUE)
-    for i, existing in enumerate(_WAITING_QUEUE):
-        if esi_level < existing["esi_level"]:
-            insert_index = i
-            break
-    _WAITING_QUEUE.insert(insert_index, entry)
-
-    overall_position = insert_index + 1
-    same_level_ahead = sum(
-        1 for e in _WAITING_QUEUE[:insert_index]
-        if e["esi_level"] == esi_level
-    )
-
-    # Estimated wait = base time for ESI level + per-patient delay for same-level queue
-    base_wait   = {2: 10, 3: 30, 4: 60, 5: 120}
-    per_patient = {2:  5, 3: 15, 4: 20, 5:  25}
-    estimated_wait = base_wait[esi_level] + same_level_ahead * per_patient[esi_level]
+    with _QUEUE_LOCK:
+        insert_index = len(_WAITING_QUEUE)
+        for i, existing in enumerate(_WAITING_QUEUE):
+            if esi_level < existing["esi_level"]:
+                insert_index = i
+                break
+        _WAITING_QUEUE.insert(insert_index, entry)
+
+        overall_position = insert_index + 1
+        same_level_ahead = sum(
+            1 for e in _WAITING_QUEUE[:insert_index]
+            if e["esi_level"] == esi_level
+        )
+        higher_ahead = insert_index - same_level_ahead
+        estimated_wait = _estimate_wait(esi_level, same_level_ahead, higher_ahead)
+        entry["estimated_wait_minutes"] = estimated_wait
 
     return {
         "status":                  "queued",
@@ -536,7 +577,9 @@ def assign_waiting_priority(patient_id: str, esi_level: int) -> dict:
         "esi_label":               _ESI_META[esi_level]["label"],
         "queue_position":          overall_position,
         "patients_ahead_same_level": same_level_ahead,
+        "patients_ahead_higher_priority": higher_ahead,
         "estimated_wait_minutes":  estimated_wait,
+        "wait_model":              _WAIT_MODEL["source"],
         "area_assigned":           _ESI_META[esi_level]["area"],
         "physician_notified":      esi_level <= 2,
         "timestamp":               timestamp,
@@ -549,13 +592,17 @@ def assign_waiting_priority(patient_id: str, esi_level: int) -> dict:
     }
 
 
+@state_transaction(readonly=True)
 def get_triage_queue() -> dict:
     """Returns the current ED waiting queue ordered by priority.
 
     Returns:
         dict: Full waiting queue with ESI breakdown, wait times, and queue summary.
     """
-    if not _WAITING_QUEUE:
+    with _QUEUE_LOCK:
+        queue = list(_WAITING_QUEUE)
+
+    if not queue:
         return {
             "status":         "empty",
             "total_waiting":  0,
@@ -565,19 +612,16 @@ def get_triage_queue() -> dict:
         }
 
     by_level = {str(i): 0 for i in range(1, 6)}
-    for entry in _WAITING_QUEUE:
+    for entry in queue:
         by_level[str(entry["esi_level"])] += 1
 
     queue_display = []
-    for pos, entry in enumerate(_WAITING_QUEUE, start=1):
+    seen_at_level = {lvl: 0 for lvl in range(1, 6)}
+    for pos, entry in enumerate(queue, start=1):
         lvl = entry["esi_level"]
-        base_wait   = {2: 10, 3: 30, 4: 60, 5: 120}
-        per_patient = {2:  5, 3: 15, 4: 20, 5:  25}
-        ahead_same  = sum(
-            1 for e in _WAITING_QUEUE[:pos - 1]
-            if e["esi_level"] == lvl
-        )
-        wait = base_wait.get(lvl, 0) + ahead_same * per_patient.get(lvl, 0)
+        ahead_same = seen_at_level[lvl]
+        seen_at_level[lvl] += 1
+        wait = _estimate_wait(lvl, ahead_same, pos - 1 - ahead_same)
         queue_display.append({
             "position":     pos,
             "patient_id":   entry["patient_id"],
@@ -591,7 +635,7 @@ def get_triage_queue() -> dict:
 
     return {
         "status":        "active",
-        "total_waiting": len(_WAITING_QUEUE),
+        "total_waiting": len(queue),
         "by_esi_level": {
             "ESI-2 Emergent":    by_level["2"],
             "ESI-3 Urgent":      by_level["3"],
@@ -599,4 +643,51 @@ def get_triage_queue() -> dict:
             "ESI-5 Non-Urgent":  by_level["5"],
         },
         "queue": queue_display,
+        "wait_model": _WAIT_MODEL["source"],
+    }
+
+
+@state_transaction
+def call_next_patient(area: str = "") -> dict:
+    """Takes the highest-priority waiting patient off the queue when a clinician is free.
+
+    Args:
+        area: Optional treatment area the clinician covers (e.g. "Majors",
+              "Fast Track"); only patients assigned to a matching area are called.
+
+    Returns:
+        dict: The patient called, their ESI level, and how long they actually waited
+              against the estimate they were given.
+    """
+    area_lower = area.strip().lower()
+    with _QUEUE_LOCK:
+        for index, entry in enumerate(_WAITING_QUEUE):
+            if not area_lower or area_lower in entry["area_assigned"].lower():
+                _WAITING_QUEUE.pop(index)
+                break
+        else:
+            return {
+                "status": "empty",
+                "message": f"No patients waiting{' for ' + area if area else ''}.",
+                "total_waiting": len(_WAITING_QUEUE),
+            }
+        remaining = len(_WAITING_QUEUE)
+
+    now = clock.now()
+    waited = None
+    try:
+        waited = round((now - datetime.strptime(entry["arrived_at"], "%Y-%m-%d %H:%M:%S")).total_seconds() / 60.0, 1)
+    except (KeyError, ValueError):
+        pass
+    return {
+        "status":                 "called",
+        "patient_id":             entry["patient_id"],
+        "esi_level":              entry["esi_level"],
+        "esi_label":              _ESI_META[entry["esi_level"]]["label"],
+        "area":                   entry["area_assigned"],
+        "arrived_at":             entry["arrived_at"],
+        "called_at":              now.strftime("%Y-%m-%d %H:%M:%S"),
+        "waited_minutes":         waited,
+        "estimated_wait_minutes": entry.get("estimated_wait_minutes"),
+        "remaining_in_queue":     remaining,
     }
@@ -0,0 +1,376 @@
+"""Compact per-patient vitals time series with automatic downsampling.
+
+Every observation, whether charted through ``record_vitals`` or streamed from
+a bedside monitor, is appended to its patient's ``VitalsSeries``. A series
+holds typed ``array`` buffers with epoch-second timestamps, not dicts of
+strings, in four tiers:
+
+===========  ===========  ========================
+tier         bucket       retained (at 1 Hz)
+===========  ===========  ========================
+``raw``      each sample  last 300 samples (5 min)
+``1min``     60 s         last 200 buckets (3 h 20 min)
+``15min``    15 min       last 200 buckets (50 h)
+``hour``     1 h          last 720 buckets (30 days)
+===========  ===========  ========================
+
+The 1-minute and 15-minute tiers hold exactly what ``pick_resolution`` can
+serve from them (200 windows); longer spans go to the next tier anyway.
+Rollup buckets keep min, max, sum and count for each parameter. A count
+stops at 65535, and from then on the bucket's sum stops too, so its mean
+covers the first 65535 samples; that only happens to hourly buckets above
+about 18 Hz. A tier's buffers grow only as buckets open, so a patient
+charted every 4 hours costs about 2 KB a day.
+
+At 1 Hz, once raw samples and the 1-minute and 15-minute tiers are full
+(after 50 hours), a patient holds a fixed working set of 46 to 58 KB: each
+tier runs up to 25% over capacity before it is trimmed. Each day of hourly
+history adds about 2 KB on top, so a patient costs 115 to 140 KB at 30 days.
+Range reads go through NumPy and copy only the requested slice.
+
+The series live in process memory, like the in-memory audit window: with a
+shared state backend each worker keeps the series for the samples it
+ingested. A patient's series is dropped on discharge from a bed
+(``discard_series``), and any series that has had no sample for
+``IDLE_EVICT_SECONDS`` is dropped by the next ``record_sample`` sweep, which
+also clears series a worker never saw discharged. Measure ingest rate and
+memory with::
+
+    python -m agentic_hospital.tools.vitals_series --days 3
+"""
+
+import argparse
+import json
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Optional
+
+PARAMETERS = ("systolic_bp", "diastolic_bp", "heart_rate", "spo2", "respiratory_rate", "temperature_f")
+_P = len(PARAMETERS)
+_NAN = float("nan")
+
+# name → (bucket width in seconds, buckets retained); raw keeps samples, not buckets
+TIERS: dict[str, tuple[int, int]] = {
+    "raw": (0, 300),
+    "1min": (60, 200),
+    "15min": (900, 200),
+    "hour": (3600, 720),
+}
+# Buffers are trimmed back to capacity once they exceed it by this fraction
+_TRIM_SLACK = 0.25
+# Saturation value of a bucket's per-parameter count (array type 'H')
+_COUNT_MAX = 65535
+# A series with no sample for this long (monotonic seconds) is evicted
+IDLE_EVICT_SECONDS = 6 * 3600
+# How often record_sample sweeps for idle series
+_SWEEP_INTERVAL = 300
+
+
+def _numpy():
+    import numpy as np  # imported lazily: only range reads need it
+    return np
+
+
+class _Raw:
+    """Individual samples, oldest first."""
+
+    __slots__ = ("capacity", "ts", "values")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ts = array("q")
+        self.values = array("f")
+
+    def add(self, ts: int, row: list) -> None:
+        if not self.ts or ts >= self.ts[-1]:
+            self.ts.append(ts)
+            self.values.extend(row)
+        else:
+            at = bisect_left(self.ts, ts)
+            if at == 0 and len(self.ts) >= self.capacity:
+                return  # older than anything retained
+            self.ts.insert(at, ts)
+            self.values[at * _P:at * _P] = array("f", row)
+        if len(self.ts) > self.capacity * (1 + _TRIM_SLACK):
+            drop = len(self.ts) - self.capacity
+            del self.ts[:drop]
+            del self.values[:drop * _P]
+
+    def nbytes(self) -> int:
+        return self.ts.itemsize * len(self.ts) + self.values.itemsize * len(self.values)
+
+
+class _Rollup:
+    """Fixed-width buckets, oldest first, with per-parameter min/max/sum/count."""
+
+    __slots__ = ("width", "capacity", "start", "min", "max", "sum", "count")
+
+    def __init__(self, width: int, capacity: int):
+        self.width = width
+        self.capacity = capacity
+        self.start = array("q")
+        self.min = array("f")
+        self.max = array("f")
+        self.sum = array("f")
+        self.count = array("H")
+
+    def _open(self, at: int, bucket: int) -> None:
+        self.start.insert(at, bucket)
+        lo = at * _P
+        for buf, fill in ((self.min, _NAN), (self.max, _NAN), (self.sum, 0.0)):
+            buf[lo:lo] = array("f", (fill,) * _P)
+        self.count[lo:lo] = array("H", (0,) * _P)
+
+    def add(self, ts: int, present: list) -> None:
+        """Folds a sample, given as (parameter index, value) pairs, into its bucket."""
+        bucket = ts - ts % self.width
+        start = self.start
+        if start and start[-1] == bucket:
+            at = len(start) - 1
+        elif not start or bucket > start[-1]:
+            at = len(start)
+            start.append(bucket)
+            self.min.extend((_NAN,) * _P)
+            self.max.extend((_NAN,) * _P)
+            self.sum.extend((0.0,) * _P)
+            self.count.extend((0,) * _P)
+        else:
+            at = bisect_left(start, bucket)
+            if at == len(start) or start[at] != bucket:
+                if at == 0 and len(start) >= self.capacity:
+                    return  # older than anything retained
+                self._open(at, bucket)
+
+        mn, mx, sm, cnt = self.min, self.max, self.sum, self.count
+        base = at * _P
+        for i, value in present:
+            j = base + i
+            n = cnt[j]
+            if n == 0:
+                mn[j] = mx[j] = value
+            elif value < mn[j]:
+                mn[j] = value
+            elif value > mx[j]:
+                mx[j] = value
+            if n < _COUNT_MAX:
+                # Sum and count stop together, so sum / count stays a true mean
+                sm[j] += value
+                cnt[j] = n + 1
+
+        if len(start) > self.capacity * (1 + _TRIM_SLACK):
+            drop = len(start) - self.capacity
+            del start[:drop]
+            for buf in (mn, mx, sm, cnt):
+                del buf[:drop * _P]
+
+    def nbytes(self) -> int:
+        return sum(buf.itemsize * len(buf) for buf in (self.start, self.min, self.max, self.sum, self.count))
+
+
+class VitalsSeries:
+    """One patient's vitals history across the raw and rollup tiers."""
+
+    __slots__ = ("raw", "rollups", "samples", "touched")
+
+    def __init__(self):
+        self.raw = _Raw(TIERS["raw"][1])
+        self.rollups = {name: _Rollup(width, capacity) for name, (width, capacity) in TIERS.items() if width}
+        self.samples = 0
+        self.touched = time.monotonic()
+
+    def add(self, ts: int, values: dict) -> None:
+        """Appends one sample; ``values`` maps ``PARAMETERS`` names to readings."""
+        row = [_NAN] * _P
+        present = []
+        for i, name in enumerate(PARAMETERS):
+            value = values.get(name)
+            if value is not None:
+                row[i] = value = float(value)
+                present.append((i, value))
+        self.raw.add(ts, row)
+        for rollup in self.rollups.values():
+            rollup.add(ts, present)
+        self.samples += 1
+
+    def nbytes(self) -> int:
+        return self.raw.nbytes() + sum(r.nbytes() for r in self.rollups.values())
+
+    def coverage(self, resolution: str) -> Optional[tuple[int, int]]:
+        """(first, last) timestamp a tier holds, or None if it is empty."""
+        if resolution == "raw":
+            return (self.raw.ts[0], self.raw.ts[-1]) if self.raw.ts else None
+        start = self.rollups[resolution].start
+        return (start[0], start[-1]) if start else None
+
+    def pick_resolution(self, start: int, end: int, max_windows: int = 200) -> str:
+        """Finest rollup with at most ``max_windows`` buckets over the span that still covers ``start``."""
+        names = [name for name in TIERS if TIERS[name][0]]
+        for name in names:
+            rollup = self.rollups[name]
+            # A tier still below capacity has never been trimmed, so it holds all history
+            complete = len(rollup.start) < rollup.capacity or rollup.start[0] <= start
+            if (end - start) / rollup.width <= max_windows and complete:
+                return name
+        # Nothing reaches back far enough: use the longest-retained tier
+        return names[-1]
+
+    def range(self, start: int, end: int, resolution: str = "auto") -> dict:
+        """Windows in ``[start, end)`` at a resolution.
+
+        Args:
+            start: Epoch seconds, inclusive.
+            end: Epoch seconds, exclusive.
+            resolution: 'raw', '1min', '15min', 'hour' or 'auto'.
+
+        Returns:
+            dict: ``resolution``, ``start`` (int64 array of window starts) and
+                  ``min``/``max``/``mean``/``count`` arrays shaped (windows,
+                  len(PARAMETERS)), NaN where a parameter was not measured.
+        """
+        np = _numpy()
+        if resolution == "auto":
+            resolution = self.pick_resolution(start, end)
+        if resolution == "raw":
+            ts = np.frombuffer(self.raw.ts, dtype=np.int64) if self.raw.ts else np.empty(0, np.int64)
+            lo, hi = np.searchsorted(ts, [start, end])
+            values = (np.frombuffer(self.raw.values, dtype=np.float32).reshape(-1, _P)[lo:hi].copy()
+                      if self.raw.values else np.empty((0, _P), np.float32))
+            return {"resolution": "raw", "start": ts[lo:hi].copy(), "min": values, "max": values,
+                    "mean": values, "count": (~np.isnan(values)).astype(np.uint16)}
+
+        rollup = self.rollups[resolution]
+        if not rollup.start:
+            empty = np.empty((0, _P), np.float32)
+            return {"resolution": resolution, "start": np.empty(0, np.int64), "min": empty, "max": empty,
+                    "mean": empty, "count": empty.astype(np.uint16)}
+        starts = np.frombuffer(rollup.start, dtype=np.int64)
+        lo, hi = np.searchsorted(starts, [start - start % rollup.width, end])
+
+        # Copies: a live view would stop the buffer from growing on the next add
+        def rows(buf, dtype):
+            return np.frombuffer(buf, dtype=dtype).reshape(-1, _P)[lo:hi].copy()
+
+        count = rows(rollup.count, np.uint16)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = rows(rollup.sum, np.float32) / count
+        return {"resolution": resolution, "start": starts[lo:hi].copy(), "min": rows(rollup.min, np.float32),
+                "max": rows(rollup.max, np.float32), "mean": mean.astype(np.float32), "count": count}
+
+
+# =============================================================================
+# PROCESS-WIDE STORE
+# =============================================================================
+_VITALS_SERIES: dict[str, VitalsSeries] = {}
+_SERIES_LOCK = threading.Lock()
+_last_sweep = time.monotonic()
+
+
+def _sweep_idle(now: float) -> None:
+    """Drops series idle for ``IDLE_EVICT_SECONDS``. Caller holds ``_SERIES_LOCK``."""
+    global _last_sweep
+    _last_sweep = now
+    idle = [pid for pid, s in _VITALS_SERIES.items() if now - s.touched > IDLE_EVICT_SECONDS]
+    for pid in idle:
+        del _VITALS_SERIES[pid]
+
+
+def record_sample(patient_id: str, ts: int, values: dict) -> None:
+    """Appends one vitals sample (epoch seconds) to a patient's series."""
+    now = time.monotonic()
+    with _SERIES_LOCK:
+        if now - _last_sweep > _SWEEP_INTERVAL:
+            _sweep_idle(now)
+        series = _VITALS_SERIES.get(patient_id)
+        if series is None:
+            series = _VITALS_SERIES[patient_id] = VitalsSeries()
+        series.add(int(ts), values)
+        series.touched = now
+
+
+def discard_series(patient_id: str) -> bool:
+    """Drops a patient's series, e.g. on discharge. Returns whether one was held."""
+    with _SERIES_LOCK:
+        return _VITALS_SERIES.pop(patient_id, None) is not None
+
+
+def read_range(patient_id: str, start: int, end: int, resolution: str = "auto") -> Optional[dict]:
+    """``VitalsSeries.range`` for a patient, or None if nothing was recorded for them."""
+    with _SERIES_LOCK:
+        series = _VITALS_SERIES.get(patient_id)
+        return None if series is None else series.range(int(start), int(end), resolution)
+
+
+def store_stats() -> dict:
+    """Patients, samples and bytes held by the process-wide store."""
+    with _SERIES_LOCK:
+        series = list(_VITALS_SERIES.values())
+    return {
+        "patients": len(series),
+        "samples": sum(s.samples for s in series),
+        "bytes": sum(s.nbytes() for s in series),
+    }
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+def _bench(days: float, patients: int = 1, hz: float = 1.0, seed: int = 7) -> dict:
+    """Feeds ``days`` of monitor samples at ``hz`` and reports ingest rate and memory."""
+    import random
+    rng = random.Random(seed)
+    start = 1_771_574_400  # 2026-02-20 08:00 UTC
+    step = 1.0 / hz
+    series = [VitalsSeries() for _ in range(patients)]
+    samples = int(days * 86400 * hz)
+    started = time.perf_counter()
+    for k in range(samples):
+        ts = int(start + k * step)
+        phase = math.sin(k * step / 3600.0)
+        values = {
+            "systolic_bp": 120 + 10 * phase + rng.gauss(0, 3), "diastolic_bp": 75 + rng.gauss(0, 2),
+            "heart_rate": 80 + 8 * phase + rng.gauss(0, 2), "spo2": 96 + rng.gauss(0, 0.7),
+            "respiratory_rate": 16 + rng.gauss(0, 1), "temperature_f": 98.6 + rng.gauss(0, 0.05),
+        }
+        for s in series:
+            s.add(ts, values)
+    elapsed = time.perf_counter() - started
+
+    per_patient = series[0].nbytes()
+    fixed = per_patient - series[0].rollups["hour"].nbytes()
+    row = {"raw": 8 + 4 * _P, "1min": 8 + 14 * _P, "15min": 8 + 14 * _P}
+    fixed_peak = sum(int(TIERS[name][1] * (1 + _TRIM_SLACK)) * size for name, size in row.items())
+    hour_row = series[0].rollups["hour"].nbytes() / max(len(series[0].rollups["hour"].start), 1)
+    end = int(start + samples * step)
+    series[0].range(end - 60, end)  # warm up: the first read imports NumPy
+    queried = time.perf_counter()
+    window = series[0].range(end - 86400, end)
+    query_ms = (time.perf_counter() - queried) * 1000
+    return {
+        "days": days,
+        "hz": hz,
+        "samples_per_patient": samples,
+        "ingest_samples_per_second": round(samples * patients / elapsed),
+        "bytes_per_patient": per_patient,
+        "fixed_working_set_bytes": fixed,
+        "fixed_working_set_peak_bytes": fixed_peak,
+        "bytes_per_additional_patient_day": round(24 * hour_row),
+        "raw_bytes_per_patient_day_as_float32": int(86400 * hz * (8 + 4 * _P)),
+        "last_24h_query": {"resolution": window["resolution"], "windows": len(window["start"]),
+                           "milliseconds": round(query_ms, 3)},
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure the vitals series store's ingest rate and memory.")
+    parser.add_argument("--days", type=float, default=3.0)
+    parser.add_argument("--patients", type=int, default=1)
+    parser.add_argument("--hz", type=float, default=1.0)
+    args = parser.parse_args(argv)
+    print(json.dumps(_bench(args.days, args.patients, args.hz), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""Streaming bedside vitals ingestion with incremental deterioration detection.
+
+Bedside monitors emit a continuous stream of samples; ``VitalsStreamMonitor``
+consumes them one at a time and raises deterioration alerts as they happen,
+instead of waiting for an agent to call ``generate_deterioration_alert``.
+
+Each sample is a dict (one NDJSON line on the wire)::
+
+    {"bed": "ICU-01", "ts": "2026-02-20T10:15:00", "spo2": 91, "heart_rate": 118}
+
+``ts`` is an ISO timestamp or epoch seconds; ``patient_id`` is optional and
+otherwise resolved from the bed. Any of the ``_CRITICAL_VITAL_THRESHOLDS``
+parameters may be present. Two kinds of rule run per (bed, parameter):
+
+* **Thresholds** from ``_CRITICAL_VITAL_THRESHOLDS``. They fire on entry
+  into a worse band, not on every abnormal sample. A parameter re-arms after
+  it has stayed normal for ``rearm_minutes``.
+* **Trends** from ``_TREND_RULES``, e.g. SpO2 falling 4 points within 30
+  minutes. Each keeps a monotonic deque of the window's extreme, so a sample
+  costs O(1) amortised however long the window.
+
+Alerts use the ``generate_deterioration_alert`` record format and go to the
+``monitoring.alerts`` log. Every sample is also appended to the patient's
+series in ``vitals_series``, which ``get_vitals_trend`` reads. Replay a recorded stream, or a socket through
+stdin, with::
+
+    python -m agentic_hospital.tools.vitals_stream replay samples.ndjson
+    nc -l 9000 | python -m agentic_hospital.tools.vitals_stream replay -
+    python -m agentic_hospital.tools.vitals_stream bench --beds 300 --minutes 240
+"""
+
+import argparse
+import datetime
+import json
+import random
+import sys
+import time
+from collections import deque
+from typing import IO, Iterable, Iterator, Optional, Union
+
+from ..infra.backend import state_transaction
+from ..infra.event_log import log_event
+from .bed_management_tools import _BED_DB
+from .monitoring_tools import _alert_record
+from .rules import VITAL_BAND_RULES, _CRITICAL_VITAL_THRESHOLDS, band_table
+from .vitals_series import record_sample
+
+# (parameter, direction, minimum change, window in minutes, severity, action)
+_TREND_RULES: tuple[tuple, ...] = (
+    ("spo2", "fall", 4, 30, "WARNING",
+     "Falling SpO2 — check probe and airway, increase O2, ABG; escalate if still falling"),
+    ("heart_rate", "rise", 30, 30, "WARNING",
+     "Rising heart rate — assess for sepsis, bleeding, pain, arrhythmia; 12-lead ECG"),
+    ("systolic_bp", "fall", 30, 60, "WARNING",
+     "Falling blood pressure — assess perfusion and volume status; fluid challenge if indicated"),
+    ("respiratory_rate", "rise", 8, 60, "WARNING",
+     "Rising respiratory rate — early marker of deterioration; full set of obs and senior review"),
+    ("temperature_f", "rise", 2.5, 120, "WARNING",
+     "Rising temperature — blood cultures x2; sepsis screen"),
+)
+
+_REARM_MINUTES = 15
+# A trend must hold for every sample in this span, so one noisy reading
+# at either end of the window cannot fire it
+_TREND_CONFIRM_SECONDS = 180
+_BAND_RANK = {"WARNING": 1, "CRITICAL": 2}
+
+
+def _band_reference(thresholds: dict) -> str:
+    unit = thresholds.get("unit", "")
+    parts = [f"{label}: {'<' if key.endswith('low') else '>'}{thresholds[key]} {unit}"
+             for key, label in (("critical_low", "Critical low"), ("warning_low", "Warning low"),
+                                ("warning_high", "Warning high"), ("critical_high", "Critical high"))
+             if key in thresholds]
+    return " | ".join(parts)
+
+
+def _epoch(ts: Union[int, float, str]) -> float:
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    return datetime.datetime.fromisoformat(ts).timestamp()
+
+
+def _slide(extremes: deque, ts: float, value: float, span: float, falling: bool) -> None:
+    """Adds a sample to a monotonic deque so ``extremes[0]`` is the max (fall) or min (rise) of the span."""
+    while extremes and extremes[0][0] < ts - span:
+        extremes.popleft()
+    while extremes and (extremes[-1][1] <= value if falling else extremes[-1][1] >= value):
+        extremes.pop()
+    extremes.append((ts, value))
+
+
+class _Trend:
+    """Sliding-window extreme for one trend rule on one (bed, parameter)."""
+
+    __slots__ = ("rule", "window", "extremes", "recent", "quiet_until")
+
+    def __init__(self, rule: tuple):
+        self.rule = rule
+        self.window = rule[3] * 60.0
+        self.extremes: deque = deque()  # (ts, value) over the rule's window, monotonic in its direction
+        self.recent: deque = deque()    # the same over _TREND_CONFIRM_SECONDS
+        self.quiet_until = 0.0
+
+    def push(self, ts: float, value: float) -> Optional[float]:
+        """Adds a sample; returns the window's reference value if the rule fires."""
+        falling = self.rule[1] == "fall"
+        extremes = self.extremes
+        _slide(extremes, ts, value, self.window, falling)
+        # The recent max (fall) or min (rise) is the sample closest to the reference,
+        # so the change has held for every sample in the confirmation span
+        _slide(self.recent, ts, value, _TREND_CONFIRM_SECONDS, falling)
+
+        reference = extremes[0][1]
+        if falling:
+            change = reference - self.recent[0][1]
+        else:
+            change = self.recent[0][1] - reference
+        if change >= self.rule[2] and ts >= self.quiet_until:
+            # One alert per window; measure the next trend from here
+            self.quiet_until = ts + self.window
+            extremes.clear()
+            extremes.append((ts, value))
+            return reference
+        return None
+
+
+class _ParameterState:
+    __slots__ = ("last_ts", "band", "normal_since", "trends")
+
+    def __init__(self, trends: list):
+        self.last_ts = float("-inf")
+        self.band: Optional[tuple[int, bool]] = None  # (band rank, high side) last alerted
+        self.normal_since: Optional[float] = None
+        self.trends = trends
+
+
+class VitalsStreamMonitor:
+    """Incremental deterioration detector over a stream of bedside samples.
+
+    Args:
+        thresholds: Per-parameter bands; defaults to ``_CRITICAL_VITAL_THRESHOLDS``.
+        trend_rules: Sliding-window trend rules; defaults to ``_TREND_RULES``.
+        rearm_minutes: How long a parameter must stay normal before its
+            threshold alert can fire again.
+        log_alerts: Write alerts to the ``monitoring.alerts`` log.
+        record_series: Append each sample to the patient's vitals time series.
+    """
+
+    def __init__(self, thresholds: Optional[dict] = None, trend_rules: Iterable[tuple] = _TREND_RULES,
+                 rearm_minutes: float = _REARM_MINUTES, log_alerts: bool = True,
+                 record_series: bool = True):
+        self.thresholds = _CRITICAL_VITAL_THRESHOLDS if thresholds is None else thresholds
+        self._bands = VITAL_BAND_RULES if thresholds is None else band_table(thresholds)
+        self.trend_rules: dict[str, list] = {}
+        for rule in trend_rules:
+            self.trend_rules.setdefault(rule[0], []).append(rule)
+        self.rearm_seconds = rearm_minutes * 60.0
+        self.log_alerts = log_alerts
+        self.record_series = record_series
+        self._state: dict[tuple[str, str], _ParameterState] = {}
+        self._bed_wards = {bed_id: ward for ward, data in _BED_DB.items() for bed_id in data["beds"]}
+        self.counts = {"samples": 0, "values": 0, "out_of_order": 0, "rejected": 0,
+                       "threshold_alerts": 0, "trend_alerts": 0}
+
+    def _patient_for(self, sample: dict, bed_id: str) -> str:
+        patient_id = sample.get("patient_id")
+        if patient_id:
+            return patient_id
+        ward = self._bed_wards.get(bed_id)
+        bed = _BED_DB[ward]["beds"].get(bed_id) if ward else None
+        return (bed or {}).get("patient_id") or bed_id
+
+    def ingest(self, sample: dict) -> list[dict]:
+        """Evaluates one sample and returns the alerts it raised."""
+        bed_id = sample.get("bed") or sample.get("bed_id")
+        try:
+            ts = _epoch(sample["ts"])
+        except (KeyError, TypeError, ValueError):
+            bed_id = None
+        if not bed_id:
+            self.counts["rejected"] += 1
+            return []
+        self.counts["samples"] += 1
+
+        alerts = []
+        patient_id = None
+        for parameter, thresholds in self.thresholds.items():
+            value = sample.get(parameter)
+            if value is None:
+                continue
+            key = (bed_id, parameter)
+            state = self._state.get(key)
+            if state is None:
+                state = self._state[key] = _ParameterState(
+                    [_Trend(rule) for rule in self.trend_rules.get(parameter, ())])
+            if ts < state.last_ts:
+                self.counts["out_of_order"] += 1
+                continue
+            state.last_ts = ts
+            self.counts["values"] += 1
+
+            band = self._bands.match_one(parameter, value)
+            if band is None:
+                if state.normal_since is None:
+                    state.normal_since = ts
+                if state.band is not None and ts - state.normal_since >= self.rearm_seconds:
+                    state.band = None
+            else:
+                state.normal_since = None
+                severity, direction, action = band
+                # Alert on a worse band or the other side; easing back to a
+                # milder band keeps the worst one until the parameter re-arms
+                side = direction.endswith("HIGH")
+                if state.band is None or side != state.band[1] or _BAND_RANK[severity] > state.band[0]:
+                    state.band = (_BAND_RANK[severity], side)
+                    patient_id = patient_id or self._patient_for(sample, bed_id)
+                    alerts.append(self._alert(patient_id, bed_id, parameter, value, ts, "vital",
+                                              direction, severity, _band_reference(thresholds), action))
+                    self.counts["threshold_alerts"] += 1
+
+            for trend in state.trends:
+                reference = trend.push(ts, value)
+                if reference is None:
+                    continue
+                _, way, change, minutes, severity, action = trend.rule
+                patient_id = patient_id or self._patient_for(sample, bed_id)
+                alerts.append(self._alert(
+                    patient_id, bed_id, parameter, value, ts, "vital_trend",
+                    "FALLING" if way == "fall" else "RISING", severity,
+                    f"{way.title()} of ≥{change} {thresholds.get('unit', '')} within {minutes} min "
+                    f"(from {reference})", action))
+                self.counts["trend_alerts"] += 1
+        if self.record_series:
+            record_sample(patient_id or self._patient_for(sample, bed_id), int(ts), sample)
+        return alerts
+
+    def ingest_many(self, samples: Iterable[dict]) -> list[dict]:
+        """Evaluates samples in order and returns every alert raised."""
+        alerts = []
+        for sample in samples:
+            alerts.extend(self.ingest(sample))
+        return alerts
+
+    @state_transaction
+    def _alert(self, patient_id, bed_id, parameter, value, ts, threshold_type,
+               direction, severity, reference, action) -> dict:
+        ward = self._bed_wards.get(bed_id, "unknown ward")
+        alert = _alert_record(
+            patient_id, parameter, value, self.thresholds[parameter].get("unit", ""),
+            threshold_type=threshold_type,
+            direction=direction,
+            severity=severity,
+            threshold_reference=reference,
+            action=action,
+            clinical_context=f"Bedside monitor {bed_id} ({ward})",
+            when=datetime.datetime.fromtimestamp(ts),
+        )
+        if self.log_alerts:
+            log_event("monitoring.alerts", alert, key=patient_id)
+        return alert
+
+
+# =============================================================================
+# REPLAY AND BENCHMARK
+# =============================================================================
+def read_samples(source: Union[str, IO[str]]) -> Iterator[dict]:
+    """Yields samples from an NDJSON file path, '-' for stdin, or an open text stream."""
+    if isinstance(source, str):
+        if source == "-":
+            yield from read_samples(sys.stdin)
+            return
+        with open(source, encoding="utf-8") as handle:
+            yield from read_samples(handle)
+            return
+    for line in source:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def replay(source: Union[str, IO[str]], monitor: Optional[VitalsStreamMonitor] = None,
+           speed: float = 0.0) -> dict:
+    """Feeds a recorded stream through a monitor.
+
+    Args:
+        source: NDJSON path, '-' for stdin, or a text stream.
+        monitor: Monitor to feed; a new logging one by default.
+        speed: 0 replays as fast as possible; otherwise simulated seconds per
+            wall-clock second (1 = real time).
+
+    Returns:
+        dict: Sample and alert counts, throughput, and the alerts raised.
+    """
+    monitor = monitor or VitalsStreamMonitor()
+    alerts, first_ts, started = [], None, time.perf_counter()
+    for sample in read_samples(source):
+        if speed > 0 and "ts" in sample:
+            ts = _epoch(sample["ts"])
+            first_ts = ts if first_ts is None else first_ts
+            delay = (ts - first_ts) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        alerts.extend(monitor.ingest(sample))
+    elapsed = time.perf_counter() - started
+    return {
+        **monitor.counts,
+        "seconds": round(elapsed, 3),
+        "samples_per_second": round(monitor.counts["samples"] / elapsed) if elapsed else None,
+        "alerts": alerts,
+    }
+
+
+def synthetic_stream(beds: int = 300, minutes: int = 240, interval_seconds: int = 60,
+                     deteriorating: float = 0.05, seed: int = 7,
+                     start: Optional[datetime.datetime] = None) -> list[dict]:
+    """A bedside stream for ``beds`` monitors, with a share of patients deteriorating."""
+    rng = random.Random(seed)
+    bed_ids = [bed_id for data in _BED_DB.values() for bed_id in data["beds"]]
+    bed_ids = [bed_ids[i % len(bed_ids)] + ("" if i < len(bed_ids) else f"-{i // len(bed_ids)}")
+               for i in range(beds)]
+    start_ts = (start or datetime.datetime(2026, 2, 20, 8, 0)).timestamp()
+    baselines = {bed: {"spo2": rng.uniform(94, 99), "heart_rate": rng.uniform(60, 95),
+                       "systolic_bp": rng.uniform(105, 150), "respiratory_rate": rng.uniform(12, 19),
+                       "temperature_f": rng.uniform(97.5, 99.5),
+                       "drift": rng.random() < deteriorating} for bed in bed_ids}
+    samples = []
+    for step in range(0, minutes * 60, interval_seconds):
+        hours = step / 3600.0
+        for bed in bed_ids:
+            base = baselines[bed]
+            drift = hours if base["drift"] else 0.0
+            samples.append({
+                "bed": bed,
+                "ts": start_ts + step,
+                "spo2": round(base["spo2"] - 2.5 * drift + rng.gauss(0, 0.8)),
+                "heart_rate": round(base["heart_rate"] + 12 * drift + rng.gauss(0, 3)),
+                "systolic_bp": round(base["systolic_bp"] - 8 * drift + rng.gauss(0, 4)),
+                "respiratory_rate": round(base["respiratory_rate"] + 2 * drift + rng.gauss(0, 1)),
+                "temperature_f": round(base["temperature_f"] + 0.4 * drift + rng.gauss(0, 0.1), 1),
+            })
+    return samples
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay or benchmark the bedside vitals stream monitor.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rp = commands.add_parser("replay", help="Replay an NDJSON stream ('-' for stdin).")
+    rp.add_argument("source")
+    rp.add_argument("--speed", type=float, default=0.0, help="Simulated seconds per second (0 = max).")
+    rp.add_argument("--no-log", action="store_true", help="Do not write alerts to the audit log.")
+    gen = commands.add_parser("generate", help="Write a synthetic NDJSON stream.")
+    gen.add_argument("out")
+    for sub in (gen, commands.add_parser("bench", help="Measure throughput on a synthetic stream.")):
+        sub.add_argument("--beds", type=int, default=300)
+        sub.add_argument("--minutes", type=int, default=240)
+        sub.add_argument("--interval", type=int, default=60, help="Seconds between samples per bed.")
+        sub.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    if args.command == "replay":
+        report = replay(args.source, VitalsStreamMonitor(log_alerts=not args.no_log), speed=args.speed)
+        alerts = report.pop("alerts")
+        report["alerts_by_trigger"] = {}
+        for alert in alerts:
+            key = f"{alert['trigger']} {alert['direction']}"
+            report["alerts_by_trigger"][key] = report["alerts_by_trigger"].get(key, 0) + 1
+        print(json.dumps(report, indent=2))
+        return
+
+    samples = synthetic_stream(args.beds, args.minutes, args.interval, seed=args.seed)
+    if args.command == "generate":
+        with open(args.out, "w", encoding="utf-8") as handle:
+            for sample in samples:
+                handle.write(json.dumps(sample) + "\n")
+        print(f"Wrote {len(samples)} samples to {args.out}")
+        return
+
+    monitor = VitalsStreamMonitor(log_alerts=False)
+    started = time.perf_counter()
+    alerts = monitor.ingest_many(samples)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        **monitor.counts,
+        "alerts": len(alerts),
+        "seconds": round(elapsed, 3),
+        "samples_per_second": round(len(samples) / elapsed),
+        "values_per_second": round(monitor.counts["values"] / elapsed),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()